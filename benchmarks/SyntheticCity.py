@@ -0,0 +1,169 @@
+import json
+import math
+import random
+from argparse import Namespace
+from pathlib import Path
+
+import numpy as np
+from py3dtilers.Common import (FeatureList, FromGeometryTreeToTileset,
+                               GeometryNode, GeometryTree)
+from py3dtilers.Common.feature import Feature
+
+# This file generates a deterministic city of box buildings on a grid of tiles and writes it as a b3dm
+# tileset, to benchmark pySunlight on inputs of any size. Each tile has a ground and buildings whose
+# walls are split in levels to reach the requested number of triangles.
+
+# Origin of the city in EPSG:3946, near Lyon like the sun path of the computation
+ORIGIN = np.array([1843000.0, 5173000.0, 170.0])
+
+# Size of a tile in meters
+TILE_SIZE = 200.0
+
+META_FILE_NAME = "city.json"
+
+
+def get_tiler_args(output_dir: str):
+    """
+    The function returns the arguments of py3dtilers used to write and read the city.
+
+    :param output_dir: The `output_dir` parameter is the output directory of py3dtilers
+    :type output_dir: str
+    :return: a `Namespace` of arguments.
+    """
+    return Namespace(obj=None, loa=None, lod1=False, crs_in='EPSG:3946', crs_out='EPSG:3946', offset=[0, 0, 0], with_texture=False, scale=1, output_dir=output_dir, geometric_error=[None, None, None], kd_tree_max=None, texture_lods=0)
+
+
+def create_quad(a, b, c, d):
+    """
+    The function splits a quad in two triangles.
+
+    :return: a list of two triangles.
+    """
+    return [[a, b, c], [a, c, d]]
+
+
+def create_building(x: float, y: float, width: float, depth: float, height: float, levels: int):
+    """
+    The function creates the triangles of a box building, its walls being split in levels.
+
+    :param x: The `x` parameter is the minimum x of the footprint
+    :param y: The `y` parameter is the minimum y of the footprint
+    :param width: The `width` parameter is the size of the footprint along x
+    :param depth: The `depth` parameter is the size of the footprint along y
+    :param height: The `height` parameter is the height of the building
+    :param levels: The `levels` parameter is the number of levels of the walls
+    :type levels: int
+    :return: a list of triangles, as lists of three numpy arrays.
+    """
+    footprint = [np.array([x, y]), np.array([x + width, y]), np.array([x + width, y + depth]), np.array([x, y + depth])]
+
+    triangles = []
+    for level in range(levels):
+        z_min = ORIGIN[2] + height * level / levels
+        z_max = ORIGIN[2] + height * (level + 1) / levels
+
+        # Counterclockwise footprint, so walls face outside
+        for i in range(4):
+            start = footprint[i]
+            end = footprint[(i + 1) % 4]
+            triangles += create_quad(np.array([*start, z_min]), np.array([*end, z_min]), np.array([*end, z_max]), np.array([*start, z_max]))
+
+    roof = [np.array([*corner, ORIGIN[2] + height]) for corner in footprint]
+    triangles += create_quad(*roof)
+
+    return triangles
+
+
+def create_feature(feature_id: str, triangles: list):
+    """
+    The function creates a py3dtilers feature from triangles.
+
+    :param feature_id: The `feature_id` parameter is the id of the feature
+    :type feature_id: str
+    :param triangles: The `triangles` parameter is the list of triangles of the feature
+    :type triangles: list
+    :return: a `Feature`.
+    """
+    feature = Feature(feature_id)
+    feature.geom.triangles.append(triangles)
+    return feature
+
+
+def write_tileset(output_dir: str, feature_lists: list):
+    """
+    The function writes feature lists as a b3dm tileset, one tile by feature list, like the py3dtilers
+    command line tools.
+
+    :param output_dir: The `output_dir` parameter is the directory of the tileset
+    :type output_dir: str
+    :param feature_lists: The `feature_lists` parameter is the list of `FeatureList` of the tiles
+    :type feature_lists: list
+    """
+    nodes = [GeometryNode(feature_list) for feature_list in feature_lists]
+
+    tileset = FromGeometryTreeToTileset.convert_to_tileset(GeometryTree(nodes), get_tiler_args(output_dir), output_dir=output_dir)
+    tileset.write_as_json(Path(output_dir))
+
+
+def generate_city(output_dir: str, num_of_tiles=4, buildings_by_tile=16, triangles_by_building=34, seed=0):
+    """
+    The function generates a city and writes it as a b3dm tileset. The same parameters always give the
+    same city.
+
+    :param output_dir: The `output_dir` parameter is the directory of the tileset
+    :type output_dir: str
+    :param num_of_tiles: The `num_of_tiles` parameter is the number of tiles, defaults to 4
+    :param buildings_by_tile: The `buildings_by_tile` parameter is the number of buildings of each
+    tile, defaults to 16
+    :param triangles_by_building: The `triangles_by_building` parameter is the approximate number of
+    triangles of each building, at least 10, defaults to 34
+    :param seed: The `seed` parameter is the seed of building sizes, defaults to 0
+    :return: a dictionary describing the city, also written in `city.json`.
+    """
+    generator = random.Random(seed)
+    levels = max(1, (triangles_by_building - 2) // 8)
+
+    tiles_by_row = math.ceil(math.sqrt(num_of_tiles))
+    buildings_by_row = math.ceil(math.sqrt(buildings_by_tile))
+    lot_size = TILE_SIZE / buildings_by_row
+
+    feature_lists = []
+    num_of_triangles = 0
+    for tile_index in range(num_of_tiles):
+        tile_x = ORIGIN[0] + (tile_index % tiles_by_row) * TILE_SIZE
+        tile_y = ORIGIN[1] + (tile_index // tiles_by_row) * TILE_SIZE
+
+        feature_list = FeatureList()
+
+        ground = [np.array([tile_x, tile_y, ORIGIN[2]]), np.array([tile_x + TILE_SIZE, tile_y, ORIGIN[2]]), np.array([tile_x + TILE_SIZE, tile_y + TILE_SIZE, ORIGIN[2]]), np.array([tile_x, tile_y + TILE_SIZE, ORIGIN[2]])]
+        feature_list.append(create_feature(f"ground_{tile_index}", create_quad(*ground)))
+        num_of_triangles += 2
+
+        for building_index in range(buildings_by_tile):
+            # Buildings fill a random part of their lot, leaving streets between lots
+            width = generator.uniform(0.3, 0.8) * lot_size
+            depth = generator.uniform(0.3, 0.8) * lot_size
+            height = generator.uniform(6.0, 60.0)
+            x = tile_x + (building_index % buildings_by_row) * lot_size + (lot_size - width) / 2
+            y = tile_y + (building_index // buildings_by_row) * lot_size + (lot_size - depth) / 2
+
+            triangles = create_building(x, y, width, depth, height, levels)
+            feature_list.append(create_feature(f"building_{tile_index}_{building_index}", triangles))
+            num_of_triangles += len(triangles)
+
+        feature_lists.append(feature_list)
+
+    write_tileset(output_dir, feature_lists)
+
+    description = {
+        'numOfTiles': num_of_tiles,
+        'buildingsByTile': buildings_by_tile,
+        'trianglesByBuilding': 8 * levels + 2,
+        'seed': seed,
+        'numOfTriangles': num_of_triangles
+    }
+
+    with open(str(Path(output_dir, META_FILE_NAME)), 'w') as file:
+        json.dump(description, file, indent=2)
+
+    return description
@@ -0,0 +1,254 @@
+import argparse
+import json
+import logging
+import multiprocessing
+import resource
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from py3dtilers.TilesetReader.TilesetReader import TilesetTiler
+from py3dtiles import TilesetReader
+
+from benchmarks.SyntheticCity import (META_FILE_NAME, generate_city,
+                                      get_tiler_args)
+from src import Utils
+from src.Aggregators.AggregatorController import \
+    AggregatorControllerInBatchTable
+from src.Computation import compute_3DTiles_sunlight
+from src.main import create_writer
+from src.Metrics import metrics
+from src.pySunlight import SunDatas, Vec3d
+from src.Writers import MetricsWriter
+
+# Benchmark harness of pySunlight on a synthetic city. Each case runs in its own process to measure
+# its peak memory, and reports triangles per second, peak RSS and the time of each stage recorded by
+# the run metrics. Inputs of a case (like the results read by the aggregates) are prepared in another
+# process before, so they are not part of its measure. Results are compared with the baseline of the
+# repository to find regressions, and can be saved as the next baseline.
+#
+# Ex : python -m benchmarks.run_benchmarks --tiles 9 --buildings 25 --save-baseline benchmarks/baseline.json
+
+WRITER_NAMES = ['json', 'csv', 'tile', 'shared-tile', 'timeseries']
+
+# Baseline of the repository, recorded with the default city
+DEFAULT_BASELINE_PATH = Path(__file__).parent / "baseline.json"
+
+# Sun positions of the benchmarked timestamps
+SUN_DATAS = [
+    ("2016-10-01:0700", (1901882.337616, 5166061.119860, 13415.421495), (0.965917, -0.130426, 0.223590)),
+    ("2016-10-01:0800", (1888857.649890, 5136065.174273, 12280.013599), (0.748839, -0.630358, 0.204667))
+]
+
+
+def create_tiler(output_dir: Path):
+    """
+    The function creates a tileset reader of the synthetic city writing in an output directory.
+
+    :param output_dir: The `output_dir` parameter is the output directory of the case
+    :type output_dir: Path
+    :return: a `TilesetTiler`.
+    """
+    tiler = TilesetTiler()
+    tiler.args = get_tiler_args(output_dir)
+    return tiler
+
+
+def compute_timestamps(tileset_dir: Path, output_dir: Path, writer_name: str, num_of_timestamps: int):
+    """
+    The function computes Sunlight on the synthetic city for a number of timestamps with one writer.
+
+    :param tileset_dir: The `tileset_dir` parameter is the directory of the synthetic city
+    :type tileset_dir: Path
+    :param output_dir: The `output_dir` parameter is the output directory of the case
+    :type output_dir: Path
+    :param writer_name: The `writer_name` parameter is the name of the writer, as in command line
+    :type writer_name: str
+    :param num_of_timestamps: The `num_of_timestamps` parameter is the number of computed timestamps
+    :type num_of_timestamps: int
+    :return: the writer, closed.
+    """
+    tiler = create_tiler(output_dir)
+    tileset = TilesetReader().read_tileset(tileset_dir)
+    writer = MetricsWriter(create_writer(writer_name, tiler))
+
+    for date_str, position, direction in SUN_DATAS[:num_of_timestamps]:
+        writer.set_directory(Utils.get_output_directory_for_timestamp(str(output_dir), date_str))
+        writer.create_directory()
+        compute_3DTiles_sunlight(tileset, SunDatas(date_str, Vec3d(*position), Vec3d(*direction)), writer)
+
+    writer.close()
+    return writer
+
+
+def prepare_case(case_name: str, tileset_dir: Path, output_dir: Path):
+    """
+    The function prepares the inputs of a benchmark case, in a process run before the one of the case.
+
+    :param case_name: The `case_name` parameter is `compute-<writer>` or `aggregate`
+    :type case_name: str
+    :param tileset_dir: The `tileset_dir` parameter is the directory of the synthetic city
+    :type tileset_dir: Path
+    :param output_dir: The `output_dir` parameter is the output directory of the case
+    :type output_dir: Path
+    """
+    # Results of all timestamps are read back by the aggregates
+    if case_name == 'aggregate':
+        compute_timestamps(tileset_dir, output_dir, 'tile', len(SUN_DATAS))
+
+
+def run_case(case_name: str, tileset_dir: Path, output_dir: Path):
+    """
+    The function runs one benchmark case, in its own process, once its inputs are prepared.
+
+    :param case_name: The `case_name` parameter is `compute-<writer>` or `aggregate`
+    :type case_name: str
+    :param tileset_dir: The `tileset_dir` parameter is the directory of the synthetic city
+    :type tileset_dir: Path
+    :param output_dir: The `output_dir` parameter is the output directory of the case
+    :type output_dir: Path
+    :return: a dictionary of results.
+    """
+    with open(str(Path(tileset_dir, META_FILE_NAME)), 'r') as file:
+        city = json.load(file)
+
+    metrics.reset()
+
+    if case_name == 'aggregate':
+        # Results of all timestamps are computed by `prepare_case`, in another process
+        writer = create_writer('tile', create_tiler(output_dir))
+
+        start_time = time.perf_counter()
+        aggregator = AggregatorControllerInBatchTable(str(output_dir), writer)
+        aggregator.compute_and_export(city['numOfTiles'], [[[date_str for date_str, position, direction in SUN_DATAS]]])
+        seconds = time.perf_counter() - start_time
+        num_of_triangles = city['numOfTriangles'] * len(SUN_DATAS)
+    else:
+        start_time = time.perf_counter()
+        compute_timestamps(tileset_dir, output_dir, case_name[len('compute-'):], 1)
+        seconds = time.perf_counter() - start_time
+        num_of_triangles = city['numOfTriangles']
+
+    # Maximum resident set size is given in kilobytes on Linux and in bytes on Mac OS
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_rss_in_megabytes = peak_rss / 1024 / 1024 if sys.platform == 'darwin' else peak_rss / 1024
+
+    return {
+        'seconds': seconds,
+        'triangles': num_of_triangles,
+        'trianglesPerSecond': num_of_triangles / seconds if 0 < seconds else 0,
+        'peakRssInMegabytes': peak_rss_in_megabytes,
+        'metrics': metrics.to_dict()
+    }
+
+
+def compare_with_baseline(results: dict, baseline: dict, tolerance: float):
+    """
+    The function compares the throughput of each case with a baseline.
+
+    :param results: The `results` parameter is the dictionary of results by case
+    :type results: dict
+    :param baseline: The `baseline` parameter is the dictionary of baseline results by case
+    :type baseline: dict
+    :param tolerance: The `tolerance` parameter is the accepted slowdown ratio, 0.1 for 10%
+    :type tolerance: float
+    :return: the list of regressed cases.
+    """
+    regressions = []
+    for case_name, result in results.items():
+        if case_name not in baseline or baseline[case_name]['trianglesPerSecond'] <= 0:
+            continue
+
+        # Throughputs are only comparable on the same city
+        if baseline[case_name].get('city') != result.get('city'):
+            logging.warning(f"{case_name} : the baseline was recorded on another city, it is not compared.")
+            continue
+
+        ratio = result['trianglesPerSecond'] / baseline[case_name]['trianglesPerSecond']
+        logging.warning(f"{case_name} : {ratio:.2f}x the baseline throughput, {result['peakRssInMegabytes'] - baseline[case_name]['peakRssInMegabytes']:+.1f} MB of peak RSS.")
+
+        if ratio < 1 - tolerance:
+            regressions.append(case_name)
+
+    return regressions
+
+
+def format_results(results: dict):
+    """
+    The function formats results as a table, with the main stages of each case.
+
+    :param results: The `results` parameter is the dictionary of results by case
+    :type results: dict
+    :return: a string.
+    """
+    lines = [f"{'Case':<22} {'Triangles/s':>12} {'Seconds':>9} {'Peak RSS (MB)':>14}  Stages (s)"]
+    for case_name, result in results.items():
+        stages = ', '.join(f"{stage} {values['seconds']:.2f}" for stage, values in result['metrics']['stages'].items())
+        lines.append(f"{case_name:<22} {result['trianglesPerSecond']:>12.0f} {result['seconds']:>9.2f} {result['peakRssInMegabytes']:>14.1f}  {stages}")
+
+    return '\n'.join(lines)
+
+
+def parse_command_line():
+    parser = argparse.ArgumentParser(description='Benchmark pySunlight on a synthetic city.')
+
+    parser.add_argument('--tiles', dest='tiles', type=int, default=4, help='Number of tiles of the synthetic city. Ex : --tiles 9, default=4')
+    parser.add_argument('--buildings', dest='buildings', type=int, default=16, help='Number of buildings by tile. Ex : --buildings 25, default=16')
+    parser.add_argument('--triangles', dest='triangles', type=int, default=34, help='Approximate number of triangles by building. Ex : --triangles 66, default=34')
+    parser.add_argument('--seed', dest='seed', type=int, default=0, help='Seed of the building sizes. Ex : --seed 1, default=0')
+    parser.add_argument('--cases', dest='cases', nargs='+', default=[f"compute-{writer_name}" for writer_name in WRITER_NAMES] + ['aggregate'], help='Benchmarked cases, compute-<writer> or aggregate. Ex : --cases compute-csv aggregate, default=all cases')
+    parser.add_argument('--work-dir', dest='work_dir', type=str, default='benchmarks/junk', help='Directory of the synthetic city and results, removed at the end. Ex : --work-dir /tmp/bench, default=benchmarks/junk')
+    parser.add_argument('--output', '-o', dest='output', type=str, help='File where results are saved as JSON. Ex : --output results.json')
+    parser.add_argument('--baseline', dest='baseline', type=str, default=str(DEFAULT_BASELINE_PATH), help='Baseline results compared with this run, none with an empty value. Ex : --baseline other.json, default=benchmarks/baseline.json')
+    parser.add_argument('--save-baseline', dest='save_baseline', type=str, help='File where results are saved as the next baseline. Ex : --save-baseline benchmarks/baseline.json')
+    parser.add_argument('--tolerance', dest='tolerance', type=float, default=0.1, help='Accepted throughput loss against the baseline. Ex : --tolerance 0.2, default=0.1')
+
+    return parser.parse_args()
+
+
+def main():
+    args = parse_command_line()
+
+    logging.basicConfig(level=logging.WARNING, format='[%(asctime)s] [%(levelname)s] %(message)s')
+
+    work_dir = Path(args.work_dir)
+    tileset_dir = Path(work_dir, 'city')
+    shutil.rmtree(str(work_dir), ignore_errors=True)
+
+    city = generate_city(tileset_dir, args.tiles, args.buildings, args.triangles, args.seed)
+    logging.warning(f"Synthetic city of {city['numOfTiles']} tiles and {city['numOfTriangles']} triangles.")
+
+    # A new process by case, so peak RSS and class-level states of each case are independent. Its
+    # inputs are prepared in a previous process, so they are not part of its peak RSS
+    results = dict()
+    context = multiprocessing.get_context('spawn')
+    for case_name in args.cases:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            executor.submit(prepare_case, case_name, tileset_dir, Path(work_dir, case_name)).result()
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            results[case_name] = executor.submit(run_case, case_name, tileset_dir, Path(work_dir, case_name)).result()
+        results[case_name]['city'] = city
+
+    print(format_results(results))
+
+    for path in (args.output, args.save_baseline):
+        if path is not None:
+            with open(path, 'w') as file:
+                json.dump(results, file, indent=2)
+
+    shutil.rmtree(str(work_dir), ignore_errors=True)
+
+    if args.baseline and Path(args.baseline).exists():
+        with open(args.baseline, 'r') as file:
+            baseline = json.load(file)
+
+        regressions = compare_with_baseline(results, baseline, args.tolerance)
+        if 0 < len(regressions):
+            logging.error(f"Throughput regressed more than {args.tolerance:.0%} : {regressions}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
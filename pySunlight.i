@@ -47,6 +47,28 @@ https://stackoverflow.com/questions/12236150/string-arguments-are-not-recognized
 %template(SunDatasList)     std::vector<SunDatas>;
 %template(Vec3f)            TVec3<float>;
 %template(Vec3d)            TVec3<double>;
+%template(DoubleVector)     std::vector<double>;
+%template(StringVector)     std::vector<std::string>;
+
+
+/* Create the triangles of a tile in one call from flat arrays, instead of one Python call by
+triangle. Vertices are the 9 coordinates of each triangle (a, b, c). */
+%inline
+%{
+    std::vector<Triangle> createTriangleSoup(const std::vector<double>& vertices, const std::vector<std::string>& ids, const std::string& tileName)
+    {
+        std::vector<Triangle> triangleSoup;
+        triangleSoup.reserve(ids.size());
+
+        for (size_t i = 0; i < ids.size() && 9 * i + 8 < vertices.size(); i++)
+        {
+            const double* v = &vertices[9 * i];
+            triangleSoup.push_back(Triangle(TVec3<double>(v[0], v[1], v[2]), TVec3<double>(v[3], v[4], v[5]), TVec3<double>(v[6], v[7], v[8]), ids[i], tileName));
+        }
+
+        return triangleSoup;
+    }
+%}
 
 
 /* Extend __str__ function to provide an user friendly output in python */
@@ -1,97 +1,196 @@
 import logging
+import queue
+from concurrent.futures import ThreadPoolExecutor
 from typing import List
 
 from .. import Utils
+from ..Metrics import metrics
+from ..RunManifest import RunManifest
 from ..Writers import Writer
 from .Aggregator import (
     Aggregator,
     ExposureAggregator,
 )
 
-# The AggregatorControllerInBatchTable class is used for aggregating data in a batch table.
+# The AggregatorControllerInBatchTable class is used for aggregating data in a batch table. Tiles are
+# aggregated in parallel only with writers exporting each tile in its own files
+# (`can_export_concurrently`), each worker thread using its own copy of the writer. Writers appending
+# to a shared file (like csv) aggregate tiles one after another, so their rows keep the order of tiles.
 
 
 class AggregatorControllerInBatchTable():
-    def __init__(self, root_directory: str, tile_writer: Writer):
+    def __init__(self, root_directory: str, tile_writer: Writer, manifest: RunManifest = None, num_workers=0, writer_name=None):
+        """
+        The function initializes the aggregation of the results of a run.
+
+        :param root_directory: The `root_directory` parameter is the root directory of results, with one
+        directory by timestamp
+        :type root_directory: str
+        :param tile_writer: The `tile_writer` parameter is the writer reading back results and exporting
+        aggregates
+        :type tile_writer: Writer
+        :param manifest: The `manifest` parameter records each aggregated tile to resume aggregation,
+        defaults to None
+        :type manifest: RunManifest
+        :param num_workers: The `num_workers` parameter is the number of threads aggregating tiles in
+        parallel, tiles are aggregated one after another with 0, defaults to 0
+        :param writer_name: The `writer_name` parameter identifies the aggregates of the writer in the
+        manifest, defaults to None
+        """
         self.root_directory = root_directory
         self.tile_writer = tile_writer
         self.aggregators = []
+        self.num_workers = num_workers
+
+        # Record each aggregated tile to resume aggregation
+        self.manifest = manifest
+        self.writer_name = writer_name
+
+    def create_aggregators(self):
+        return [
+            ExposureAggregator(),
+            # OccludeAggregator(self.root_directory, num_of_tiles), OccludeAmountAggregator(self.root_directory, num_of_tiles)
+        ]
+
+    def export_results_for_an_entire_day(self, hours: List[str], tile_index: int, export_daily: bool, aggregators: List[Aggregator] = None, tile_writer: Writer = None):
+        # Aggregators and writer of the tile in parallel aggregation
+        aggregators = self.aggregators if aggregators is None else aggregators
+        tile_writer = self.tile_writer if tile_writer is None else tile_writer
 
-    def export_results_for_an_entire_day(self, hours: List[str], tile_index: int, export_daily: bool):
         # Timestamp key to identify each result
         timestamp_key = 'daily' if export_daily else 'monthly'
 
         # Store each normalize result to avoid normalize at each call
         results = []
-        for i, aggregator in enumerate(self.aggregators):
+        for i, aggregator in enumerate(aggregators):
             result = aggregator.get_normalized_daily_result() if export_daily else aggregator.get_normalized_monthly_result()
             results.append(result)
 
         for hour in hours:
             # Load tile corresponding to a given hour
             CURRENT_DIRECTORY = Utils.get_output_directory_for_timestamp(self.root_directory, hour)
-            feature_list = self.tile_writer.get_feature_list_from_tile(tile_index, CURRENT_DIRECTORY)
+            feature_list = tile_writer.get_feature_list_from_tile(tile_index, CURRENT_DIRECTORY)
 
             # Add all aggregators result
             for i, feature in enumerate(feature_list):
-                for j, aggregator in enumerate(self.aggregators):
+                for j, aggregator in enumerate(aggregators):
                     result = results[j][i]
                     feature.add_batchtable_data(f'{timestamp_key}{aggregator.get_name()}', result)
 
-            self.tile_writer.set_directory(CURRENT_DIRECTORY)
-            self.tile_writer.export_feature_list_by_tile(feature_list, tile_index)
+            tile_writer.set_directory(CURRENT_DIRECTORY)
+            tile_writer.export_feature_list_by_tile(feature_list, tile_index)
+
+    def aggregate_tile(self, tile_index: int, num_of_tiles: int, dates_by_month_and_days: List[List[List[str]]], aggregators: List[Aggregator], tile_writer: Writer):
+        """
+        The function computes and exports the daily and monthly aggregates of a tile.
+
+        :param tile_index: The `tile_index` parameter is the index of the aggregated tile
+        :type tile_index: int
+        :param num_of_tiles: The `num_of_tiles` parameter is the number of tiles of the tileset
+        :type num_of_tiles: int
+        :param dates_by_month_and_days: The `dates_by_month_and_days` parameter is the list of dates
+        grouped by month and by day
+        :type dates_by_month_and_days: List[List[List[str]]]
+        :param aggregators: The `aggregators` parameter is the list of aggregators of the tile
+        :type aggregators: List[Aggregator]
+        :param tile_writer: The `tile_writer` parameter is the writer of the tile, whose directory is
+        changed for each timestamp
+        :type tile_writer: Writer
+        """
+        logging.info(f"Compute aggregate of tile : {Utils.compute_percent(tile_index, num_of_tiles)}%...")
+
+        # Initialize or reset computation
+        for aggregator in aggregators:
+            aggregator.initialize_count()
+
+        # Monthly computation
+        for i, months in enumerate(dates_by_month_and_days):
+            logging.info(f"Loop in month {i + 1} on {len(dates_by_month_and_days)}")
+
+            # Daily computation
+            for j, day in enumerate(months):
+                # Hourly computation
+                for hour in day:
+
+                    # Load tile corresponding to a given hour
+                    CURRENT_DIRECTORY = Utils.get_output_directory_for_timestamp(self.root_directory, hour)
+                    with metrics.time('read'):
+                        feature_list = tile_writer.get_feature_list_from_tile(tile_index, CURRENT_DIRECTORY)
+
+                    # Compute aggregate
+                    with metrics.time('aggregate'):
+                        for aggregator in aggregators:
+                            aggregator.compute_hourly_for(feature_list, day)
 
-    def compute_and_export(self, num_of_tiles: int, dates_by_month_and_days: List[List[List[str]]]):
-        self.aggregators: List[Aggregator] = [
-            ExposureAggregator(),
-            # OccludeAggregator(self.root_directory, num_of_tiles), OccludeAmountAggregator(self.root_directory, num_of_tiles)
-        ]
+                # Export daily result after looping on each hour
+                logging.debug(f"Exporting daily result {Utils.compute_percent(j, len(months))}% ...")
 
-        # We compute exposure on each tile
-        for tile_index in range(0, num_of_tiles):
-            logging.info(f"Compute aggregate of tile : {Utils.compute_percent(tile_index, num_of_tiles)}%...")
+                for aggregator in aggregators:
+                    self.export_results_for_an_entire_day(day, tile_index, True, aggregators, tile_writer)
 
-            # Initialize or reset computation
-            for aggregator in self.aggregators:
-                aggregator.initialize_count()
+                logging.debug("Exporting daily result completed.")
 
-            # Monthly computation
-            for i, months in enumerate(dates_by_month_and_days):
-                logging.info(f"Loop in month {i + 1} on {len(dates_by_month_and_days)}")
+                # Sum all aggregate by month
+                for aggregator in aggregators:
+                    aggregator.add_daily_result_to_monthly_result()
 
-                # Daily computation
-                for j, day in enumerate(months):
-                    # Hourly computation
-                    for hour in day:
+            # Export monthly result after looping on each day
+            logging.debug("Exporting monthly result...")
 
-                        # Load tile corresponding to a given hour
-                        CURRENT_DIRECTORY = Utils.get_output_directory_for_timestamp(self.root_directory, hour)
-                        feature_list = self.tile_writer.get_feature_list_from_tile(tile_index, CURRENT_DIRECTORY)
+            # Convert all value in percent
+            for day in months:
+                for aggregator in aggregators:
+                    self.export_results_for_an_entire_day(day, tile_index, False, aggregators, tile_writer)
 
-                        # Compute aggregate
-                        for aggregator in self.aggregators:
-                            aggregator.compute_hourly_for(feature_list, day)
+            logging.debug("Exporting monthly result completed.")
+
+        metrics.increment('aggregated_tiles')
+
+        # The aggregates of the tile are recorded once they are written
+        tile_writer.wait()
+
+        if self.manifest is not None:
+            self.manifest.record_aggregate(tile_index, writer_name=self.writer_name)
+
+        logging.info("End computation.")
+
+    def compute_and_export(self, num_of_tiles: int, dates_by_month_and_days: List[List[List[str]]], tile_indexes=None):
+        # We compute exposure on each tile, or only on tiles with results
+        remaining_tile_indexes = []
+        for tile_index in (range(0, num_of_tiles) if tile_indexes is None else tile_indexes):
+            if self.manifest is not None and self.manifest.is_aggregate_complete(tile_index, self.writer_name):
+                logging.info(f"Aggregate of tile {tile_index} already computed.")
+                continue
 
-                    # Export daily result after looping on each hour
-                    logging.debug(f"Exporting daily result {Utils.compute_percent(j, len(months))}% ...")
+            remaining_tile_indexes.append(tile_index)
 
-                    for aggregator in self.aggregators:
-                        self.export_results_for_an_entire_day(day, tile_index, True)
+        # Rows of writers appending to a shared file are exported in the order of tiles
+        if 0 < self.num_workers and not self.tile_writer.can_export_concurrently():
+            logging.info("The writer can't export tiles concurrently, tiles are aggregated one after another.")
 
-                    logging.debug("Exporting daily result completed.")
+        if self.num_workers <= 0 or not self.tile_writer.can_export_concurrently():
+            self.aggregators = self.create_aggregators()
+            for tile_index in remaining_tile_indexes:
+                self.aggregate_tile(tile_index, num_of_tiles, dates_by_month_and_days, self.aggregators, self.tile_writer)
 
-                    # Sum all aggregate by month
-                    for aggregator in self.aggregators:
-                        aggregator.add_daily_result_to_monthly_result()
+            return
 
-                # Export monthly result after looping on each day
-                logging.debug("Exporting monthly result...")
+        # Each worker thread takes a copy of the writer, whose directory is changed for each timestamp,
+        # and gives it back once its tile is aggregated. Copies share the read caches of the writer
+        tile_writers = queue.Queue()
+        for _ in range(min(self.num_workers, len(remaining_tile_indexes))):
+            tile_writers.put(self.tile_writer.copy())
 
-                # Convert all value in percent
-                for day in months:
-                    for aggregator in self.aggregators:
-                        self.export_results_for_an_entire_day(day, tile_index, False)
+        def aggregate_tile_with_a_writer_copy(tile_index: int):
+            tile_writer = tile_writers.get()
+            try:
+                self.aggregate_tile(tile_index, num_of_tiles, dates_by_month_and_days, self.create_aggregators(), tile_writer)
+            finally:
+                tile_writers.put(tile_writer)
 
-                logging.debug("Exporting monthly result completed.")
+        with ThreadPoolExecutor(max_workers=self.num_workers, thread_name_prefix="Aggregator") as executor:
+            futures = [executor.submit(aggregate_tile_with_a_writer_copy, tile_index) for tile_index in remaining_tile_indexes]
 
-            logging.info("End computation.")
+            # Raise the first aggregation error
+            for future in futures:
+                future.result()
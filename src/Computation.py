@@ -0,0 +1,262 @@
+import functools
+import logging
+
+from py3dtilers.TilesetReader.TilesetReader import TilesetTiler
+from py3dtiles import TileSet
+from src import Geometry, Utils, pySunlight
+from src.Converters import SunlightToTiler
+from src.ExtrusionEngine import ExtrusionEngine
+from src.GeometryExport import GeometryExport
+from src.HitBuffer import HitBuffer
+from src.Metrics import metrics
+from src.OccluderProxies import OccluderProxies
+from src.RegionOfInterest import RegionOfInterest
+from src.SceneCache import SceneCache
+from src.TileHierarchy import TileHierarchy
+from src.TilePool import TilePool
+from src.TilePrefetcher import TilePrefetcher
+from src.Writers import Writer
+
+# Computation of Sunlight on a tileset, shared by the command line, the distributed workers, the
+# library engine and the benchmarks. Nothing here parses arguments or creates writers.
+
+
+def export_with_triangle_level(tiler: TilesetTiler, tileset: TileSet, tile_hierarchy: TileHierarchy = None, geometry_export: GeometryExport = None, prefetch_size=0, tile_pool: TilePool = None, scene_cache: SceneCache = None):
+    """
+    The function exports a 3D Tiles file with triangle-level features from a given tileset.
+
+    :param tiler: The `tiler` parameter is an instance of the `TilesetTiler` class. It is used to
+    perform tiling operations on a tileset
+    :type tiler: TilesetTiler
+    :param tileset: The `tileset` parameter is an instance of the `TileSet` class. It represents a 3D
+    tileset, which is a hierarchical data structure that organizes 3D geometric data into a tree-like
+    structure
+    :type tileset: TileSet
+    :param tile_hierarchy: The `tile_hierarchy` parameter is the hierarchy of the tileset, built from
+    the tileset when it is None, defaults to None
+    :type tile_hierarchy: TileHierarchy
+    :param geometry_export: The `geometry_export` parameter is the export in progress, with the tiles
+    already exported during the computation. All tiles are exported when it is None, defaults to None
+    :type geometry_export: GeometryExport
+    :param prefetch_size: The `prefetch_size` parameter is the number of tiles decoded in a background
+    thread while exporting the current one, defaults to 0
+    :param tile_pool: The `tile_pool` parameter keeps decoded tiles under a memory budget, defaults to
+    None
+    :type tile_pool: TilePool
+    :param scene_cache: The `scene_cache` parameter is a loaded cache of the triangles of all tiles,
+    defaults to None
+    :type scene_cache: SceneCache
+    """
+    # Tiles of the whole tree, in the same order as results
+    all_tiles = (TileHierarchy(tileset) if tile_hierarchy is None else tile_hierarchy).get_tiles()
+
+    # Export a default 3D Tiles containing only geometries
+    if geometry_export is None:
+        geometry_export = GeometryExport(tiler, all_tiles)
+
+    # Only tiles that were not computed are decoded
+    pending_tile_indexes = sorted(tile_index for tile_index in range(len(all_tiles)) if geometry_export.is_pending(tile_index))
+    geometry_export.close(tileset, TilePrefetcher(all_tiles, prefetch_size, pending_tile_indexes, tile_pool=tile_pool, scene_cache=scene_cache))
+
+
+def compute_3DTiles_sunlight(tileset: TileSet, sun_datas: pySunlight.SunDatas, writer: Writer, prefetch_size=0, tile_indexes=None, region_of_interest: RegionOfInterest = None, proxy_distance=None, conservative_proxies=False, extrusion_engine: ExtrusionEngine = None, tile_hierarchy: TileHierarchy = None, tile_pool: TilePool = None, hit_buffer_directory=None, scene_cache: SceneCache = None, geometry_export: GeometryExport = None):
+    """
+    The function `compute_3DTiles_sunlight` computes sunlight visibility for each triangle in a 3D
+    tileset and exports the results.
+
+    :param tileset: The `tileset` parameter is an object of type `TileSet`. It represents a collection
+    of tiles that make up a 3D model or scene
+    :type tileset: TileSet
+    :param sun_datas: The `sun_datas` parameter is an object of type `pySunlight.SunDatas`. It contains
+    information about the sun, such as the date and direction
+    :type sun_datas: pySunlight.SunDatas
+    :param writer: The `writer` parameter is an object of the `Writer` class. It is used to export the
+    computed results and the updated `tileset.json` file
+    :type writer: Writer
+    :param prefetch_size: The `prefetch_size` parameter is the number of tiles decoded and converted
+    in a background thread while computing the current one. Tiles are loaded synchronously with 0,
+    defaults to 0
+    :param tile_indexes: The `tile_indexes` parameter is the list of indexes of the tiles whose
+    triangles are computed and exported. All tiles are still used as occluders. All tiles are computed
+    when it is None, defaults to None
+    :param region_of_interest: The `region_of_interest` parameter limits receivers to the triangles of
+    a region, with its tiles already selected. Only tiles which can shade the region are used as
+    occluders. All triangles are computed when it is None, defaults to None
+    :type region_of_interest: RegionOfInterest
+    :param proxy_distance: The `proxy_distance` parameter is the distance between tile bounds beyond
+    which occluder tiles are replaced by one box by feature. Full geometries are always used when it is
+    None, defaults to None
+    :param conservative_proxies: The `conservative_proxies` parameter confirms box hits on the
+    triangles of their feature, defaults to False
+    :param extrusion_engine: The `extrusion_engine` parameter computes shadows of extruded features in
+    2.5D. Only other features are used as occluders of the ray engine. All features are ray traced
+    when it is None, defaults to None
+    :type extrusion_engine: ExtrusionEngine
+    :param tile_hierarchy: The `tile_hierarchy` parameter is the hierarchy of the tileset, built from
+    the tileset when it is None, defaults to None
+    :type tile_hierarchy: TileHierarchy
+    :param tile_pool: The `tile_pool` parameter keeps decoded tiles between receivers and timestamps
+    under a memory budget. Occluders are then visited in serpentine order, so the last occluders of a
+    receiver are the first ones of the next receiver. Tiles are decoded for each receiver when it is
+    None, defaults to None
+    :type tile_pool: TilePool
+    :param hit_buffer_directory: The `hit_buffer_directory` parameter is the directory where hits of
+    each tile are memory-mapped, to compute very large tiles in bounded memory. Hits are kept in memory
+    when it is None, defaults to None
+    :param scene_cache: The `scene_cache` parameter is a loaded cache of the triangles of all tiles,
+    memory-mapped instead of decoding tiles. Tiles are decoded when it is None, defaults to None
+    :type scene_cache: SceneCache
+    :param geometry_export: The `geometry_export` parameter exports the geometry of each receiver tile
+    from its decoded triangles, so the tile is not decoded again for the export, defaults to None
+    :type geometry_export: GeometryExport
+    """
+    # Loop in the whole tree of tileset.json
+    if tile_hierarchy is None:
+        tile_hierarchy = TileHierarchy(tileset)
+    all_tiles = tile_hierarchy.get_tiles()
+    sun_direction = SunlightToTiler.convert_vec3_to_numpy(sun_datas.direction)
+
+    # Only tiles of the region are receivers, and only tiles in its shadow corridor are occluders
+    occluder_tile_indexes = None
+    if region_of_interest is not None:
+        receiver_tile_indexes = region_of_interest.get_receiver_tile_indexes()
+        tile_indexes = [i for i in (range(len(all_tiles)) if tile_indexes is None else tile_indexes) if i in receiver_tile_indexes]
+        occluder_tile_indexes = region_of_interest.get_occluder_tile_indexes(sun_direction)
+
+    # Extrusions are indexed for the sun direction, other features are ray traced
+    residual_tile_loader = None
+    if extrusion_engine is not None:
+        extrusion_engine.set_sun_direction(sun_direction)
+        residual_tile_loader = extrusion_engine.load_residual_tile_wrapper
+
+        ray_tile_indexes = extrusion_engine.get_ray_tile_indexes()
+        occluder_tile_indexes = [i for i in (ray_tile_indexes if occluder_tile_indexes is None else occluder_tile_indexes) if i in ray_tile_indexes]
+
+    if occluder_tile_indexes is not None:
+        occluder_tile_indexes = set(occluder_tile_indexes)
+
+    # Proxies of distant occluders are built once by tile, kept in the tile pool if there is one and
+    # for all receivers of the timestamp otherwise
+    proxy_loader = None
+    if proxy_distance is not None:
+        if extrusion_engine is not None:
+            proxy_loader = functools.partial(extrusion_engine.load_residual_occluder_proxies, conservative=conservative_proxies)
+        elif tile_pool is not None:
+            proxy_loader = functools.partial(tile_pool.load_occluder_proxies, conservative=conservative_proxies)
+        else:
+            occluder_proxies = dict()
+
+            def proxy_loader(proxy_tile_index: int):
+                if proxy_tile_index not in occluder_proxies:
+                    occluder_proxies[proxy_tile_index] = OccluderProxies(all_tiles[proxy_tile_index], proxy_tile_index, conservative_proxies)
+                return occluder_proxies[proxy_tile_index]
+
+    for receiver_position, (tile_index, tile_wrapper) in enumerate(TilePrefetcher(all_tiles, prefetch_size, tile_indexes, tile_pool=tile_pool, scene_cache=scene_cache)):
+        logging.debug(f"Load triangles from tile {tile_index} ...")
+
+        Utils.log_memory_size_in_megabyte(tile_wrapper.get_triangles())
+        logging.debug(f"Successfully load {len(tile_wrapper.get_triangles())} triangles !")
+
+        # The geometry of the tile is exported from the same decoded triangles
+        if geometry_export is not None:
+            geometry_export.export_tile(tile_wrapper)
+
+        # Receivers are separated from occluders, which keep all triangles of the tile
+        receiver_triangles = tile_wrapper.get_triangles()
+        if region_of_interest is not None:
+            receiver_triangles = region_of_interest.get_receiver_triangles(receiver_triangles)
+
+        # Record ray hits accross the whole tile comparaison to get the closest intersection. Results
+        # are converted to features by chunks while they are exported, once all tiles are compared
+        with HitBuffer(len(receiver_triangles), hit_buffer_directory) as hit_buffer:
+            # Cast one ray by receiver triangle facing the sun, tested against each occluder tile. A
+            # triangle looking at the ground is associated with its own shadow, because there's nothing
+            # blocking it but itself
+            rays = []
+            for triangle_index, triangle in enumerate(receiver_triangles):
+                if pySunlight.isFacingTheSun(triangle, sun_datas.direction):
+                    rays.append((triangle_index, pySunlight.constructRay(triangle, sun_datas.direction)))
+                else:
+                    hit_buffer.record_not_facing(triangle_index)
+
+            metrics.increment('rays', len(rays))
+            metrics.increment('back_face_skips', len(receiver_triangles) - len(rays))
+
+            # Start from the nearest extrusion, features which are not extrusions can still be closer
+            if extrusion_engine is not None:
+                for triangle_index, _ in rays:
+                    extrusion_hit = extrusion_engine.get_nearest_hit(receiver_triangles[triangle_index])
+                    if extrusion_hit is not None:
+                        hit_buffer.record_hit(triangle_index, extrusion_hit)
+
+            # Skip subtrees out of the shadow corridor of the receiver tile
+            receiver_bounds = tile_hierarchy.get_tile_bounds(tile_index)
+            receiver_occluder_tile_indexes = tile_hierarchy.get_occluder_tile_indexes(receiver_bounds, sun_direction)
+            if occluder_tile_indexes is not None:
+                receiver_occluder_tile_indexes = [i for i in receiver_occluder_tile_indexes if i in occluder_tile_indexes]
+
+            # The receiver tile is always compared, its triangles can shadow each other. Only its features
+            # which are not extrusions are compared with the extrusion engine, if it has any
+            is_receiver_occluder = extrusion_engine is None or tile_index in ray_tile_indexes
+            if is_receiver_occluder and tile_index not in receiver_occluder_tile_indexes:
+                receiver_occluder_tile_indexes = sorted(receiver_occluder_tile_indexes + [tile_index])
+
+            # Reverse every other visit to reuse the most recently loaded tiles of the pool
+            if tile_pool is not None and receiver_position % 2 == 1:
+                receiver_occluder_tile_indexes = receiver_occluder_tile_indexes[::-1]
+
+            # Distant occluders are only coarse blockers, their features are replaced by boxes
+            proxy_tile_indexes = set()
+            if proxy_distance is not None:
+                proxy_tile_indexes = {i for i in receiver_occluder_tile_indexes if proxy_distance < Geometry.get_bounds_distance(receiver_bounds, tile_hierarchy.get_tile_bounds(i))}
+
+            # We loop on tiles to compare with triangle in order to load a tile once
+            # and not for each triangle. Avoid to read and convert a tile already loaded with pool system,
+            # gain in performance and memory
+            loaded_tile_wrappers = {tile_index: tile_wrapper} if residual_tile_loader is None else None
+            other_tile_wrappers = TilePrefetcher(all_tiles, prefetch_size, receiver_occluder_tile_indexes, loaded_tile_wrappers, proxy_tile_indexes, conservative_proxies, tile_pool, scene_cache, residual_tile_loader, proxy_loader)
+            for other_tile_index, other_tile_wrapper in other_tile_wrappers:
+                # Each test of an occluder tile checks all its triangles, or all the boxes of its proxies.
+                # Tests are counted locally and added once by occluder tile to keep the loop fast
+                is_proxy = isinstance(other_tile_wrapper, OccluderProxies)
+                num_of_occluders = len(other_tile_wrapper.mins) if is_proxy else len(other_tile_wrapper.get_triangles())
+                num_of_tile_tests = 0
+
+                with metrics.time('intersect'):
+                    for triangle_index, ray in rays:
+                        tile_bounding_box_hit = pySunlight.checkIntersectionWith(ray, other_tile_wrapper.get_bounding_box())
+
+                        # Pool the nearest hit of a previous comparaison to get only the closest
+                        nearest_distance = hit_buffer.get_nearest_distance(triangle_index)
+
+                        if 0 < len(tile_bounding_box_hit) and tile_bounding_box_hit[0].distance < nearest_distance:
+                            # Sort result by impact distance (from near to far)
+                            if is_proxy:
+                                triangle_ray_hits = other_tile_wrapper.check_intersection_with(ray)
+                            else:
+                                triangle_ray_hits = pySunlight.checkIntersectionWith(ray, other_tile_wrapper.get_triangles())
+                            num_of_tile_tests += 1
+
+                            # We consider the first triangle to be blocking, recorded if it is the closest
+                            if 0 < len(triangle_ray_hits):
+                                hit_buffer.record_hit(triangle_index, triangle_ray_hits[0])
+
+                if is_proxy:
+                    metrics.increment('box_tests', len(rays) + num_of_tile_tests * num_of_occluders)
+                else:
+                    metrics.increment('box_tests', len(rays))
+                    metrics.increment('triangle_tests', num_of_tile_tests * num_of_occluders)
+
+            logging.info("Exporting result...")
+
+            # Transform collision detection to sunlight result, streamed to the writers
+            writer.export_feature_chunks_by_tile(hit_buffer.get_feature_chunks(receiver_triangles, sun_datas.dateStr), tile_index)
+
+        logging.info("Export finished.")
+
+        # Dump metrics every configured number of tiles
+        metrics.record_computed_tile()
+
+    # Export tileset.json for each timestamp
+    writer.export_tileset(tileset)
+    logging.info("End computation.\n")
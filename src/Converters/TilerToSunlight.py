@@ -10,6 +10,8 @@ from py3dtiles.tile import Tile
 
 from .. import pySunlight
 from ..Converters import TilerToSunlight
+from ..Metrics import metrics
+from ..TileHierarchy import TileHierarchy
 
 # This file convert py3DTiler type to Sunlight type
 
@@ -82,11 +84,11 @@ def get_tiles_bounding_boxes_from_tileset(tileset: TileSet):
     :type tileset: TileSet
     :return: a collection of bounding boxes for each tile in the given tileset.
     """
-    all_tiles = tileset.get_root_tile().get_children()
+    all_tiles = TileHierarchy(tileset).get_tiles()
 
     bounding_boxes = pySunlight.BoundingBoxes()
     for i, tile in enumerate(all_tiles):
-        bounding_volume = TilerToSunlight.convert_to_bounding_box(tile.get_bounding_volume(), tile.get_transform(), str(i), tile.get_content_uri())
+        bounding_volume = TilerToSunlight.convert_to_bounding_box(tile.get_bounding_volume(), str(i), tile.get_content_uri())
         bounding_boxes.append(bounding_volume)
 
     return bounding_boxes
@@ -109,11 +111,11 @@ def get_bounding_boxes_from_feature_list(feature_list: FeatureList):
         # Check bounding volume integrity
         bounding_box_tiler = feature.get_bounding_volume_box()
         if bounding_box_tiler is None:
-            logging.warn('Undefined bounding volume on feature {i}')
+            logging.warning(f'Undefined bounding volume on feature {i}')
             continue
 
         # Convert bounding volume to sunlight bounding box
-        bounding_box = TilerToSunlight.convert_to_bounding_box(bounding_box_tiler, None, str(i), "0")
+        bounding_box = TilerToSunlight.convert_to_bounding_box(bounding_box_tiler, str(i), "0")
         bounding_boxes.append(bounding_box)
 
     return bounding_boxes
@@ -133,6 +135,18 @@ def generate_triangle_id(tile_name, feature_id, triangle_index: int):
     return f"Tile-{tile_name}__Feature-{feature_id}__Triangle-{triangle_index}"
 
 
+def get_feature_id_from_triangle_id(triangle_id: str, tile_name):
+    """
+    The function reads the feature id of a triangle id generated by `generate_triangle_id`.
+
+    :param triangle_id: The `triangle_id` parameter is the id of the triangle
+    :type triangle_id: str
+    :param tile_name: The `tile_name` parameter is the name of the tile of the triangle
+    :return: the feature id, as a string.
+    """
+    return triangle_id[len(f"Tile-{tile_name}__Feature-"):triangle_id.rindex("__Triangle-")]
+
+
 def add_triangles_from_feature(triangle_soup: pySunlight.TriangleSoup, feature: Feature, tile: Tile, tile_index: int):
     """
     The function `add_triangles_from_feature` converts triangles from a feature into sunlight triangles
@@ -174,10 +188,12 @@ def get_triangle_soup_from_tile(tile: Tile, tile_index: int):
     :type tile_index: int
     :return: a `TriangleSoup` object.
     """
-    feature_list = TileToFeatureList(tile)
+    with metrics.time('load'):
+        feature_list = TileToFeatureList(tile)
 
-    all_triangles = pySunlight.TriangleSoup()
-    for feature in feature_list:
-        add_triangles_from_feature(all_triangles, feature, tile, tile_index)
+    with metrics.time('convert'):
+        all_triangles = pySunlight.TriangleSoup()
+        for feature in feature_list:
+            add_triangles_from_feature(all_triangles, feature, tile, tile_index)
 
     return all_triangles
@@ -0,0 +1,354 @@
+import argparse
+import logging
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from py3dtilers.TilesetReader.TilesetReader import TilesetTiler
+
+from src import Utils
+from src.main import (create_writer, export_aggregates,
+                      export_with_triangle_level, get_run_parameters,
+                      get_scenario_output_directory, load_scenarios,
+                      load_sun_datas)
+from src.main import parse_command_line as parse_sunlight_command_line
+from src.LazyTileset import LazyTileset
+from src.RegionOfInterest import RegionOfInterest
+from src.RunManifest import hash_run
+from src.SceneCache import SceneCache
+from src.SunlightEngine import SunlightEngine
+from src.TileHierarchy import TileHierarchy
+from src.WorkQueue import (STAGING_DIRECTORY_NAME, LeaseLostError, WorkQueue,
+                           split_into_shards)
+from src.Writers import AsyncWriter, CompositeWriter, CsvWriter, ShardWriter
+
+# Distributed execution of a Sunlight run on several nodes sharing a directory. The coordinator splits
+# the run into (timestamp range, tile set) shards published in a WorkQueue, workers claim shards and
+# compute them on a scene loaded once, and the coordinator merges the results once all shards are
+# completed : tileset.json of each timestamp, csv of each timestamp, geometry and aggregates. All nodes
+# are started with the same pySunlight arguments.
+#
+#    python src/Distributed.py --role coordinator --queue /shared/queue -i city -o /shared/out -s 403224 -e 411984
+#    python src/Distributed.py --role worker --queue /shared/queue -i city -o /shared/out -s 403224 -e 411984
+#
+# The local role runs the coordinator with --local-workers worker processes on the same machine.
+
+# Time between two checks of the queue
+POLL_SECONDS = 1.0
+
+# Csv of a shard in a timestamp directory, concatenated in output.csv by the merge
+CSV_PART_NAME = "output-{}.csv"
+
+
+def get_job(args, tiler: TilesetTiler):
+    """
+    The function identifies the inputs and parameters of a distributed run, so workers started with
+    other arguments don't compute the shards of the coordinator.
+
+    :param args: The `args` parameter is the parsed command line of pySunlight
+    :param tiler: The `tiler` parameter is an instance of the `TilesetTiler` class
+    :type tiler: TilesetTiler
+    :return: a dictionary identifying the job.
+    """
+    parameters = get_run_parameters(args, tiler)
+    parameters['scenarios'] = [scenario._asdict() for scenario in args.scenarios or []]
+
+    return {'runHash': hash_run(tiler.files, parameters), 'outputDirectory': str(tiler.get_output_dir())}
+
+
+def load_scenario_sun_datas(args):
+    """
+    The function loads the sun positions of each scenario, or of the dates of the command line.
+
+    :param args: The `args` parameter is the parsed command line of pySunlight
+    :return: a dictionary of `pySunlight.SunDatasList` by scenario name, None without scenarios.
+    """
+    if args.scenarios is not None:
+        return load_scenarios(args)
+
+    return {None: load_sun_datas(args, args.sunpath, args.start_date, args.end_date)}
+
+
+def create_shard_writer(args, tiler: TilesetTiler, output_directory: str, shard_id: str, staging_directory=None):
+    """
+    The function creates the writers of the results of a shard.
+
+    :param args: The `args` parameter is the parsed command line of pySunlight
+    :param tiler: The `tiler` parameter is an instance of the `TilesetTiler` class
+    :type tiler: TilesetTiler
+    :param output_directory: The `output_directory` parameter is the root directory of the scenario
+    :type output_directory: str
+    :param shard_id: The `shard_id` parameter is the id of the shard
+    :type shard_id: str
+    :param staging_directory: The `staging_directory` parameter is the directory where results are
+    written until the shard is completed, defaults to None
+    :return: a `Writer` instance.
+    """
+    writers = []
+    for writer_name in args.writers:
+        writer = create_writer(writer_name, tiler, args.read_cache_size, output_directory, args.encoding_processes)
+
+        # Shards of a timestamp can't append to the same csv from different nodes
+        if isinstance(writer, CsvWriter):
+            writer.file_name = CSV_PART_NAME.format(shard_id)
+
+        writer = ShardWriter(writer, output_directory, staging_directory)
+        if 0 < args.writer_threads:
+            writer = AsyncWriter(writer, args.writer_threads)
+
+        writers.append(writer)
+
+    return writers[0] if len(writers) == 1 else CompositeWriter(writers)
+
+
+def merge_csv_parts(directory: str):
+    """
+    The function concatenates the csv of all shards of a timestamp directory in output.csv, in the
+    order of the tiles of a run on one node.
+
+    :param directory: The `directory` parameter is the directory of a timestamp
+    :type directory: str
+    """
+    # Shard ids are ordered by timestamps then tiles
+    part_paths = sorted(Path(directory).glob(CSV_PART_NAME.format("*")))
+
+    with open(str(Path(directory, "output.csv")), 'wb') as file:
+        for part_path in part_paths:
+            with open(str(part_path), 'rb') as part:
+                file.write(part.read())
+
+    for part_path in part_paths:
+        part_path.unlink()
+
+
+def run_worker(args, distributed_args, tiler: TilesetTiler, queue: WorkQueue):
+    """
+    The function claims and computes shards until all shards of the queue are completed.
+
+    :param args: The `args` parameter is the parsed command line of pySunlight
+    :param distributed_args: The `distributed_args` parameter is the parsed distributed command line
+    :param tiler: The `tiler` parameter is an instance of the `TilesetTiler` class
+    :type tiler: TilesetTiler
+    :param queue: The `queue` parameter is the queue shared with the coordinator
+    :type queue: WorkQueue
+    """
+    worker_id = distributed_args.worker_id or f"{socket.gethostname()}-{os.getpid()}"
+
+    job = queue.load()
+    if job != get_job(args, tiler):
+        raise ValueError(f"The queue {queue.directory} was published for other inputs or parameters.")
+
+    scenarios = load_scenario_sun_datas(args)
+
+    # The scene is loaded once for all claimed shards
+    tileset = LazyTileset(tiler.files)
+
+    scene_cache = None
+    if args.scene_cache is not None:
+        scene_cache = SceneCache(args.scene_cache or SceneCache.get_default_directory(tiler.files))
+        scene_cache.open(TileHierarchy(tileset).get_tiles(), tiler.files)
+
+    max_memory_in_bytes = None if args.max_memory is None else args.max_memory * 1024 * 1024
+    engine = SunlightEngine(tileset, args.prefetch, max_memory_in_bytes, scene_cache, args.engine, args.proxy_distance, args.conservative_proxies)
+
+    region_of_interest = None
+    if args.roi is not None:
+        region_of_interest = RegionOfInterest.from_coordinates(args.roi)
+
+    while not queue.is_complete():
+        shard = queue.claim(worker_id)
+
+        # Remaining shards are computed by other workers, or their lease will expire
+        if shard is None:
+            time.sleep(POLL_SECONDS)
+            continue
+
+        logging.info(f"Worker {worker_id} computes shard {shard['id']} on {len(queue.shards)}.")
+        start_time = time.monotonic()
+
+        output_directory = get_scenario_output_directory(tiler.get_output_dir(), shard['scenario'])
+        staging_directory = queue.get_staging_directory(output_directory, shard['id'], worker_id)
+        sun_datas_list = scenarios[shard['scenario']]
+
+        with queue.hold(shard['id'], worker_id) as lease_lost:
+            writer = create_shard_writer(args, tiler, output_directory, shard['id'], staging_directory)
+            try:
+                # The shard is aborted between two timestamps once another worker claimed it
+                for i in range(shard['start'], shard['end']):
+                    if lease_lost.is_set():
+                        break
+                    engine.compute([sun_datas_list[i]], writer, output_directory, shard['tiles'], region_of_interest)
+            finally:
+                writer.close()
+
+        try:
+            if lease_lost.is_set():
+                raise LeaseLostError(f"Lease of shard {shard['id']} was lost during its computation.")
+            queue.complete(shard['id'], worker_id, time.monotonic() - start_time, [(staging_directory, output_directory)])
+        except LeaseLostError as error:
+            logging.warning(f"Worker {worker_id} aborts shard {shard['id']}, its results are discarded : {error}")
+            shutil.rmtree(str(staging_directory), ignore_errors=True)
+
+    logging.info(f"Worker {worker_id} stops, all shards are completed.")
+
+
+def wait_for_shards(queue: WorkQueue, worker_processes=()):
+    """
+    The function waits until all shards of the queue are completed.
+
+    :param queue: The `queue` parameter is the published queue
+    :type queue: WorkQueue
+    :param worker_processes: The `worker_processes` parameter is the list of local worker processes,
+    defaults to ()
+    """
+    num_of_completed_shards = None
+    while not queue.is_complete():
+        if num_of_completed_shards != len(queue.get_completed_shard_ids()):
+            num_of_completed_shards = len(queue.get_completed_shard_ids())
+            logging.info(f"{num_of_completed_shards} shards completed on {len(queue.shards)}.")
+
+        if 0 < len(worker_processes) and all(process.poll() is not None for process in worker_processes) and not queue.is_complete():
+            raise RuntimeError("All local workers stopped before completing all shards.")
+
+        time.sleep(POLL_SECONDS)
+
+
+def merge(args, tiler: TilesetTiler, tileset, scenarios: dict, tile_hierarchy: TileHierarchy, tile_indexes):
+    """
+    The function builds the outputs shared by all shards once they are completed : the tileset.json
+    and csv of each timestamp, the geometry of non-geometric writers and the aggregates.
+
+    :param args: The `args` parameter is the parsed command line of pySunlight
+    :param tiler: The `tiler` parameter is an instance of the `TilesetTiler` class
+    :type tiler: TilesetTiler
+    :param tileset: The `tileset` parameter is the merged input tileset
+    :param scenarios: The `scenarios` parameter is the dictionary of `pySunlight.SunDatasList` by
+    scenario name
+    :type scenarios: dict
+    :param tile_hierarchy: The `tile_hierarchy` parameter is the hierarchy of the tileset
+    :type tile_hierarchy: TileHierarchy
+    :param tile_indexes: The `tile_indexes` parameter is the list of computed tiles
+    """
+    writer = None
+    for scenario_name, sun_datas_list in scenarios.items():
+        output_directory = get_scenario_output_directory(tiler.get_output_dir(), scenario_name)
+
+        writers = [create_writer(writer_name, tiler, args.read_cache_size, output_directory, args.encoding_processes) for writer_name in args.writers]
+        writer = writers[0] if len(writers) == 1 else CompositeWriter(writers)
+
+        for sun_datas in sun_datas_list:
+            CURRENT_OUTPUT_DIRECTORY = Utils.get_output_directory_for_timestamp(output_directory, sun_datas.dateStr)
+            writer.set_directory(CURRENT_OUTPUT_DIRECTORY)
+
+            if 'csv' in args.writers:
+                merge_csv_parts(CURRENT_OUTPUT_DIRECTORY)
+
+            writer.export_tileset(tileset)
+
+        if args.with_aggregate:
+            dates = [sun_datas.dateStr for sun_datas in sun_datas_list]
+            export_aggregates(list(zip(args.writers, writers)), output_directory, dates, tile_hierarchy.get_num_of_tiles(), tile_indexes, num_workers=args.aggregate_workers)
+
+        writer.close()
+
+        # Staged outputs of aborted shards
+        shutil.rmtree(str(Path(output_directory, STAGING_DIRECTORY_NAME)), ignore_errors=True)
+
+    # Workers don't export the geometry, which is shared by all shards
+    if writer is not None and not writer.can_export_geometry():
+        export_with_triangle_level(tiler, tileset, tile_hierarchy, prefetch_size=args.prefetch)
+
+
+def run_coordinator(args, distributed_args, tiler: TilesetTiler, queue: WorkQueue):
+    """
+    The function publishes the shards of the run, waits until workers complete them, and merges their
+    results. In the local role, worker processes are started on this machine.
+
+    :param args: The `args` parameter is the parsed command line of pySunlight
+    :param distributed_args: The `distributed_args` parameter is the parsed distributed command line
+    :param tiler: The `tiler` parameter is an instance of the `TilesetTiler` class
+    :type tiler: TilesetTiler
+    :param queue: The `queue` parameter is the queue shared with the workers
+    :type queue: WorkQueue
+    """
+    scenarios = load_scenario_sun_datas(args)
+
+    tileset = LazyTileset(tiler.files)
+    tile_hierarchy = TileHierarchy(tileset)
+
+    tile_indexes = range(tile_hierarchy.get_num_of_tiles())
+    if args.roi is not None:
+        tile_indexes = RegionOfInterest.from_coordinates(args.roi).select_tiles(tile_hierarchy)
+
+    # A time series file of a tile is appended by one worker, in the order of timestamps
+    shard_timestamps = distributed_args.shard_timestamps
+    if 'timeseries' in args.writers and shard_timestamps is not None:
+        logging.warning("Shards contain all timestamps with the timeseries writer.")
+        shard_timestamps = None
+
+    num_of_timestamps_by_scenario = {scenario_name: len(sun_datas_list) for scenario_name, sun_datas_list in scenarios.items()}
+    shards = split_into_shards(num_of_timestamps_by_scenario, tile_indexes, distributed_args.shard_tiles, shard_timestamps)
+
+    queue.publish(get_job(args, tiler), shards)
+    logging.info(f"Published {len(shards)} shards in {queue.directory}.")
+
+    # Local workers are started with the same arguments
+    worker_processes = []
+    if distributed_args.role == 'local':
+        for i in range(distributed_args.local_workers):
+            worker_arguments = sys.argv + ['--role', 'worker', '--queue', str(queue.directory), '--worker-id', f"{socket.gethostname()}-local-{i}"]
+            worker_processes.append(subprocess.Popen([sys.executable] + worker_arguments))
+
+    try:
+        wait_for_shards(queue, worker_processes)
+    finally:
+        for process in worker_processes:
+            process.wait()
+
+    for shard_id in sorted(queue.get_completed_shard_ids()):
+        logging.debug(f"Shard {shard_id} : {queue.get_completed_shard(shard_id)}")
+
+    logging.info("All shards are completed, merges results.")
+    merge(args, tiler, tileset, scenarios, tile_hierarchy, tile_indexes)
+
+
+def parse_command_line():
+    """
+    The function parses the distributed arguments, given with the arguments of pySunlight.
+    :return: The function `parse_command_line` returns the parsed command line arguments.
+    """
+    parser = argparse.ArgumentParser(description='Distributed Sunlight computation on nodes sharing a directory.')
+    parser.add_argument('--role', dest='role', default='local', choices=['coordinator', 'worker', 'local'], help='Role of this node. local runs the coordinator with local worker processes. Ex : --role worker, default=local')
+    parser.add_argument('--queue', dest='queue', type=str, help='Shared directory of the work queue, default=<output_dir>/queue. Ex : --queue /shared/queue')
+    parser.add_argument('--local-workers', dest='local_workers', type=int, default=2, help='Number of worker processes of the local role. Ex : --local-workers 8, default=2')
+    parser.add_argument('--shard-tiles', dest='shard_tiles', type=int, help='Maximum number of tiles of a shard, default=all tiles. Ex : --shard-tiles 16')
+    parser.add_argument('--shard-timestamps', dest='shard_timestamps', type=int, default=24, help='Maximum number of timestamps of a shard, all timestamps with the timeseries writer. Ex : --shard-timestamps 168, default=24')
+    parser.add_argument('--lease-seconds', dest='lease_seconds', type=float, default=60, help='Duration after which the shard of a worker that stopped renewing its lease is claimed again. Ex : --lease-seconds 300, default=60')
+    parser.add_argument('--worker-id', dest='worker_id', type=str, help='Identifier of the worker, unique among all nodes, default=<hostname>-<pid>. Ex : --worker-id node-1')
+
+    return parser.parse_known_args()[0]
+
+
+def main():
+    args = parse_sunlight_command_line()
+    distributed_args = parse_command_line()
+
+    logging.basicConfig(level=args.log_level, format='[%(asctime)s] [%(levelname)s] %(message)s')
+
+    tiler = TilesetTiler()
+    tiler.parse_command_line()
+
+    queue = WorkQueue(distributed_args.queue or Path(tiler.get_output_dir(), "queue"), distributed_args.lease_seconds)
+
+    if distributed_args.role == 'worker':
+        run_worker(args, distributed_args, tiler, queue)
+    else:
+        run_coordinator(args, distributed_args, tiler, queue)
+
+
+if __name__ == '__main__':
+    main()
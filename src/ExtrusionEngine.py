@@ -0,0 +1,256 @@
+import functools
+import logging
+import math
+
+import numpy as np
+from py3dtilers.TilesetReader.tile_to_feature import TileToFeatureList
+
+from src import Geometry, pySunlight
+from src.Converters import SunlightToTiler, TilerToSunlight
+from src.OccluderProxies import OccluderProxies, ProxyHit
+from src.TilePool import TilePool
+from src.TileWrapper import TileWrapper
+
+# The ExtrusionEngine class computes shadows of extruded features (LOD1) in 2.5D. A ray going from a
+# receiver to the sun crosses an extrusion when its horizontal projection, limited to the heights of
+# the extrusion, crosses the roof. For each sun direction, the shadow of each extrusion (its footprint
+# swept along the projected sun vector) is indexed in a 2D grid, so each receiver is only tested
+# against the extrusions shading its position. Features that are not extrusions are ray traced, their
+# triangles are converted again when their tile is loaded, through the tile pool if there is one. The
+# proxies of distant tiles only replace features which are not extrusions.
+
+
+class ExtrusionEngine():
+    def __init__(self, all_tiles: list, cell_size=50.0, tolerance=0.01, tile_pool: TilePool = None):
+        """
+        The function initializes the engine by splitting the features of all tiles between extrusions
+        and other geometries.
+
+        :param all_tiles: The `all_tiles` parameter is the list of all tiles of the tileset
+        :type all_tiles: list
+        :param cell_size: The `cell_size` parameter is the size of the cells of the 2D grid indexing
+        shadows, in tileset CRS units, defaults to 50.0
+        :param tolerance: The `tolerance` parameter is the maximal height difference between vertices of
+        the same level of an extrusion, defaults to 0.01
+        :param tile_pool: The `tile_pool` parameter keeps the triangles of features which are not
+        extrusions under the memory budget of the pool. They are converted each time their tile is
+        loaded when it is None, defaults to None
+        :type tile_pool: TilePool
+        """
+        self.all_tiles = all_tiles
+        self.cell_size = cell_size
+        self.tolerance = tolerance
+        self.tile_pool = tile_pool
+
+        # Roof triangles, heights and footprint bounds by extrusion
+        self.roofs = []
+        self.roof_triangle_ids = []
+        self.heights = []
+        self.footprint_bounds = []
+
+        # Ids of extruded features by tile index, and tiles with features which are not extrusions
+        self.extrusion_feature_ids = dict()
+        self.ray_tile_indexes = []
+
+        # Loaders of the proxies of features which are not extrusions, by conservative mode, and the
+        # proxies kept without tile pool
+        self.proxy_loaders = {conservative: functools.partial(self.create_residual_occluder_proxies, conservative=conservative) for conservative in (False, True)}
+        self.occluder_proxies = dict()
+
+        tile_bounds = []
+        num_of_residual_triangles = 0
+        for tile_index, tile in enumerate(all_tiles):
+            tile_bounds.append(Geometry.get_tile_bounds(tile))
+            num_of_residual_triangles += self.add_tile(tile, tile_index)
+
+        self.scene_bounds = Geometry.merge_bounds(tile_bounds) if 0 < len(tile_bounds) else None
+
+        logging.info(f"{len(self.roofs)} extrusions found, {num_of_residual_triangles} triangles kept for ray tracing.")
+
+        # Shadow index of the current sun direction
+        self.sun_direction = None
+        self.grid = dict()
+
+    def add_tile(self, tile, tile_index: int):
+        """
+        The function splits the features of a tile between extrusions and other geometries.
+
+        :param tile: The `tile` parameter is a tile of the tileset
+        :param tile_index: The `tile_index` parameter is the index of the tile
+        :type tile_index: int
+        :return: the number of triangles of features which are not extrusions.
+        """
+        num_of_residual_triangles = 0
+        self.extrusion_feature_ids[tile_index] = set()
+
+        for feature in TileToFeatureList(tile):
+            triangles = feature.get_geom_as_triangles()
+            extrusion = Geometry.get_extrusion_roof(triangles, self.tolerance) if 0 < len(triangles) else None
+
+            # Fall back to the ray engine
+            if extrusion is None:
+                num_of_residual_triangles += len(triangles)
+                continue
+
+            self.extrusion_feature_ids[tile_index].add(feature.get_id())
+
+            roof_triangle_indexes, min_z, max_z = extrusion
+            roof = np.asarray(triangles, dtype=float)[roof_triangle_indexes]
+
+            self.roofs.append(roof)
+            self.roof_triangle_ids.append([(TilerToSunlight.generate_triangle_id(tile.get_content_uri(), feature.get_id(), i), tile.get_content_uri()) for i in roof_triangle_indexes])
+            self.heights.append((min_z, max_z))
+            self.footprint_bounds.append(Geometry.get_bounds_from_corners(roof[:, :, :2].reshape(-1, 2)))
+
+        if 0 < num_of_residual_triangles:
+            self.ray_tile_indexes.append(tile_index)
+
+        return num_of_residual_triangles
+
+    def create_residual_tile_wrapper(self, tile_index: int):
+        """
+        The function decodes a tile and converts the triangles of its features which are not extrusions.
+
+        :param tile_index: The `tile_index` parameter is the index of the tile
+        :type tile_index: int
+        :return: a `TileWrapper` containing only triangles of features which are not extrusions.
+        """
+        tile = self.all_tiles[tile_index]
+
+        residual_triangles = pySunlight.TriangleSoup()
+        for feature in TileToFeatureList(tile):
+            if feature.get_id() not in self.extrusion_feature_ids[tile_index]:
+                TilerToSunlight.add_triangles_from_feature(residual_triangles, feature, tile, tile_index)
+
+        return TileWrapper(tile, tile_index, residual_triangles)
+
+    def load_residual_tile_wrapper(self, tile_index: int):
+        """
+        The function returns the triangles of the features of a tile which are not extrusions, from the
+        tile pool if there is one.
+
+        :param tile_index: The `tile_index` parameter is the index of the tile
+        :type tile_index: int
+        :return: a `TileWrapper` containing only triangles of features which are not extrusions.
+        """
+        if self.tile_pool is not None:
+            return self.tile_pool.load(tile_index, self.create_residual_tile_wrapper)
+
+        return self.create_residual_tile_wrapper(tile_index)
+
+    def create_residual_occluder_proxies(self, tile_index: int, conservative=False):
+        """
+        The function builds the proxies of the features of a tile which are not extrusions.
+
+        :param tile_index: The `tile_index` parameter is the index of the tile
+        :type tile_index: int
+        :param conservative: The `conservative` parameter keeps the features of the tile to confirm box
+        hits on their triangles, defaults to False
+        :return: the `OccluderProxies` of the tile.
+        """
+        return OccluderProxies(self.all_tiles[tile_index], tile_index, conservative, self.extrusion_feature_ids[tile_index])
+
+    def load_residual_occluder_proxies(self, tile_index: int, conservative=False):
+        """
+        The function returns the proxies of the features of a tile which are not extrusions, built once
+        and kept in the tile pool if there is one.
+
+        :param tile_index: The `tile_index` parameter is the index of the tile
+        :type tile_index: int
+        :param conservative: The `conservative` parameter keeps the features of the tile to confirm box
+        hits on their triangles, defaults to False
+        :return: the `OccluderProxies` of the tile.
+        """
+        if self.tile_pool is not None:
+            return self.tile_pool.load(tile_index, self.proxy_loaders[conservative])
+
+        key = (tile_index, conservative)
+        if key not in self.occluder_proxies:
+            self.occluder_proxies[key] = self.create_residual_occluder_proxies(tile_index, conservative)
+
+        return self.occluder_proxies[key]
+
+    def get_ray_tile_indexes(self):
+        """
+        The function returns the tiles containing features which are not extrusions.
+        :return: a list of tile indexes.
+        """
+        return self.ray_tile_indexes
+
+    def get_cell(self, x: float, y: float):
+        """
+        The function returns the grid cell of a point.
+
+        :param x: The `x` parameter is the x coordinate of the point
+        :type x: float
+        :param y: The `y` parameter is the y coordinate of the point
+        :type y: float
+        :return: a tuple of cell coordinates.
+        """
+        return math.floor(x / self.cell_size), math.floor(y / self.cell_size)
+
+    def set_sun_direction(self, sun_direction):
+        """
+        The function indexes the shadow of each extrusion for a sun direction.
+
+        :param sun_direction: The `sun_direction` parameter is the direction from the ground to the sun,
+        as an array of 3 coordinates
+        """
+        self.sun_direction = np.asarray(sun_direction, dtype=float) / np.linalg.norm(sun_direction)
+        self.grid = dict()
+
+        # No shadow when the sun is under the horizon
+        if self.sun_direction[2] <= 0 or self.scene_bounds is None:
+            return
+
+        scene_min, scene_max = self.scene_bounds
+        for extrusion_index, (min_xy, max_xy) in enumerate(self.footprint_bounds):
+            # Shadow of the roof on the lowest point of the scene
+            shadow_length = (self.heights[extrusion_index][1] - scene_min[2]) / self.sun_direction[2]
+            offset = -self.sun_direction[:2] * shadow_length
+
+            shadow_min = np.maximum(np.minimum(min_xy, min_xy + offset), scene_min[:2])
+            shadow_max = np.minimum(np.maximum(max_xy, max_xy + offset), scene_max[:2])
+
+            cell_min = self.get_cell(*shadow_min)
+            cell_max = self.get_cell(*shadow_max)
+            for i in range(cell_min[0], cell_max[0] + 1):
+                for j in range(cell_min[1], cell_max[1] + 1):
+                    self.grid.setdefault((i, j), []).append(extrusion_index)
+
+    def get_nearest_hit(self, triangle: pySunlight.Triangle):
+        """
+        The function finds the nearest extrusion crossed by the ray going from the center of a triangle
+        to the sun.
+
+        :param triangle: The `triangle` parameter is the receiver triangle
+        :type triangle: pySunlight.Triangle
+        :return: a `ProxyHit` on the crossed roof triangle, or None if no extrusion is crossed.
+        """
+        point = np.mean([SunlightToTiler.convert_vec3_to_numpy(vertex) for vertex in (triangle.a, triangle.b, triangle.c)], axis=0)
+
+        nearest_hit = None
+        for extrusion_index in self.grid.get(self.get_cell(point[0], point[1]), []):
+            min_z, max_z = self.heights[extrusion_index]
+
+            # Part of the ray between the heights of the extrusion, starting a bit after the receiver to
+            # avoid hitting its own building
+            t_start = max((min_z - point[2]) / self.sun_direction[2], self.tolerance)
+            t_end = (max_z - point[2]) / self.sun_direction[2]
+            if t_end < t_start or (nearest_hit is not None and nearest_hit.distance <= t_start):
+                continue
+
+            start = point[:2] + t_start * self.sun_direction[:2]
+            end = point[:2] + t_end * self.sun_direction[:2]
+            clip = Geometry.clip_segment_by_triangles(start, end, self.roofs[extrusion_index][:, :, :2])
+            if clip is None:
+                continue
+
+            s, roof_triangle_index = clip
+            distance = t_start + s * (t_end - t_start)
+            if nearest_hit is None or distance < nearest_hit.distance:
+                roof_triangle = self.roofs[extrusion_index][roof_triangle_index]
+                triangle_id, tile_name = self.roof_triangle_ids[extrusion_index][roof_triangle_index]
+                nearest_hit = ProxyHit(distance, TilerToSunlight.convert_to_sunlight_triangle(roof_triangle, triangle_id, tile_name))
+
+        return nearest_hit
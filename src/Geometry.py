@@ -0,0 +1,194 @@
+import numpy as np
+
+# This file contains geometric tests on axis aligned bounds, used to know which tiles can shadow
+# each other without loading their triangles. Bounds are (min, max) pairs of numpy arrays.
+
+
+def get_bounds_from_corners(corners):
+    """
+    The function `get_bounds_from_corners` computes the axis aligned bounds of a list of points.
+
+    :param corners: The `corners` parameter is an array of 3D points, like the corners of a bounding
+    volume
+    :return: a tuple (min, max) of numpy arrays.
+    """
+    corners = np.asarray(corners, dtype=float)
+    return np.amin(corners, axis=0), np.amax(corners, axis=0)
+
+
+def get_tile_bounds(tile):
+    """
+    The function `get_tile_bounds` computes the axis aligned bounds of the bounding volume of a tile.
+
+    :param tile: The `tile` parameter is a tile of a tileset
+    :return: a tuple (min, max) of numpy arrays.
+    """
+    return get_bounds_from_corners(tile.get_bounding_volume().get_corners())
+
+
+def merge_bounds(bounds_list: list):
+    """
+    The function `merge_bounds` computes the bounds containing all given bounds.
+
+    :param bounds_list: The `bounds_list` parameter is a non empty list of (min, max) bounds
+    :type bounds_list: list
+    :return: a tuple (min, max) of numpy arrays.
+    """
+    min = np.amin([bounds[0] for bounds in bounds_list], axis=0)
+    max = np.amax([bounds[1] for bounds in bounds_list], axis=0)
+
+    return min, max
+
+
+def bounds_intersect(bounds, other_bounds):
+    """
+    The function `bounds_intersect` checks if two bounds overlap, touching bounds included.
+
+    :param bounds: The `bounds` parameter is a (min, max) pair
+    :param other_bounds: The `other_bounds` parameter is a (min, max) pair
+    :return: True if bounds overlap, False otherwise.
+    """
+    return bool(np.all(bounds[0] <= other_bounds[1]) and np.all(other_bounds[0] <= bounds[1]))
+
+
+def get_bounds_distance(bounds, other_bounds):
+    """
+    The function `get_bounds_distance` computes the smallest distance between two bounds.
+
+    :param bounds: The `bounds` parameter is a (min, max) pair
+    :param other_bounds: The `other_bounds` parameter is a (min, max) pair
+    :return: the distance, 0 if bounds overlap.
+    """
+    gap = np.maximum(0, np.maximum(bounds[0] - other_bounds[1], other_bounds[0] - bounds[1]))
+    return float(np.linalg.norm(gap))
+
+
+def is_in_shadow_corridor(receiver_bounds, occluder_bounds, sun_direction, epsilon=1e-9):
+    """
+    The function `is_in_shadow_corridor` checks if an occluder can shadow a receiver, by sweeping the
+    receiver bounds towards the sun and testing the overlap of the swept volume with the occluder
+    bounds. The test is exact for boxes, so it never misses an occluder.
+
+    :param receiver_bounds: The `receiver_bounds` parameter is the (min, max) pair of the receiver
+    :param occluder_bounds: The `occluder_bounds` parameter is the (min, max) pair of the occluder
+    :param sun_direction: The `sun_direction` parameter is the direction from the ground to the sun,
+    as an array of 3 coordinates
+    :param epsilon: The `epsilon` parameter is the tolerance used to compare bounds, defaults to 1e-9
+    :return: True if a ray going from the receiver to the sun can hit the occluder, False otherwise.
+    """
+    receiver_min, receiver_max = receiver_bounds
+    occluder_min, occluder_max = occluder_bounds
+
+    # The receiver translated by t * direction overlaps the occluder on an axis when
+    # occluder_min - receiver_max <= t * direction <= occluder_max - receiver_min
+    t_min = 0.0
+    t_max = np.inf
+    for axis in range(3):
+        lower = occluder_min[axis] - receiver_max[axis] - epsilon
+        upper = occluder_max[axis] - receiver_min[axis] + epsilon
+        direction = float(sun_direction[axis])
+
+        if abs(direction) < epsilon:
+            # No move on this axis, bounds must already overlap
+            if lower > 0 or upper < 0:
+                return False
+            continue
+
+        t_lower, t_upper = sorted((lower / direction, upper / direction))
+        t_min = max(t_min, t_lower)
+        t_max = min(t_max, t_upper)
+
+        if t_max < t_min:
+            return False
+
+    return True
+
+
+def get_extrusion_roof(triangles, tolerance=0.01):
+    """
+    The function `get_extrusion_roof` checks if the triangles of a feature form an extrusion (LOD1) : a
+    flat roof above a footprint of the same shape, joined by vertical walls.
+
+    :param triangles: The `triangles` parameter is an array of shape (n, 3, 3) of the triangles of a
+    feature
+    :param tolerance: The `tolerance` parameter is the maximal height difference between vertices of
+    the same level, defaults to 0.01
+    :return: a tuple (roof triangle indexes, min z, max z), or None if the feature is not an extrusion.
+    """
+    triangles = np.asarray(triangles, dtype=float)
+    if len(triangles) == 0:
+        return None
+
+    heights = triangles[:, :, 2]
+    min_z = heights.min()
+    max_z = heights.max()
+
+    if max_z - min_z <= tolerance:
+        return None
+
+    # All vertices are on the ground or on the roof
+    on_ground = np.abs(heights - min_z) <= tolerance
+    on_roof = np.abs(heights - max_z) <= tolerance
+    if not np.all(on_ground | on_roof):
+        return None
+
+    # Walls are vertical when the roof and the ground have the same vertices in the horizontal plane
+    def get_vertices_xy(mask):
+        return {tuple(vertex) for vertex in np.round(triangles[:, :, :2][mask] / tolerance).astype(np.int64)}
+
+    if get_vertices_xy(on_ground) != get_vertices_xy(on_roof):
+        return None
+
+    roof_triangle_indexes = np.nonzero(np.all(on_roof, axis=1))[0]
+    if len(roof_triangle_indexes) == 0:
+        return None
+
+    return roof_triangle_indexes, float(min_z), float(max_z)
+
+
+def clip_segment_by_triangles(start, end, triangles_xy, epsilon=1e-12):
+    """
+    The function `clip_segment_by_triangles` finds the first point where a 2D segment enters a set of
+    2D triangles, clipping the segment by the three half-planes of each triangle (Cyrus-Beck).
+
+    :param start: The `start` parameter is the start point of the segment, as an array of 2 coordinates
+    :param end: The `end` parameter is the end point of the segment, as an array of 2 coordinates
+    :param triangles_xy: The `triangles_xy` parameter is an array of shape (n, 3, 2) of triangles
+    :param epsilon: The `epsilon` parameter is the tolerance used to ignore degenerated triangles,
+    defaults to 1e-12
+    :return: a tuple (s, triangle index) where `start + s * (end - start)` is the entry point, or None
+    if the segment doesn't cross any triangle.
+    """
+    triangles_xy = np.asarray(triangles_xy, dtype=float)
+    start = np.asarray(start, dtype=float)
+    segment = np.asarray(end, dtype=float) - start
+
+    # Inward normals of edges depend on the winding of each triangle
+    edges = np.roll(triangles_xy, -1, axis=1) - triangles_xy
+    normals = np.stack((-edges[:, :, 1], edges[:, :, 0]), axis=2)
+    area = edges[:, 0, 0] * edges[:, 1, 1] - edges[:, 0, 1] * edges[:, 1, 0]
+    normals *= np.sign(area)[:, np.newaxis, np.newaxis]
+
+    # Points of the segment inside an edge half-plane verify numerator + s * denominator >= 0
+    numerators = np.einsum('tek,tek->te', normals, start - triangles_xy)
+    denominators = np.einsum('tek,k->te', normals, segment)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        bounds = -numerators / denominators
+
+    parallel = np.abs(denominators) <= epsilon
+    entering = denominators > epsilon
+    leaving = denominators < -epsilon
+
+    s_min = np.where(entering, bounds, -np.inf).max(axis=1).clip(min=0)
+    s_max = np.where(leaving, bounds, np.inf).min(axis=1).clip(max=1)
+
+    # A segment parallel to an edge is kept only on the inner side
+    outside = np.any(parallel & (numerators < 0), axis=1)
+    valid = (np.abs(area) > epsilon) & ~outside & (s_min <= s_max)
+
+    if not np.any(valid):
+        return None
+
+    triangle_index = int(np.argmin(np.where(valid, s_min, np.inf)))
+    return float(s_min[triangle_index]), triangle_index
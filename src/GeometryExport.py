@@ -0,0 +1,151 @@
+import json
+import logging
+import os
+from pathlib import Path
+
+from py3dtilers.TilesetReader.TilesetReader import TilesetTiler
+from py3dtiles import TileSet
+
+from src.Converters import SunlightToTiler
+from src.RunManifest import hash_files
+from src.SceneChanges import describe_tile
+from src.TileWrapper import TileWrapper
+from src.Writers import AsyncWriter, MetricsWriter, TileWriter
+
+# The GeometryExport class exports the triangle-level geometry of the input from the tiles decoded for
+# the computation, so each tile is decoded once for both. Tiles are encoded in background threads.
+# The content hash of each input tile is recorded with the checksum of its export, so tiles that
+# didn't change since the last run are not exported again.
+
+# Arguments of the tiler changing the exported geometry. Other arguments (output directory, log
+# level...) don't invalidate the previous export
+GEOMETRY_ARGUMENTS = ['crs_in', 'crs_out', 'offset', 'scale', 'with_texture', 'lod1', 'loa']
+
+
+class GeometryExport():
+    FILE_NAME = "geometry.json"
+
+    def __init__(self, tiler: TilesetTiler, all_tiles: list, num_threads=1):
+        """
+        The function initializes the geometry export of the input tiles and finds the tiles already
+        exported by a previous run.
+
+        :param tiler: The `tiler` parameter is an instance of the `TilesetTiler` class, with the output
+        directory and the arguments of the export
+        :type tiler: TilesetTiler
+        :param all_tiles: The `all_tiles` parameter is the list of all tiles of the tileset
+        :type all_tiles: list
+        :param num_threads: The `num_threads` parameter is the number of threads encoding tiles, 0 to
+        encode them synchronously, defaults to 1
+        """
+        self.directory = Path(tiler.get_output_dir(), "geometry")
+        self.all_tiles = all_tiles
+        self.parameters = json.dumps({name: getattr(tiler.args, name, None) for name in GEOMETRY_ARGUMENTS}, sort_keys=True, default=str)
+
+        self.tile_writer = TileWriter(self.directory, tiler)
+        self.writer = MetricsWriter(self.tile_writer)
+        if 0 < num_threads:
+            self.writer = AsyncWriter(self.writer, num_threads)
+
+        # Content hash of each input tile, compared with the previous export
+        self.content_hashes = [describe_tile(tile)['hash'] for tile in all_tiles]
+        self.records = self.read_records()
+
+        self.pending_tile_indexes = {tile_index for tile_index in range(len(all_tiles)) if not self.is_tile_complete(tile_index)}
+        self.exported_tile_indexes = []
+
+        logging.info(f"{len(all_tiles) - len(self.pending_tile_indexes)} geometry tiles unchanged since the last export.")
+
+    def get_records_path(self):
+        return Path(self.directory, self.FILE_NAME)
+
+    def read_records(self):
+        """
+        The function reads the records of the previous export, if it was made with the same arguments.
+        :return: a dictionary of records by tile index.
+        """
+        path = self.get_records_path()
+        if not path.exists():
+            return dict()
+
+        with open(str(path), 'r') as file:
+            content = json.load(file)
+
+        if content.get('parameters') != self.parameters:
+            return dict()
+
+        return {int(tile_index): record for tile_index, record in content['tiles'].items()}
+
+    def is_tile_complete(self, tile_index: int):
+        """
+        The function checks if a tile was exported from the same content and its export didn't change.
+
+        :param tile_index: The `tile_index` parameter is the index of the tile
+        :type tile_index: int
+        :return: True if the tile doesn't need to be exported again, False otherwise.
+        """
+        record = self.records.get(tile_index)
+        if record is None or record['hash'] != self.content_hashes[tile_index]:
+            return False
+
+        output_paths = self.tile_writer.get_output_paths(tile_index)
+        if not all(path.exists() for path in output_paths):
+            return False
+
+        return record['checksum'] == hash_files(output_paths)
+
+    def is_pending(self, tile_index: int):
+        """
+        The function checks if the geometry of a tile must still be exported.
+
+        :param tile_index: The `tile_index` parameter is the index of the tile
+        :type tile_index: int
+        :return: True if the tile must be exported, False otherwise.
+        """
+        return tile_index in self.pending_tile_indexes
+
+    def export_tile(self, tile_wrapper: TileWrapper):
+        """
+        The function exports the geometry of a tile already decoded for the computation, with features
+        at triangle level.
+
+        :param tile_wrapper: The `tile_wrapper` parameter is the tile wrapper with all triangles of the
+        tile
+        :type tile_wrapper: TileWrapper
+        """
+        tile_index = tile_wrapper.get_tile_index()
+        if not self.is_pending(tile_index):
+            return
+
+        self.pending_tile_indexes.discard(tile_index)
+        self.exported_tile_indexes.append(tile_index)
+
+        # Set feature level in 3D Tiles as triangles
+        feature_list = SunlightToTiler.convert_to_feature_list_with_triangle_level(tile_wrapper.get_triangles())
+        self.writer.export_feature_list_by_tile(feature_list, tile_index)
+
+    def close(self, tileset: TileSet, tile_wrappers):
+        """
+        The function exports the tiles that were not computed, the tileset and records the export.
+
+        :param tileset: The `tileset` parameter is the input tileset
+        :type tileset: TileSet
+        :param tile_wrappers: The `tile_wrappers` parameter is an iterable of (tile index, tile wrapper)
+        tuples loading the remaining tiles
+        """
+        for tile_index, tile_wrapper in tile_wrappers:
+            self.export_tile(tile_wrapper)
+
+        self.writer.export_tileset(tileset)
+        self.writer.close()
+
+        for tile_index in self.exported_tile_indexes:
+            self.records[tile_index] = {'hash': self.content_hashes[tile_index], 'checksum': hash_files(self.tile_writer.get_output_paths(tile_index))}
+        self.exported_tile_indexes = []
+
+        # Replace the records at once, a stopped run exports its tiles again
+        path = self.get_records_path()
+        temporary_path = path.with_suffix('.tmp')
+        with open(str(temporary_path), 'w') as file:
+            json.dump({'parameters': self.parameters, 'tiles': {str(tile_index): record for tile_index, record in self.records.items()}}, file)
+        os.replace(str(temporary_path), str(path))
@@ -0,0 +1,194 @@
+import shutil
+import tempfile
+from pathlib import Path
+
+import numpy as np
+from py3dtilers.Common import FeatureList
+
+from src import pySunlight
+from src.Converters import SunlightToTiler
+
+# The HitBuffer class records the nearest hit of each receiver triangle of a tile in fixed size NumPy
+# arrays (distance and occluder code) instead of Sunlight objects. Occluders are identified by a code
+# in a table of occluder ids. Arrays can be memory-mapped to process very large tiles in bounded
+# memory, and results are converted to features by chunks streamed to the writers.
+
+# Occluder code of triangles without hit
+NO_HIT = -1
+
+# Occluder code of triangles which are not facing the sun, shadowed by themselves
+NOT_FACING = -2
+
+# Number of features of each feature list streamed to the writers
+DEFAULT_CHUNK_SIZE = 10000
+
+
+class FeatureChunks():
+    def __init__(self, hit_buffer, triangle_soup: pySunlight.TriangleSoup, date_str: str, chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        The function initializes the results of a hit buffer as feature lists of a bounded size. Features
+        are converted again each time the chunks are iterated, so several writers can read them while
+        the buffer is open.
+
+        :param hit_buffer: The `hit_buffer` parameter is the buffer of the hits of the tile
+        :type hit_buffer: HitBuffer
+        :param triangle_soup: The `triangle_soup` parameter is the receiver triangles, in the order of
+        the buffer
+        :type triangle_soup: pySunlight.TriangleSoup
+        :param date_str: The `date_str` parameter is the date of the results
+        :type date_str: str
+        :param chunk_size: The `chunk_size` parameter is the maximum number of features of each feature
+        list, defaults to DEFAULT_CHUNK_SIZE
+        """
+        self.hit_buffer = hit_buffer
+        self.triangle_soup = triangle_soup
+        self.date_str = date_str
+        self.chunk_size = chunk_size
+
+    def __iter__(self):
+        feature_list = FeatureList()
+
+        for triangle_index, triangle in enumerate(self.triangle_soup):
+            feature_list.append(self.hit_buffer.convert_to_feature(triangle_index, triangle, self.date_str))
+
+            if self.chunk_size <= len(feature_list):
+                yield feature_list
+                feature_list = FeatureList()
+
+        if 0 < len(feature_list):
+            yield feature_list
+
+
+class HitBuffer():
+    def __init__(self, num_of_triangles: int, directory=None):
+        """
+        The function initializes the buffer of a tile, without any hit.
+
+        :param num_of_triangles: The `num_of_triangles` parameter is the number of receiver triangles
+        :type num_of_triangles: int
+        :param directory: The `directory` parameter is the directory of memory-mapped arrays. Arrays are
+        kept in memory when it is None, defaults to None
+        """
+        self.memmap_directory = None
+
+        if directory is None:
+            self.distances = np.full(num_of_triangles, np.inf, dtype=np.float64)
+            self.occluder_codes = np.full(num_of_triangles, NO_HIT, dtype=np.int64)
+        else:
+            Path(directory).mkdir(parents=True, exist_ok=True)
+            self.memmap_directory = tempfile.mkdtemp(prefix="hits_", dir=str(directory))
+
+            # Empty files can't be memory-mapped
+            shape = (max(num_of_triangles, 1),)
+            self.distances = np.memmap(str(Path(self.memmap_directory, "distances.dat")), dtype=np.float64, mode='w+', shape=shape)
+            self.occluder_codes = np.memmap(str(Path(self.memmap_directory, "occluders.dat")), dtype=np.int64, mode='w+', shape=shape)
+            self.distances[:] = np.inf
+            self.occluder_codes[:] = NO_HIT
+
+        self.num_of_triangles = num_of_triangles
+
+        # Occluder triangle ids, by occluder code
+        self.occluder_ids = []
+        self.occluder_codes_by_id = dict()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """
+        The function removes memory-mapped arrays.
+        """
+        if self.memmap_directory is None:
+            return
+
+        self.distances = None
+        self.occluder_codes = None
+        shutil.rmtree(self.memmap_directory, ignore_errors=True)
+        self.memmap_directory = None
+
+    def get_nearest_distance(self, triangle_index: int):
+        """
+        The function returns the distance of the nearest hit of a triangle.
+
+        :param triangle_index: The `triangle_index` parameter is the index of the receiver triangle
+        :type triangle_index: int
+        :return: the distance, infinity without hit.
+        """
+        return self.distances[triangle_index]
+
+    def record_hit(self, triangle_index: int, ray_hit):
+        """
+        The function records a hit of a triangle if it is closer than the previous ones.
+
+        :param triangle_index: The `triangle_index` parameter is the index of the receiver triangle
+        :type triangle_index: int
+        :param ray_hit: The `ray_hit` parameter is a Sunlight `RayHit`, or any hit with a `distance` and
+        a `triangle`
+        """
+        if self.distances[triangle_index] <= ray_hit.distance:
+            return
+
+        occluder_id = ray_hit.triangle.getId()
+        occluder_code = self.occluder_codes_by_id.get(occluder_id)
+        if occluder_code is None:
+            occluder_code = len(self.occluder_ids)
+            self.occluder_ids.append(occluder_id)
+            self.occluder_codes_by_id[occluder_id] = occluder_code
+
+        self.distances[triangle_index] = ray_hit.distance
+        self.occluder_codes[triangle_index] = occluder_code
+
+    def record_not_facing(self, triangle_index: int):
+        """
+        The function records a triangle which is not facing the sun.
+
+        :param triangle_index: The `triangle_index` parameter is the index of the receiver triangle
+        :type triangle_index: int
+        """
+        self.distances[triangle_index] = 0
+        self.occluder_codes[triangle_index] = NOT_FACING
+
+    def convert_to_feature(self, triangle_index: int, triangle: pySunlight.Triangle, date_str: str):
+        """
+        The function converts a receiver triangle and its hit to a feature with the result in its batch
+        table.
+
+        :param triangle_index: The `triangle_index` parameter is the index of the receiver triangle
+        :type triangle_index: int
+        :param triangle: The `triangle` parameter is the receiver triangle
+        :type triangle: pySunlight.Triangle
+        :param date_str: The `date_str` parameter is the date of the result
+        :type date_str: str
+        :return: a `Feature` of the triangle.
+        """
+        feature = SunlightToTiler.convert_to_feature(triangle)
+        occluder_code = int(self.occluder_codes[triangle_index])
+
+        # Nothing is blocking a triangle looking at the ground but itself
+        if occluder_code == NOT_FACING:
+            SunlightToTiler.record_result_in_batch_table(feature, date_str, False, triangle.getId())
+        elif occluder_code == NO_HIT:
+            SunlightToTiler.record_result_in_batch_table(feature, date_str, True, "")
+        else:
+            SunlightToTiler.record_result_in_batch_table(feature, date_str, False, self.occluder_ids[occluder_code])
+
+        return feature
+
+    def get_feature_chunks(self, triangle_soup: pySunlight.TriangleSoup, date_str: str, chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        The function returns the receiver triangles and their hits as feature lists of a bounded size,
+        converted while the writers export them. They must be exported before the buffer is closed.
+
+        :param triangle_soup: The `triangle_soup` parameter is the receiver triangles, in the order of
+        the buffer
+        :type triangle_soup: pySunlight.TriangleSoup
+        :param date_str: The `date_str` parameter is the date of the results
+        :type date_str: str
+        :param chunk_size: The `chunk_size` parameter is the maximum number of features of each feature
+        list, defaults to DEFAULT_CHUNK_SIZE
+        :return: an iterable of `FeatureList`.
+        """
+        return FeatureChunks(self, triangle_soup, date_str, chunk_size)
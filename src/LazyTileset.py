@@ -0,0 +1,157 @@
+import copy
+import hashlib
+import json
+import weakref
+from pathlib import Path
+
+from py3dtiles import TileContentReader, TileSet
+from py3dtiles.bounding_volume_box import BoundingVolumeBox
+from py3dtiles.tile import Tile
+
+from src import Geometry
+
+# The LazyTileset class indexes the metadata of the input tilesets (bounding volumes, transforms and
+# content uris) from their tileset.json, without reading any b3dm. The content of a tile is decoded
+# the first time it is needed, and released once it is not referenced anymore, so only the tiles in
+# use (and the tile wrappers kept by the tile pool) stay in memory.
+
+
+class LazyTile(Tile):
+    def __init__(self, content_path=None):
+        """
+        The function initializes a tile whose content is read from a b3dm file on demand.
+
+        :param content_path: The `content_path` parameter is the path of the b3dm of the tile, None for
+        a tile without content, defaults to None
+        """
+        super().__init__()
+
+        self.content_path = content_path
+
+        # Refine mode of the tileset.json, None when it is inherited from the parent
+        self.refine = None
+
+        # Weak reference to the decoded content, alive while a conversion uses it
+        self.content_reference = None
+
+    def get_content(self):
+        """
+        The function returns the content of the tile, decoding its b3dm if it is not in use.
+        :return: the `TileContent` of the tile, or None for a tile without content.
+        """
+        content = self.content_reference() if self.content_reference is not None else None
+
+        if content is None and self.content_path is not None:
+            content = TileContentReader.read_file(str(self.content_path))
+            self.content_reference = weakref.ref(content)
+
+        return content
+
+    def get_content_hash(self):
+        """
+        The function computes the hash of the b3dm of the tile, without decoding it.
+        :return: the hexadecimal sha256 of the b3dm.
+        """
+        with open(str(self.content_path), 'rb') as file:
+            return hashlib.sha256(file.read()).hexdigest()
+
+
+class LazyTileset(TileSet):
+    def __init__(self, input_paths: list):
+        """
+        The function indexes the tiles of the input tilesets, merged under one root.
+
+        :param input_paths: The `input_paths` parameter is the list of input tilesets directories
+        :type input_paths: list
+        """
+        super().__init__()
+
+        self.root = LazyTile()
+        self.tileset_json = None
+
+        merged_children = []
+        for input_path in input_paths:
+            with open(str(Path(input_path, "tileset.json")), 'r') as file:
+                tileset_json = json.load(file)
+
+            # Tiles of several inputs can have the same uri, their uris are prefixed by their input
+            uri_prefix = f"{Path(input_path).name}/" if 1 < len(input_paths) else ""
+
+            for child_json in tileset_json['root'].get('children', []):
+                child_json = copy.deepcopy(child_json)
+                self.root.add_child(self.create_tile(child_json, Path(input_path), uri_prefix))
+                merged_children.append(child_json)
+
+            if self.tileset_json is None:
+                self.tileset_json = tileset_json
+
+        if self.tileset_json is None:
+            raise ValueError("No input tileset to read.")
+
+        self.tileset_json['root']['children'] = merged_children
+
+        # The root of several inputs contains all their tiles
+        if 1 < len(input_paths) and 0 < len(self.root.get_children()):
+            min, max = Geometry.merge_bounds([Geometry.get_tile_bounds(child) for child in self.root.get_children()])
+            center = (min + max) / 2
+            half_size = (max - min) / 2
+            box = center.tolist() + [half_size[0], 0, 0, 0, half_size[1], 0, 0, 0, half_size[2]]
+
+            self.tileset_json['root']['boundingVolume'] = {'box': box}
+            self.tileset_json['root'].pop('transform', None)
+
+        bounding_volume = BoundingVolumeBox()
+        bounding_volume.set_from_list(self.tileset_json['root']['boundingVolume']['box'])
+        self.root.set_bounding_volume(bounding_volume)
+        self.root.refine = self.tileset_json['root'].get('refine')
+
+    def create_tile(self, tile_json: dict, directory: Path, uri_prefix: str):
+        """
+        The function creates the lazy tile of a tile of a tileset.json and its subtree.
+
+        :param tile_json: The `tile_json` parameter is the tile in the tileset.json. Its content uri is
+        updated with the prefix
+        :type tile_json: dict
+        :param directory: The `directory` parameter is the directory of the tileset.json
+        :type directory: Path
+        :param uri_prefix: The `uri_prefix` parameter is the prefix of the content uris in the merged
+        tileset
+        :type uri_prefix: str
+        :return: a `LazyTile`.
+        """
+        content_path = None
+        if 'content' in tile_json:
+            content_path = Path(directory, tile_json['content']['uri'])
+            tile_json['content']['uri'] = uri_prefix + tile_json['content']['uri']
+
+        tile = LazyTile(content_path)
+        tile.refine = tile_json.get('refine')
+
+        bounding_volume = BoundingVolumeBox()
+        bounding_volume.set_from_list(tile_json['boundingVolume']['box'])
+        tile.set_bounding_volume(bounding_volume)
+
+        if 'transform' in tile_json:
+            tile.set_transform(tile_json['transform'])
+
+        if content_path is not None:
+            tile.set_content_uri(tile_json['content']['uri'])
+
+        for child_json in tile_json.get('children', []):
+            tile.add_child(self.create_tile(child_json, directory, uri_prefix))
+
+        return tile
+
+    def get_root_tile(self):
+        return self.root
+
+    def write_as_json(self, directory):
+        """
+        The function writes the merged tileset.json in a directory.
+
+        :param directory: The `directory` parameter is the directory of the tileset.json
+        """
+        Path(directory).mkdir(parents=True, exist_ok=True)
+
+        with open(str(Path(directory, "tileset.json")), 'w') as file:
+            json.dump(self.tileset_json, file)
@@ -0,0 +1,204 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+# The Metrics class records the wall time of each stage of a run (load, convert, intersect, record,
+# write, aggregate) and counters (rays, box tests, triangle tests, back-face skips, bytes written...).
+# One instance is shared by the whole run, like loggers, and dumped as JSON or Prometheus text at the
+# end of the run and every N computed tiles. Hot loops count in local variables and add them once by
+# tile, so recording metrics doesn't slow down the computation. Metrics are reset at the start of a
+# run, a scenario or an engine call, and the metrics of a scenario or a call are merged back in the
+# totals of the run once they are dumped. Box and triangle tests count each ray tested against each
+# box or triangle, not each call of the intersection functions.
+
+
+class Metrics():
+    def __init__(self):
+        """
+        The function initializes empty metrics, without dump.
+        """
+        self.lock = threading.Lock()
+
+        # Number of calls and total seconds by stage, and values by counter
+        self.stages = dict()
+        self.counters = dict()
+
+        # Stages in progress by thread, read by the sampling profiler
+        self.thread_stages = dict()
+
+        self.output_path = None
+        self.output_format = 'json'
+        self.dump_interval = 0
+
+    def configure(self, output_path=None, output_format='json', dump_interval=0):
+        """
+        The function sets where and how often metrics are dumped.
+
+        :param output_path: The `output_path` parameter is the file where metrics are dumped. Metrics
+        are not dumped when it is None, defaults to None
+        :param output_format: The `output_format` parameter is the format of the dump, json or
+        prometheus, defaults to 'json'
+        :param dump_interval: The `dump_interval` parameter is the number of computed tiles between two
+        dumps. Metrics are only dumped at the end of the run with 0, defaults to 0
+        """
+        self.output_path = output_path
+        self.output_format = output_format
+        self.dump_interval = dump_interval
+
+    def reset(self):
+        """
+        The function removes all recorded metrics.
+        :return: the removed metrics, in the format of `to_dict`.
+        """
+        with self.lock:
+            content = self.get_content()
+            self.stages = dict()
+            self.counters = dict()
+
+        return content
+
+    def merge(self, content: dict):
+        """
+        The function adds metrics removed by `reset` to the current ones.
+
+        :param content: The `content` parameter is metrics in the format of `to_dict`
+        :type content: dict
+        """
+        with self.lock:
+            for stage, values in content['stages'].items():
+                count, total = self.stages.get(stage, (0, 0.0))
+                self.stages[stage] = (count + values['count'], total + values['seconds'])
+
+            for counter, value in content['counters'].items():
+                self.counters[counter] = self.counters.get(counter, 0) + value
+
+    def add_time(self, stage: str, seconds: float):
+        """
+        The function adds the wall time of a call to a stage.
+
+        :param stage: The `stage` parameter is the name of the stage
+        :type stage: str
+        :param seconds: The `seconds` parameter is the wall time of the call
+        :type seconds: float
+        """
+        with self.lock:
+            count, total = self.stages.get(stage, (0, 0.0))
+            self.stages[stage] = (count + 1, total + seconds)
+
+    @contextmanager
+    def time(self, stage: str):
+        """
+        The function measures the wall time of a block of code in a stage.
+
+        :param stage: The `stage` parameter is the name of the stage
+        :type stage: str
+        """
+        thread_stages = self.thread_stages.setdefault(threading.get_ident(), [])
+        thread_stages.append(stage)
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(stage, time.perf_counter() - start)
+            thread_stages.pop()
+
+    def get_current_stage(self, thread_id: int):
+        """
+        The function returns the innermost stage in progress in a thread.
+
+        :param thread_id: The `thread_id` parameter is the identifier of the thread
+        :type thread_id: int
+        :return: the name of the stage, or None outside of any stage.
+        """
+        # Read from another thread while the stage may end
+        try:
+            return self.thread_stages.get(thread_id, [])[-1]
+        except IndexError:
+            return None
+
+    def increment(self, counter: str, value=1):
+        """
+        The function increments a counter.
+
+        :param counter: The `counter` parameter is the name of the counter
+        :type counter: str
+        :param value: The `value` parameter is added to the counter, defaults to 1
+        """
+        with self.lock:
+            self.counters[counter] = self.counters.get(counter, 0) + value
+
+    def get_counter(self, counter: str):
+        with self.lock:
+            return self.counters.get(counter, 0)
+
+    def to_dict(self):
+        """
+        The function returns a copy of all metrics.
+        :return: a dictionary with the `stages` (count and seconds by stage) and the `counters`.
+        """
+        with self.lock:
+            return self.get_content()
+
+    def get_content(self):
+        """
+        The function returns a copy of all metrics, with the lock already held.
+        :return: a dictionary with the `stages` and the `counters`.
+        """
+        return {
+            'stages': {stage: {'count': count, 'seconds': total} for stage, (count, total) in sorted(self.stages.items())},
+            'counters': dict(sorted(self.counters.items()))
+        }
+
+    def to_prometheus(self):
+        """
+        The function returns all metrics in the Prometheus text exposition format.
+        :return: a string.
+        """
+        metrics = self.to_dict()
+
+        lines = ["# TYPE sunlight_stage_seconds_total counter"]
+        lines += [f'sunlight_stage_seconds_total{{stage="{stage}"}} {values["seconds"]}' for stage, values in metrics['stages'].items()]
+        lines += ["# TYPE sunlight_stage_calls_total counter"]
+        lines += [f'sunlight_stage_calls_total{{stage="{stage}"}} {values["count"]}' for stage, values in metrics['stages'].items()]
+
+        for counter, value in metrics['counters'].items():
+            lines += [f"# TYPE sunlight_{counter}_total counter", f"sunlight_{counter}_total {value}"]
+
+        return '\n'.join(lines) + '\n'
+
+    def dump(self, output_path=None):
+        """
+        The function writes all metrics in a file, replacing the previous dump at once.
+
+        :param output_path: The `output_path` parameter is the file where metrics are dumped, the
+        configured file when it is None, defaults to None
+        """
+        output_path = self.output_path if output_path is None else output_path
+        if output_path is None:
+            return
+
+        content = self.to_prometheus() if self.output_format == 'prometheus' else json.dumps(self.to_dict(), indent=2)
+
+        path = Path(output_path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temporary_path = path.with_name(f".{path.name}.tmp")
+        with open(str(temporary_path), 'w') as file:
+            file.write(content)
+        os.replace(str(temporary_path), str(path))
+
+    def record_computed_tile(self):
+        """
+        The function counts a computed tile, and dumps metrics every configured number of tiles.
+        """
+        self.increment('tiles')
+
+        if 0 < self.dump_interval and self.get_counter('tiles') % self.dump_interval == 0:
+            self.dump()
+
+
+# Metrics of the run
+metrics = Metrics()
@@ -0,0 +1,174 @@
+import numpy as np
+from py3dtilers.TilesetReader.tile_to_feature import TileToFeatureList
+from py3dtiles.tile import Tile
+
+from src import pySunlight
+from src.Converters import SunlightToTiler, TilerToSunlight
+from src.TileWrapper import TRIANGLE_SIZE_IN_BYTES
+
+# The OccluderProxies class replaces the triangles of a distant occluder tile by one axis aligned box
+# by feature. Distant buildings only matter as coarse blockers, so rays are tested against a few
+# boxes instead of all triangles. In conservative mode, a box hit is confirmed on the triangles of its
+# feature, converted to Sunlight triangles the first time its box is hit. Proxies only depend on their
+# tile, they are built once and kept in the tile pool like tile wrappers.
+
+
+class ProxyHit():
+    def __init__(self, distance: float, triangle: pySunlight.Triangle):
+        """
+        The function initializes the hit of a ray with a proxy, exposing the same attributes as a
+        Sunlight `RayHit`.
+
+        :param distance: The `distance` parameter is the distance from the origin of the ray to the box
+        :type distance: float
+        :param triangle: The `triangle` parameter is the first triangle of the feature of the box,
+        identifying the occluder in results
+        :type triangle: pySunlight.Triangle
+        """
+        self.distance = distance
+        self.triangle = triangle
+
+
+class OccluderProxies():
+    def __init__(self, tile: Tile, tile_index: int, conservative=False, excluded_feature_ids=None):
+        """
+        The function initializes the proxies of the features of a tile.
+
+        :param tile: The `tile` parameter is the occluder tile
+        :type tile: Tile
+        :param tile_index: The `tile_index` parameter is the index of the tile
+        :type tile_index: int
+        :param conservative: The `conservative` parameter keeps the features of the tile to confirm box
+        hits on their triangles, defaults to False
+        :param excluded_feature_ids: The `excluded_feature_ids` parameter is the set of ids of the
+        features which are not replaced by a box, because another engine computes their shadows (like
+        extrusions), defaults to None
+        """
+        self.index = tile_index
+        self.conservative = conservative
+        self.tile = tile if conservative else None
+
+        # Same tile bounding box as a TileWrapper
+        self.bounding_box = pySunlight.BoundingBoxes()
+        self.bounding_box.push_back(TilerToSunlight.convert_to_bounding_box(tile.get_bounding_volume(), str(tile_index), tile.get_content_uri()))
+
+        mins = []
+        maxs = []
+        self.first_triangles = []
+
+        # Features of each box and their triangles, converted when the box is hit in conservative mode
+        self.features = []
+        self.triangle_soups = dict()
+        num_of_triangles = 0
+        for feature in TileToFeatureList(tile):
+            triangles = feature.get_geom_as_triangles()
+            if len(triangles) == 0 or (excluded_feature_ids is not None and feature.get_id() in excluded_feature_ids):
+                continue
+            num_of_triangles += len(triangles)
+
+            vertices = np.reshape(np.asarray(triangles, dtype=float), (-1, 3))
+            mins.append(np.amin(vertices, axis=0))
+            maxs.append(np.amax(vertices, axis=0))
+
+            # A proxy hit is reported on the first triangle of the feature
+            triangle_id = TilerToSunlight.generate_triangle_id(tile.get_content_uri(), feature.get_id(), 0)
+            self.first_triangles.append(TilerToSunlight.convert_to_sunlight_triangle(triangles[0], triangle_id, tile.get_content_uri()))
+
+            if conservative:
+                self.features.append(feature)
+
+        self.mins = np.array(mins).reshape(-1, 3)
+        self.maxs = np.array(maxs).reshape(-1, 3)
+
+        # Boxes and their first triangle, and the triangles of the features kept in conservative mode
+        self.memory_size = self.mins.nbytes + self.maxs.nbytes + len(self.first_triangles) * TRIANGLE_SIZE_IN_BYTES
+        if conservative:
+            self.memory_size += num_of_triangles * TRIANGLE_SIZE_IN_BYTES
+
+    def get_tile_index(self):
+        """
+        The function returns the index of a tile.
+        :return: the value of the variable "self.index".
+        """
+        return self.index
+
+    def get_bounding_box(self):
+        """
+        The function returns the Sunlight bounding box of a tile.
+        :return: The bounding box of the object.
+        """
+        return self.bounding_box
+
+    def get_memory_size(self):
+        """
+        The function returns the estimated memory of the proxies, to keep them in the tile pool.
+        :return: the size in bytes.
+        """
+        return self.memory_size
+
+    def get_triangle_soup(self, box_index: int):
+        """
+        The function returns the triangles of the feature of a box, converted on the first call.
+
+        :param box_index: The `box_index` parameter is the index of the box
+        :type box_index: int
+        :return: a `TriangleSoup` with all triangles of the feature.
+        """
+        if box_index not in self.triangle_soups:
+            triangle_soup = pySunlight.TriangleSoup()
+            TilerToSunlight.add_triangles_from_feature(triangle_soup, self.features[box_index], self.tile, self.index)
+            self.triangle_soups[box_index] = triangle_soup
+
+        return self.triangle_soups[box_index]
+
+    def get_box_hits(self, ray: pySunlight.Ray):
+        """
+        The function computes the intersections of a ray with all boxes, using the slab method.
+
+        :param ray: The `ray` parameter is the ray going from a receiver to the sun
+        :type ray: pySunlight.Ray
+        :return: a tuple of the indexes of hit boxes sorted from near to far, and their distances.
+        """
+        origin = SunlightToTiler.convert_vec3_to_numpy(ray.origin)
+        direction = SunlightToTiler.convert_vec3_to_numpy(ray.direction)
+
+        # Avoid divisions by zero, a ray parallel to a slab stays inside or outside of it
+        with np.errstate(divide='ignore', invalid='ignore'):
+            inverse_direction = 1.0 / direction
+            t1 = (self.mins - origin) * inverse_direction
+            t2 = (self.maxs - origin) * inverse_direction
+
+        parallel = direction == 0
+        inside = (self.mins <= origin) & (origin <= self.maxs)
+        t_near = np.where(parallel, np.where(inside, -np.inf, np.inf), np.minimum(t1, t2)).max(axis=1)
+        t_far = np.where(parallel, np.where(inside, np.inf, -np.inf), np.maximum(t1, t2)).min(axis=1)
+
+        hit_indexes = np.nonzero((t_near <= t_far) & (0 < t_far))[0]
+        distances = np.maximum(t_near[hit_indexes], 0)
+
+        order = np.argsort(distances, kind='stable')
+        return hit_indexes[order], distances[order]
+
+    def check_intersection_with(self, ray: pySunlight.Ray):
+        """
+        The function checks the intersection of a ray with the proxies, like `checkIntersectionWith`
+        with the triangles of a tile.
+
+        :param ray: The `ray` parameter is the ray going from a receiver to the sun
+        :type ray: pySunlight.Ray
+        :return: a list containing the nearest hit, empty if nothing is hit.
+        """
+        hit_indexes, distances = self.get_box_hits(ray)
+
+        if not self.conservative:
+            if len(hit_indexes) == 0:
+                return []
+            return [ProxyHit(float(distances[0]), self.first_triangles[hit_indexes[0]])]
+
+        # Confirm boxes from near to far on full geometry, the first confirmed one blocks the ray
+        for hit_index in hit_indexes:
+            triangle_ray_hits = pySunlight.checkIntersectionWith(ray, self.get_triangle_soup(hit_index))
+            if 0 < len(triangle_ray_hits):
+                return [triangle_ray_hits[0]]
+
+        return []
@@ -0,0 +1,204 @@
+import cProfile
+import io
+import json
+import logging
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+from src.Metrics import metrics
+
+# The Profiler class profiles a whole run with a bounded overhead, to stay enabled on real runs. A
+# sampling thread records the stack of every thread at a fixed interval, tagged with the thread name
+# (main, prefetcher, writers...) and the stage in progress in the run metrics. Stacks are written as a
+# collapsed stack file for flamegraph tools, with a summary by thread, stage and function. The cprofile
+# mode also records deterministic statistics of each thread, merged in one pstats file.
+
+# Maximum part of the time spent sampling stacks, the interval grows when sampling is slower
+MAX_SAMPLING_OVERHEAD = 0.02
+
+# Number of functions listed in the summary
+NUM_OF_TOP_FUNCTIONS = 50
+
+
+def get_frame_name(frame):
+    """
+    The function returns the name of a frame in collapsed stacks.
+
+    :param frame: The `frame` parameter is a Python frame
+    :return: a string with the function, file and line.
+    """
+    code = frame.f_code
+    return f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})"
+
+
+class Profiler():
+    def __init__(self, mode: str, output_directory: str, interval=0.01):
+        """
+        The function initializes a profiler, without starting it.
+
+        :param mode: The `mode` parameter is sampling, or cprofile to also record deterministic
+        statistics
+        :type mode: str
+        :param output_directory: The `output_directory` parameter is the directory of the profile files
+        :type output_directory: str
+        :param interval: The `interval` parameter is the minimal time in seconds between two samples,
+        defaults to 0.01
+        """
+        self.mode = mode
+        self.output_directory = Path(output_directory)
+        self.interval = interval
+
+        # Number of samples by collapsed stack
+        self.stacks = Counter()
+        self.num_of_samples = 0
+        self.sampling_seconds = 0.0
+
+        self.stop_event = threading.Event()
+        self.sampler = None
+
+        # Deterministic profiles of each thread
+        self.profiles = []
+        self.profiles_lock = threading.Lock()
+
+    def start(self):
+        """
+        The function starts the sampling thread, and the deterministic profiles in cprofile mode.
+        """
+        self.sampler = threading.Thread(target=self.sample, name="Profiler", daemon=True)
+        self.sampler.start()
+
+        if self.mode == 'cprofile':
+            # Threads started from now on enable their own profile at their first call
+            threading.setprofile(self.profile_thread)
+
+            profile = cProfile.Profile()
+            profile.enable()
+            self.profiles.append((threading.current_thread().name, profile))
+
+    def profile_thread(self, frame, event, arg):
+        """
+        The function is called once at the start of each thread, and replaces itself by a profile of the
+        thread.
+        """
+        sys.setprofile(None)
+
+        # From Python 3.12, the profile of the main thread already records all threads
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            return
+
+        with self.profiles_lock:
+            self.profiles.append((threading.current_thread().name, profile))
+
+    def sample(self):
+        """
+        The function records the stacks of all threads until the profiler is stopped.
+        """
+        sampler_id = threading.get_ident()
+        interval = self.interval
+
+        while not self.stop_event.wait(interval):
+            start = time.perf_counter()
+
+            thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == sampler_id:
+                    continue
+
+                stack = []
+                while frame is not None:
+                    stack.append(get_frame_name(frame))
+                    frame = frame.f_back
+
+                stage = metrics.get_current_stage(thread_id) or "no-stage"
+                self.stacks[';'.join([thread_names.get(thread_id, str(thread_id)), stage] + stack[::-1])] += 1
+
+            self.num_of_samples += 1
+
+            # Keep the overhead bounded on large stacks or many threads
+            sampling_seconds = time.perf_counter() - start
+            self.sampling_seconds += sampling_seconds
+            interval = max(self.interval, sampling_seconds / MAX_SAMPLING_OVERHEAD)
+
+    def stop(self):
+        """
+        The function stops profiling and writes the profile files.
+        """
+        if self.sampler is not None:
+            self.stop_event.set()
+            self.sampler.join()
+            self.sampler = None
+
+        if self.mode == 'cprofile':
+            threading.setprofile(None)
+            self.profiles[0][1].disable()
+
+        self.write()
+
+    def get_summary(self):
+        """
+        The function summarizes samples by thread, stage and function.
+        :return: a dictionary.
+        """
+        samples_by_thread = Counter()
+        samples_by_stage = Counter()
+        samples_by_function = Counter()
+
+        for stack, count in self.stacks.items():
+            frames = stack.split(';')
+            samples_by_thread[frames[0]] += count
+            samples_by_stage[frames[1]] += count
+
+            # Samples where the function is running, not one of its callees
+            if 2 < len(frames):
+                samples_by_function[frames[-1]] += count
+
+        return {
+            'mode': self.mode,
+            'interval': self.interval,
+            'samples': self.num_of_samples,
+            'samplingSeconds': self.sampling_seconds,
+            'samplesByThread': dict(samples_by_thread.most_common()),
+            'samplesByStage': dict(samples_by_stage.most_common()),
+            'topFunctions': samples_by_function.most_common(NUM_OF_TOP_FUNCTIONS)
+        }
+
+    def write(self):
+        """
+        The function writes the collapsed stacks, the summary and, in cprofile mode, the merged
+        statistics of all threads.
+        """
+        self.output_directory.mkdir(parents=True, exist_ok=True)
+
+        with open(str(Path(self.output_directory, "profile.collapsed")), 'w') as file:
+            for stack, count in sorted(self.stacks.items()):
+                file.write(f"{stack} {count}\n")
+
+        with open(str(Path(self.output_directory, "profile.json")), 'w') as file:
+            json.dump(self.get_summary(), file, indent=2)
+
+        if self.mode == 'cprofile':
+            # Threads without any call have no statistics
+            stats = None
+            for thread_name, profile in self.profiles:
+                try:
+                    stats = pstats.Stats(profile) if stats is None else stats.add(profile)
+                except TypeError:
+                    logging.debug(f"No profile statistics for thread {thread_name}.")
+
+            if stats is not None:
+                stats.dump_stats(str(Path(self.output_directory, "profile.pstats")))
+
+                text = io.StringIO()
+                stats.stream = text
+                stats.sort_stats('cumulative').print_stats(NUM_OF_TOP_FUNCTIONS)
+                with open(str(Path(self.output_directory, "profile.txt")), 'w') as file:
+                    file.write(text.getvalue())
+
+        logging.info(f"Profile of {self.num_of_samples} samples written in {self.output_directory}.")
@@ -0,0 +1,151 @@
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import numpy as np
+
+# The QueryBatcher class runs the queries of concurrent clients in one thread, grouped by sun direction.
+# Queries received during a short window are answered together for each direction, so the scene is
+# indexed once by direction (extrusions, occluder tiles kept in memory) instead of once by query when
+# clients alternate between timestamps.
+
+# Percentiles of latencies reported by the query server
+LATENCY_PERCENTILES = (50, 90, 99)
+
+
+class LatencyRecorder():
+    def __init__(self, max_samples=100000):
+        """
+        The function initializes an empty record of latencies.
+
+        :param max_samples: The `max_samples` parameter is the number of most recent latencies used to
+        compute percentiles, defaults to 100000
+        """
+        self.lock = threading.Lock()
+        self.latencies = deque(maxlen=max_samples)
+        self.num_of_queries = 0
+
+    def record(self, seconds: float):
+        """
+        The function records the latency of a query.
+
+        :param seconds: The `seconds` parameter is the time between the reception of the query and its
+        answer
+        :type seconds: float
+        """
+        with self.lock:
+            self.latencies.append(seconds)
+            self.num_of_queries += 1
+
+    def get_statistics(self):
+        """
+        The function computes the latency percentiles of the most recent queries.
+        :return: a dictionary with the number of queries and the latencies in milliseconds.
+        """
+        with self.lock:
+            latencies = np.array(self.latencies) * 1000
+            statistics = {'queries': self.num_of_queries}
+
+        if len(latencies) == 0:
+            return statistics
+
+        for percentile, value in zip(LATENCY_PERCENTILES, np.percentile(latencies, LATENCY_PERCENTILES)):
+            statistics[f'p{percentile}Ms'] = float(value)
+        statistics['maxMs'] = float(np.amax(latencies))
+
+        return statistics
+
+
+class QueryBatcher():
+    def __init__(self, batch_window=0.002):
+        """
+        The function initializes a batcher, without starting its thread.
+
+        :param batch_window: The `batch_window` parameter is the time in seconds waited after a first query
+        to receive the queries answered with it, defaults to 0.002
+        """
+        self.batch_window = batch_window
+        self.queries = queue.Queue()
+        self.thread = None
+
+        self.num_of_batches = 0
+        self.num_of_groups = 0
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name="QueryBatcher", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """
+        The function answers pending queries and stops the thread.
+        """
+        if self.thread is not None:
+            self.queries.put(None)
+            self.thread.join()
+            self.thread = None
+
+    def submit(self, direction_key, function, *args):
+        """
+        The function queues a query.
+
+        :param direction_key: The `direction_key` parameter is a hashable key of the sun direction, queries
+        with the same key are answered together
+        :param function: The `function` parameter is called with `args` to answer the query
+        :return: a `Future` of the answer.
+        """
+        future = Future()
+        self.queries.put((direction_key, function, args, future))
+        return future
+
+    def get_batch(self):
+        """
+        The function waits for a query and returns it with all queries received during the batch window.
+        :return: a list of queries, and True when the batcher is stopped.
+        """
+        batch = [self.queries.get()]
+        deadline = time.perf_counter() + self.batch_window
+
+        while batch[-1] is not None:
+            timeout = deadline - time.perf_counter()
+            try:
+                batch.append(self.queries.get(timeout=timeout) if 0 < timeout else self.queries.get_nowait())
+            except queue.Empty:
+                break
+
+        if batch[-1] is None:
+            return batch[:-1], True
+
+        return batch, False
+
+    def run(self):
+        """
+        The function answers queries by batch until the batcher is stopped.
+        """
+        stopped = False
+        while not stopped:
+            batch, stopped = self.get_batch()
+
+            # Group queries by direction, in order of arrival of each direction
+            groups = dict()
+            for direction_key, function, args, future in batch:
+                groups.setdefault(direction_key, []).append((function, args, future))
+
+            self.num_of_batches += 1
+            self.num_of_groups += len(groups)
+
+            for group in groups.values():
+                for function, args, future in group:
+                    if not future.set_running_or_notify_cancel():
+                        continue
+
+                    try:
+                        future.set_result(function(*args))
+                    except Exception as exception:
+                        logging.exception("Query failed.")
+                        future.set_exception(exception)
+
+    def get_statistics(self):
+        return {'batches': self.num_of_batches, 'directionGroups': self.num_of_groups}
@@ -0,0 +1,266 @@
+import argparse
+import json
+import logging
+import math
+import os
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from socketserver import ThreadingMixIn, UnixStreamServer
+
+from py3dtilers.TilesetReader.TilesetReader import TilesetTiler
+
+from src import pySunlight
+from src.Converters import TilerToSunlight
+from src.LazyTileset import LazyTileset
+from src.QueryBatcher import LatencyRecorder, QueryBatcher
+from src.SceneCache import SceneCache
+from src.SunlightEngine import SunlightEngine
+from src.TileHierarchy import TileHierarchy
+
+# The QueryServer serves Sunlight queries of a scene loaded once, over localhost HTTP or a Unix socket.
+# Clients post points, triangles or features with a timestamp of the loaded sun path (or a sun
+# direction), and get their visibility. Queries of concurrent clients are batched by sun direction,
+# and latency percentiles are served on /stats and logged at shutdown.
+#
+#    python src/QueryServer.py -i datas/testing/b3dm_tileset --start-date 403224 --end-date 403248
+#    curl -d '{"date": "2016-01-01:0800", "points": [[1843500, 5173500, 175]]}' localhost:8642/query
+
+
+class UnixHTTPServer(ThreadingMixIn, UnixStreamServer):
+    daemon_threads = True
+
+
+class QueryServer():
+    def __init__(self, engine: SunlightEngine, sun_datas_list: pySunlight.SunDatasList, batch_window=0.002):
+        """
+        The function initializes a server answering queries on a prepared scene.
+
+        :param engine: The `engine` parameter is the engine of the scene
+        :type engine: SunlightEngine
+        :param sun_datas_list: The `sun_datas_list` parameter is the list of sun positions, queried by
+        their date
+        :type sun_datas_list: pySunlight.SunDatasList
+        :param batch_window: The `batch_window` parameter is the time in seconds during which concurrent
+        queries are batched, defaults to 0.002
+        """
+        self.engine = engine
+
+        # Sun positions are kept alive with their directions
+        self.sun_datas_list = sun_datas_list
+        self.sun_directions_by_date = {sun_datas.dateStr: sun_datas.direction for sun_datas in sun_datas_list}
+
+        self.batcher = QueryBatcher(batch_window)
+        self.latencies = LatencyRecorder()
+        self.http_server = None
+
+    def get_sun_direction(self, request: dict):
+        """
+        The function returns the sun direction of a request, from its date or its direction.
+
+        :param request: The `request` parameter is the decoded body of the request
+        :type request: dict
+        :return: the key of the direction and the direction as a `pySunlight.Vec3d`.
+        """
+        if 'date' in request:
+            if request['date'] not in self.sun_directions_by_date:
+                raise ValueError(f"No sun position at {request['date']}, the sun path is loaded from {min(self.sun_directions_by_date, default=None)} to {max(self.sun_directions_by_date, default=None)}.")
+            return request['date'], self.sun_directions_by_date[request['date']]
+
+        if 'direction' in request:
+            x, y, z = (float(value) for value in request['direction'])
+            return (x, y, z), pySunlight.Vec3d(x, y, z)
+
+        raise ValueError("A query needs a date or a sun direction.")
+
+    def answer(self, request: dict, sun_direction: pySunlight.Vec3d):
+        """
+        The function answers all queries of a request, in the batcher thread.
+
+        :param request: The `request` parameter is the decoded body of the request
+        :type request: dict
+        :param sun_direction: The `sun_direction` parameter is the direction from the ground to the sun
+        :type sun_direction: pySunlight.Vec3d
+        :return: a dictionary of results by query type.
+        """
+        answer = dict()
+
+        if 'points' in request:
+            answer['points'] = [self.engine.query_point(pySunlight.Vec3d(*point), sun_direction).to_dict() for point in request['points']]
+
+        if 'triangles' in request:
+            triangles = [pySunlight.Triangle(*(TilerToSunlight.convert_numpy_to_vec3(vertex) for vertex in vertices), "", "") for vertices in request['triangles']]
+            answer['triangles'] = [self.engine.query_triangle(triangle, sun_direction).to_dict() for triangle in triangles]
+
+        if 'features' in request:
+            answer['features'] = []
+            for feature in request['features']:
+                results = self.engine.query_feature(int(feature['tile']), str(feature['id']), sun_direction)
+                num_of_lighted_triangles = sum(1 for result in results if result.lighted)
+                answer['features'].append({
+                    'tile': feature['tile'],
+                    'id': feature['id'],
+                    'triangles': len(results),
+                    'lightedTriangles': num_of_lighted_triangles,
+                    'lightedRatio': num_of_lighted_triangles / len(results) if 0 < len(results) else math.nan,
+                    'results': [result.to_dict() for result in results]
+                })
+
+        return answer
+
+    def query(self, request: dict):
+        """
+        The function queues the queries of a request and waits for their answer.
+
+        :param request: The `request` parameter is the decoded body of the request
+        :type request: dict
+        :return: a dictionary of results by query type.
+        """
+        direction_key, sun_direction = self.get_sun_direction(request)
+        return self.batcher.submit(direction_key, self.answer, request, sun_direction).result()
+
+    def get_statistics(self):
+        return {
+            'latency': self.latencies.get_statistics(),
+            'batcher': self.batcher.get_statistics(),
+            'tilePool': self.engine.get_statistics()
+        }
+
+    def create_request_handler(self):
+        server = self
+
+        class RequestHandler(BaseHTTPRequestHandler):
+            def send_json(self, status: int, content: dict):
+                body = json.dumps(content).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path == '/stats':
+                    self.send_json(200, server.get_statistics())
+                elif self.path == '/dates':
+                    self.send_json(200, sorted(server.sun_directions_by_date))
+                else:
+                    self.send_json(404, {'error': f"Unknown path {self.path}"})
+
+            def do_POST(self):
+                if self.path != '/query':
+                    self.send_json(404, {'error': f"Unknown path {self.path}"})
+                    return
+
+                start = time.perf_counter()
+                try:
+                    request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+                    answer = server.query(request)
+                except (ValueError, KeyError, TypeError) as error:
+                    self.send_json(400, {'error': str(error)})
+                    return
+                except IndexError as error:
+                    self.send_json(404, {'error': str(error)})
+                    return
+                except Exception as error:
+                    # The client is answered even when a query fails unexpectedly
+                    logging.exception("Query failed.")
+                    self.send_json(500, {'error': str(error)})
+                    return
+
+                self.send_json(200, answer)
+                server.latencies.record(time.perf_counter() - start)
+
+            def address_string(self):
+                # Clients of a Unix socket have no address
+                return self.client_address[0] if isinstance(self.client_address, tuple) else "unix"
+
+            def log_message(self, format, *args):
+                logging.debug(f"{self.address_string()} {format % args}")
+
+        return RequestHandler
+
+    def serve(self, host='127.0.0.1', port=8642, socket_path=None):
+        """
+        The function serves queries until the server is interrupted.
+
+        :param host: The `host` parameter is the listened address, defaults to '127.0.0.1'
+        :param port: The `port` parameter is the listened port, defaults to 8642
+        :param socket_path: The `socket_path` parameter is the path of a Unix socket listened instead of
+        the port, defaults to None
+        """
+        if socket_path is not None:
+            if os.path.exists(socket_path):
+                os.remove(socket_path)
+            self.http_server = UnixHTTPServer(socket_path, self.create_request_handler())
+            logging.warning(f"Serving Sunlight queries on {socket_path}.")
+        else:
+            self.http_server = ThreadingHTTPServer((host, port), self.create_request_handler())
+            logging.warning(f"Serving Sunlight queries on http://{host}:{self.http_server.server_address[1]}.")
+
+        self.batcher.start()
+        try:
+            self.http_server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.http_server.server_close()
+            self.batcher.stop()
+
+            if socket_path is not None and os.path.exists(socket_path):
+                os.remove(socket_path)
+
+        logging.warning(f"Query statistics : {self.get_statistics()}")
+
+    def shutdown(self):
+        """
+        The function stops serving, from another thread.
+        """
+        if self.http_server is not None:
+            self.http_server.shutdown()
+
+
+def parse_command_line():
+    parser = argparse.ArgumentParser(description='Serve Sunlight queries of a scene loaded once.')
+    parser.add_argument('--paths', '--path', '--db_config_path', '--file_path', '-i', nargs='*', type=str, help='Paths to input files or directories.')
+    parser.add_argument('--start-date', '-s', dest='start_date', type=int, help='Start date of the sun positions which can be queried. Ex : --start-date 403224', required=True)
+    parser.add_argument('--end-date', '-e', dest='end_date', type=int, help='End date of the sun positions which can be queried. Ex : --end-date 403248', required=True)
+    parser.add_argument('--host', dest='host', default='127.0.0.1', help='Listened address. Ex : --host 0.0.0.0, default=127.0.0.1')
+    parser.add_argument('--port', dest='port', type=int, default=8642, help='Listened port. Ex : --port 8000, default=8642')
+    parser.add_argument('--socket', dest='socket', type=str, help='Unix socket listened instead of the port. Ex : --socket /tmp/sunlight.sock')
+    parser.add_argument('--batch-window', dest='batch_window', type=float, default=2, help='Milliseconds during which concurrent queries are batched by sun direction. Ex : --batch-window 5, default=2')
+    parser.add_argument('--engine', dest='engine', default='ray', choices=['ray', 'extrusion'], help='Shadow engine. Ex : --engine extrusion, default=ray')
+    parser.add_argument('--scene-cache', dest='scene_cache', nargs='?', const='', type=str, help='Read triangles from a scene cache, compiled when the input changes. Ex : --scene-cache /tmp/city.sunlight-cache')
+    parser.add_argument('--max-memory', dest='max_memory', type=int, help='Memory budget in megabytes of decoded tiles. Ex : --max-memory 4096, default=2048')
+    parser.add_argument('--log-level', '-log', dest='log_level', default='WARNING', choices=logging._nameToLevel.keys(), help='Provide logging level. Ex : --log-level DEBUG, default=WARNING')
+
+    return parser.parse_known_args()[0]
+
+
+def main():
+    args = parse_command_line()
+
+    logging.basicConfig(level=args.log_level, format='[%(asctime)s] [%(levelname)s] %(message)s')
+
+    sunParser = pySunlight.SunEarthToolsParser()
+    sunParser.loadSunpathFile("datas/AnnualSunPath_Lyon.csv", args.start_date, args.end_date)
+
+    tiler = TilesetTiler()
+    tiler.parse_command_line()
+    tileset = LazyTileset(tiler.files)
+
+    scene_cache = None
+    if args.scene_cache is not None:
+        scene_cache = SceneCache(args.scene_cache or SceneCache.get_default_directory(tiler.files))
+        scene_cache.open(TileHierarchy(tileset).get_tiles(), tiler.files)
+
+    max_memory_in_bytes = None if args.max_memory is None else args.max_memory * 1024 * 1024
+    engine = SunlightEngine(tileset, max_memory_in_bytes=max_memory_in_bytes, scene_cache=scene_cache, engine=args.engine)
+
+    # Convert all tiles before the first query
+    engine.prepare()
+
+    server = QueryServer(engine, sunParser.getSunDatas(), args.batch_window / 1000)
+    server.serve(args.host, args.port, args.socket)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,173 @@
+import logging
+
+import numpy as np
+
+from src import pySunlight
+from src.TileHierarchy import TileHierarchy
+from src.TilePool import TilePool
+from src.TilePrefetcher import TilePrefetcher
+
+# The RegionOfInterest class limits the computation to the triangles inside a polygon of the tileset
+# CRS, in the horizontal plane. Only tiles which can shade the region are used as occluders.
+
+
+class RegionOfInterest():
+    def __init__(self, polygon):
+        """
+        The function initializes a region of interest from a polygon.
+
+        :param polygon: The `polygon` parameter is the list of (x, y) vertices of the polygon, in the
+        tileset CRS. The polygon is closed implicitly
+        """
+        self.polygon = np.asarray(polygon, dtype=float)
+        self.min = np.amin(self.polygon, axis=0)
+        self.max = np.amax(self.polygon, axis=0)
+
+        # Set when tiles are selected
+        self.tile_hierarchy = None
+        self.receiver_tile_indexes = []
+        self.bounds = None
+
+    @staticmethod
+    def from_coordinates(coordinates: list):
+        """
+        The function creates a region of interest from a flat list of coordinates.
+
+        :param coordinates: The `coordinates` parameter is either a bounding box `xmin ymin xmax ymax`,
+        or the `x y` coordinates of at least 3 vertices of a polygon
+        :type coordinates: list
+        :return: a `RegionOfInterest`.
+        """
+        if len(coordinates) == 4:
+            xmin, ymin, xmax, ymax = coordinates
+            return RegionOfInterest([(xmin, ymin), (xmax, ymin), (xmax, ymax), (xmin, ymax)])
+
+        if len(coordinates) < 6 or len(coordinates) % 2 != 0:
+            raise ValueError(f"A region of interest needs a bounding box or at least 3 vertices, got {len(coordinates)} coordinates.")
+
+        return RegionOfInterest(np.reshape(coordinates, (-1, 2)))
+
+    def contains_point(self, x: float, y: float):
+        """
+        The function checks if a point is inside the polygon, using the even-odd rule.
+
+        :param x: The `x` parameter is the x coordinate of the point
+        :type x: float
+        :param y: The `y` parameter is the y coordinate of the point
+        :type y: float
+        :return: True if the point is inside, False otherwise.
+        """
+        if x < self.min[0] or self.max[0] < x or y < self.min[1] or self.max[1] < y:
+            return False
+
+        inside = False
+        previous = self.polygon[-1]
+        for vertex in self.polygon:
+            # Count crossings of an horizontal ray going to +x
+            if (vertex[1] > y) != (previous[1] > y):
+                crossing_x = vertex[0] + (y - vertex[1]) * (previous[0] - vertex[0]) / (previous[1] - vertex[1])
+                if x < crossing_x:
+                    inside = not inside
+            previous = vertex
+
+        return inside
+
+    def contains_triangle(self, triangle: pySunlight.Triangle):
+        """
+        The function checks if a triangle is inside the region, using its centroid.
+
+        :param triangle: The `triangle` parameter is a Sunlight triangle
+        :type triangle: pySunlight.Triangle
+        :return: True if the triangle is inside, False otherwise.
+        """
+        x = (triangle.a.getX() + triangle.b.getX() + triangle.c.getX()) / 3
+        y = (triangle.a.getY() + triangle.b.getY() + triangle.c.getY()) / 3
+
+        return self.contains_point(x, y)
+
+    def intersects_bounds(self, bounds):
+        """
+        The function checks if bounds overlap the bounding box of the polygon, in the horizontal plane.
+
+        :param bounds: The `bounds` parameter is a (min, max) pair
+        :return: True if bounds can contain triangles of the region, False otherwise.
+        """
+        return bool(np.all(bounds[0][:2] <= self.max) and np.all(self.min <= bounds[1][:2]))
+
+    def get_receiver_triangles(self, triangle_soup: pySunlight.TriangleSoup):
+        """
+        The function returns the triangles inside the region.
+
+        :param triangle_soup: The `triangle_soup` parameter is all triangles of a tile
+        :type triangle_soup: pySunlight.TriangleSoup
+        :return: a new `TriangleSoup` containing only triangles of the region.
+        """
+        receiver_triangles = pySunlight.TriangleSoup()
+        for triangle in triangle_soup:
+            if self.contains_triangle(triangle):
+                receiver_triangles.push_back(triangle)
+
+        return receiver_triangles
+
+    def select_tiles(self, tile_hierarchy: TileHierarchy, tile_pool: TilePool = None, scene_cache=None):
+        """
+        The function selects the tiles containing triangles of the region. Tiles overlapping the region
+        are loaded once to check their triangles, the selection is kept for the next calls with the same
+        tile hierarchy.
+
+        :param tile_hierarchy: The `tile_hierarchy` parameter is the hierarchy of all tiles of the
+        tileset, giving their bounds
+        :type tile_hierarchy: TileHierarchy
+        :param tile_pool: The `tile_pool` parameter is the pool from which tiles overlapping the region
+        are loaded, so they count in its memory budget. Tiles are decoded when it is None, defaults to
+        None
+        :type tile_pool: TilePool
+        :param scene_cache: The `scene_cache` parameter is a loaded `SceneCache` from which triangles are
+        read instead of decoding tiles, defaults to None
+        :return: the list of indexes of receiver tiles.
+        """
+        if tile_hierarchy is self.tile_hierarchy:
+            return self.receiver_tile_indexes
+
+        self.tile_hierarchy = tile_hierarchy
+        tile_indexes = [i for i in range(tile_hierarchy.get_num_of_tiles()) if self.intersects_bounds(tile_hierarchy.get_tile_bounds(i))]
+
+        self.receiver_tile_indexes = []
+        for tile_index, tile_wrapper in TilePrefetcher(tile_hierarchy.get_tiles(), tile_indexes=tile_indexes, tile_pool=tile_pool, scene_cache=scene_cache):
+            if any(self.contains_triangle(triangle) for triangle in tile_wrapper.get_triangles()):
+                self.receiver_tile_indexes.append(tile_index)
+
+        logging.info(f"Tiles containing the region of interest : {self.receiver_tile_indexes}")
+
+        if len(self.receiver_tile_indexes) == 0:
+            logging.warning("No triangle in the region of interest.")
+            self.bounds = None
+            return self.receiver_tile_indexes
+
+        # Receivers are under the polygon, between the lowest and the highest receiver tile
+        min_z = min(tile_hierarchy.get_tile_bounds(i)[0][2] for i in self.receiver_tile_indexes)
+        max_z = max(tile_hierarchy.get_tile_bounds(i)[1][2] for i in self.receiver_tile_indexes)
+        self.bounds = (np.append(self.min, min_z), np.append(self.max, max_z))
+
+        return self.receiver_tile_indexes
+
+    def get_receiver_tile_indexes(self):
+        """
+        The function returns the tiles containing triangles of the region, once tiles are selected.
+        :return: a list of tile indexes.
+        """
+        return self.receiver_tile_indexes
+
+    def get_occluder_tile_indexes(self, sun_direction):
+        """
+        The function returns the tiles which can shade the region for a sun direction, once tiles are
+        selected.
+
+        :param sun_direction: The `sun_direction` parameter is the direction from the ground to the sun,
+        as an array of 3 coordinates
+        :return: a list of tile indexes.
+        """
+        if self.bounds is None:
+            return []
+
+        return self.tile_hierarchy.get_occluder_tile_indexes(self.bounds, sun_direction)
@@ -0,0 +1,300 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+
+# The RunManifest class records each completed unit of a run (a tile exported by a writer in a
+# timestamp directory, a tileset, an aggregated tile) in an append-only file of the output directory.
+# A stopped run can then be resumed, skipping the units already completed.
+
+MANIFEST_VERSION = 2
+
+
+def list_files(paths: list):
+    """
+    The function `list_files` lists the files of a list of files or directories.
+
+    :param paths: The `paths` parameter is a list of paths of files or directories. Directories are
+    read recursively in a sorted order
+    :type paths: list
+    :return: an iterator of (file path, name of the file relatively to its directory) tuples.
+    """
+    for path in paths:
+        path = Path(path)
+        files = sorted(file for file in path.rglob('*') if file.is_file()) if path.is_dir() else [path]
+
+        for file in files:
+            yield file, str(file.relative_to(path) if path.is_dir() else file.name)
+
+
+def hash_files(paths: list, hash=None):
+    """
+    The function `hash_files` computes the sha256 of the content of a list of files or directories.
+
+    :param paths: The `paths` parameter is a list of paths of files or directories. Directories are
+    read recursively in a sorted order
+    :type paths: list
+    :param hash: The `hash` parameter is an existing hash object to update, defaults to None
+    :return: the hexadecimal sha256 of all contents.
+    """
+    hash = hashlib.sha256() if hash is None else hash
+
+    for file, name in list_files(paths):
+        hash.update(name.encode())
+
+        with open(str(file), 'rb') as content:
+            for chunk in iter(lambda: content.read(1024 * 1024), b''):
+                hash.update(chunk)
+
+    return hash.hexdigest()
+
+
+def hash_files_metadata(paths: list, hash=None):
+    """
+    The function `hash_files_metadata` computes the sha256 of the size and modification time of a list
+    of files or directories, without reading their content.
+
+    :param paths: The `paths` parameter is a list of paths of files or directories. Directories are
+    read recursively in a sorted order
+    :type paths: list
+    :param hash: The `hash` parameter is an existing hash object to update, defaults to None
+    :return: the hexadecimal sha256 of all metadata.
+    """
+    hash = hashlib.sha256() if hash is None else hash
+
+    for file, name in list_files(paths):
+        stat = file.stat()
+        hash.update(f"{name}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+
+    return hash.hexdigest()
+
+
+def hash_run(input_paths: list, parameters: dict, read_contents=True):
+    """
+    The function `hash_run` computes a hash identifying the inputs and parameters of a run.
+
+    :param input_paths: The `input_paths` parameter is the list of input tilesets directories
+    :type input_paths: list
+    :param parameters: The `parameters` parameter is a dictionary of all parameters changing results
+    :type parameters: dict
+    :param read_contents: The `read_contents` parameter hashes the content of inputs. Only their size
+    and modification time are hashed with False, so inputs are not read, defaults to True
+    :return: the hexadecimal sha256 of inputs and parameters.
+    """
+    hash = hashlib.sha256()
+    hash.update(json.dumps(parameters, sort_keys=True, default=str).encode())
+
+    if not read_contents:
+        return hash_files_metadata(input_paths, hash)
+
+    return hash_files(input_paths, hash)
+
+
+class RunManifest():
+    FILE_NAME = "manifest.jsonl"
+
+    def __init__(self, output_directory: str, run_hash: str):
+        """
+        The function initializes the manifest of an output directory.
+
+        :param output_directory: The `output_directory` parameter is the root directory of all results
+        :type output_directory: str
+        :param run_hash: The `run_hash` parameter identifies the inputs and parameters of the run. A
+        previous manifest with another hash can't be resumed
+        :type run_hash: str
+        """
+        self.output_directory = output_directory
+        self.run_hash = run_hash
+        self.path = Path(output_directory, self.FILE_NAME)
+
+        # Last record of each unit, by key
+        self.units = dict()
+        self.lock = threading.Lock()
+
+    def open(self, resume=False):
+        """
+        The function loads the completed units of a previous run when resuming, or starts a new
+        manifest.
+
+        :param resume: The `resume` parameter enables the loading of a previous manifest, defaults to
+        False
+        :return: True if a previous run is resumed, False otherwise.
+        """
+        if resume and self.path.exists():
+            records = self.read_records()
+
+            if 0 < len(records) and records[0].get('runHash') == self.run_hash and records[0].get('version') == MANIFEST_VERSION:
+                for record in records[1:]:
+                    self.units[self.get_key(record)] = record
+
+                logging.info(f"Resume previous run with {len(self.units)} recorded units.")
+                return True
+
+            logging.warning("Inputs or parameters changed since the previous run, start over.")
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(str(self.path), 'w') as file:
+            file.write(json.dumps({'version': MANIFEST_VERSION, 'runHash': self.run_hash}) + '\n')
+
+        return False
+
+    def read_records(self):
+        """
+        The function reads all records of the manifest, ignoring a last line partially written.
+        :return: the list of records, starting with the header.
+        """
+        records = []
+        with open(str(self.path), 'r') as file:
+            for line in file:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    logging.warning("Ignore a partially written manifest record.")
+
+        return records
+
+    def get_key(self, record: dict):
+        """
+        The function returns the key identifying the unit of a record.
+
+        :param record: The `record` parameter is a manifest record
+        :type record: dict
+        :return: a string identifying the unit.
+        """
+        return f"{record['unit']}/{record.get('writer')}/{record.get('directory')}/{record.get('tile')}"
+
+    def append(self, record: dict):
+        """
+        The function appends a record to the manifest and flushes it to disk.
+
+        :param record: The `record` parameter is the record to append
+        :type record: dict
+        """
+        with self.lock:
+            self.units[self.get_key(record)] = record
+
+            with open(str(self.path), 'a') as file:
+                file.write(json.dumps(record) + '\n')
+                file.flush()
+                os.fsync(file.fileno())
+
+    def get_directory_name(self, directory: str):
+        # Timestamp directories are recorded relatively to the output directory
+        return Path(directory).name
+
+    def record_tile(self, writer_name: str, directory: str, tile_index: int, output_paths: list, checksum=None):
+        """
+        The function records a tile exported by a writer, with a checksum of its outputs.
+
+        :param writer_name: The `writer_name` parameter is the name of the writer
+        :type writer_name: str
+        :param directory: The `directory` parameter is the timestamp directory of the export
+        :type directory: str
+        :param tile_index: The `tile_index` parameter is the index of the exported tile
+        :type tile_index: int
+        :param output_paths: The `output_paths` parameter is the list of files written for the tile
+        :type output_paths: list
+        :param checksum: The `checksum` parameter is the checksum of the outputs when it is already
+        computed, defaults to None
+        """
+        self.append({
+            'unit': 'tile',
+            'writer': writer_name,
+            'directory': self.get_directory_name(directory),
+            'tile': tile_index,
+            'checksum': hash_files(output_paths) if checksum is None else checksum
+        })
+
+    def record_tileset(self, writer_name: str, directory: str):
+        """
+        The function records a tileset exported by a writer, ending a timestamp.
+
+        :param writer_name: The `writer_name` parameter is the name of the writer
+        :type writer_name: str
+        :param directory: The `directory` parameter is the timestamp directory of the export
+        :type directory: str
+        """
+        self.append({'unit': 'tileset', 'writer': writer_name, 'directory': self.get_directory_name(directory)})
+
+    def record_aggregate(self, tile_index: int, complete=True, writer_name=None):
+        """
+        The function records if the aggregates of a tile are complete.
+
+        :param tile_index: The `tile_index` parameter is the index of the aggregated tile
+        :type tile_index: int
+        :param complete: The `complete` parameter is False when the aggregates of a tile must be
+        computed again, defaults to True
+        :param writer_name: The `writer_name` parameter is the name of the writer whose results are
+        aggregated, defaults to None
+        """
+        self.append({'unit': 'aggregate', 'writer': writer_name, 'tile': tile_index, 'complete': complete})
+
+    def record_scene(self, tiles: list):
+        """
+        The function records the description of the input tiles of a completed run, compared with the
+        input tiles of the next incremental run.
+
+        :param tiles: The `tiles` parameter is the list of tile descriptions, ordered by tile index
+        :type tiles: list
+        """
+        self.append({'unit': 'scene', 'tiles': tiles})
+
+    def get_scene(self):
+        """
+        The function returns the description of the input tiles of the last completed run.
+        :return: a list of tile descriptions, or None if no run was completed.
+        """
+        key = self.get_key({'unit': 'scene'})
+        return self.units[key]['tiles'] if key in self.units else None
+
+    def is_tile_complete(self, writer_name: str, directory: str, tile_index: int, output_paths: list):
+        """
+        The function checks if a tile was completely exported by a writer and its outputs didn't change.
+
+        :param writer_name: The `writer_name` parameter is the name of the writer
+        :type writer_name: str
+        :param directory: The `directory` parameter is the timestamp directory of the export
+        :type directory: str
+        :param tile_index: The `tile_index` parameter is the index of the tile
+        :type tile_index: int
+        :param output_paths: The `output_paths` parameter is the list of files written for the tile
+        :type output_paths: list
+        :return: True if the tile doesn't need to be exported again, False otherwise.
+        """
+        key = self.get_key({'unit': 'tile', 'writer': writer_name, 'directory': self.get_directory_name(directory), 'tile': tile_index})
+        if key not in self.units:
+            return False
+
+        # Partial exports have a different checksum
+        if not all(Path(path).exists() for path in output_paths):
+            return False
+
+        return self.units[key]['checksum'] == hash_files(output_paths)
+
+    def is_tileset_complete(self, writer_name: str, directory: str):
+        """
+        The function checks if the tileset of a timestamp was exported by a writer.
+
+        :param writer_name: The `writer_name` parameter is the name of the writer
+        :type writer_name: str
+        :param directory: The `directory` parameter is the timestamp directory of the export
+        :type directory: str
+        :return: True if the tileset was exported, False otherwise.
+        """
+        key = self.get_key({'unit': 'tileset', 'writer': writer_name, 'directory': self.get_directory_name(directory)})
+        return key in self.units
+
+    def is_aggregate_complete(self, tile_index: int, writer_name=None):
+        """
+        The function checks if the aggregates of a tile are complete.
+
+        :param tile_index: The `tile_index` parameter is the index of the aggregated tile
+        :type tile_index: int
+        :param writer_name: The `writer_name` parameter is the name of the writer whose results are
+        aggregated, defaults to None
+        :return: True if the aggregates don't need to be computed again, False otherwise.
+        """
+        key = self.get_key({'unit': 'aggregate', 'writer': writer_name, 'tile': tile_index})
+        return key in self.units and self.units[key]['complete']
@@ -0,0 +1,231 @@
+import json
+import logging
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+import numpy as np
+from py3dtilers.TilesetReader.tile_to_feature import TileToFeatureList
+
+from src import Geometry, pySunlight
+from src.Metrics import metrics
+from src.RunManifest import hash_files_metadata
+from src.TileWrapper import TileWrapper
+
+# The SceneCache class compiles the triangles of all tiles once in binary arrays (vertices, triangle to
+# feature / tile maps, tile bounds) stored next to the input. Later runs memory-map these arrays
+# instead of decoding b3dm files and converting py3dtilers features, and create the Sunlight triangles
+# of a tile in one call. The cache is compiled again when the inputs (identified by the size and
+# modification time of their files) or the cache version change.
+
+SCENE_CACHE_VERSION = 2
+
+
+class SceneCache():
+    META_FILE_NAME = "scene.json"
+
+    def __init__(self, directory: str):
+        """
+        The function initializes a scene cache stored in a directory, without loading it.
+
+        :param directory: The `directory` parameter is the directory of the cache
+        :type directory: str
+        """
+        self.directory = Path(directory)
+
+        # Set when the cache is loaded
+        self.meta = None
+        self.vertices = None
+        self.tile_offsets = None
+        self.triangle_features = None
+        self.triangle_local_indexes = None
+        self.tile_bounds = None
+        self.feature_ids = None
+
+    @staticmethod
+    def get_default_directory(input_paths: list):
+        """
+        The function returns the default cache directory, next to the first input.
+
+        :param input_paths: The `input_paths` parameter is the list of input tilesets directories
+        :type input_paths: list
+        :return: a Path of the cache directory.
+        """
+        input_path = Path(input_paths[0]).resolve()
+        return input_path.with_name(f"{input_path.name}.sunlight-cache")
+
+    def load(self, input_hash: str):
+        """
+        The function memory-maps the arrays of the cache if it was compiled from the same inputs with
+        the same version.
+
+        :param input_hash: The `input_hash` parameter is the hash of the current inputs
+        :type input_hash: str
+        :return: True if the cache is loaded, False otherwise.
+        """
+        meta_path = Path(self.directory, self.META_FILE_NAME)
+        if not meta_path.exists():
+            return False
+
+        with open(str(meta_path), 'r') as file:
+            meta = json.load(file)
+
+        if meta.get('version') != SCENE_CACHE_VERSION or meta.get('inputHash') != input_hash:
+            logging.info("Scene cache is outdated.")
+            return False
+
+        self.meta = meta
+        self.feature_ids = None
+        self.vertices = np.load(str(Path(self.directory, "vertices.npy")), mmap_mode='r')
+        self.tile_offsets = np.load(str(Path(self.directory, "tile_offsets.npy")), mmap_mode='r')
+        self.triangle_features = np.load(str(Path(self.directory, "triangle_features.npy")), mmap_mode='r')
+        self.triangle_local_indexes = np.load(str(Path(self.directory, "triangle_local_indexes.npy")), mmap_mode='r')
+        self.tile_bounds = np.load(str(Path(self.directory, "tile_bounds.npy")), mmap_mode='r')
+
+        logging.info(f"Load scene cache of {len(self.vertices)} triangles from {self.directory}.")
+        return True
+
+    def compile(self, all_tiles: list, input_hash: str):
+        """
+        The function decodes all tiles once and writes their triangles in the cache. The cache is
+        written in a temporary directory and moved at the end, so a stopped compilation leaves no
+        partial cache.
+
+        :param all_tiles: The `all_tiles` parameter is the list of all tiles of the tileset
+        :type all_tiles: list
+        :param input_hash: The `input_hash` parameter is the hash of the inputs
+        :type input_hash: str
+        """
+        logging.info(f"Compile scene cache in {self.directory}...")
+
+        # Arrays of the triangles of each feature, concatenated once all tiles are decoded
+        vertices = []
+        tile_offsets = [0]
+        triangle_features = []
+        triangle_local_indexes = []
+        tile_bounds = []
+        tile_names = []
+        feature_ids = []
+
+        num_of_triangles = 0
+        for tile in all_tiles:
+            for feature in TileToFeatureList(tile):
+                feature_code = len(feature_ids)
+                feature_ids.append(str(feature.get_id()))
+
+                feature_vertices = np.asarray(feature.get_geom_as_triangles(), dtype=np.float64).reshape(-1, 3, 3)
+                vertices.append(feature_vertices)
+                triangle_features.append(np.full(len(feature_vertices), feature_code, dtype=np.int64))
+                triangle_local_indexes.append(np.arange(len(feature_vertices), dtype=np.int64))
+                num_of_triangles += len(feature_vertices)
+
+            tile_offsets.append(num_of_triangles)
+            tile_bounds.append(np.array(Geometry.get_tile_bounds(tile)))
+            tile_names.append(tile.get_content_uri())
+
+        # Empty arrays keep a scene without feature valid
+        vertices.append(np.zeros((0, 3, 3), dtype=np.float64))
+        triangle_features.append(np.zeros(0, dtype=np.int64))
+        triangle_local_indexes.append(np.zeros(0, dtype=np.int64))
+
+        self.directory.parent.mkdir(parents=True, exist_ok=True)
+        temporary_directory = Path(tempfile.mkdtemp(prefix=".scene_", dir=str(self.directory.parent)))
+
+        np.save(str(Path(temporary_directory, "vertices.npy")), np.concatenate(vertices))
+        np.save(str(Path(temporary_directory, "tile_offsets.npy")), np.array(tile_offsets, dtype=np.int64))
+        np.save(str(Path(temporary_directory, "triangle_features.npy")), np.concatenate(triangle_features))
+        np.save(str(Path(temporary_directory, "triangle_local_indexes.npy")), np.concatenate(triangle_local_indexes))
+        np.save(str(Path(temporary_directory, "tile_bounds.npy")), np.array(tile_bounds, dtype=np.float64).reshape(-1, 2, 3))
+
+        # Meta data is written last, it validates the cache
+        with open(str(Path(temporary_directory, self.META_FILE_NAME)), 'w') as file:
+            json.dump({'version': SCENE_CACHE_VERSION, 'inputHash': input_hash, 'tileNames': tile_names, 'featureIds': feature_ids}, file)
+
+        shutil.rmtree(str(self.directory), ignore_errors=True)
+        os.replace(str(temporary_directory), str(self.directory))
+
+    def open(self, all_tiles: list, input_paths: list):
+        """
+        The function loads the cache, compiling it first if it is missing or outdated.
+
+        :param all_tiles: The `all_tiles` parameter is the list of all tiles of the tileset
+        :type all_tiles: list
+        :param input_paths: The `input_paths` parameter is the list of input tilesets directories
+        :type input_paths: list
+        """
+        # Validating the cache must not read all inputs, which would cost as much as decoding them
+        input_hash = hash_files_metadata(input_paths)
+
+        if not self.load(input_hash):
+            self.compile(all_tiles, input_hash)
+            self.load(input_hash)
+
+    def get_num_of_tiles(self):
+        """
+        The function returns the number of tiles in the cache.
+        :return: an integer.
+        """
+        return len(self.tile_offsets) - 1
+
+    def get_tile_bounds(self, tile_index: int):
+        """
+        The function returns the bounds of a tile.
+
+        :param tile_index: The `tile_index` parameter is the index of the tile
+        :type tile_index: int
+        :return: a tuple (min, max) of numpy arrays.
+        """
+        return self.tile_bounds[tile_index][0], self.tile_bounds[tile_index][1]
+
+    def get_triangle_ids(self, tile_name: str, start: int, end: int):
+        """
+        The function generates the ids of a range of triangles of the cache, like
+        `TilerToSunlight.generate_triangle_id` but for all triangles at once.
+
+        :param tile_name: The `tile_name` parameter is the content uri of the tile of the triangles
+        :type tile_name: str
+        :param start: The `start` parameter is the index of the first triangle
+        :type start: int
+        :param end: The `end` parameter is the index after the last triangle
+        :type end: int
+        :return: a list of ids.
+        """
+        if self.feature_ids is None:
+            self.feature_ids = np.array(self.meta['featureIds'], dtype=str)
+
+        triangle_ids = np.char.add(f"Tile-{tile_name}__Feature-", self.feature_ids[self.triangle_features[start:end]])
+        triangle_ids = np.char.add(triangle_ids, "__Triangle-")
+        triangle_ids = np.char.add(triangle_ids, self.triangle_local_indexes[start:end].astype(str))
+
+        return triangle_ids.tolist()
+
+    def get_triangle_soup(self, tile_index: int):
+        """
+        The function creates the Sunlight triangles of a tile from the cache, with the same ids as the
+        triangles converted from the tile.
+
+        :param tile_index: The `tile_index` parameter is the index of the tile
+        :type tile_index: int
+        :return: a `TriangleSoup`.
+        """
+        start = self.tile_offsets[tile_index]
+        end = self.tile_offsets[tile_index + 1]
+        tile_name = self.meta['tileNames'][tile_index]
+
+        with metrics.time('convert'):
+            triangle_ids = self.get_triangle_ids(tile_name, start, end)
+            triangle_soup = pySunlight.createTriangleSoup(self.vertices[start:end].ravel().tolist(), triangle_ids, tile_name)
+
+        return triangle_soup
+
+    def create_tile_wrapper(self, tile, tile_index: int):
+        """
+        The function creates the tile wrapper of a tile with its triangles read from the cache.
+
+        :param tile: The `tile` parameter is the tile, for its bounding volume
+        :param tile_index: The `tile_index` parameter is the index of the tile
+        :type tile_index: int
+        :return: a `TileWrapper`.
+        """
+        return TileWrapper(tile, tile_index, self.get_triangle_soup(tile_index))
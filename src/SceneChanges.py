@@ -0,0 +1,116 @@
+import hashlib
+
+import numpy as np
+from py3dtiles.tile import Tile
+
+from src import Geometry
+from src.LazyTileset import LazyTile
+
+# The SceneChanges class compares the tiles of the input tileset with the tiles of a previous run, to
+# recompute only the tiles that changed and the tiles they can shadow, or could shadow before.
+
+
+def describe_tile(tile: Tile):
+    """
+    The function `describe_tile` computes the content hash and the bounds of a tile, to compare it
+    with the same tile in another run.
+
+    :param tile: The `tile` parameter is a tile of the input tileset
+    :type tile: Tile
+    :return: a dictionary with the `hash` of the tile content and its `min` and `max` bounds.
+    """
+    # The b3dm of a lazy tile is hashed without being decoded
+    if isinstance(tile, LazyTile):
+        content_hash = tile.get_content_hash()
+    else:
+        content_hash = hashlib.sha256(tile.get_content().to_array().tobytes()).hexdigest()
+    min, max = Geometry.get_tile_bounds(tile)
+
+    return {'hash': content_hash, 'min': min.tolist(), 'max': max.tolist()}
+
+
+def describe_tiles(all_tiles: list):
+    """
+    The function `describe_tiles` describes all tiles of a tileset.
+
+    :param all_tiles: The `all_tiles` parameter is the list of all tiles of the tileset
+    :type all_tiles: list
+    :return: a list of tile descriptions, ordered by tile index.
+    """
+    return [describe_tile(tile) for tile in all_tiles]
+
+
+def get_bounds(tile_description: dict):
+    """
+    The function `get_bounds` returns the bounds of a tile description.
+
+    :param tile_description: The `tile_description` parameter is a description made by `describe_tile`
+    :type tile_description: dict
+    :return: a tuple (min, max) of numpy arrays.
+    """
+    return np.array(tile_description['min']), np.array(tile_description['max'])
+
+
+class SceneChanges():
+    def __init__(self, previous_tiles: list, current_tiles: list):
+        """
+        The function initializes the changes between the tiles of a previous run and the current tiles.
+
+        :param previous_tiles: The `previous_tiles` parameter is the list of tile descriptions of the
+        previous run. All tiles are considered as changed when it is None or when the number of tiles
+        changed, because tile indexes can't be matched
+        :type previous_tiles: list
+        :param current_tiles: The `current_tiles` parameter is the list of tile descriptions of the
+        current input tileset
+        :type current_tiles: list
+        """
+        self.previous_tiles = previous_tiles
+        self.current_tiles = current_tiles
+
+        if previous_tiles is None or len(previous_tiles) != len(current_tiles):
+            self.changed_tile_indexes = list(range(len(current_tiles)))
+        else:
+            self.changed_tile_indexes = [i for i, (previous_tile, current_tile) in enumerate(zip(previous_tiles, current_tiles)) if previous_tile['hash'] != current_tile['hash']]
+
+    def is_full_recompute(self):
+        """
+        The function checks if all tiles must be computed again.
+        :return: True if all tiles changed, False otherwise.
+        """
+        return len(self.changed_tile_indexes) == len(self.current_tiles)
+
+    def get_changed_tile_indexes(self):
+        """
+        The function returns the indexes of the tiles whose content changed.
+        :return: a list of tile indexes.
+        """
+        return self.changed_tile_indexes
+
+    def get_affected_tile_indexes(self, sun_direction):
+        """
+        The function returns the tiles to compute again for a sun direction : changed tiles, and tiles
+        whose shadow corridor crosses the old or the new bounds of a changed tile.
+
+        :param sun_direction: The `sun_direction` parameter is the direction from the ground to the sun,
+        as an array of 3 coordinates
+        :return: a sorted list of tile indexes.
+        """
+        if self.is_full_recompute():
+            return list(range(len(self.current_tiles)))
+
+        # Occluders that were removed or added can change the lighting of unchanged receivers
+        changed_bounds = []
+        for changed_tile_index in self.changed_tile_indexes:
+            changed_bounds.append(get_bounds(self.previous_tiles[changed_tile_index]))
+            changed_bounds.append(get_bounds(self.current_tiles[changed_tile_index]))
+
+        affected_tile_indexes = set(self.changed_tile_indexes)
+        for tile_index, tile in enumerate(self.current_tiles):
+            if tile_index in affected_tile_indexes:
+                continue
+
+            receiver_bounds = get_bounds(tile)
+            if any(Geometry.is_in_shadow_corridor(receiver_bounds, bounds, sun_direction) for bounds in changed_bounds):
+                affected_tile_indexes.add(tile_index)
+
+        return sorted(affected_tile_indexes)
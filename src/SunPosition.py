@@ -0,0 +1,382 @@
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+
+import numpy as np
+
+from src import pySunlight
+
+# Sun positions of a site, as an alternative to the SunEarthToolsParser of Sunlight. Solar elevation
+# and azimuth are either computed for any latitude and longitude with the NOAA solar position
+# algorithm (about 0.01 degree from SPA between 1900 and 2100), or loaded at once from a SunEarthTools
+# sun path file with NumPy. Both are vectorized over all hours of the date range, and computed
+# positions are cached on disk by site and range.
+#
+# Dates are hours since 1970-01-01 00:00 in local time, like the start and end dates of the command
+# line : 403224 is 2016-01-01 at 00:00. The range is [start, end). Dates follow the convention of the
+# SunEarthToolsParser : a date is one hour before the same hour of the file (in UTC+1), and one more
+# hour before during European summer time. The parser also reads the elevation of the next hour of the
+# file, the NumPy loader reproduces it.
+
+SUN_POSITION_CACHE_VERSION = 2
+
+# Distance from the site to the sun positions, the same as the SunEarthToolsParser
+SUN_DISTANCE = 60000
+
+EPOCH = np.datetime64('1970-01-01T00', 'h')
+
+
+def get_dates(start_hour: int, end_hour: int):
+    """
+    The function returns the hours of a date range.
+
+    :param start_hour: The `start_hour` parameter is the first hour since 1970-01-01 00:00
+    :type start_hour: int
+    :param end_hour: The `end_hour` parameter is the hour after the last one
+    :type end_hour: int
+    :return: a numpy array of datetime64 in hours.
+    """
+    return EPOCH + np.arange(start_hour, end_hour, dtype=np.int64).astype('timedelta64[h]')
+
+
+def get_last_sunday(months: np.ndarray):
+    """
+    The function returns the last sunday of months.
+
+    :param months: The `months` parameter is a numpy array of datetime64 in months
+    :type months: np.ndarray
+    :return: a numpy array of datetime64 in days.
+    """
+    last_days = (months + 1).astype('datetime64[D]') - 1
+
+    # 1970-01-01 is a thursday, monday being 0
+    week_days = (last_days.astype(np.int64) + 3) % 7
+    return last_days - ((week_days + 1) % 7).astype('timedelta64[D]')
+
+
+def is_summer_time(dates: np.ndarray):
+    """
+    The function checks if dates are in European summer time, from the last sunday of March to the last
+    sunday of October. Days of a change are in the time of their end.
+
+    :param dates: The `dates` parameter is a numpy array of datetime64
+    :type dates: np.ndarray
+    :return: a numpy array of booleans.
+    """
+    days = dates.astype('datetime64[D]')
+    years = dates.astype('datetime64[Y]').astype('datetime64[M]')
+
+    return (get_last_sunday(years + 2) <= days) & (days < get_last_sunday(years + 9))
+
+
+def format_dates(dates: np.ndarray):
+    """
+    The function formats dates like the dates of Sunlight results.
+
+    :param dates: The `dates` parameter is a numpy array of datetime64
+    :type dates: np.ndarray
+    :return: a list of strings in the format "YYYY-MM-DD:HHMM".
+    """
+    return [f"{date[:10]}:{date[11:13]}{date[14:16]}" for date in np.datetime_as_string(dates, unit='m')]
+
+
+def compute_solar_angles(latitude: float, longitude: float, dates: np.ndarray, utc_offset=0.0, refraction=False):
+    """
+    The function computes the solar elevation and azimuth with the NOAA algorithm.
+
+    :param latitude: The `latitude` parameter is the latitude of the site in degrees, north positive
+    :type latitude: float
+    :param longitude: The `longitude` parameter is the longitude of the site in degrees, east positive
+    :type longitude: float
+    :param dates: The `dates` parameter is a numpy array of datetime64 in local time
+    :type dates: np.ndarray
+    :param utc_offset: The `utc_offset` parameter is the offset of the local time from UTC in hours,
+    either one for all dates or an array of offsets by date, defaults to 0.0
+    :param refraction: The `refraction` parameter corrects the elevation for atmospheric refraction.
+    Sun path files of SunEarthTools give the elevation without refraction, defaults to False
+    :return: the elevation and the azimuth (clockwise from north) in degrees, as numpy arrays.
+    """
+    seconds = (dates - np.datetime64('1970-01-01T00:00:00', 's')).astype('timedelta64[s]').astype(np.float64) - utc_offset * 3600
+
+    # Julian century since J2000
+    julian_century = (seconds / 86400 + 2440587.5 - 2451545) / 36525
+
+    mean_longitude = np.radians((280.46646 + julian_century * (36000.76983 + julian_century * 0.0003032)) % 360)
+    mean_anomaly = np.radians(357.52911 + julian_century * (35999.05029 - 0.0001537 * julian_century))
+    eccentricity = 0.016708634 - julian_century * (0.000042037 + 0.0000001267 * julian_century)
+
+    equation_of_center = np.radians(np.sin(mean_anomaly) * (1.914602 - julian_century * (0.004817 + 0.000014 * julian_century)) + np.sin(2 * mean_anomaly) * (0.019993 - 0.000101 * julian_century) + np.sin(3 * mean_anomaly) * 0.000289)
+
+    omega = np.radians(125.04 - 1934.136 * julian_century)
+    apparent_longitude = mean_longitude + equation_of_center - np.radians(0.00569 + 0.00478 * np.sin(omega))
+
+    mean_obliquity = 23 + (26 + (21.448 - julian_century * (46.815 + julian_century * (0.00059 - julian_century * 0.001813))) / 60) / 60
+    obliquity = np.radians(mean_obliquity + 0.00256 * np.cos(omega))
+
+    declination = np.arcsin(np.sin(obliquity) * np.sin(apparent_longitude))
+
+    # Equation of time in minutes
+    y = np.tan(obliquity / 2) ** 2
+    equation_of_time = 4 * np.degrees(y * np.sin(2 * mean_longitude) - 2 * eccentricity * np.sin(mean_anomaly) + 4 * eccentricity * y * np.sin(mean_anomaly) * np.cos(2 * mean_longitude) - 0.5 * y * y * np.sin(4 * mean_longitude) - 1.25 * eccentricity * eccentricity * np.sin(2 * mean_anomaly))
+
+    true_solar_minutes = ((seconds % 86400) / 60 + equation_of_time + 4 * longitude) % 1440
+    hour_angle = np.radians(true_solar_minutes / 4 - 180)
+
+    phi = np.radians(latitude)
+    elevation = np.degrees(np.arcsin(np.sin(phi) * np.sin(declination) + np.cos(phi) * np.cos(declination) * np.cos(hour_angle)))
+    azimuth = (np.degrees(np.arctan2(np.sin(hour_angle), np.cos(hour_angle) * np.sin(phi) - np.tan(declination) * np.cos(phi))) + 180) % 360
+
+    if not refraction:
+        return elevation, azimuth
+
+    # Atmospheric refraction in arc seconds
+    tangent = np.tan(np.radians(elevation))
+    with np.errstate(all='ignore'):
+        refraction_in_seconds = np.select(
+            [elevation > 85, elevation > 5, elevation > -0.575],
+            [0, 58.1 / tangent - 0.07 / tangent ** 3 + 0.000086 / tangent ** 5, 1735 + elevation * (-518.2 + elevation * (103.4 + elevation * (-12.79 + elevation * 0.711)))],
+            -20.772 / tangent)
+
+    return elevation + refraction_in_seconds / 3600, azimuth
+
+
+def convert_angles_to_directions(elevation: np.ndarray, azimuth: np.ndarray):
+    """
+    The function converts solar angles to directions from the ground to the sun, east being x and
+    north being y. The direction is null when the sun is under the horizon.
+
+    :param elevation: The `elevation` parameter is the elevation in degrees, NaN when unknown
+    :type elevation: np.ndarray
+    :param azimuth: The `azimuth` parameter is the azimuth in degrees, clockwise from north
+    :type azimuth: np.ndarray
+    :return: a numpy array of shape (N, 3).
+    """
+    elevation = np.radians(elevation)
+    azimuth = np.radians(azimuth)
+
+    directions = np.stack([np.cos(elevation) * np.sin(azimuth), np.cos(elevation) * np.cos(azimuth), np.sin(elevation)], axis=1)
+    directions[~(elevation > 0)] = 0
+
+    return directions
+
+
+def project_to_conic_conformal(latitude: float, longitude: float):
+    """
+    The function projects a site in the French conic conformal zone of its latitude (EPSG:3942 to
+    EPSG:3950), the CRS of the sun positions of the SunEarthToolsParser.
+
+    :param latitude: The `latitude` parameter is the latitude of the site in degrees
+    :type latitude: float
+    :param longitude: The `longitude` parameter is the longitude of the site in degrees
+    :type longitude: float
+    :return: the x and y coordinates of the site.
+    """
+    # GRS80 ellipsoid
+    a = 6378137.0
+    flattening = 1 / 298.257222101
+    e = np.sqrt(2 * flattening - flattening * flattening)
+
+    zone = int(np.clip(np.round(latitude), 42, 50))
+    origin_latitude = np.radians(zone)
+    parallels = np.radians([zone - 0.75, zone + 0.75])
+
+    def m(phi):
+        return np.cos(phi) / np.sqrt(1 - (e * np.sin(phi)) ** 2)
+
+    def t(phi):
+        return np.tan(np.pi / 4 - phi / 2) / ((1 - e * np.sin(phi)) / (1 + e * np.sin(phi))) ** (e / 2)
+
+    n = (np.log(m(parallels[0])) - np.log(m(parallels[1]))) / (np.log(t(parallels[0])) - np.log(t(parallels[1])))
+    radius = a * m(parallels[0]) / (n * t(parallels[0]) ** n)
+
+    rho = radius * t(np.radians(latitude)) ** n
+    theta = n * np.radians(longitude - 3)
+
+    return 1700000 + rho * np.sin(theta), (zone - 41) * 1000000 + 200000 + radius * t(origin_latitude) ** n - rho * np.cos(theta)
+
+
+def create_sun_datas_list(dates: np.ndarray, directions: np.ndarray, target):
+    """
+    The function creates the sun positions of Sunlight.
+
+    :param dates: The `dates` parameter is a numpy array of datetime64
+    :type dates: np.ndarray
+    :param directions: The `directions` parameter is the numpy array of directions to the sun
+    :type directions: np.ndarray
+    :param target: The `target` parameter is the (x, y, z) point of the site, sun positions are at
+    `SUN_DISTANCE` from it
+    :return: a `pySunlight.SunDatasList`.
+    """
+    positions = np.asarray(target, dtype=np.float64) + directions * SUN_DISTANCE
+
+    sun_datas_list = pySunlight.SunDatasList()
+    for date_str, position, direction in zip(format_dates(dates), positions.tolist(), directions.tolist()):
+        sun_datas_list.append(pySunlight.SunDatas(date_str, pySunlight.Vec3d(*position), pySunlight.Vec3d(*direction)))
+
+    return sun_datas_list
+
+
+def read_sunpath_site(file_path: str):
+    """
+    The function reads the site of a SunEarthTools sun path file, whose header starts with
+    "coo: <latitude>; <longitude>;".
+
+    :param file_path: The `file_path` parameter is the path of the sun path file
+    :type file_path: str
+    :return: the latitude and the longitude of the site in degrees.
+    """
+    with open(file_path, 'r') as file:
+        header = file.readline()
+
+    latitude, longitude = (float(value) for value in header.split(':', 1)[1].split(';')[:2])
+    return latitude, longitude
+
+
+def read_sunpath_file(file_path: str):
+    """
+    The function reads a SunEarthTools sun path file at once. Each line is a day, with the elevation
+    and azimuth of each hour, "--" when the sun is under the horizon.
+
+    :param file_path: The `file_path` parameter is the path of the sun path file
+    :type file_path: str
+    :return: the (latitude, longitude) of the site, the numpy array of days, and the numpy arrays of
+    elevations and azimuths by day and hour.
+    """
+    latitude, longitude = read_sunpath_site(file_path)
+
+    days = np.loadtxt(file_path, delimiter=';', skiprows=1, usecols=0, dtype='datetime64[D]', ndmin=1)
+    angles = np.genfromtxt(file_path, delimiter=';', skip_header=1, usecols=range(1, 49), missing_values='--', filling_values=np.nan, ndmin=2)
+
+    return (latitude, longitude), days, angles[:, 0::2], angles[:, 1::2]
+
+
+def get_hourly_values(days: np.ndarray, values: np.ndarray, dates: np.ndarray):
+    """
+    The function reads the values of a sun path file at some hours of the file.
+
+    :param days: The `days` parameter is the numpy array of days of the file
+    :type days: np.ndarray
+    :param values: The `values` parameter is the numpy array of values by day and hour
+    :type values: np.ndarray
+    :param dates: The `dates` parameter is the numpy array of datetime64 in hours of the file
+    :type dates: np.ndarray
+    :return: a numpy array of values, NaN for hours out of the file.
+    """
+    dates_days = dates.astype('datetime64[D]')
+    day_indexes = np.searchsorted(days, dates_days)
+    known = (day_indexes < len(days)) & (days[np.minimum(day_indexes, len(days) - 1)] == dates_days)
+    day_indexes = np.minimum(day_indexes, len(days) - 1)
+    hours = (dates - dates_days).astype(np.int64)
+
+    return np.where(known, values[day_indexes, hours], np.nan)
+
+
+def load_sunpath_file(file_path: str, start_hour: int, end_hour: int):
+    """
+    The function loads the sun positions of a date range from a SunEarthTools sun path file, without
+    the SunEarthToolsParser but with the same positions : the azimuth of a date is read one hour later
+    in the file (two hours out of summer time), and its elevation one more hour later.
+
+    :param file_path: The `file_path` parameter is the path of the sun path file
+    :type file_path: str
+    :param start_hour: The `start_hour` parameter is the first hour since 1970-01-01 00:00
+    :type start_hour: int
+    :param end_hour: The `end_hour` parameter is the hour after the last one
+    :type end_hour: int
+    :return: a `pySunlight.SunDatasList`.
+    """
+    (latitude, longitude), days, elevations, azimuths = read_sunpath_file(file_path)
+
+    dates = get_dates(start_hour, end_hour)
+
+    # Hours of the file read by the parser for each date
+    azimuth_dates = dates + np.where(is_summer_time(dates), 0, 1).astype('timedelta64[h]')
+    elevation_dates = azimuth_dates + np.timedelta64(1, 'h')
+
+    # Hours out of the file have no sun, neither have the hours with only one of the two angles
+    azimuth = get_hourly_values(days, azimuths, azimuth_dates)
+    elevation = get_hourly_values(days, elevations, elevation_dates)
+    elevation[np.isnan(azimuth)] = np.nan
+
+    return create_sun_datas_list(dates, convert_angles_to_directions(elevation, azimuth), (*project_to_conic_conformal(latitude, longitude), 0))
+
+
+class SunPositionProvider():
+    def __init__(self, latitude: float, longitude: float, utc_offset=0.0, summer_time=False, refraction=False, target=None, cache_directory=None):
+        """
+        The function initializes the sun positions of a site.
+
+        :param latitude: The `latitude` parameter is the latitude of the site in degrees, north positive
+        :type latitude: float
+        :param longitude: The `longitude` parameter is the longitude of the site in degrees, east positive
+        :type longitude: float
+        :param utc_offset: The `utc_offset` parameter is the offset of the dates from UTC in hours,
+        defaults to 0.0
+        :param summer_time: The `summer_time` parameter adds one hour to the offset during European
+        summer time. With an offset of 0, dates have the same azimuths as the SunEarthToolsParser,
+        defaults to False
+        :param refraction: The `refraction` parameter corrects elevations for atmospheric refraction,
+        defaults to False
+        :param target: The `target` parameter is the (x, y, z) point of the site in the tileset CRS. It
+        is only used to place the sun, the site is projected in its French conic conformal zone when it
+        is None, defaults to None
+        :param cache_directory: The `cache_directory` parameter is the directory where computed angles
+        are cached. Nothing is cached when it is None, defaults to None
+        """
+        self.latitude = latitude
+        self.longitude = longitude
+        self.utc_offset = utc_offset
+        self.summer_time = summer_time
+        self.refraction = refraction
+        self.target = target if target is not None else (*project_to_conic_conformal(latitude, longitude), 0)
+        self.cache_directory = cache_directory
+
+    def get_cache_path(self, start_hour: int, end_hour: int):
+        key = json.dumps([SUN_POSITION_CACHE_VERSION, self.latitude, self.longitude, self.utc_offset, self.summer_time, self.refraction, start_hour, end_hour])
+        return Path(self.cache_directory, f"{hashlib.sha1(key.encode('utf-8')).hexdigest()}.npz")
+
+    def compute_angles(self, start_hour: int, end_hour: int):
+        """
+        The function computes the solar angles of a date range, or loads them from the cache.
+
+        :param start_hour: The `start_hour` parameter is the first hour since 1970-01-01 00:00
+        :type start_hour: int
+        :param end_hour: The `end_hour` parameter is the hour after the last one
+        :type end_hour: int
+        :return: the numpy arrays of elevations and azimuths in degrees.
+        """
+        cache_path = None if self.cache_directory is None else self.get_cache_path(start_hour, end_hour)
+        if cache_path is not None and cache_path.exists():
+            logging.info(f"Sun positions loaded from {cache_path}.")
+            with np.load(str(cache_path)) as angles:
+                return angles['elevation'], angles['azimuth']
+
+        dates = get_dates(start_hour, end_hour)
+        utc_offset = self.utc_offset + is_summer_time(dates) if self.summer_time else self.utc_offset
+
+        elevation, azimuth = compute_solar_angles(self.latitude, self.longitude, dates, utc_offset, self.refraction)
+
+        if cache_path is not None:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+
+            # Write then rename, so a stopped run doesn't leave a truncated cache
+            temporary_path = cache_path.with_name(f".{cache_path.stem}.tmp.npz")
+            np.savez(str(temporary_path), elevation=elevation, azimuth=azimuth)
+            os.replace(str(temporary_path), str(cache_path))
+
+        return elevation, azimuth
+
+    def get_sun_datas(self, start_hour: int, end_hour: int):
+        """
+        The function returns the sun positions of a date range.
+
+        :param start_hour: The `start_hour` parameter is the first hour since 1970-01-01 00:00
+        :type start_hour: int
+        :param end_hour: The `end_hour` parameter is the hour after the last one
+        :type end_hour: int
+        :return: a `pySunlight.SunDatasList`.
+        """
+        elevation, azimuth = self.compute_angles(start_hour, end_hour)
+        return create_sun_datas_list(get_dates(start_hour, end_hour), convert_angles_to_directions(elevation, azimuth), self.target)
@@ -0,0 +1,244 @@
+import math
+import threading
+from contextlib import nullcontext
+
+import numpy as np
+from py3dtiles import TileSet
+
+from src import Utils, pySunlight
+from src.Converters import SunlightToTiler
+from src.ExtrusionEngine import ExtrusionEngine
+from src.Computation import compute_3DTiles_sunlight
+from src.Metrics import metrics
+from src.RegionOfInterest import RegionOfInterest
+from src.SceneCache import SceneCache
+from src.TileHierarchy import TileHierarchy
+from src.TilePool import DEFAULT_MAX_MEMORY_IN_BYTES, TilePool
+from src.Writers import Writer
+
+# The SunlightEngine class is the library entry point of pySunlight. The scene (tile hierarchy,
+# converted tiles, extrusions) is prepared once and reused by every computation and query, so an
+# application can keep it loaded and answer many sun positions without paying the setup again.
+#
+#    engine = SunlightEngine(TilesetReader().read_tileset("datas/testing/b3dm_tileset"))
+#    engine.compute(sun_datas_list, CsvWriter(None), "junk")
+#    engine.query_point(Vec3d(1843500, 5173500, 175), sun_datas.direction)
+
+
+class QueryResult():
+    def __init__(self, lighted: bool, occluder_id="", distance=math.inf):
+        """
+        The function initializes the result of a query.
+
+        :param lighted: The `lighted` parameter is True when nothing blocks the sun
+        :type lighted: bool
+        :param occluder_id: The `occluder_id` parameter is the id of the triangle blocking the sun,
+        empty when lighted, defaults to ""
+        :param distance: The `distance` parameter is the distance to the occluder, defaults to infinity
+        """
+        self.lighted = lighted
+        self.occluder_id = occluder_id
+        self.distance = distance
+
+    def to_dict(self):
+        return {'bLighted': self.lighted, 'OccultingId': self.occluder_id, 'distance': self.distance}
+
+
+class SunlightEngine():
+    def __init__(self, tileset: TileSet, prefetch_size=0, max_memory_in_bytes=None, scene_cache: SceneCache = None, engine='ray', proxy_distance=None, conservative_proxies=False):
+        """
+        The function prepares the scene of a tileset once for all computations and queries.
+
+        :param tileset: The `tileset` parameter is the input tileset
+        :type tileset: TileSet
+        :param prefetch_size: The `prefetch_size` parameter is the number of tiles loaded in a background
+        thread during computations, defaults to 0
+        :param max_memory_in_bytes: The `max_memory_in_bytes` parameter is the memory budget of converted
+        tiles kept between calls, 2 GB when it is None, defaults to None
+        :param scene_cache: The `scene_cache` parameter is a loaded cache of the triangles of all tiles,
+        defaults to None
+        :type scene_cache: SceneCache
+        :param engine: The `engine` parameter is the shadow engine, ray or extrusion, defaults to 'ray'
+        :param proxy_distance: The `proxy_distance` parameter is the distance beyond which occluders are
+        simplified in computations, defaults to None
+        :param conservative_proxies: The `conservative_proxies` parameter confirms hits of simplified
+        occluders, defaults to False
+        """
+        self.tileset = tileset
+        self.prefetch_size = prefetch_size
+        self.proxy_distance = proxy_distance
+        self.conservative_proxies = conservative_proxies
+
+        self.tile_hierarchy = TileHierarchy(tileset)
+        self.all_tiles = self.tile_hierarchy.get_tiles()
+        self.tile_pool = TilePool(self.all_tiles, DEFAULT_MAX_MEMORY_IN_BYTES if max_memory_in_bytes is None else max_memory_in_bytes, scene_cache)
+        self.scene_cache = scene_cache
+
+        self.extrusion_engine = ExtrusionEngine(self.all_tiles, tile_pool=self.tile_pool) if engine == 'extrusion' else None
+
+        # The extrusion engine indexes one sun direction at a time, other states are safe to share
+        self.lock = threading.Lock() if self.extrusion_engine is not None else nullcontext()
+
+    def prepare(self):
+        """
+        The function converts all tiles now, instead of at their first use.
+        """
+        for tile_index in range(len(self.all_tiles)):
+            self.tile_pool.load(tile_index)
+
+    def get_num_of_tiles(self):
+        return len(self.all_tiles)
+
+    def compute(self, sun_datas_list: pySunlight.SunDatasList, writer: Writer, output_directory=None, tile_indexes=None, region_of_interest: RegionOfInterest = None):
+        """
+        The function computes Sunlight for each sun position and exports results with a writer. The
+        writer is not closed, so it can be reused.
+
+        :param sun_datas_list: The `sun_datas_list` parameter is the list of sun positions
+        :type sun_datas_list: pySunlight.SunDatasList
+        :param writer: The `writer` parameter is the writer of results
+        :type writer: Writer
+        :param output_directory: The `output_directory` parameter is the root directory of results, with
+        one directory by timestamp. The writer keeps its directory when it is None, defaults to None
+        :param tile_indexes: The `tile_indexes` parameter is the list of computed tiles, all tiles when it
+        is None, defaults to None
+        :param region_of_interest: The `region_of_interest` parameter limits receivers to a region,
+        defaults to None
+        :type region_of_interest: RegionOfInterest
+        :return: the metrics of this call, in the format of `Metrics.to_dict`. They are also added to
+        the metrics recorded before the call.
+        """
+        previous_metrics = metrics.reset()
+
+        try:
+            # Tiles of a region are only selected on the first call
+            if region_of_interest is not None:
+                region_of_interest.select_tiles(self.tile_hierarchy, self.tile_pool, self.scene_cache)
+
+            for sun_datas in sun_datas_list:
+                if output_directory is not None:
+                    writer.set_directory(Utils.get_output_directory_for_timestamp(output_directory, sun_datas.dateStr))
+                    writer.create_directory()
+
+                with self.lock:
+                    compute_3DTiles_sunlight(self.tileset, sun_datas, writer, self.prefetch_size, tile_indexes, region_of_interest, self.proxy_distance, self.conservative_proxies, self.extrusion_engine, self.tile_hierarchy, self.tile_pool, None, self.scene_cache)
+
+            return metrics.to_dict()
+        finally:
+            metrics.merge(previous_metrics)
+
+    def get_occluder_tile_wrappers(self, bounds, sun_direction):
+        """
+        The function returns the tile wrappers which can shade a region for a sun direction.
+
+        :param bounds: The `bounds` parameter is the (min, max) pair of the region
+        :param sun_direction: The `sun_direction` parameter is the sun direction as a numpy array
+        :return: a generator of tile wrappers.
+        """
+        occluder_tile_indexes = self.tile_hierarchy.get_occluder_tile_indexes(bounds, sun_direction)
+
+        # Only features which are not extrusions are ray traced with the extrusion engine
+        if self.extrusion_engine is not None:
+            return (self.extrusion_engine.load_residual_tile_wrapper(tile_index) for tile_index in occluder_tile_indexes)
+
+        return (self.tile_pool.load(tile_index) for tile_index in occluder_tile_indexes)
+
+    def query_ray(self, ray: pySunlight.Ray, bounds, sun_direction, receiver_triangle: pySunlight.Triangle):
+        """
+        The function finds the nearest occluder of a ray going to the sun.
+
+        :param ray: The `ray` parameter is the ray going from the receiver to the sun
+        :type ray: pySunlight.Ray
+        :param bounds: The `bounds` parameter is the (min, max) pair of the receiver
+        :param sun_direction: The `sun_direction` parameter is the sun direction
+        :type sun_direction: pySunlight.Vec3d
+        :param receiver_triangle: The `receiver_triangle` parameter is the receiver triangle, whose center
+        is used by the extrusion engine
+        :type receiver_triangle: pySunlight.Triangle
+        :return: a `QueryResult`.
+        """
+        sun_direction_array = SunlightToTiler.convert_vec3_to_numpy(sun_direction)
+        nearest_hit = None
+
+        with self.lock:
+            if self.extrusion_engine is not None:
+                if self.extrusion_engine.sun_direction is None or not np.allclose(self.extrusion_engine.sun_direction, sun_direction_array / np.linalg.norm(sun_direction_array)):
+                    self.extrusion_engine.set_sun_direction(sun_direction_array)
+                nearest_hit = self.extrusion_engine.get_nearest_hit(receiver_triangle)
+
+            for tile_wrapper in self.get_occluder_tile_wrappers(bounds, sun_direction_array):
+                nearest_distance = math.inf if nearest_hit is None else nearest_hit.distance
+
+                tile_bounding_box_hit = pySunlight.checkIntersectionWith(ray, tile_wrapper.get_bounding_box())
+                if len(tile_bounding_box_hit) == 0 or nearest_distance <= tile_bounding_box_hit[0].distance:
+                    continue
+
+                triangle_ray_hits = pySunlight.checkIntersectionWith(ray, tile_wrapper.get_triangles())
+                if 0 < len(triangle_ray_hits) and triangle_ray_hits[0].distance < nearest_distance:
+                    nearest_hit = triangle_ray_hits[0]
+
+        if nearest_hit is None:
+            return QueryResult(True)
+
+        return QueryResult(False, nearest_hit.triangle.getId(), nearest_hit.distance)
+
+    def query_triangle(self, triangle: pySunlight.Triangle, sun_direction: pySunlight.Vec3d):
+        """
+        The function computes if a triangle is lighted by the sun, like the triangles of a computation.
+
+        :param triangle: The `triangle` parameter is the receiver triangle
+        :type triangle: pySunlight.Triangle
+        :param sun_direction: The `sun_direction` parameter is the direction from the ground to the sun
+        :type sun_direction: pySunlight.Vec3d
+        :return: a `QueryResult`.
+        """
+        # Nothing is blocking a triangle looking at the ground but itself
+        if not pySunlight.isFacingTheSun(triangle, sun_direction):
+            return QueryResult(False, triangle.getId(), 0)
+
+        vertices = np.array([SunlightToTiler.convert_vec3_to_numpy(vertex) for vertex in (triangle.a, triangle.b, triangle.c)])
+        bounds = (np.amin(vertices, axis=0), np.amax(vertices, axis=0))
+
+        return self.query_ray(pySunlight.constructRay(triangle, sun_direction), bounds, sun_direction, triangle)
+
+    def query_point(self, point: pySunlight.Vec3d, sun_direction: pySunlight.Vec3d):
+        """
+        The function computes if a point is lighted by the sun.
+
+        :param point: The `point` parameter is the point, in the tileset CRS
+        :type point: pySunlight.Vec3d
+        :param sun_direction: The `sun_direction` parameter is the direction from the ground to the sun
+        :type sun_direction: pySunlight.Vec3d
+        :return: a `QueryResult`.
+        """
+        position = SunlightToTiler.convert_vec3_to_numpy(point)
+
+        # A triangle reduced to the point, for the extrusion engine
+        point_triangle = pySunlight.Triangle(point, point, point, "", "")
+
+        return self.query_ray(pySunlight.Ray(point, sun_direction), (position, position), sun_direction, point_triangle)
+
+    def query_feature(self, tile_index: int, feature_id: str, sun_direction: pySunlight.Vec3d):
+        """
+        The function computes if each triangle of a feature is lighted by the sun.
+
+        :param tile_index: The `tile_index` parameter is the index of the tile containing the feature
+        :type tile_index: int
+        :param feature_id: The `feature_id` parameter is the id of the feature in its tile
+        :type feature_id: str
+        :param sun_direction: The `sun_direction` parameter is the direction from the ground to the sun
+        :type sun_direction: pySunlight.Vec3d
+        :return: a list of `QueryResult` by triangle of the feature, empty for an unknown feature.
+        """
+        if not 0 <= tile_index < len(self.all_tiles):
+            raise IndexError(f"No tile {tile_index}, the scene has {len(self.all_tiles)} tiles.")
+
+        triangles = self.tile_pool.load(tile_index).get_triangles_of_feature(feature_id)
+        return [self.query_triangle(triangle, sun_direction) for triangle in triangles]
+
+    def get_statistics(self):
+        """
+        The function returns the statistics of the tiles kept in memory.
+        :return: a dictionary of counters.
+        """
+        return self.tile_pool.get_statistics()
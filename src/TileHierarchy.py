@@ -0,0 +1,185 @@
+from py3dtiles import TileSet
+
+from src import Geometry
+
+# The TileHierarchy class walks the whole tree of a tileset. Tiles with a content are indexed in
+# pre-order, which is the order of the children of the root for a flat tileset, so tile indexes used
+# by writers don't change. Only the most detailed level of the scene is indexed : the contents of the
+# leaves and of the tiles refined by adding their children. The content of a tile replaced by its
+# children is a coarser level of the same buildings, it would shade its own children and its results
+# would be written twice. Bounding volumes of parent tiles contain their subtree, so a subtree out of
+# the shadow corridor of a receiver is skipped at once.
+
+# Refine mode of the root when the tileset doesn't give one
+DEFAULT_REFINE_MODE = 'ADD'
+
+
+def get_refine_mode(tile, parent_refine_mode: str):
+    """
+    The function returns the refine mode of a tile, inherited from its parent when the tile doesn't
+    give one.
+
+    :param tile: The `tile` parameter is a tile of the tileset
+    :param parent_refine_mode: The `parent_refine_mode` parameter is the refine mode of the parent tile
+    :type parent_refine_mode: str
+    :return: 'ADD' or 'REPLACE'.
+    """
+    # Lazy tiles keep the refine mode of their tileset.json, other tiles their 3D Tiles attributes
+    refine_mode = tile.refine if hasattr(tile, 'refine') else getattr(tile, 'attributes', dict()).get('refine')
+
+    return parent_refine_mode if refine_mode is None else refine_mode.upper()
+
+
+def is_indexed(has_content: bool, has_children: bool, refine_mode: str):
+    """
+    The function checks if the content of a tile is part of the most detailed level of the scene.
+
+    :param has_content: The `has_content` parameter is True if the tile has a content
+    :type has_content: bool
+    :param has_children: The `has_children` parameter is True if the tile has children
+    :type has_children: bool
+    :param refine_mode: The `refine_mode` parameter is the refine mode of the tile
+    :type refine_mode: str
+    :return: True if the tile is indexed, False otherwise.
+    """
+    return has_content and (not has_children or refine_mode == 'ADD')
+
+
+def prune_tileset_json(tileset_json: dict, get_content_uri):
+    """
+    The function `prune_tileset_json` sets the content uri of each tile of a tileset.json, with tiles
+    indexed in the same pre-order as the `TileHierarchy`. Contents without uri and contents replaced
+    by their children are removed, and subtrees left without content are removed.
+
+    :param tileset_json: The `tileset_json` parameter is the parsed tileset.json, updated in place
+    :type tileset_json: dict
+    :param get_content_uri: The `get_content_uri` parameter is a function returning the content uri
+    of a tile index, or None to remove its content
+    """
+    tile_index = 0
+
+    def prune(tile, parent_refine_mode):
+        nonlocal tile_index
+
+        refine_mode = tile.get('refine', parent_refine_mode).upper()
+
+        # The content of a tile is indexed before its children
+        kept = False
+        if is_indexed('content' in tile, 0 < len(tile.get('children', [])), refine_mode):
+            content_uri = get_content_uri(tile_index)
+            tile_index += 1
+
+            kept = content_uri is not None
+            if kept:
+                tile['content']['uri'] = content_uri
+            else:
+                del tile['content']
+        elif 'content' in tile:
+            del tile['content']
+
+        if 'children' in tile:
+            tile['children'] = [child for child in tile['children'] if prune(child, refine_mode)]
+            if len(tile['children']) == 0:
+                del tile['children']
+
+        return kept or 'children' in tile
+
+    root = tileset_json['root']
+    root_refine_mode = root.get('refine', DEFAULT_REFINE_MODE).upper()
+    root['children'] = [child for child in root.get('children', []) if prune(child, root_refine_mode)]
+
+
+class TileHierarchy():
+    def __init__(self, tileset: TileSet):
+        """
+        The function initializes the hierarchy of a tileset.
+
+        :param tileset: The `tileset` parameter is the tileset to walk
+        :type tileset: TileSet
+        """
+        # Tiles with a content and their bounds, by tile index
+        self.tiles = []
+        self.tile_bounds = []
+
+        # Bounds, tile index (None without content) and children of each node of the tree
+        self.nodes = []
+
+        root_refine_mode = get_refine_mode(tileset.get_root_tile(), DEFAULT_REFINE_MODE)
+        self.root_node_indexes = [self.add_node(tile, root_refine_mode) for tile in tileset.get_root_tile().get_children()]
+
+    def add_node(self, tile, parent_refine_mode: str):
+        """
+        The function adds a tile and its subtree to the hierarchy, in pre-order.
+
+        :param tile: The `tile` parameter is a tile of the tileset
+        :param parent_refine_mode: The `parent_refine_mode` parameter is the refine mode of the parent
+        tile
+        :type parent_refine_mode: str
+        :return: the index of the node of the tile.
+        """
+        bounds = Geometry.get_tile_bounds(tile)
+        refine_mode = get_refine_mode(tile, parent_refine_mode)
+
+        # The content uri is enough to index a tile, its content is not decoded
+        tile_index = None
+        if is_indexed(tile.get_content_uri() is not None, 0 < len(tile.get_children()), refine_mode):
+            tile_index = len(self.tiles)
+            self.tiles.append(tile)
+            self.tile_bounds.append(bounds)
+
+        node_index = len(self.nodes)
+        self.nodes.append((bounds, tile_index, []))
+
+        for child in tile.get_children():
+            self.nodes[node_index][2].append(self.add_node(child, refine_mode))
+
+        return node_index
+
+    def get_tiles(self):
+        """
+        The function returns all tiles with a content, ordered by tile index.
+        :return: a list of tiles.
+        """
+        return self.tiles
+
+    def get_num_of_tiles(self):
+        """
+        The function returns the number of tiles with a content.
+        :return: an integer.
+        """
+        return len(self.tiles)
+
+    def get_tile_bounds(self, tile_index: int):
+        """
+        The function returns the bounds of a tile.
+
+        :param tile_index: The `tile_index` parameter is the index of the tile
+        :type tile_index: int
+        :return: a tuple (min, max) of numpy arrays.
+        """
+        return self.tile_bounds[tile_index]
+
+    def get_occluder_tile_indexes(self, receiver_bounds, sun_direction):
+        """
+        The function returns the tiles which can shade receivers for a sun direction, skipping subtrees
+        out of their shadow corridor.
+
+        :param receiver_bounds: The `receiver_bounds` parameter is the (min, max) pair of the receivers
+        :param sun_direction: The `sun_direction` parameter is the direction from the ground to the sun,
+        as an array of 3 coordinates
+        :return: a sorted list of tile indexes.
+        """
+        occluder_tile_indexes = []
+
+        node_indexes = list(self.root_node_indexes)
+        while 0 < len(node_indexes):
+            bounds, tile_index, children = self.nodes[node_indexes.pop()]
+
+            if not Geometry.is_in_shadow_corridor(receiver_bounds, bounds, sun_direction):
+                continue
+
+            if tile_index is not None:
+                occluder_tile_indexes.append(tile_index)
+            node_indexes.extend(children)
+
+        return sorted(occluder_tile_indexes)
@@ -0,0 +1,129 @@
+import functools
+import logging
+import threading
+from collections import OrderedDict
+
+from src.OccluderProxies import OccluderProxies
+from src.TileWrapper import TileWrapper
+
+# The TilePool class keeps converted tiles in memory between comparisons, up to a memory budget. It is
+# the only cache of tiles : the input tileset only indexes their metadata and decodes a tile when it is
+# converted. Least recently used tiles are evicted first when the budget is exceeded.
+
+# Memory budget of an engine kept loaded between calls, when none is given
+DEFAULT_MAX_MEMORY_IN_BYTES = 2 * 1024 * 1024 * 1024
+
+
+class TilePool():
+    def __init__(self, all_tiles: list, max_memory_in_bytes: int, scene_cache=None):
+        """
+        The function initializes an empty pool of tile wrappers.
+
+        :param all_tiles: The `all_tiles` parameter is the list of all tiles of the tileset
+        :type all_tiles: list
+        :param max_memory_in_bytes: The `max_memory_in_bytes` parameter is the memory budget of the tile
+        wrappers kept in the pool
+        :type max_memory_in_bytes: int
+        :param scene_cache: The `scene_cache` parameter is a loaded `SceneCache` from which triangles are
+        read instead of decoding tiles, defaults to None
+        """
+        self.all_tiles = all_tiles
+        self.max_memory_in_bytes = max_memory_in_bytes
+        self.scene_cache = scene_cache
+
+        # Tile wrappers and their memory size by tile index (and tile loader), from least to most
+        # recently used
+        self.tile_wrappers = OrderedDict()
+        self.memory_in_bytes = 0
+        self.lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        # Loaders of the proxies of a tile, by conservative mode, pooled apart from its tile wrappers
+        self.proxy_loaders = {conservative: functools.partial(self.create_occluder_proxies, conservative=conservative) for conservative in (False, True)}
+
+    def load(self, tile_index: int, tile_loader=None):
+        """
+        The function returns the tile wrapper of a tile, decoding it if it is not in the pool.
+
+        :param tile_index: The `tile_index` parameter is the index of the tile
+        :type tile_index: int
+        :param tile_loader: The `tile_loader` parameter is a function creating another tile wrapper from
+        a tile index, like the triangles of the features which are not extrusions. Its tile wrappers
+        are pooled apart from the complete tile wrappers, defaults to None
+        :return: a `TileWrapper` of the tile.
+        """
+        key = tile_index if tile_loader is None else (tile_index, tile_loader)
+
+        with self.lock:
+            if key in self.tile_wrappers:
+                self.tile_wrappers.move_to_end(key)
+                self.hits += 1
+                return self.tile_wrappers[key][0]
+            self.misses += 1
+
+        # Decode outside of the lock, so tiles can be prefetched while others are read from the pool
+        if tile_loader is not None:
+            tile_wrapper = tile_loader(tile_index)
+        elif self.scene_cache is not None:
+            tile_wrapper = self.scene_cache.create_tile_wrapper(self.all_tiles[tile_index], tile_index)
+        else:
+            tile_wrapper = TileWrapper(self.all_tiles[tile_index], tile_index)
+        size = tile_wrapper.get_memory_size()
+
+        with self.lock:
+            if key not in self.tile_wrappers:
+                self.tile_wrappers[key] = (tile_wrapper, size)
+                self.memory_in_bytes += size
+
+            # The last loaded tile is kept, even if it exceeds the budget alone
+            while self.max_memory_in_bytes < self.memory_in_bytes and 1 < len(self.tile_wrappers):
+                evicted_key, (evicted_tile_wrapper, evicted_size) = self.tile_wrappers.popitem(last=False)
+                self.memory_in_bytes -= evicted_size
+                self.evictions += 1
+                logging.debug(f"Evict tile {evicted_key} from the tile pool.")
+
+        return tile_wrapper
+
+    def create_occluder_proxies(self, tile_index: int, conservative=False):
+        """
+        The function builds the proxies of all features of a tile.
+
+        :param tile_index: The `tile_index` parameter is the index of the tile
+        :type tile_index: int
+        :param conservative: The `conservative` parameter keeps the features of the tile to confirm box
+        hits on their triangles, defaults to False
+        :return: the `OccluderProxies` of the tile.
+        """
+        return OccluderProxies(self.all_tiles[tile_index], tile_index, conservative)
+
+    def load_occluder_proxies(self, tile_index: int, conservative=False):
+        """
+        The function returns the proxies of a tile, built if they are not in the pool.
+
+        :param tile_index: The `tile_index` parameter is the index of the tile
+        :type tile_index: int
+        :param conservative: The `conservative` parameter keeps the features of the tile to confirm box
+        hits on their triangles, defaults to False
+        :return: the `OccluderProxies` of the tile.
+        """
+        return self.load(tile_index, self.proxy_loaders[conservative])
+
+    def get_statistics(self):
+        """
+        The function returns the statistics of the pool.
+        :return: a dictionary of counters.
+        """
+        with self.lock:
+            requests = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hitRatio': self.hits / requests if 0 < requests else 0,
+                'tiles': len(self.tile_wrappers),
+                'memoryInBytes': self.memory_in_bytes,
+                'maxMemoryInBytes': self.max_memory_in_bytes
+            }
@@ -0,0 +1,150 @@
+import queue
+import threading
+
+from src.OccluderProxies import OccluderProxies
+from src.TilePool import TilePool
+from src.TileWrapper import TileWrapper
+
+# The TilePrefetcher class decodes and converts upcoming tiles in a background thread, while the
+# previous ones are used for computation. A bounded queue keeps the number of loaded tiles bounded.
+
+
+class TilePrefetcher():
+    def __init__(self, all_tiles: list, prefetch_size=0, tile_indexes=None, loaded_tile_wrappers=None, proxy_tile_indexes=None, conservative_proxies=False, tile_pool: TilePool = None, scene_cache=None, tile_loader=None, proxy_loader=None):
+        """
+        The function initializes a prefetcher of tile wrappers.
+
+        :param all_tiles: The `all_tiles` parameter is the list of all tiles of the tileset
+        :type all_tiles: list
+        :param prefetch_size: The `prefetch_size` parameter is the maximum number of tiles loaded in
+        advance. With 0, tiles are loaded synchronously when they are requested, defaults to 0
+        :param tile_indexes: The `tile_indexes` parameter is the ordered list of tile indexes to load.
+        All tiles are loaded when it is None, defaults to None
+        :param loaded_tile_wrappers: The `loaded_tile_wrappers` parameter is a dictionary of tile
+        wrappers by tile index already loaded, that are reused instead of being loaded again, defaults
+        to None
+        :param proxy_tile_indexes: The `proxy_tile_indexes` parameter is the set of indexes of the tiles
+        loaded as `OccluderProxies` instead of `TileWrapper`, defaults to None
+        :param conservative_proxies: The `conservative_proxies` parameter keeps the features of proxies
+        to confirm their hits, defaults to False
+        :param tile_pool: The `tile_pool` parameter is a pool keeping tile wrappers between prefetchers.
+        Tile wrappers are loaded each time when it is None, defaults to None
+        :type tile_pool: TilePool
+        :param scene_cache: The `scene_cache` parameter is a loaded `SceneCache` from which triangles are
+        read instead of decoding tiles, defaults to None
+        :param tile_loader: The `tile_loader` parameter is a function returning the tile wrapper of a
+        tile index, like the triangles of the features which are not extrusions. Tiles are loaded from
+        the pool, the scene cache or decoded when it is None, defaults to None
+        :param proxy_loader: The `proxy_loader` parameter is a function returning the `OccluderProxies`
+        of a tile index, which keeps them between prefetchers. Proxies are built at each load when it is
+        None, defaults to None
+        """
+        self.all_tiles = all_tiles
+        self.prefetch_size = prefetch_size
+        self.tile_indexes = range(len(all_tiles)) if tile_indexes is None else tile_indexes
+        self.loaded_tile_wrappers = dict() if loaded_tile_wrappers is None else loaded_tile_wrappers
+        self.proxy_tile_indexes = set() if proxy_tile_indexes is None else proxy_tile_indexes
+        self.conservative_proxies = conservative_proxies
+        self.tile_pool = tile_pool
+        self.scene_cache = scene_cache
+        self.tile_loader = tile_loader
+        self.proxy_loader = proxy_loader
+
+    def load(self, tile_index: int):
+        """
+        The function returns the tile wrapper of a tile, reusing it if it is already loaded.
+
+        :param tile_index: The `tile_index` parameter is the index of the tile to load
+        :type tile_index: int
+        :return: a `TileWrapper` of the tile, or its `OccluderProxies`.
+        """
+        if tile_index in self.loaded_tile_wrappers:
+            return self.loaded_tile_wrappers[tile_index]
+
+        # Distant tiles are replaced by their proxies, whatever the loader of the other tiles
+        if tile_index in self.proxy_tile_indexes:
+            if self.proxy_loader is not None:
+                return self.proxy_loader(tile_index)
+            return OccluderProxies(self.all_tiles[tile_index], tile_index, self.conservative_proxies)
+
+        if self.tile_loader is not None:
+            return self.tile_loader(tile_index)
+
+        if self.tile_pool is not None:
+            return self.tile_pool.load(tile_index)
+
+        if self.scene_cache is not None:
+            return self.scene_cache.create_tile_wrapper(self.all_tiles[tile_index], tile_index)
+
+        return TileWrapper(self.all_tiles[tile_index], tile_index)
+
+    def put(self, loaded_queue: queue.Queue, item, stop_event: threading.Event):
+        """
+        The function puts an item in a queue, blocking while the queue is full (backpressure) unless the
+        consumer stopped iterating.
+
+        :param loaded_queue: The `loaded_queue` parameter is the bounded queue shared with the consumer
+        :type loaded_queue: queue.Queue
+        :param item: The `item` parameter is the item to put in the queue
+        :param stop_event: The `stop_event` parameter is set by the consumer when it stops iterating
+        :type stop_event: threading.Event
+        :return: False if the consumer stopped iterating, True otherwise.
+        """
+        while not stop_event.is_set():
+            try:
+                loaded_queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+
+        return False
+
+    def produce(self, loaded_queue: queue.Queue, stop_event: threading.Event):
+        """
+        The function loads each tile in order and puts it in a queue shared with the consumer.
+
+        :param loaded_queue: The `loaded_queue` parameter is the bounded queue shared with the consumer
+        :type loaded_queue: queue.Queue
+        :param stop_event: The `stop_event` parameter is set by the consumer when it stops iterating
+        :type stop_event: threading.Event
+        """
+        try:
+            for tile_index in self.tile_indexes:
+                if not self.put(loaded_queue, (tile_index, self.load(tile_index), None), stop_event):
+                    return
+
+        except Exception as exception:
+            self.put(loaded_queue, (None, None, exception), stop_event)
+            return
+
+        self.put(loaded_queue, None, stop_event)
+
+    def __iter__(self):
+        """
+        The function iterates on the tile wrappers, loading the next ones in a background thread.
+        :return: an iterator of (tile index, tile wrapper) tuples.
+        """
+        if self.prefetch_size <= 0:
+            for tile_index in self.tile_indexes:
+                yield tile_index, self.load(tile_index)
+            return
+
+        loaded_queue = queue.Queue(maxsize=self.prefetch_size)
+        stop_event = threading.Event()
+        producer = threading.Thread(target=self.produce, args=(loaded_queue, stop_event), name="TilePrefetcher", daemon=True)
+        producer.start()
+
+        try:
+            while True:
+                item = loaded_queue.get()
+                if item is None:
+                    break
+
+                tile_index, tile_wrapper, exception = item
+                if exception is not None:
+                    raise exception
+
+                yield tile_index, tile_wrapper
+        finally:
+            stop_event.set()
+            producer.join()
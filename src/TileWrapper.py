@@ -6,9 +6,36 @@ from src.pySunlight import BoundingBoxes
 # The TileWrapper class is a wrapper class for tiles containing Sunlight supported types
 # (TriangleSoup, AABB...)
 
+# Memory of a Sunlight triangle in the std::vector of a TriangleSoup : 3 Vec3d of doubles and 2
+# std::string (id and tile name)
+TRIANGLE_SIZE_IN_BYTES = 3 * 3 * 8 + 2 * 32
+
+# Strings longer than the small string buffer of std::string are allocated on the heap, with the header
+# of the allocator
+SMALL_STRING_CAPACITY = 15
+HEAP_ALLOCATION_OVERHEAD_IN_BYTES = 16
+
+# Number of triangles whose ids are measured to estimate the memory of all ids
+NUM_OF_SAMPLED_TRIANGLES = 64
+
+
+def get_string_memory_size(string: str):
+    """
+    The function `get_string_memory_size` returns the heap memory used by a std::string.
+
+    :param string: The `string` parameter is the value of the string
+    :type string: str
+    :return: the size in bytes allocated on the heap, 0 for a string in the small string buffer.
+    """
+    length = len(string.encode())
+    if length <= SMALL_STRING_CAPACITY:
+        return 0
+
+    return length + 1 + HEAP_ALLOCATION_OVERHEAD_IN_BYTES
+
 
 class TileWrapper():
-    def __init__(self, tile: Tile, tile_index: int):
+    def __init__(self, tile: Tile, tile_index: int, triangle_soup=None):
         """
         The function initializes a wrapper by creating a triangle soup supported by Sunlight from a tile and its index, and
         converting the tile's bounding box to a Sunlight bounding box.
@@ -19,9 +46,16 @@ class TileWrapper():
         :param tile_index: The `tile_index` parameter is an integer that represents the index of a tile.
         It is used to identify a specific tile within a collection or set of tiles
         :type tile_index: int
+        :param triangle_soup: The `triangle_soup` parameter replaces the triangles of the tile, when only
+        a part of them is needed. Triangles are read from the tile when it is None, defaults to None
         """
-        self.triangle_soup = TilerToSunlight.get_triangle_soup_from_tile(tile, tile_index)
+        self.triangle_soup = TilerToSunlight.get_triangle_soup_from_tile(tile, tile_index) if triangle_soup is None else triangle_soup
         self.index = tile_index
+        self.tile_name = tile.get_content_uri()
+        self.memory_size = None
+
+        # Triangle indexes by feature id, indexed on the first query of a feature
+        self.triangle_indexes_by_feature = None
 
         # Read bounding box in tile content and convert to Sunlight bounding box (AABB)
         bounding_box = TilerToSunlight.convert_to_bounding_box(tile.get_bounding_volume(), str(tile_index), tile.get_content_uri())
@@ -50,3 +84,43 @@ class TileWrapper():
         :return: Sunlight.TriangleSoup - The method is returning the variable "self.triangle_soup".
         """
         return self.triangle_soup
+
+    def get_triangles_of_feature(self, feature_id: str):
+        """
+        The function returns the triangles of a feature. Triangles are indexed by feature once, so next
+        features are found without reading all triangles.
+
+        :param feature_id: The `feature_id` parameter is the id of the feature in the tile
+        :type feature_id: str
+        :return: a list of Sunlight triangles, empty for an unknown feature.
+        """
+        if self.triangle_indexes_by_feature is None:
+            triangle_indexes_by_feature = dict()
+            for triangle_index, triangle in enumerate(self.triangle_soup):
+                feature_key = TilerToSunlight.get_feature_id_from_triangle_id(triangle.getId(), self.tile_name)
+                triangle_indexes_by_feature.setdefault(feature_key, []).append(triangle_index)
+            self.triangle_indexes_by_feature = triangle_indexes_by_feature
+
+        return [self.triangle_soup[triangle_index] for triangle_index in self.triangle_indexes_by_feature.get(feature_id, [])]
+
+    def get_memory_size(self):
+        """
+        The function measures the memory used by the triangles of the tile, with the length of the ids
+        of some triangles. It is measured once, triangles don't change.
+        :return: the size in bytes.
+        """
+        if self.memory_size is not None:
+            return self.memory_size
+
+        num_of_triangles = len(self.triangle_soup)
+        if num_of_triangles == 0:
+            self.memory_size = 0
+            return self.memory_size
+
+        step = max(1, num_of_triangles // NUM_OF_SAMPLED_TRIANGLES)
+        sampled_ids = [self.triangle_soup[i].getId() for i in range(0, num_of_triangles, step)]
+        id_size = sum(get_string_memory_size(id) for id in sampled_ids) / len(sampled_ids)
+        tile_name_size = get_string_memory_size(self.tile_name or "")
+
+        self.memory_size = int(num_of_triangles * (TRIANGLE_SIZE_IN_BYTES + id_size + tile_name_size))
+        return self.memory_size
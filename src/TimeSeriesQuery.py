@@ -0,0 +1,167 @@
+import json
+from bisect import bisect_left, bisect_right
+from pathlib import Path
+
+# The TimeSeriesQuery class answers range queries on time series exported by the TimeSeriesWriter,
+# without reading one file per timestamp.
+
+
+class TimeSeriesQuery():
+    def __init__(self, root_directory: str, folder_name="timeseries"):
+        """
+        The function initializes a query object on the time series of an output directory.
+
+        :param root_directory: The `root_directory` parameter is the output directory of a Sunlight
+        computation
+        :type root_directory: str
+        :param folder_name: The `folder_name` parameter is the name of the sub folder containing all
+        time series files, defaults to "timeseries"
+        """
+        self.directory = Path(root_directory, folder_name)
+
+        # Loaded time series by tile index
+        self.time_series_by_tile = dict()
+
+    def get_tile_indexes(self):
+        """
+        The function returns the index of each tile having a time series.
+        :return: a sorted list of tile indexes.
+        """
+        return sorted(int(path.stem) for path in self.directory.glob('*.json'))
+
+    def get_time_series(self, tile_index: int):
+        """
+        The function loads the time series of a tile once and returns it.
+
+        :param tile_index: The `tile_index` parameter is an integer that represents the index of the
+        tile
+        :type tile_index: int
+        :return: a dictionary with the ordered `dates` and the run-length encoded `triangles` states.
+        """
+        if tile_index not in self.time_series_by_tile:
+            with open(str(Path(self.directory, f"{tile_index}.json")), 'r') as file:
+                self.time_series_by_tile[tile_index] = json.load(file)
+
+        return self.time_series_by_tile[tile_index]
+
+    def get_dates(self, tile_index: int):
+        """
+        The function returns all timestamps recorded for a tile.
+
+        :param tile_index: The `tile_index` parameter is an integer that represents the index of the
+        tile
+        :type tile_index: int
+        :return: an ordered list of dates in the format "YYYY-MM-DD:HHMM".
+        """
+        return self.get_time_series(tile_index)['dates']
+
+    def get_index_range(self, tile_index: int, start_date=None, end_date=None):
+        """
+        The function converts a date range to a range of timestamp indexes.
+
+        :param tile_index: The `tile_index` parameter is an integer that represents the index of the
+        tile
+        :type tile_index: int
+        :param start_date: The `start_date` parameter is the first date included in the range, or None
+        to start at the first timestamp
+        :param end_date: The `end_date` parameter is the last date included in the range, or None to
+        stop at the last timestamp
+        :return: a tuple with the first index included and the last index excluded.
+        """
+        dates = self.get_dates(tile_index)
+
+        start = 0 if start_date is None else bisect_left(dates, start_date)
+        end = len(dates) if end_date is None else bisect_right(dates, end_date)
+
+        return start, end
+
+    def count_states(self, runs: list, start: int, end: int, state):
+        """
+        The function counts the timestamps in a given state between two indexes of a run-length encoded
+        series.
+
+        :param runs: The `runs` parameter is a list of `[state, length]` pairs, ordered by time
+        :type runs: list
+        :param start: The `start` parameter is the first timestamp index included
+        :type start: int
+        :param end: The `end` parameter is the last timestamp index excluded
+        :type end: int
+        :param state: The `state` parameter is the state to count
+        :return: the number of timestamps in the given state.
+        """
+        count = 0
+        run_start = 0
+        for run_state, length in runs:
+            run_end = run_start + length
+
+            if end <= run_start:
+                break
+
+            if run_state == state:
+                count += max(0, min(end, run_end) - max(start, run_start))
+
+            run_start = run_end
+
+        return count
+
+    def get_lighted_hours(self, tile_index: int, triangle_id: str, start_date=None, end_date=None):
+        """
+        The function returns how many timestamps a triangle was lighted over a date range.
+
+        :param tile_index: The `tile_index` parameter is an integer that represents the index of the
+        tile containing the triangle
+        :type tile_index: int
+        :param triangle_id: The `triangle_id` parameter is the identifier of the triangle
+        :type triangle_id: str
+        :param start_date: The `start_date` parameter is the first date included, defaults to None
+        :param end_date: The `end_date` parameter is the last date included, defaults to None
+        :return: the number of lighted timestamps.
+        """
+        start, end = self.get_index_range(tile_index, start_date, end_date)
+        runs = self.get_time_series(tile_index)['triangles'][triangle_id]
+
+        return self.count_states(runs, start, end, True)
+
+    def get_lighted_hours_by_triangle(self, tile_index: int, start_date=None, end_date=None):
+        """
+        The function returns how many timestamps each triangle of a tile was lighted over a date range.
+
+        :param tile_index: The `tile_index` parameter is an integer that represents the index of the
+        tile
+        :type tile_index: int
+        :param start_date: The `start_date` parameter is the first date included, defaults to None
+        :param end_date: The `end_date` parameter is the last date included, defaults to None
+        :return: a dictionary of lighted timestamps count by triangle id.
+        """
+        start, end = self.get_index_range(tile_index, start_date, end_date)
+        triangles = self.get_time_series(tile_index)['triangles']
+
+        return {id: self.count_states(runs, start, end, True) for id, runs in triangles.items()}
+
+    def is_lighted_at(self, tile_index: int, triangle_id: str, date: str):
+        """
+        The function returns the state of a triangle at a given timestamp.
+
+        :param tile_index: The `tile_index` parameter is an integer that represents the index of the
+        tile containing the triangle
+        :type tile_index: int
+        :param triangle_id: The `triangle_id` parameter is the identifier of the triangle
+        :type triangle_id: str
+        :param date: The `date` parameter is a timestamp in the format "YYYY-MM-DD:HHMM"
+        :type date: str
+        :return: True if the triangle is lighted, False if it is in shadow and None if there is no
+        result at this timestamp.
+        """
+        dates = self.get_dates(tile_index)
+        index = bisect_left(dates, date)
+        if len(dates) <= index or dates[index] != date:
+            return None
+
+        run_start = 0
+        for state, length in self.get_time_series(tile_index)['triangles'][triangle_id]:
+            if index < run_start + length:
+                return state
+
+            run_start += length
+
+        return None
@@ -14,6 +14,9 @@ def log_memory_size_in_megabyte(object):
     want to calculate and print its memory size in megabytes. This can be any variable, data structure,
     or instance of a class
     """
+    # Measuring the size walks the whole object, skip it when it is not logged
+    if not logging.getLogger().isEnabledFor(logging.DEBUG):
+        return
 
     # Convert octet to Mega octet
     full_size = asizeof.asizeof(object) / 1024 / 1024
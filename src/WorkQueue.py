@@ -0,0 +1,397 @@
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+# The WorkQueue class shares the shards of a distributed run between nodes through a shared directory.
+# The coordinator publishes all shards in queue.json, each worker claims a shard by creating its lease
+# file exclusively and renews the lease while computing it. The lease of a worker that stopped expires
+# and the shard is claimed again by another worker. A completed shard is recorded in done/<id>.json.
+#
+#    <queue>/queue.json          job and shards published by the coordinator
+#    <queue>/leases/<id>.lease   worker computing a shard, renewed every third of the lease duration
+#    <queue>/done/<id>.json      worker and duration of a completed shard
+#
+# A worker writes the outputs of a shard in its own staging directory, moved to the output directory
+# when it completes the shard. A worker whose lease expired and was claimed again by another worker
+# can't renew nor complete the shard anymore, so only the worker owning the lease moves its outputs.
+
+QUEUE_VERSION = 1
+
+# Directory of the staged outputs of the shards, in the output directory
+STAGING_DIRECTORY_NAME = ".staging"
+
+
+class LeaseLostError(RuntimeError):
+    pass
+
+
+def split_into_shards(num_of_timestamps_by_scenario: dict, tile_indexes, shard_tiles=None, shard_timestamps=None):
+    """
+    The function splits the (timestamp, tile) pairs of all scenarios into shards.
+
+    :param num_of_timestamps_by_scenario: The `num_of_timestamps_by_scenario` parameter is the number of
+    timestamps of each scenario, by scenario name (None without scenarios)
+    :type num_of_timestamps_by_scenario: dict
+    :param tile_indexes: The `tile_indexes` parameter is the list of computed tiles
+    :param shard_tiles: The `shard_tiles` parameter is the maximum number of tiles of a shard, all tiles
+    when it is None, defaults to None
+    :param shard_timestamps: The `shard_timestamps` parameter is the maximum number of timestamps of a
+    shard, all timestamps of the scenario when it is None, defaults to None
+    :return: a list of shards, ordered by scenario, timestamps and tiles. Each shard is a dictionary
+    with an `id`, a `scenario`, a `[start, end)` range of timestamp positions and a list of `tiles`.
+    """
+    tile_indexes = list(tile_indexes)
+    shard_tiles = shard_tiles or max(len(tile_indexes), 1)
+
+    shards = []
+    for scenario_name, num_of_timestamps in num_of_timestamps_by_scenario.items():
+        for start in range(0, num_of_timestamps, shard_timestamps or max(num_of_timestamps, 1)):
+            end = min(start + (shard_timestamps or num_of_timestamps), num_of_timestamps)
+
+            for i in range(0, len(tile_indexes), shard_tiles):
+                shards.append({'id': f"{len(shards):06d}", 'scenario': scenario_name, 'start': start, 'end': end, 'tiles': tile_indexes[i:i + shard_tiles]})
+
+    return shards
+
+
+def write_json_atomically(path: Path, content):
+    """
+    The function writes a json file in a temporary file renamed at the end, so readers of other nodes
+    never read a partial file.
+
+    :param path: The `path` parameter is the path of the json file
+    :type path: Path
+    :param content: The `content` parameter is the json content
+    """
+    temporary_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(str(temporary_path), 'w') as file:
+        json.dump(content, file)
+
+    os.replace(str(temporary_path), str(path))
+
+
+def move_staged_outputs(staging_directory: Path, output_directory: Path):
+    """
+    The function moves the files of a staging directory at the same place in the output directory, and
+    removes the staging directory. Each file is renamed, so readers never read a partial file.
+
+    :param staging_directory: The `staging_directory` parameter is the staging directory of a shard
+    :type staging_directory: Path
+    :param output_directory: The `output_directory` parameter is the output directory of the shard
+    :type output_directory: Path
+    """
+    if not Path(staging_directory).exists():
+        return
+
+    for staged_path in sorted(Path(staging_directory).rglob('*')):
+        if not staged_path.is_file():
+            continue
+
+        output_path = Path(output_directory, staged_path.relative_to(staging_directory))
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(str(staged_path), str(output_path))
+
+    shutil.rmtree(str(staging_directory), ignore_errors=True)
+
+
+class WorkQueue():
+    FILE_NAME = "queue.json"
+
+    def __init__(self, directory: str, lease_seconds=60.0):
+        """
+        The function initializes a queue in a directory shared by all nodes.
+
+        :param directory: The `directory` parameter is the shared directory of the queue
+        :type directory: str
+        :param lease_seconds: The `lease_seconds` parameter is the duration after which the shard of a
+        worker which didn't renew its lease can be claimed again, defaults to 60.0
+        """
+        self.directory = Path(directory)
+        self.lease_seconds = lease_seconds
+
+        self.path = Path(directory, self.FILE_NAME)
+        self.lease_directory = Path(directory, "leases")
+        self.done_directory = Path(directory, "done")
+
+        self.job = None
+        self.shards = []
+
+    def get_lease_path(self, shard_id: str):
+        return Path(self.lease_directory, f"{shard_id}.lease")
+
+    def get_done_path(self, shard_id: str):
+        return Path(self.done_directory, f"{shard_id}.json")
+
+    @staticmethod
+    def get_staging_directory(output_directory: str, shard_id: str, worker_id: str):
+        """
+        The function returns the directory where a worker writes the outputs of a shard before it is
+        completed. It is in the output directory, so outputs are moved by a rename.
+
+        :param output_directory: The `output_directory` parameter is the output directory of the shard
+        :type output_directory: str
+        :param shard_id: The `shard_id` parameter is the id of the shard
+        :type shard_id: str
+        :param worker_id: The `worker_id` parameter identifies the worker computing the shard
+        :type worker_id: str
+        :return: a Path.
+        """
+        return Path(output_directory, STAGING_DIRECTORY_NAME, f"{shard_id}.{worker_id}")
+
+    def publish(self, job: dict, shards: list):
+        """
+        The function publishes the shards of a job. Shards completed by a previous publication of the
+        same job are kept, so a stopped distributed run can be resumed.
+
+        :param job: The `job` parameter identifies the inputs and parameters of the run
+        :type job: dict
+        :param shards: The `shards` parameter is the list of shards, created by `split_into_shards`
+        :type shards: list
+        """
+        self.lease_directory.mkdir(parents=True, exist_ok=True)
+        self.done_directory.mkdir(parents=True, exist_ok=True)
+
+        content = {'version': QUEUE_VERSION, 'job': job, 'shards': shards}
+
+        if self.path.exists() and self.read() == content:
+            logging.info(f"Resumes the queue in {self.directory} with {len(self.get_completed_shard_ids())} completed shards.")
+        else:
+            # Results and leases of another job are not valid for this one
+            for path in list(self.done_directory.iterdir()) + list(self.lease_directory.iterdir()):
+                path.unlink()
+
+            write_json_atomically(self.path, content)
+
+        self.job = job
+        self.shards = shards
+
+    def read(self):
+        with open(str(self.path), 'r') as file:
+            return json.load(file)
+
+    def load(self, timeout=None, poll_seconds=1.0):
+        """
+        The function loads the job and the shards published by the coordinator, waiting for the
+        publication.
+
+        :param timeout: The `timeout` parameter is the maximum waiting time in seconds, forever when it
+        is None, defaults to None
+        :param poll_seconds: The `poll_seconds` parameter is the time between two checks of the queue,
+        defaults to 1.0
+        :return: the published job.
+        """
+        start_time = time.monotonic()
+        while not self.path.exists():
+            if timeout is not None and timeout < time.monotonic() - start_time:
+                raise TimeoutError(f"No queue was published in {self.directory}.")
+
+            time.sleep(poll_seconds)
+
+        content = self.read()
+        if content['version'] != QUEUE_VERSION:
+            raise ValueError(f"The queue {self.path} has version {content['version']} instead of {QUEUE_VERSION}.")
+
+        self.job = content['job']
+        self.shards = content['shards']
+
+        return self.job
+
+    def is_lease_expired(self, shard_id: str):
+        """
+        The function checks if the lease of a shard was not renewed in time.
+
+        :param shard_id: The `shard_id` parameter is the id of the shard
+        :type shard_id: str
+        :return: True if the lease can be claimed again, False otherwise or if there is no lease.
+        """
+        try:
+            return self.lease_seconds < time.time() - self.get_lease_path(shard_id).stat().st_mtime
+        except FileNotFoundError:
+            return False
+
+    def create_lease(self, shard_id: str, worker_id: str):
+        """
+        The function creates the lease file of a shard, only if it doesn't exist.
+
+        :param shard_id: The `shard_id` parameter is the id of the shard
+        :type shard_id: str
+        :param worker_id: The `worker_id` parameter identifies the worker in the lease
+        :type worker_id: str
+        :return: True if the lease was created by this call, False otherwise.
+        """
+        try:
+            file_descriptor = os.open(str(self.get_lease_path(shard_id)), os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return False
+
+        with os.fdopen(file_descriptor, 'w') as file:
+            file.write(worker_id)
+
+        return True
+
+    def acquire_lease(self, shard_id: str, worker_id: str):
+        """
+        The function creates the lease file of a shard which is not completed.
+
+        :param shard_id: The `shard_id` parameter is the id of the shard
+        :type shard_id: str
+        :param worker_id: The `worker_id` parameter identifies the worker in the lease
+        :type worker_id: str
+        :return: True if the shard is leased by this call, False otherwise.
+        """
+        if not self.create_lease(shard_id, worker_id):
+            return False
+
+        # The shard can be completed, and its lease released, since it was checked
+        if self.get_done_path(shard_id).exists():
+            self.get_lease_path(shard_id).unlink()
+            return False
+
+        return True
+
+    def claim(self, worker_id: str):
+        """
+        The function claims the first shard which is not completed and not leased by another worker.
+
+        :param worker_id: The `worker_id` parameter identifies the worker, unique among all nodes
+        :type worker_id: str
+        :return: the claimed shard, or None if all remaining shards are leased.
+        """
+        for shard in self.shards:
+            shard_id = shard['id']
+            if self.get_done_path(shard_id).exists():
+                continue
+
+            if self.acquire_lease(shard_id, worker_id):
+                return shard
+
+            if not self.is_lease_expired(shard_id):
+                continue
+
+            # The rename succeeds for only one of the workers reclaiming an expired lease
+            stale_path = self.get_lease_path(shard_id).with_suffix(f".stale-{worker_id}")
+            try:
+                os.rename(str(self.get_lease_path(shard_id)), str(stale_path))
+            except FileNotFoundError:
+                continue
+
+            stale_path.unlink()
+            logging.warning(f"Lease of shard {shard_id} expired, it is claimed again by {worker_id}.")
+
+            if self.acquire_lease(shard_id, worker_id):
+                return shard
+
+        return None
+
+    def get_lease_owner(self, shard_id: str):
+        """
+        The function reads the worker owning the lease of a shard.
+
+        :param shard_id: The `shard_id` parameter is the id of the shard
+        :type shard_id: str
+        :return: the id of the worker, or None if the shard is not leased.
+        """
+        try:
+            return self.get_lease_path(shard_id).read_text()
+        except FileNotFoundError:
+            return None
+
+    def check_lease(self, shard_id: str, worker_id: str):
+        """
+        The function checks that a worker still owns the lease of a shard.
+
+        :param shard_id: The `shard_id` parameter is the id of the shard
+        :type shard_id: str
+        :param worker_id: The `worker_id` parameter identifies the worker
+        :type worker_id: str
+        """
+        owner = self.get_lease_owner(shard_id)
+        if owner != worker_id:
+            raise LeaseLostError(f"Lease of shard {shard_id} is owned by {owner} instead of {worker_id}.")
+
+    def renew(self, shard_id: str, worker_id: str):
+        """
+        The function renews the lease of a shard owned by a worker.
+
+        :param shard_id: The `shard_id` parameter is the id of the shard
+        :type shard_id: str
+        :param worker_id: The `worker_id` parameter identifies the worker owning the lease
+        :type worker_id: str
+        """
+        self.check_lease(shard_id, worker_id)
+        os.utime(str(self.get_lease_path(shard_id)))
+
+    @contextmanager
+    def hold(self, shard_id: str, worker_id: str):
+        """
+        The function renews the lease of a shard in a background thread while it is computed.
+
+        :param shard_id: The `shard_id` parameter is the id of the claimed shard
+        :type shard_id: str
+        :param worker_id: The `worker_id` parameter identifies the worker owning the lease
+        :type worker_id: str
+        :return: a `threading.Event` set when the lease is lost, the shard is then aborted.
+        """
+        stopped = threading.Event()
+        lost = threading.Event()
+
+        def renew_until_stopped():
+            while not stopped.wait(self.lease_seconds / 3):
+                try:
+                    self.renew(shard_id, worker_id)
+                except (LeaseLostError, FileNotFoundError):
+                    logging.warning(f"Lease of shard {shard_id} was claimed by another worker.")
+                    lost.set()
+                    return
+
+        thread = threading.Thread(target=renew_until_stopped, daemon=True)
+        thread.start()
+
+        try:
+            yield lost
+        finally:
+            stopped.set()
+            thread.join()
+
+    def complete(self, shard_id: str, worker_id: str, duration=None, staged_directories=()):
+        """
+        The function moves the staged outputs of a shard, records it as completed and releases its
+        lease. Only the worker owning the lease can complete a shard.
+
+        :param shard_id: The `shard_id` parameter is the id of the shard
+        :type shard_id: str
+        :param worker_id: The `worker_id` parameter identifies the worker which computed the shard
+        :type worker_id: str
+        :param duration: The `duration` parameter is the computation time of the shard in seconds,
+        defaults to None
+        :param staged_directories: The `staged_directories` parameter is the list of (staging directory,
+        output directory) pairs of the outputs of the shard, defaults to ()
+        """
+        self.check_lease(shard_id, worker_id)
+
+        # Outputs are in place before the shard is completed, the coordinator merges them after
+        for staging_directory, output_directory in staged_directories:
+            move_staged_outputs(staging_directory, output_directory)
+
+        write_json_atomically(self.get_done_path(shard_id), {'worker': worker_id, 'duration': duration})
+
+        try:
+            self.get_lease_path(shard_id).unlink()
+        except FileNotFoundError:
+            pass
+
+    def get_completed_shard_ids(self):
+        return {path.stem for path in self.done_directory.glob("*.json")}
+
+    def get_completed_shard(self, shard_id: str):
+        with open(str(self.get_done_path(shard_id)), 'r') as file:
+            return json.load(file)
+
+    def is_complete(self):
+        completed_shard_ids = self.get_completed_shard_ids()
+        return all(shard['id'] in completed_shard_ids for shard in self.shards)
@@ -0,0 +1,171 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from py3dtilers.Common import FeatureList
+from py3dtiles import TileSet
+
+from .Writer import Writer
+
+# The AsyncWriter class forwards exports to another writer in a thread pool, so encoding and writing
+# results overlap with the computation of the next tiles. The number of pending exports is bounded to
+# keep memory bounded. Chunks of a tile are streamed to the writer from a writing thread, and their
+# export is waited for since they can be converted from buffers released once the export call returns.
+
+
+class AsyncWriter(Writer):
+    def __init__(self, writer: Writer, num_threads=1, max_pending_exports=None):
+        """
+        The function initializes an asynchronous writer around another writer.
+
+        :param writer: The `writer` parameter is the writer doing the export
+        :type writer: Writer
+        :param num_threads: The `num_threads` parameter is the number of writing threads. Only one
+        thread is used if the writer can't export concurrently, defaults to 1
+        :param max_pending_exports: The `max_pending_exports` parameter is the maximum number of feature
+        lists waiting to be exported. The computation waits when it is reached, defaults to twice the
+        number of threads
+        """
+        super().__init__(writer.directory)
+
+        self.writer = writer
+
+        if not writer.can_export_concurrently():
+            num_threads = 1
+
+        if max_pending_exports is None:
+            max_pending_exports = 2 * num_threads
+
+        self.executor = ThreadPoolExecutor(max_workers=num_threads, thread_name_prefix="Writer")
+        self.pending_exports = threading.BoundedSemaphore(max_pending_exports)
+        self.futures = []
+
+    def wait(self):
+        """
+        The function waits for all pending exports, and the ones of the writer, and raises the first
+        export error.
+        """
+        futures = self.futures
+        self.futures = []
+
+        for future in futures:
+            future.result()
+
+        self.writer.wait()
+
+    def close(self):
+        """
+        The function waits for all pending exports, stops the writing threads and closes the writer.
+        """
+        self.wait()
+        self.executor.shutdown()
+        self.writer.close()
+
+    def set_directory(self, directory: str):
+        # Pending exports must be written in the previous directory
+        self.wait()
+
+        super().set_directory(directory)
+        self.writer.set_directory(directory)
+
+    def copy(self):
+        # A copy is used from its own thread, it exports synchronously
+        self.wait()
+        return self.writer.copy()
+
+    def can_export_geometry(self):
+        return self.writer.can_export_geometry()
+
+    def can_read_feature_list(self):
+        return self.writer.can_read_feature_list()
+
+    def can_export_tileset(self):
+        return self.writer.can_export_tileset()
+
+    def is_buffered(self):
+        return self.writer.is_buffered()
+
+    def can_export_concurrently(self):
+        return self.writer.can_export_concurrently()
+
+    def get_output_paths(self, tile_index: int):
+        return self.writer.get_output_paths(tile_index)
+
+    def get_shared_output_paths(self):
+        return self.writer.get_shared_output_paths()
+
+    def create_directory(self):
+        self.wait()
+        self.writer.create_directory()
+
+    def export_tileset(self, tileset: TileSet):
+        # The tileset is exported once all its tiles are written
+        self.wait()
+        self.writer.export_tileset(tileset)
+
+    def export(self, feature_list: FeatureList, tile_index: int):
+        """
+        The function exports a feature list with the writer and frees its pending slot.
+
+        :param feature_list: The `feature_list` parameter is the feature list to export
+        :type feature_list: FeatureList
+        :param tile_index: The `tile_index` parameter is the index of the exported tile
+        :type tile_index: int
+        """
+        try:
+            self.writer.export_feature_list_by_tile(feature_list, tile_index)
+        finally:
+            self.pending_exports.release()
+
+    def export_chunks(self, feature_chunks, tile_index: int):
+        """
+        The function exports the feature lists of a tile with the writer and frees its pending slot.
+
+        :param feature_chunks: The `feature_chunks` parameter is an iterable of `FeatureList` of the
+        tile, in order
+        :param tile_index: The `tile_index` parameter is the index of the exported tile
+        :type tile_index: int
+        """
+        try:
+            self.writer.export_feature_chunks_by_tile(feature_chunks, tile_index)
+        finally:
+            self.pending_exports.release()
+
+    def export_feature_list_by_tile(self, feature_list: FeatureList, tile_index: int):
+        """
+        The function queues the export of a feature list, waiting while too many exports are pending.
+
+        :param feature_list: The `feature_list` parameter is the feature list to export. It must not be
+        modified after this call
+        :type feature_list: FeatureList
+        :param tile_index: The `tile_index` parameter is the index of the exported tile
+        :type tile_index: int
+        """
+        self.pending_exports.acquire()
+        self.futures.append(self.executor.submit(self.export, feature_list, tile_index))
+
+        # Raise export errors as soon as possible and forget finished exports
+        for future in [future for future in self.futures if future.done()]:
+            self.futures.remove(future)
+            future.result()
+
+    def export_feature_chunks_by_tile(self, feature_chunks, tile_index: int):
+        """
+        The function exports the feature lists of a tile with the writer, one chunk at a time without
+        merging them. The export runs in a writing thread after the queued ones of a writer which can't
+        export concurrently, and is waited for since the chunks can be released after this call.
+
+        :param feature_chunks: The `feature_chunks` parameter is an iterable of `FeatureList` of the
+        tile, in order
+        :param tile_index: The `tile_index` parameter is the index of the exported tile
+        :type tile_index: int
+        """
+        self.pending_exports.acquire()
+        self.executor.submit(self.export_chunks, feature_chunks, tile_index).result()
+
+    def get_feature_list_from_tile(self, tile_index: int, root_directory: str):
+        # Read back only complete exports
+        self.wait()
+        return self.writer.get_feature_list_from_tile(tile_index, root_directory)
+
+    def get_read_cache_statistics(self):
+        return self.writer.get_read_cache_statistics()
@@ -0,0 +1,128 @@
+import copy
+from typing import List
+
+from py3dtilers.Common import FeatureList
+from py3dtiles import TileSet
+
+from .Writer import Writer
+
+# The CompositeWriter class forwards each export to several writers, so one computation produces
+# several outputs (3D Tiles and tabular results for instance). Writers don't read back the same
+# results, so aggregates are computed with each writer separately instead of the composite.
+
+
+class CompositeWriter(Writer):
+    def __init__(self, writers: List[Writer]):
+        """
+        The function initializes a writer forwarding each call to a list of writers.
+
+        :param writers: The `writers` parameter is the list of writers receiving each export. Only one
+        of them can write the tileset.json of the directory
+        :type writers: List[Writer]
+        """
+        if 1 < sum(writer.can_export_tileset() for writer in writers):
+            raise ValueError("Several writers would write the same tileset.json, export them in different runs.")
+
+        super().__init__(writers[0].directory if 0 < len(writers) else None)
+
+        self.writers = writers
+
+    def set_directory(self, directory: str):
+        super().set_directory(directory)
+
+        for writer in self.writers:
+            writer.set_directory(directory)
+
+    def copy(self):
+        return CompositeWriter([writer.copy() for writer in self.writers])
+
+    def can_export_geometry(self):
+        # Geometry must be exported separately as soon as one writer doesn't export it
+        return all(writer.can_export_geometry() for writer in self.writers)
+
+    def can_export_tileset(self):
+        return any(writer.can_export_tileset() for writer in self.writers)
+
+    def is_buffered(self):
+        return any(writer.is_buffered() for writer in self.writers)
+
+    def can_export_concurrently(self):
+        return all(writer.can_export_concurrently() for writer in self.writers)
+
+    def get_output_paths(self, tile_index: int):
+        output_paths = []
+        for writer in self.writers:
+            writer_output_paths = writer.get_output_paths(tile_index)
+            if writer_output_paths is None:
+                return None
+
+            output_paths.extend(writer_output_paths)
+
+        return output_paths
+
+    def get_shared_output_paths(self):
+        return [path for writer in self.writers for path in writer.get_shared_output_paths()]
+
+    def create_directory(self):
+        for writer in self.writers:
+            writer.create_directory()
+
+    def export_tileset(self, tileset: TileSet):
+        for writer in self.writers:
+            writer.export_tileset(tileset)
+
+    def export_feature_list_by_tile(self, feature_list: FeatureList, tile_index: int):
+        """
+        The function exports a feature list with each writer.
+
+        :param feature_list: The `feature_list` parameter is an instance of the `FeatureList` class. It
+        represents a list of features that need to be exported
+        :type feature_list: FeatureList
+        :param tile_index: The `tile_index` parameter is an integer that represents the index of the
+        tile
+        :type tile_index: int
+        """
+        for i, writer in enumerate(self.writers):
+            # Geometry is transformed in place during the encoding of a tile, the next writers
+            # must receive the original one
+            is_last_writer = i == len(self.writers) - 1
+            if writer.can_export_geometry() and not is_last_writer:
+                writer.export_feature_list_by_tile(copy.deepcopy(feature_list), tile_index)
+            else:
+                writer.export_feature_list_by_tile(feature_list, tile_index)
+
+    def export_feature_chunks_by_tile(self, feature_chunks, tile_index: int):
+        """
+        The function exports the feature lists of a tile with each writer, iterating them once by
+        writer.
+
+        :param feature_chunks: The `feature_chunks` parameter is an iterable of `FeatureList` of the
+        tile, which can be iterated several times
+        :param tile_index: The `tile_index` parameter is the index of the tile
+        :type tile_index: int
+        """
+        for i, writer in enumerate(self.writers):
+            # Same as a feature list, the geometry of each chunk is transformed in place by encoding
+            is_last_writer = i == len(self.writers) - 1
+            if writer.can_export_geometry() and not is_last_writer:
+                writer.export_feature_chunks_by_tile((copy.deepcopy(feature_list) for feature_list in feature_chunks), tile_index)
+            else:
+                writer.export_feature_chunks_by_tile(feature_chunks, tile_index)
+
+    def get_read_cache_statistics(self):
+        # Statistics of each writer caching its results, by writer
+        statistics = dict()
+        for i, writer in enumerate(self.writers):
+            writer_statistics = writer.get_read_cache_statistics()
+            if writer_statistics is not None:
+                statistics[f"{i}"] = writer_statistics
+
+        return statistics if 0 < len(statistics) else None
+
+    def wait(self):
+        for writer in self.writers:
+            writer.wait()
+
+    def close(self):
+        for writer in self.writers:
+            writer.close()
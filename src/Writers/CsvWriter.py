@@ -21,6 +21,9 @@ class CsvWriter(Writer):
         """
         return Path(self.directory, self.file_name)
 
+    def get_shared_output_paths(self):
+        return [self.get_path()]
+
     def create_directory(self):
         super().create_directory()
 
@@ -37,7 +40,19 @@ class CsvWriter(Writer):
         :param feature_list: A list of features that you want to export
         :type feature_list: FeatureList
         """
-        super().export_feature_list_by_tile(feature_list, tile_index)
+        self.export_feature_chunks_by_tile([feature_list], tile_index)
+
+    def export_feature_chunks_by_tile(self, feature_chunks, tile_index: int):
+        """
+        The function appends the batch tables of the feature lists of a tile to the CSV file, one
+        feature list at a time.
+
+        :param feature_chunks: The `feature_chunks` parameter is an iterable of `FeatureList` of the
+        tile
+        :param tile_index: The `tile_index` parameter is the index of the tile
+        :type tile_index: int
+        """
+        super().export_feature_list_by_tile(None, tile_index)
 
         # Append all result / batch table content in the same csv
         path_str = str(self.get_path())
@@ -45,10 +60,11 @@ class CsvWriter(Writer):
             writer = csv.writer(file)
 
             # Append each batch table result
-            for feature in feature_list:
-                output = f'{feature.get_id()};'
+            for feature_list in feature_chunks:
+                for feature in feature_list:
+                    output = f'{feature.get_id()};'
 
-                for value in feature.batchtable_data.values():
-                    output += f'{value};'
+                    for value in feature.batchtable_data.values():
+                        output += f'{value};'
 
-                writer.writerow([output.strip()])
+                    writer.writerow([output.strip()])
@@ -3,44 +3,81 @@ from pathlib import Path
 
 from py3dtilers.Common import Feature, FeatureList
 
+from .ReadCache import ReadCache
 from .Writer import Writer
 
 # The JsonWriter class is a subclass of the Writer class and export 3DTiles batch table in a json.
 
 
 class JsonWriter(Writer):
-    def export_feature_list_by_tile(self, feature_list: FeatureList, tile_index: int):
-        super().export_feature_list_by_tile(feature_list, tile_index)
+    def __init__(self, directory=None, read_cache_size=64):
+        super().__init__(directory)
+
+        # Batch tables read back by aggregates, several times for each timestamp
+        self.read_cache = ReadCache(read_cache_size)
 
-        formated_results = dict()
+    def can_read_feature_list(self):
+        return True
 
-        # Gather all batch table content around a feature
-        for feature in feature_list:
-            formated_results[feature.get_id()] = dict()
+    def can_export_concurrently(self):
+        # Each tile is exported in its own file
+        return True
 
-            for k, v in feature.get_batchtable_data().items():
-                formated_results[feature.get_id()][k] = v
+    def get_output_paths(self, tile_index: int):
+        return [Path(self.directory, f"{tile_index}.json")]
 
-        # Store all result corresponding to one tile
+    def export_feature_list_by_tile(self, feature_list: FeatureList, tile_index: int):
+        self.export_feature_chunks_by_tile([feature_list], tile_index)
+
+    def export_feature_chunks_by_tile(self, feature_chunks, tile_index: int):
+        """
+        The function writes the batch tables of the feature lists of a tile in its json file, one
+        feature list at a time, as one object by feature id.
+
+        :param feature_chunks: The `feature_chunks` parameter is an iterable of `FeatureList` of the
+        tile
+        :param tile_index: The `tile_index` parameter is the index of the tile
+        :type tile_index: int
+        """
+        super().export_feature_list_by_tile(None, tile_index)
+
+        # Store all result corresponding to one tile, each feature is written with its batch table
+        # content without gathering the tile in memory
         path_str = str(Path(self.directory, f"{tile_index}.json"))
         with open(path_str, 'w', newline='') as file:
-            json.dump(formated_results, file)
+            file.write('{')
+
+            separator = ''
+            for feature_list in feature_chunks:
+                for feature in feature_list:
+                    file.write(f"{separator}{json.dumps(str(feature.get_id()))}: {json.dumps(dict(feature.get_batchtable_data()))}")
+                    separator = ', '
+
+            file.write('}')
+
+        self.read_cache.invalidate(path_str)
+
+    def load_batch_table(self, path):
+        with open(str(path), 'r') as file:
+            return json.load(file)
 
     def get_feature_list_from_tile(self, tile_index: int, root_directory: str):
         feature_list = FeatureList()
 
         path_str = str(Path(root_directory, f"{tile_index}.json"))
 
-        with open(path_str, 'r') as file:
-            batch_table = json.load(file)
+        batch_table = self.read_cache.get(path_str, self.load_batch_table)
 
-            # Recreate feature list from json files
-            for id, batch_table_content in batch_table.items():
-                feature = Feature(id)
+        # Recreate feature list from json files, features are new to keep the cached batch table intact
+        for id, batch_table_content in batch_table.items():
+            feature = Feature(id)
 
-                for key, value in batch_table_content.items():
-                    feature.add_batchtable_data(key, value)
+            for key, value in batch_table_content.items():
+                feature.add_batchtable_data(key, value)
 
-                feature_list.append(feature)
+            feature_list.append(feature)
 
         return feature_list
+
+    def get_read_cache_statistics(self):
+        return self.read_cache.get_statistics()
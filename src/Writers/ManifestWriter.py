@@ -0,0 +1,137 @@
+from py3dtilers.Common import FeatureList
+from py3dtiles import TileSet
+
+from ..RunManifest import RunManifest, hash_files
+from .Writer import Writer
+
+# The ManifestWriter class records each export of another writer in the run manifest, once it is
+# written, so a stopped run can be resumed. Exports of buffered writers are recorded when the writer is
+# closed, once their outputs are written.
+
+
+class ManifestWriter(Writer):
+    def __init__(self, writer: Writer, manifest: RunManifest, writer_name: str):
+        """
+        The function initializes a writer recording the exports of another writer.
+
+        :param writer: The `writer` parameter is the writer doing the export
+        :type writer: Writer
+        :param manifest: The `manifest` parameter is the manifest of the run
+        :type manifest: RunManifest
+        :param writer_name: The `writer_name` parameter identifies the writer in the manifest
+        :type writer_name: str
+        """
+        super().__init__(writer.directory)
+
+        self.writer = writer
+        self.manifest = manifest
+        self.writer_name = writer_name
+
+        # (directory, tile index, output paths) of the exports not written yet by a buffered writer,
+        # shared with the copies of the writer so they are recorded when it is closed
+        self.pending_units = []
+
+    def set_directory(self, directory: str):
+        super().set_directory(directory)
+        self.writer.set_directory(directory)
+
+    def copy(self):
+        writer_copy = super().copy()
+        writer_copy.writer = self.writer.copy()
+
+        return writer_copy
+
+    def can_export_geometry(self):
+        return self.writer.can_export_geometry()
+
+    def can_read_feature_list(self):
+        return self.writer.can_read_feature_list()
+
+    def can_export_tileset(self):
+        return self.writer.can_export_tileset()
+
+    def is_buffered(self):
+        return self.writer.is_buffered()
+
+    def can_export_concurrently(self):
+        return self.writer.can_export_concurrently()
+
+    def create_directory(self):
+        self.writer.create_directory()
+
+    def get_output_paths(self, tile_index: int):
+        return self.writer.get_output_paths(tile_index)
+
+    def get_shared_output_paths(self):
+        return self.writer.get_shared_output_paths()
+
+    def is_tile_complete(self, tile_index: int):
+        """
+        The function checks in the manifest if a tile was already exported in the current directory.
+
+        :param tile_index: The `tile_index` parameter is the index of the tile
+        :type tile_index: int
+        :return: True if the tile doesn't need to be exported again, False otherwise.
+        """
+        output_paths = self.get_output_paths(tile_index)
+
+        # Outputs that can't be checked by tile are always exported again
+        if output_paths is None:
+            return False
+
+        return self.manifest.is_tile_complete(self.writer_name, self.directory, tile_index, output_paths)
+
+    def is_tileset_complete(self):
+        return self.manifest.is_tileset_complete(self.writer_name, self.directory)
+
+    def export_tileset(self, tileset: TileSet):
+        self.writer.export_tileset(tileset)
+        self.manifest.record_tileset(self.writer_name, self.directory)
+
+    def export_feature_list_by_tile(self, feature_list: FeatureList, tile_index: int):
+        self.writer.export_feature_list_by_tile(feature_list, tile_index)
+        self.record_tile(tile_index)
+
+    def export_feature_chunks_by_tile(self, feature_chunks, tile_index: int):
+        self.writer.export_feature_chunks_by_tile(feature_chunks, tile_index)
+        self.record_tile(tile_index)
+
+    def record_tile(self, tile_index: int):
+        """
+        The function records the outputs of an exported tile in the manifest, once they are written.
+
+        :param tile_index: The `tile_index` parameter is the index of the exported tile
+        :type tile_index: int
+        """
+        output_paths = self.get_output_paths(tile_index)
+        if output_paths is None:
+            return
+
+        if self.is_buffered():
+            self.pending_units.append((self.directory, tile_index, output_paths))
+            return
+
+        self.manifest.record_tile(self.writer_name, self.directory, tile_index, output_paths)
+
+    def get_feature_list_from_tile(self, tile_index: int, root_directory: str):
+        return self.writer.get_feature_list_from_tile(tile_index, root_directory)
+
+    def get_read_cache_statistics(self):
+        return self.writer.get_read_cache_statistics()
+
+    def wait(self):
+        self.writer.wait()
+
+    def close(self):
+        self.writer.close()
+
+        # Outputs shared by several exports, like the series of a tile, are hashed once
+        checksums = dict()
+        for directory, tile_index, output_paths in self.pending_units:
+            key = tuple(str(path) for path in output_paths)
+            if key not in checksums:
+                checksums[key] = hash_files(output_paths)
+
+            self.manifest.record_tile(self.writer_name, directory, tile_index, output_paths, checksums[key])
+
+        self.pending_units.clear()
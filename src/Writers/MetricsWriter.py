@@ -0,0 +1,109 @@
+from pathlib import Path
+
+from py3dtilers.Common import FeatureList
+from py3dtiles import TileSet
+
+from ..Metrics import metrics
+from .Writer import Writer
+
+# The MetricsWriter class records the wall time of the exports of another writer in the write stage of
+# the run metrics, and the bytes of the files it wrote. Files are measured once when the writer is
+# closed, since buffered writers only write them then and some files are shared by all tiles.
+
+
+class MetricsWriter(Writer):
+    def __init__(self, writer: Writer):
+        """
+        The function initializes a writer measuring the exports of another writer.
+
+        :param writer: The `writer` parameter is the writer doing the export
+        :type writer: Writer
+        """
+        super().__init__(writer.directory)
+
+        self.writer = writer
+
+        # Files written by the exports, shared with copies
+        self.output_paths = set()
+
+    def set_directory(self, directory: str):
+        super().set_directory(directory)
+        self.writer.set_directory(directory)
+
+    def copy(self):
+        writer_copy = super().copy()
+        writer_copy.writer = self.writer.copy()
+
+        return writer_copy
+
+    def can_export_geometry(self):
+        return self.writer.can_export_geometry()
+
+    def can_read_feature_list(self):
+        return self.writer.can_read_feature_list()
+
+    def can_export_tileset(self):
+        return self.writer.can_export_tileset()
+
+    def is_buffered(self):
+        return self.writer.is_buffered()
+
+    def can_export_concurrently(self):
+        return self.writer.can_export_concurrently()
+
+    def create_directory(self):
+        self.writer.create_directory()
+
+    def get_output_paths(self, tile_index: int):
+        return self.writer.get_output_paths(tile_index)
+
+    def export_tileset(self, tileset: TileSet):
+        with metrics.time('write'):
+            self.writer.export_tileset(tileset)
+
+    def export_feature_list_by_tile(self, feature_list: FeatureList, tile_index: int):
+        with metrics.time('write'):
+            self.writer.export_feature_list_by_tile(feature_list, tile_index)
+
+        self.add_output_paths(tile_index)
+
+    def export_feature_chunks_by_tile(self, feature_chunks, tile_index: int):
+        # Features are converted while they are written, their conversion is part of the write stage
+        with metrics.time('write'):
+            self.writer.export_feature_chunks_by_tile(feature_chunks, tile_index)
+
+        self.add_output_paths(tile_index)
+
+    def add_output_paths(self, tile_index: int):
+        """
+        The function remembers the files written for a tile, to measure them when the writer is closed.
+
+        :param tile_index: The `tile_index` parameter is the index of the exported tile
+        :type tile_index: int
+        """
+        output_paths = self.get_output_paths(tile_index)
+
+        # Outputs shared by all tiles, like a csv, are measured once
+        if output_paths is None:
+            output_paths = self.writer.get_shared_output_paths()
+
+        self.output_paths.update(str(path) for path in output_paths)
+
+    def get_feature_list_from_tile(self, tile_index: int, root_directory: str):
+        return self.writer.get_feature_list_from_tile(tile_index, root_directory)
+
+    def get_read_cache_statistics(self):
+        return self.writer.get_read_cache_statistics()
+
+    def get_shared_output_paths(self):
+        return self.writer.get_shared_output_paths()
+
+    def wait(self):
+        self.writer.wait()
+
+    def close(self):
+        self.writer.close()
+
+        output_paths = list(self.output_paths)
+        self.output_paths.clear()
+        metrics.increment('bytes_written', sum(Path(path).stat().st_size for path in output_paths if Path(path).exists()))
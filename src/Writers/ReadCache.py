@@ -0,0 +1,110 @@
+import os
+import threading
+from collections import OrderedDict
+
+# The ReadCache class is a bounded cache (least recently used) of files read back by writers. An
+# entry is reused only if its file didn't change since it was loaded.
+
+
+class ReadCache():
+    def __init__(self, max_entries=16):
+        """
+        The function initializes an empty cache and its statistics.
+
+        :param max_entries: The `max_entries` parameter is the maximum number of files kept in cache.
+        The cache is disabled with 0, defaults to 16
+        """
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get_signature(self, path):
+        """
+        The function returns the signature of a file, changing each time the file is written.
+
+        :param path: The `path` parameter is the path of the file
+        :return: a tuple with the modification time in nanoseconds and the size of the file.
+        """
+        stat = os.stat(str(path))
+        return stat.st_mtime_ns, stat.st_size
+
+    def get(self, path, load):
+        """
+        The function returns the cached value of a file, loading it if it is not in cache or if it
+        changed on disk.
+
+        :param path: The `path` parameter is the path of the file, used as key
+        :param load: The `load` parameter is a function reading the file from its path
+        :return: the value returned by `load`, or its cached version.
+        """
+        key = str(path)
+        signature = self.get_signature(path)
+
+        with self.lock:
+            if key in self.entries:
+                if self.entries[key][0] == signature:
+                    self.hits += 1
+                    self.entries.move_to_end(key)
+                    return self.entries[key][1]
+
+                self.invalidations += 1
+                del self.entries[key]
+
+            self.misses += 1
+
+        value = load(path)
+
+        if self.max_entries <= 0:
+            return value
+
+        with self.lock:
+            self.entries[key] = (signature, value)
+            self.entries.move_to_end(key)
+
+            while self.max_entries < len(self.entries):
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+        return value
+
+    def invalidate(self, path):
+        """
+        The function removes the entry of a file, because a writer changed it. Writers must call it,
+        because two writings during the same file system tick can have the same signature.
+
+        :param path: The `path` parameter is the path of the file, used as key
+        """
+        with self.lock:
+            if self.entries.pop(str(path), None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        """
+        The function removes all cached entries.
+        """
+        with self.lock:
+            self.entries.clear()
+
+    def get_statistics(self):
+        """
+        The function returns the usage statistics of the cache.
+        :return: a dictionary with hits, misses, evictions, invalidations, hit ratio and size of the
+        cache.
+        """
+        with self.lock:
+            requests = self.hits + self.misses
+
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'hitRatio': round(self.hits / requests, 4) if 0 < requests else 0,
+                'entries': len(self.entries),
+                'maxEntries': self.max_entries
+            }
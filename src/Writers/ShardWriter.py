@@ -0,0 +1,102 @@
+from pathlib import Path
+
+from py3dtilers.Common import FeatureList
+from py3dtiles import TileSet
+
+from .Writer import Writer
+
+# The ShardWriter class exports the tiles of a shard of a distributed run with another writer. The
+# tileset.json of each timestamp lists the tiles of all shards, so it is exported once by the merge of
+# the coordinator instead of each worker. Outputs can be written in a staging directory, moved to the
+# output directory when the shard is completed.
+
+
+class ShardWriter(Writer):
+    def __init__(self, writer: Writer, output_directory=None, staging_directory=None):
+        """
+        The function initializes a writer exporting only the tiles of another writer.
+
+        :param writer: The `writer` parameter is the writer doing the export
+        :type writer: Writer
+        :param output_directory: The `output_directory` parameter is the root directory of the results
+        of the shard, defaults to None
+        :param staging_directory: The `staging_directory` parameter is the directory where the files of
+        the output directory are written instead, at the same relative path. Files are written in place
+        when it is None, defaults to None
+        """
+        super().__init__(writer.directory)
+
+        self.writer = writer
+        self.output_directory = output_directory
+        self.staging_directory = staging_directory
+
+        # Writers keeping their root directory (like time series) are only staged here
+        self.writer.directory = self.get_staging_path(writer.directory)
+
+    def get_staging_path(self, directory):
+        """
+        The function returns the directory where the files of a directory are written.
+
+        :param directory: The `directory` parameter is a directory of the output directory
+        :return: the directory in the staging directory, or the same directory without staging.
+        """
+        if self.staging_directory is None or directory is None:
+            return directory
+
+        return str(Path(self.staging_directory, Path(directory).relative_to(self.output_directory)))
+
+    def set_directory(self, directory: str):
+        super().set_directory(directory)
+        self.writer.set_directory(self.get_staging_path(directory))
+
+    def copy(self):
+        writer_copy = super().copy()
+        writer_copy.writer = self.writer.copy()
+
+        return writer_copy
+
+    def can_export_geometry(self):
+        return self.writer.can_export_geometry()
+
+    def can_read_feature_list(self):
+        return self.writer.can_read_feature_list()
+
+    def can_export_tileset(self):
+        return self.writer.can_export_tileset()
+
+    def is_buffered(self):
+        return self.writer.is_buffered()
+
+    def can_export_concurrently(self):
+        return self.writer.can_export_concurrently()
+
+    def create_directory(self):
+        self.writer.create_directory()
+
+    def get_output_paths(self, tile_index: int):
+        return self.writer.get_output_paths(tile_index)
+
+    def get_shared_output_paths(self):
+        return self.writer.get_shared_output_paths()
+
+    def export_tileset(self, tileset: TileSet):
+        # Exported by the merge, once all shards are completed
+        pass
+
+    def export_feature_list_by_tile(self, feature_list: FeatureList, tile_index: int):
+        self.writer.export_feature_list_by_tile(feature_list, tile_index)
+
+    def export_feature_chunks_by_tile(self, feature_chunks, tile_index: int):
+        self.writer.export_feature_chunks_by_tile(feature_chunks, tile_index)
+
+    def get_feature_list_from_tile(self, tile_index: int, root_directory: str):
+        return self.writer.get_feature_list_from_tile(tile_index, root_directory)
+
+    def get_read_cache_statistics(self):
+        return self.writer.get_read_cache_statistics()
+
+    def wait(self):
+        self.writer.wait()
+
+    def close(self):
+        self.writer.close()
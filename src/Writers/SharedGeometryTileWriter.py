@@ -0,0 +1,151 @@
+import json
+import os
+from pathlib import Path, PurePosixPath
+
+from py3dtilers.Common import Feature, FeatureList
+from py3dtilers.TilesetReader.TilesetReader import TilesetTiler
+from py3dtiles import TileSet
+
+from ..Utils import sort_batchtable_data_by_custom_order
+from .TileWriter import TileWriter
+
+# Tile writer sharing one geometry export between all timestamps. Each timestamp only stores a
+# tileset.json referencing the shared b3dm and one batch table by tile, instead of a complete b3dm.
+
+
+class SharedGeometryTileWriter(TileWriter):
+    def __init__(self, directory, tiler=TilesetTiler, geometry_directory=None, read_cache_size=64):
+        """
+        The function initializes a tile writer referencing the geometry exported once in a given
+        directory.
+
+        :param directory: The `directory` parameter is the export directory of the current timestamp
+        :param tiler: The `tiler` parameter is an instance of the `TilesetTiler` class
+        :param geometry_directory: The `geometry_directory` parameter is the directory containing the
+        triangle-level geometry, written once by `export_with_triangle_level`
+        :param read_cache_size: The `read_cache_size` parameter is the number of batch tables kept in
+        cache when they are read back, defaults to 64
+        """
+        super().__init__(directory, tiler, read_cache_size)
+
+        self.geometry_directory = geometry_directory
+
+    def can_export_geometry(self):
+        # Geometry is exported once with triangle level, outside of each timestamp
+        return False
+
+    def can_export_concurrently(self):
+        # Each tile is exported in its own batch table, without py3dtilers encoding
+        return True
+
+    def get_batch_table_uri(self, content_uri: str):
+        """
+        The function returns the uri of the batch table associated to a tile content.
+
+        :param content_uri: The `content_uri` parameter is the uri of a tile content (ex : tiles/0.b3dm)
+        :type content_uri: str
+        :return: the uri of the batch table json (ex : tiles/0.json).
+        """
+        return str(PurePosixPath(content_uri).with_suffix('.json'))
+
+    def get_output_paths(self, tile_index: int):
+        return [Path(self.directory, self.get_batch_table_uri(self.get_content_uri(tile_index)))]
+
+    def export_tileset(self, tileset: TileSet):
+        """
+        The function exports the tileset.json of a timestamp, where each tile content references the
+        shared geometry and its batch table is referenced in the tile extras.
+
+        :param tileset: The `tileset` parameter is an instance of the `TileSet` class. It represents a
+        collection of tiles that make up a 3D tileset
+        :type tileset: TileSet
+        """
+        super().export_tileset(tileset)
+
+        if self.directory is None:
+            return
+
+        # Content uris are relative to the tileset.json
+        geometry_uri = PurePosixPath(Path(os.path.relpath(self.geometry_directory, self.directory)).as_posix())
+
+        tileset_path = str(Path(self.directory, "tileset.json"))
+        with open(tileset_path, 'r') as file:
+            tileset_json = json.load(file)
+
+        tiles = [tileset_json['root']]
+        while 0 < len(tiles):
+            tile = tiles.pop()
+            tiles.extend(tile.get('children', []))
+
+            if 'content' not in tile:
+                continue
+
+            content_uri = tile['content']['uri']
+            tile['content']['uri'] = str(geometry_uri / content_uri)
+            tile.setdefault('extras', dict())['batchTable'] = self.get_batch_table_uri(content_uri)
+
+        with open(tileset_path, 'w') as file:
+            json.dump(tileset_json, file)
+
+    def export_feature_list_by_tile(self, feature_list: FeatureList, tile_index: int):
+        """
+        The function exports the batch table of a tile in the 3D Tiles json format (one array by
+        property), without geometry.
+
+        :param feature_list: The `feature_list` parameter is an instance of the `FeatureList` class. It
+        represents a list of features that need to be exported
+        :type feature_list: FeatureList
+        :param tile_index: The `tile_index` parameter is an integer that represents the index of the
+        tile. It is used to identify a specific tile within a tileset
+        :type tile_index: int
+        """
+        if self.directory is None:
+            super().export_feature_list_by_tile(feature_list, tile_index)
+            return
+
+        sort_batchtable_data_by_custom_order(feature_list)
+
+        # Same properties as the batch table of a b3dm exported by the TileWriter
+        batch_table = {'id': [feature.get_id() for feature in feature_list]}
+        for feature in feature_list:
+            for key, value in feature.get_batchtable_data().items():
+                if key != 'id':
+                    batch_table.setdefault(key, []).append(value)
+
+        path = Path(self.directory, self.get_batch_table_uri(self.get_content_uri(tile_index)))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(str(path), 'w') as file:
+            json.dump(batch_table, file)
+
+        self.read_cache.invalidate(path)
+
+    def load_batch_table(self, path):
+        with open(str(path), 'r') as file:
+            return json.load(file)
+
+    def get_feature_list_from_tile(self, tile_index: int, root_directory: str):
+        """
+        The function reads back the batch table of a tile and returns it as a feature list without
+        geometry.
+
+        :param tile_index: The `tile_index` parameter is an integer that represents the index of the
+        tile you want to retrieve
+        :type tile_index: int
+        :param root_directory: The `root_directory` parameter is a string that represents the directory
+        of a timestamp
+        :type root_directory: str
+        :return: the feature list of a specific tile.
+        """
+        path = Path(root_directory, self.get_batch_table_uri(self.get_content_uri(tile_index)))
+        batch_table = self.read_cache.get(path, self.load_batch_table)
+
+        feature_list = FeatureList()
+        for i, id in enumerate(batch_table['id']):
+            feature = Feature(id)
+
+            for key, values in batch_table.items():
+                feature.add_batchtable_data(key, values[i])
+
+            feature_list.append(feature)
+
+        return feature_list
@@ -1,26 +1,162 @@
-from pathlib import Path
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+import json
+from pathlib import Path, PurePosixPath
 
 import numpy as np
 from py3dtilers.Common import (FeatureList, FromGeometryTreeToTileset,
                                GeometryNode)
+from py3dtilers.Common.feature import Feature
 from py3dtilers.TilesetReader.TilesetReader import TilesetReader, TilesetTiler
 from py3dtiles import TileSet
 from py3dtilers.TilesetReader.tile_to_feature import TileToFeatureList
 
+from ..TileHierarchy import TileHierarchy, prune_tileset_json
 from ..Utils import sort_batchtable_data_by_custom_order
+from .ReadCache import ReadCache
 from .Writer import Writer
 
 # On the fly tile writer (write tile by tile and tileset individually)
 # Avoid to store in memory the whole tileset_tree
 
 
+# py3dtilers encodes tiles with a class-level tile index, so tile writers of different threads encode
+# one tile at a time. Each process of an encoding pool has its own tile index
+ENCODING_LOCK = threading.Lock()
+
+
+def encode_tile(feature_list: FeatureList, args, tile_index: int, directory: str):
+    """
+    The function encodes a feature list in the b3dm of a tile, written in `tiles/<tile_index>.b3dm` of a
+    directory. It only depends on its arguments, so it can be called in the processes of a pool.
+
+    :param feature_list: The `feature_list` parameter is the feature list of the tile, with its batch
+    table data already sorted
+    :type feature_list: FeatureList
+    :param args: The `args` parameter is the arguments of the tiler (crs, offset, scale...)
+    :param tile_index: The `tile_index` parameter is the index of the tile, naming its b3dm
+    :type tile_index: int
+    :param directory: The `directory` parameter is the directory of the timestamp
+    :type directory: str
+    """
+    node = GeometryNode(feature_list)
+    node.set_node_features_geometry(args)
+
+    with ENCODING_LOCK:
+        FromGeometryTreeToTileset.tile_index = tile_index
+        offset = FromGeometryTreeToTileset._FromGeometryTreeToTileset__transform_node(node, args, np.array([0, 0, 0]))  # type: ignore
+        FromGeometryTreeToTileset._FromGeometryTreeToTileset__create_tile(node, offset, None, directory)  # type: ignore
+
+
+def get_tile_arrays(feature_list: FeatureList):
+    """
+    The function extracts the content of the b3dm of a feature list : the ids, triangles, texture
+    coordinates, batch table data and materials of its features. A tile is sent to an encoding process as these few arrays
+    instead of pickling each feature and its geometry objects.
+
+    :param feature_list: The `feature_list` parameter is the feature list of the tile, with its batch
+    table data already sorted
+    :type feature_list: FeatureList
+    :return: a dictionary of the arrays of the tile, read by `create_feature_list`.
+    """
+    triangles_by_feature = [np.asarray(feature.get_geom_as_triangles()).reshape(-1, 3, 3) for feature in feature_list]
+
+    return {
+        'ids': [feature.get_id() for feature in feature_list],
+        'triangle_counts': np.array([len(triangles) for triangles in triangles_by_feature], dtype=np.int64),
+        'triangles': np.concatenate(triangles_by_feature) if 0 < len(triangles_by_feature) else np.empty((0, 3, 3)),
+        # Texture coordinates of textured features, following their triangles in the geometry
+        'uvs': [feature.geom.triangles[1:] for feature in feature_list],
+        'batchtable_data': [feature.get_batchtable_data() for feature in feature_list],
+        'material_indexes': [feature.material_index for feature in feature_list],
+        'materials': feature_list.materials
+    }
+
+
+def create_feature_list(tile_arrays: dict):
+    """
+    The function creates the feature list of a tile from the arrays of `get_tile_arrays`.
+
+    :param tile_arrays: The `tile_arrays` parameter is the arrays of the tile
+    :type tile_arrays: dict
+    :return: a `FeatureList` with one feature by id.
+    """
+    feature_list = FeatureList()
+    feature_list.set_materials(tile_arrays['materials'])
+
+    ends = np.cumsum(tile_arrays['triangle_counts'])
+    for i, id in enumerate(tile_arrays['ids']):
+        feature = Feature(id)
+
+        # Same geometry as the converted features, a list of triangles made of three vertices
+        triangles = tile_arrays['triangles'][ends[i] - tile_arrays['triangle_counts'][i]:ends[i]]
+        feature.geom.triangles.append([list(triangle) for triangle in triangles])
+        feature.geom.triangles.extend(tile_arrays['uvs'][i])
+
+        for key, value in tile_arrays['batchtable_data'][i].items():
+            feature.add_batchtable_data(key, value)
+        feature.material_index = tile_arrays['material_indexes'][i]
+
+        feature_list.append(feature)
+
+    return feature_list
+
+
+def encode_tile_arrays(tile_arrays: dict, args, tile_index: int, directory: str):
+    """
+    The function encodes the arrays of a tile in its b3dm, like `encode_tile`. It is called in the
+    processes of a pool.
+
+    :param tile_arrays: The `tile_arrays` parameter is the arrays of the tile, from `get_tile_arrays`
+    :type tile_arrays: dict
+    :param args: The `args` parameter is the arguments of the tiler (crs, offset, scale...)
+    :param tile_index: The `tile_index` parameter is the index of the tile, naming its b3dm
+    :type tile_index: int
+    :param directory: The `directory` parameter is the directory of the timestamp
+    :type directory: str
+    """
+    encode_tile(create_feature_list(tile_arrays), args, tile_index, directory)
+
+
 class TileWriter(Writer):
-    def __init__(self, directory, tiler=TilesetTiler):
+    def __init__(self, directory, tiler=TilesetTiler, read_cache_size=4, encoding_processes=0, max_pending_encodes=None):
+        """
+        The function initializes a writer exporting each tile as a b3dm with its results.
+
+        :param directory: The `directory` parameter is the directory of the timestamp
+        :param tiler: The `tiler` parameter gives the arguments of the encoding, defaults to TilesetTiler
+        :param read_cache_size: The `read_cache_size` parameter is the number of tilesets kept in memory
+        when results are read back, defaults to 4
+        :param encoding_processes: The `encoding_processes` parameter is the number of processes
+        encoding tiles outside of the GIL. Tiles are encoded in the exporting thread with 0, defaults
+        to 0
+        :param max_pending_encodes: The `max_pending_encodes` parameter is the maximum number of tiles
+        sent to the encoding processes and not written yet. Exports wait when it is reached, defaults to
+        twice the number of processes
+        """
         super().__init__(directory)
 
         self.args = tiler.args
         self.tileset_reader = TilesetReader()
 
+        # Tilesets read back by aggregates, one by directory, several times for each timestamp
+        self.read_cache = ReadCache(read_cache_size)
+
+        # Processes are spawned, forking a process with computing and writing threads is unsafe
+        self.encoding_executor = None
+        if 0 < encoding_processes:
+            self.encoding_executor = ProcessPoolExecutor(max_workers=encoding_processes, mp_context=multiprocessing.get_context('spawn'))
+
+        if max_pending_encodes is None:
+            max_pending_encodes = 2 * max(encoding_processes, 1)
+
+        # Encodes in progress, shared by the copies of the writer which are stopped with this one
+        self.pending_encodes = threading.BoundedSemaphore(max_pending_encodes)
+        self.futures = []
+        self.futures_lock = threading.Lock()
+        self.is_copy = False
+
     def set_args(self, args):
         """
         The function sets the value of the "args" attribute of an object.
@@ -34,6 +170,54 @@ class TileWriter(Writer):
     def can_export_geometry(self):
         return True
 
+    def can_read_feature_list(self):
+        return True
+
+    def can_export_tileset(self):
+        return True
+
+    def can_export_concurrently(self):
+        # Each tile is written in its own b3dm, tiles of different threads are encoded one at a time
+        # under the encoding lock or at the same time in the encoding processes
+        return True
+
+    def is_buffered(self):
+        # Tiles sent to the encoding processes are written once the writer waits for them
+        return self.encoding_executor is not None
+
+    def copy(self):
+        writer_copy = super().copy()
+        writer_copy.is_copy = True
+
+        return writer_copy
+
+    def wait(self):
+        """
+        The function waits for the tiles sent to the encoding processes, by this writer and its copies,
+        and raises the first encoding error.
+        """
+        # The list is emptied in place, it is shared with the copies
+        with self.futures_lock:
+            futures = list(self.futures)
+            self.futures.clear()
+
+        for future in futures:
+            future.result()
+
+    def get_content_uri(self, tile_index: int):
+        """
+        The function returns the uri of the b3dm of a tile, relatively to the tileset.json.
+
+        :param tile_index: The `tile_index` parameter is the index of the tile
+        :type tile_index: int
+        :return: the uri of the tile content (ex : tiles/0.b3dm).
+        """
+        # Tile name given by py3dtilers when the tile is created
+        return f"tiles/{tile_index}.b3dm"
+
+    def get_output_paths(self, tile_index: int):
+        return [Path(self.directory, self.get_content_uri(tile_index))]
+
     def export_tileset(self, tileset: TileSet):
         """
         The function exports a tileset by writing it as a JSON file, with each tile's content URI set to
@@ -45,8 +229,23 @@ class TileWriter(Writer):
         """
         super().export_tileset(tileset)
 
+        # Contents are pruned from the tiles written on disk
+        self.wait()
+
         tileset.write_as_json(self.directory)
 
+        # Contents reference the tiles written by index, whatever the uris of the input tileset. Under
+        # a region of interest, only some tiles are exported and other tiles are removed, so each
+        # content of the tileset exists
+        tileset_path = str(Path(self.directory, "tileset.json"))
+        with open(tileset_path, 'r') as file:
+            tileset_json = json.load(file)
+
+        prune_tileset_json(tileset_json, lambda tile_index: self.get_content_uri(tile_index) if all(path.exists() for path in self.get_output_paths(tile_index)) else None)
+
+        with open(tileset_path, 'w') as file:
+            json.dump(tileset_json, file)
+
     def export_feature_list_by_tile(self, feature_list: FeatureList, tile_index: int):
         """
         The function exports a feature list by tile, sorting the batch table data and creating a tile
@@ -63,13 +262,23 @@ class TileWriter(Writer):
 
         sort_batchtable_data_by_custom_order(feature_list)
 
-        node = GeometryNode(feature_list)
-        node.set_node_features_geometry(self.args)
+        # Export Tile. Tiles sent to the encoding processes are written once the writer waits for them
+        if self.encoding_executor is not None:
+            self.pending_encodes.acquire()
+            try:
+                future = self.encoding_executor.submit(encode_tile_arrays, get_tile_arrays(feature_list), self.args, tile_index, self.directory)
+            except BaseException:
+                self.pending_encodes.release()
+                raise
+            future.add_done_callback(lambda _: self.pending_encodes.release())
 
-        # Export Tile
-        FromGeometryTreeToTileset.tile_index = tile_index
-        offset = FromGeometryTreeToTileset._FromGeometryTreeToTileset__transform_node(node, self.args, np.array([0, 0, 0]))  # type: ignore
-        FromGeometryTreeToTileset._FromGeometryTreeToTileset__create_tile(node, offset, None, self.directory)  # type: ignore
+            with self.futures_lock:
+                self.futures.append(future)
+        else:
+            encode_tile(feature_list, self.args, tile_index, self.directory)
+
+        # The tileset read back from this directory contains the previous content of the tile
+        self.read_cache.invalidate(Path(self.directory, "tileset.json"))
 
     def get_feature_list_from_tile(self, tile_index: int, root_directory: str):
         """
@@ -87,8 +296,34 @@ class TileWriter(Writer):
         """
         super().get_feature_list_from_tile(tile_index, root_directory)
 
-        # Read tile corresponding to a given path
-        tileset = self.tileset_reader.read_tileset(Path(root_directory))
-        tile = tileset.get_root_tile().get_children()[tile_index]
+        # Tiles still encoded may be read back
+        self.wait()
+
+        # Read tile corresponding to a given path, the tileset is parsed once by directory. Tiles are
+        # found by their content uri, the tileset may only contain some tiles
+        tiles_by_uri = self.read_cache.get(Path(root_directory, "tileset.json"), self.load_tileset)
+        tile = tiles_by_uri[PurePosixPath(self.get_content_uri(tile_index))]
 
         return TileToFeatureList(tile)
+
+    def load_tileset(self, tileset_path: Path):
+        """
+        The function reads the tileset of a directory with all its tiles.
+
+        :param tileset_path: The `tileset_path` parameter is the path of the tileset.json
+        :type tileset_path: Path
+        :return: a dictionary of the tiles of the whole tree, by content uri.
+        """
+        tile_hierarchy = TileHierarchy(self.tileset_reader.read_tileset(Path(tileset_path).parent))
+
+        return {PurePosixPath(tile.get_content_uri()): tile for tile in tile_hierarchy.get_tiles()}
+
+    def get_read_cache_statistics(self):
+        return self.read_cache.get_statistics()
+
+    def close(self):
+        self.wait()
+
+        # Copies share the encoding processes, they are stopped with the original writer
+        if self.encoding_executor is not None and not self.is_copy:
+            self.encoding_executor.shutdown()
@@ -0,0 +1,277 @@
+import json
+import logging
+import os
+from pathlib import Path
+
+from py3dtilers.Common import FeatureList
+from py3dtiles import TileSet
+
+from .Writer import Writer
+
+# The TimeSeriesWriter class is a subclass of the Writer class and export results transposed by tile :
+# each triangle stores its run-length encoded lit / shadow states over the whole run. Series are kept in
+# memory during the run and each file is written once, when the writer is flushed or closed.
+
+
+def append_state_to_runs(runs: list, state):
+    """
+    The function `append_state_to_runs` appends a state to a run-length encoded list, extending the
+    last run if the state didn't change.
+
+    :param runs: The `runs` parameter is a list of `[state, length]` pairs, ordered by time
+    :type runs: list
+    :param state: The `state` parameter is the state to append. It is a boolean for lit / shadow
+    results, or None when the triangle has no result for a timestamp
+    """
+    if 0 < len(runs) and runs[-1][0] == state:
+        runs[-1][1] += 1
+    else:
+        runs.append([state, 1])
+
+
+def replace_state_in_runs(runs: list, index: int, state):
+    """
+    The function `replace_state_in_runs` replaces the state at a given position of a run-length encoded
+    list, splitting the run containing it and merging the new state with its neighbours.
+
+    :param runs: The `runs` parameter is a list of `[state, length]` pairs, ordered by time, updated in
+    place
+    :type runs: list
+    :param index: The `index` parameter is the position of the state to replace
+    :type index: int
+    :param state: The `state` parameter is the new state
+    :return: True if the state changed, False otherwise.
+    """
+    # Find the run containing the position
+    start = 0
+    for i, (run_state, length) in enumerate(runs):
+        if index < start + length:
+            break
+        start += length
+    else:
+        raise IndexError(f"State {index} is out of the {start} encoded states.")
+
+    if run_state == state:
+        return False
+
+    # Split the run around the new state
+    before = index - start
+    after = length - before - 1
+    new_runs = [[run_state, before]] if 0 < before else []
+    new_runs.append([state, 1])
+    if 0 < after:
+        new_runs.append([run_state, after])
+
+    # Merge the new state with the previous and next runs of the same state
+    first, last = i, i + 1
+    if before == 0 and 0 < i and runs[i - 1][0] == state:
+        first -= 1
+        new_runs[0][1] += runs[first][1]
+    if after == 0 and last < len(runs) and runs[last][0] == state:
+        new_runs[-1][1] += runs[last][1]
+        last += 1
+
+    runs[first:last] = new_runs
+    return True
+
+
+class TimeSeriesWriter(Writer):
+    def __init__(self, directory, folder_name="timeseries"):
+        """
+        The function initializes a writer storing one time series file by tile in a sub folder of the
+        output directory.
+
+        :param directory: The `directory` parameter is the root output directory. Unlike other writers,
+        it is not changed for each timestamp
+        :param folder_name: The `folder_name` parameter is the name of the sub folder containing all
+        time series files, defaults to "timeseries"
+        """
+        super().__init__(directory)
+
+        self.folder_name = folder_name
+
+        # Time series already loaded or written, by tile index
+        self.time_series_by_tile = dict()
+
+        # Tiles whose series changed since the last flush
+        self.changed_tile_indexes = set()
+
+    def set_directory(self, directory: str):
+        """
+        The function keeps the root directory, because time series are keyed by tile and not by
+        timestamp.
+
+        :param directory: The "directory" parameter is a string that represents the path to a timestamp
+        directory
+        :type directory: str
+        """
+        pass
+
+    def get_path(self, tile_index: int):
+        """
+        The function returns the path of the time series file of a tile.
+
+        :param tile_index: The `tile_index` parameter is an integer that represents the index of the
+        tile
+        :type tile_index: int
+        :return: a Path object that represents the path to the time series file.
+        """
+        return Path(self.directory, self.folder_name, f"{tile_index}.json")
+
+    def get_output_paths(self, tile_index: int):
+        return [self.get_path(tile_index)]
+
+    def is_buffered(self):
+        # Series are only written when the writer is flushed
+        return True
+
+    def create_directory(self):
+        super().create_directory()
+
+        if self.directory is None:
+            return
+
+        Path(self.directory, self.folder_name).mkdir(parents=True, exist_ok=True)
+
+    def export_tileset(self, tileset: TileSet):
+        # Series are written by tile when the writer is flushed, there is no tileset to write
+        super().export_tileset(tileset)
+
+    def get_time_series(self, tile_index: int):
+        """
+        The function returns the time series of a tile, loading a previous export if it exists so a run
+        can be continued.
+
+        :param tile_index: The `tile_index` parameter is an integer that represents the index of the
+        tile
+        :type tile_index: int
+        :return: a dictionary with the ordered `dates` and the run-length encoded `triangles` states.
+        """
+        if tile_index not in self.time_series_by_tile:
+            path = self.get_path(tile_index)
+
+            time_series = {'dates': [], 'triangles': dict()}
+            if path.exists():
+                with open(str(path), 'r') as file:
+                    time_series = json.load(file)
+
+            self.time_series_by_tile[tile_index] = time_series
+
+        return self.time_series_by_tile[tile_index]
+
+    def export_feature_list_by_tile(self, feature_list: FeatureList, tile_index: int):
+        """
+        The function appends the state of each feature to the time series of a tile, written at the
+        next flush.
+
+        :param feature_list: The `feature_list` parameter is an instance of the `FeatureList` class.
+        Each feature must have a `date` and a `bLighted` value in its batch table
+        :type feature_list: FeatureList
+        :param tile_index: The `tile_index` parameter is an integer that represents the index of the
+        tile
+        :type tile_index: int
+        """
+        super().export_feature_list_by_tile(feature_list, tile_index)
+
+        if self.directory is None or len(feature_list) == 0:
+            return
+
+        time_series = self.get_time_series(tile_index)
+        dates = time_series['dates']
+
+        date = feature_list[0].get_batchtable_data()['date']
+
+        # A timestamp exported again (aggregates, resumed or incremental runs...) replaces its states
+        if date in dates:
+            logging.debug(f"Timestamp {date} is already in the time series of tile {tile_index}.")
+            changed = self.replace_timestamp(time_series, dates.index(date), feature_list)
+        else:
+            changed = self.append_timestamp(time_series, date, feature_list, tile_index)
+
+        if changed:
+            self.changed_tile_indexes.add(tile_index)
+
+    def flush(self):
+        """
+        The function writes the time series of each tile changed since the last flush. Each file is
+        written next to the previous one and renamed, so a stopped run never leaves a truncated series.
+        """
+        for tile_index in sorted(self.changed_tile_indexes):
+            path = self.get_path(tile_index)
+            temporary_path = path.with_suffix('.json.tmp')
+
+            with open(str(temporary_path), 'w') as file:
+                json.dump(self.time_series_by_tile[tile_index], file)
+            os.replace(str(temporary_path), str(path))
+
+        self.changed_tile_indexes.clear()
+
+    def replace_timestamp(self, time_series: dict, date_index: int, feature_list: FeatureList):
+        """
+        The function replaces the states of a timestamp already in a time series.
+
+        :param time_series: The `time_series` parameter is the time series of a tile
+        :type time_series: dict
+        :param date_index: The `date_index` parameter is the position of the timestamp in the series
+        :type date_index: int
+        :param feature_list: The `feature_list` parameter is the feature list of the timestamp
+        :type feature_list: FeatureList
+        :return: True if a state changed, False otherwise.
+        """
+        triangles = time_series['triangles']
+
+        changed = False
+        for feature in feature_list:
+            # A new triangle has no result for other timestamps
+            if feature.get_id() not in triangles:
+                triangles[feature.get_id()] = [[None, len(time_series['dates'])]]
+                changed = True
+
+            if replace_state_in_runs(triangles[feature.get_id()], date_index, bool(feature.get_batchtable_data()['bLighted'])):
+                changed = True
+
+        return changed
+
+    def append_timestamp(self, time_series: dict, date: str, feature_list: FeatureList, tile_index: int):
+        """
+        The function appends the states of a new timestamp to a time series.
+
+        :param time_series: The `time_series` parameter is the time series of a tile
+        :type time_series: dict
+        :param date: The `date` parameter is the new timestamp
+        :type date: str
+        :param feature_list: The `feature_list` parameter is the feature list of the timestamp
+        :type feature_list: FeatureList
+        :param tile_index: The `tile_index` parameter is the index of the tile
+        :type tile_index: int
+        :return: True if the timestamp was appended, False otherwise.
+        """
+        dates = time_series['dates']
+        triangles = time_series['triangles']
+
+        if 0 < len(dates) and date < dates[-1]:
+            logging.error(f"Timestamp {date} is older than the last one of tile {tile_index}. Can't export...")
+            return False
+
+        dates.append(date)
+
+        updated_ids = set()
+        for feature in feature_list:
+            runs = triangles.setdefault(feature.get_id(), [])
+
+            # A triangle appearing after the first timestamp has no result before
+            if len(runs) == 0 and 1 < len(dates):
+                runs.append([None, len(dates) - 1])
+
+            append_state_to_runs(runs, bool(feature.get_batchtable_data()['bLighted']))
+            updated_ids.add(feature.get_id())
+
+        # Keep all series aligned on dates when a triangle is missing
+        for id, runs in triangles.items():
+            if id not in updated_ids:
+                append_state_to_runs(runs, None)
+
+        return True
+
+    def close(self):
+        self.flush()
@@ -1,3 +1,4 @@
+import copy
 import logging
 from pathlib import Path
 
@@ -27,6 +28,63 @@ class Writer():
         """
         return False
 
+    def can_read_feature_list(self):
+        """
+        The function "can_read_feature_list" returns if a class can read back an exported feature list by tile.
+        :return: Whetever the class implements `get_feature_list_from_tile`.
+        """
+        return False
+
+    def can_export_tileset(self):
+        """
+        The function "can_export_tileset" returns if a class writes a tileset.json in its directory.
+        :return: Whetever `export_tileset` writes a file.
+        """
+        return False
+
+    def can_export_concurrently(self):
+        """
+        The function "can_export_concurrently" returns if a class can export several tiles at the same time from different threads.
+        A writer can only do it when each tile is exported in its own files, and each thread uses its own `copy` of the writer
+        (copies share read caches, which are thread safe, but not their directory). Writers appending tiles to a shared file
+        can't, their output would depend on the order of threads.
+        :return: Whetever `export_feature_list_by_tile` is thread safe for different tiles.
+        """
+        return False
+
+    def is_buffered(self):
+        """
+        The function "is_buffered" returns if a class keeps exports in memory until it is closed.
+        :return: Whetever the outputs of `export_feature_list_by_tile` are only written by `close`.
+        """
+        return False
+
+    def copy(self):
+        """
+        The function returns a writer exporting like this one in its own directory, so tiles can be
+        exported in several directories from different threads. Read caches are shared with the copy.
+        :return: a `Writer` instance.
+        """
+        return copy.copy(self)
+
+    def get_output_paths(self, tile_index: int):
+        """
+        The function returns the files written by `export_feature_list_by_tile` for a tile in the current directory.
+
+        :param tile_index: The `tile_index` parameter is the index of the tile
+        :type tile_index: int
+        :return: a list of paths, or None if the outputs of a tile can't be separated from other tiles.
+        """
+        return None
+
+    def get_shared_output_paths(self):
+        """
+        The function returns the files of the current directory written by the exports of all tiles,
+        when the outputs of a tile can't be separated from other tiles.
+        :return: a list of paths.
+        """
+        return []
+
     def create_directory(self):
         """
         The function creates a directory.
@@ -67,5 +125,45 @@ class Writer():
             logging.error("Output Directory is undefined. Can't export...")
             return
 
+    def export_feature_chunks_by_tile(self, feature_chunks, tile_index: int):
+        """
+        The function exports the results of a tile given as several feature lists. They are merged in
+        one feature list by default, writers which can append results override it to write each chunk
+        without keeping the whole tile in memory.
+
+        :param feature_chunks: The `feature_chunks` parameter is an iterable of `FeatureList` of the
+        tile, in order
+        :param tile_index: The `tile_index` parameter is the index of the tile
+        :type tile_index: int
+        """
+        feature_list = FeatureList()
+        for feature_chunk in feature_chunks:
+            for feature in feature_chunk:
+                feature_list.append(feature)
+
+        self.export_feature_list_by_tile(feature_list, tile_index)
+
     def get_feature_list_from_tile(self, tile_index: int, root_directory: str):
         pass
+
+    def get_read_cache_statistics(self):
+        """
+        The function returns the statistics of the cache used by `get_feature_list_from_tile`.
+        :return: a dictionary of statistics, or None if the class doesn't cache read back results.
+        """
+        return None
+
+    def wait(self):
+        """
+        The function waits for the exports still in progress, so their outputs are written, and raises
+        the first export error.
+        :return: nothing (None).
+        """
+        pass
+
+    def close(self):
+        """
+        The function ends all exports, waiting for the ones still in progress.
+        :return: nothing (None).
+        """
+        pass
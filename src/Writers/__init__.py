@@ -1,6 +1,13 @@
+from .AsyncWriter import AsyncWriter
 from .TileWriter import TileWriter
+from .SharedGeometryTileWriter import SharedGeometryTileWriter
+from .CompositeWriter import CompositeWriter
 from .CsvWriter import CsvWriter
 from .JsonWriter import JsonWriter
+from .ManifestWriter import ManifestWriter
+from .MetricsWriter import MetricsWriter
+from .ShardWriter import ShardWriter
+from .TimeSeriesWriter import TimeSeriesWriter
 from .Writer import Writer
 
-__all__ = ['TileWriter', 'CsvWriter', 'JsonWriter', 'Writer']
+__all__ = ['AsyncWriter', 'TileWriter', 'SharedGeometryTileWriter', 'CompositeWriter', 'CsvWriter', 'JsonWriter', 'ManifestWriter', 'MetricsWriter', 'ShardWriter', 'TimeSeriesWriter', 'Writer']
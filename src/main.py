@@ -1,189 +1,415 @@
 import argparse
 import logging
+import re
+from collections import namedtuple
 from pathlib import Path
 
 from py3dtilers.TilesetReader.TilesetReader import TilesetTiler
-from py3dtiles import TileSet
-from src import Utils, pySunlight
+from src import SunPosition, Utils, pySunlight
 from src.Aggregators.AggregatorController import \
     AggregatorControllerInBatchTable
-from src.Converters import SunlightToTiler, TilerToSunlight
-from src.TileWrapper import TileWrapper
-from src.Writers import JsonWriter, TileWriter, Writer
-
+from src.Computation import (compute_3DTiles_sunlight,
+                             export_with_triangle_level)
+from src.Converters import SunlightToTiler
+from src.ExtrusionEngine import ExtrusionEngine
+from src.GeometryExport import GeometryExport
+from src.LazyTileset import LazyTileset
+from src.Metrics import metrics
+from src.Profiler import Profiler
+from src.RegionOfInterest import RegionOfInterest
+from src.RunManifest import RunManifest, hash_run
+from src.SceneCache import SceneCache
+from src.SceneChanges import SceneChanges, describe_tiles
+from src.TileHierarchy import TileHierarchy
+from src.TilePool import TilePool
+from src.Writers import (AsyncWriter, CompositeWriter, CsvWriter, JsonWriter,
+                         ManifestWriter, MetricsWriter,
+                         SharedGeometryTileWriter, TileWriter,
+                         TimeSeriesWriter)
+
+# Sun path of Lyon, exported from SunEarthTools in UTC+1
+DEFAULT_SUNPATH = "datas/AnnualSunPath_Lyon.csv"
+
+
+def get_run_parameters(args, tiler: TilesetTiler, scenario_name=None):
+    """
+    The function `get_run_parameters` gathers all parameters changing the results of a run, to
+    identify it in the run manifest.
 
-def export_with_triangle_level(tiler: TilesetTiler, tileset: TileSet):
+    :param args: The `args` parameter is the parsed command line of pySunlight
+    :param tiler: The `tiler` parameter is an instance of the `TilesetTiler` class, containing the
+    arguments of the tileset reader
+    :type tiler: TilesetTiler
+    :param scenario_name: The `scenario_name` parameter is the name of the computed scenario, None
+    without scenarios, defaults to None
+    :return: a dictionary of parameters.
+    """
+    parameters = {
+        'startDate': args.start_date,
+        'endDate': args.end_date,
+        'writers': args.writers,
+        'regionOfInterest': args.roi,
+        'proxyDistance': args.proxy_distance,
+        'conservativeProxies': args.conservative_proxies,
+        'engine': args.engine,
+        'tilerArguments': vars(tiler.args)
+    }
+
+    # Runs with the default sun path keep their identifier
+    if args.sun_source != 'parser' or args.sunpath != DEFAULT_SUNPATH:
+        parameters['sunPositions'] = {'source': args.sun_source, 'sunpath': args.sunpath, 'site': args.site, 'utcOffset': args.utc_offset, 'summerTime': args.summer_time}
+
+    # Dates and sun path of a scenario replace the ones of the command line
+    if scenario_name is not None:
+        scenario = next((scenario for scenario in args.scenarios or [] if scenario.name == scenario_name), None)
+        parameters['scenario'] = {'name': scenario_name} if scenario is None else scenario._asdict()
+
+    return parameters
+
+
+def create_writer(writer_name: str, tiler: TilesetTiler, read_cache_size=None, output_directory=None, encoding_processes=0):
     """
-    The function exports a 3D Tiles file with triangle-level features from a given tileset.
+    The function `create_writer` creates the writer exporting Sunlight results from its name.
 
+    :param writer_name: The `writer_name` parameter is the name of the writer given in command line
+    (json, csv, tile, shared-tile or timeseries)
+    :type writer_name: str
     :param tiler: The `tiler` parameter is an instance of the `TilesetTiler` class. It is used to
-    perform tiling operations on a tileset
+    get the output directory and the arguments required by the tile writer
     :type tiler: TilesetTiler
-    :param tileset: The `tileset` parameter is an instance of the `TileSet` class. It represents a 3D
-    tileset, which is a hierarchical data structure that organizes 3D geometric data into a tree-like
-    structure
-    :type tileset: TileSet
+    :param read_cache_size: The `read_cache_size` parameter is the number of files kept in cache when
+    results are read back for aggregates. Each writer uses its own default when it is None, defaults
+    to None
+    :param output_directory: The `output_directory` parameter is the root directory of results, the
+    output directory of the tiler when it is None, defaults to None
+    :param encoding_processes: The `encoding_processes` parameter is the number of processes encoding
+    the b3dm of the tile writer, tiles are encoded in the exporting thread with 0, defaults to 0
+    :return: a `Writer` instance.
     """
-    # Export a default 3D Tiles containing only geometries
-    geometry_path = Path(tiler.get_output_dir(), "geometry")
-    tile_writer = TileWriter(geometry_path, tiler)
+    output_directory = tiler.get_output_dir() if output_directory is None else output_directory
 
-    all_tiles = tileset.get_root_tile().get_children()
-    for tile_index, tile in enumerate(all_tiles):
+    # Only give cache size to writers when it is defined
+    cache_arguments = dict() if read_cache_size is None else {'read_cache_size': read_cache_size}
 
-        # Set feature level in 3D Tiles as triangles
-        triangle_soup = TilerToSunlight.get_triangle_soup_from_tile(tile, tile_index)
-        feature_list = SunlightToTiler.convert_to_feature_list_with_triangle_level(triangle_soup)
+    if writer_name == 'csv':
+        return CsvWriter(None)
+    if writer_name == 'tile':
+        return TileWriter(None, tiler, encoding_processes=encoding_processes, **cache_arguments)
+    if writer_name == 'shared-tile':
+        # Reference the geometry exported once by export_with_triangle_level, shared by all scenarios
+        return SharedGeometryTileWriter(None, tiler, Path(tiler.get_output_dir(), "geometry"), **cache_arguments)
+    if writer_name == 'timeseries':
+        return TimeSeriesWriter(output_directory)
 
-        tile_writer.export_feature_list_by_tile(feature_list, tile_index)
+    return JsonWriter(None, **cache_arguments)
 
-    tile_writer.export_tileset(tileset)
 
-
-def is_closer(testing_ray_hit, nearest_ray_hit: pySunlight.RayHit):
+def export_aggregates(named_writers: list, output_directory: str, dates: list, num_of_tiles: int, tile_indexes=None, manifest: RunManifest = None, num_workers=0):
     """
-    The function `is_closer` checks if a testing ray hit is closer to the origin than the nearest ray
-    hit.
-
-    :param testing_ray_hit: This parameter represents the result of a ray hit test that is being tested
-    against the current nearest ray hit. It likely contains information about the distance between the
-    ray origin and the hit point, as well as other relevant data
-    :param nearest_ray_hit: The nearest_ray_hit parameter represents the closest ray hit object found so
-    far. It is an object that contains information about the ray hit, such as the distance from the
-    origin of the ray to the hit point
-    :return: a boolean value.
+    The function computes and exports the daily and monthly aggregates of the results of each writer.
+    Each writer reads back its own results to export their aggregates, so the results of a writer are
+    never exported by another one.
+
+    :param named_writers: The `named_writers` parameter is the list of (writer name, writer) tuples of
+    the run. Writers which can't read back their results have no aggregates
+    :type named_writers: list
+    :param output_directory: The `output_directory` parameter is the root directory of results, with
+    one directory by timestamp
+    :type output_directory: str
+    :param dates: The `dates` parameter is the list of computed timestamps
+    :type dates: list
+    :param num_of_tiles: The `num_of_tiles` parameter is the number of tiles of the tileset
+    :type num_of_tiles: int
+    :param tile_indexes: The `tile_indexes` parameter is the list of tiles with results, all tiles when
+    it is None, defaults to None
+    :param manifest: The `manifest` parameter records each aggregated tile of each writer, defaults to
+    None
+    :type manifest: RunManifest
+    :param num_workers: The `num_workers` parameter is the number of threads aggregating tiles in
+    parallel, defaults to 0
     """
-    return not nearest_ray_hit or testing_ray_hit.distance < nearest_ray_hit.distance
+    # We group all dates to compute aggreate on different group (by day and by month)
+    dates_by_month_and_days = Utils.group_dates_by_month_and_days(list(dates))
+
+    for writer_name, writer in named_writers:
+        if not writer.can_read_feature_list():
+            logging.warning(f"The {writer_name} writer can't read back its results, its aggregates are not computed.")
+            continue
+
+        aggregator = AggregatorControllerInBatchTable(output_directory, writer, manifest, num_workers, writer_name)
+        aggregator.compute_and_export(num_of_tiles, dates_by_month_and_days, tile_indexes)
 
+        logging.info(f"Read cache statistics of the {writer_name} writer : {writer.get_read_cache_statistics()}")
 
-def compute_3DTiles_sunlight(tileset: TileSet, sun_datas: pySunlight.SunDatas, writer: Writer):
+
+def produce_3DTiles_sunlight(sun_datas_list: pySunlight.SunDatasList, tiler: TilesetTiler, args=None):
     """
-    The function `compute_3DTiles_sunlight` computes sunlight visibility for each triangle in a 3D
-    tileset and exports the results.
+    The function `produce_3DTiles_sunlight` merges all tiles to create one TileSet, computes 3D Tiles
+    sunlight, and then computes and exports aggregates based on different date groups.
 
-    :param tileset: The `tileset` parameter is an object of type `TileSet`. It represents a collection
-    of tiles that make up a 3D model or scene
-    :type tileset: TileSet
-    :param sun_datas: The `sun_datas` parameter is an object of type `pySunlight.SunDatas`. It contains
-    information about the sun, such as the date and direction
-    :type sun_datas: pySunlight.SunDatas
-    :param writer: The `writer` parameter is an object of the `Writer` class. It is used to export the
-    computed results and the updated `tileset.json` file
-    :type writer: Writer
+    :param sun_datas_list: A list of sun data objects. Each sun data object contains information about
+    the position of the sun at a specific time and location. It can also be a dictionary of lists by
+    scenario name, all computed on the same scene and exported in `<output_dir>/<scenario name>`
+    :type sun_datas_list: pySunlight.SunDatasList
+    :param tiler: The `tiler` parameter is an instance of the `TilesetTiler` class. It is used to
+    perform operations related to tiling and merging tilesets
+    :type tiler: TilesetTiler
+    :param args: The 'args' parameter is an optional argument that can be passed to the function. It is
+    used to provide additional configuration or settings to the function
     """
-    # Loop in tileset.json
-    all_tiles = tileset.get_root_tile().get_children()
-    for tile_index, tile in enumerate(all_tiles):
-        logging.debug(f"Load triangles from tile {tile_index} ...")
+    # Several named scenarios are computed on the same scene, each one in its own output root
+    scenarios = sun_datas_list if isinstance(sun_datas_list, dict) else {None: sun_datas_list}
+
+    # Dump per-stage times and counters at the end of the run and every N tiles, counted from the start
+    # of this run
+    metrics.reset()
+    metrics.configure(args.metrics_output, args.metrics_format, args.metrics_interval)
+
+    # Index the tiles of all inputs under one root, their content is decoded when a tile is converted
+    tileset = LazyTileset(tiler.files)
+
+    # Tiles of the whole tree, indexed once for all timestamps
+    tile_hierarchy = TileHierarchy(tileset)
+    all_tiles = tile_hierarchy.get_tiles()
+    num_of_tiles = tile_hierarchy.get_num_of_tiles()
+
+    # Read triangles from a cache compiled by a previous run with the same inputs
+    scene_cache = None
+    if args.scene_cache is not None:
+        scene_cache = SceneCache(args.scene_cache or SceneCache.get_default_directory(tiler.files))
+        scene_cache.open(all_tiles, tiler.files)
+
+    # Keep decoded tiles between receivers and timestamps under a memory budget
+    tile_pool = None
+    if args.max_memory is not None:
+        tile_pool = TilePool(all_tiles, args.max_memory * 1024 * 1024, scene_cache)
+
+    # Compute and export only tiles containing the region of interest
+    region_of_interest = None
+    receiver_tile_indexes = range(num_of_tiles)
+    if args.roi is not None:
+        region_of_interest = RegionOfInterest.from_coordinates(args.roi)
+        receiver_tile_indexes = region_of_interest.select_tiles(tile_hierarchy, tile_pool, scene_cache)
+
+    # Split extruded features from other features once for all timestamps
+    extrusion_engine = None
+    if args.engine == 'extrusion':
+        extrusion_engine = ExtrusionEngine(all_tiles, tile_pool=tile_pool)
+
+    # Tiles of this run, compared with the previous run of each scenario in incremental runs
+    current_tiles = describe_tiles(all_tiles) if args.incremental else None
+
+    geometry_export = None
+    for scenario_name, scenario_sun_datas_list in scenarios.items():
+        output_directory = get_scenario_output_directory(tiler.get_output_dir(), scenario_name)
+        if scenario_name is not None:
+            logging.info(f"Computes scenario {scenario_name} in {output_directory}.")
+
+        # Metrics of a named scenario are dumped in their own file, then added to the totals of the run
+        run_metrics = None
+        if scenario_name is not None:
+            run_metrics = metrics.reset()
+            metrics.configure(get_scenario_metrics_path(args.metrics_output, scenario_name), args.metrics_format, args.metrics_interval)
+
+        # Record each completed unit to resume the run if it stops. Input changes are handled by tile
+        # in incremental runs, so only parameters identify the run. Inputs are identified by their size
+        # and modification time, so a run doesn't read all of them before starting
+        input_paths = [] if args.incremental else tiler.files
+        manifest = RunManifest(output_directory, hash_run(input_paths, get_run_parameters(args, tiler, scenario_name), read_contents=False))
+        manifest.open(args.resume or args.incremental)
+
+        # Compare input tiles with the previous run to compute only the tiles affected by changes
+        scene_changes = None
+        if args.incremental:
+            scene_changes = SceneChanges(manifest.get_scene(), current_tiles)
+
+            if scene_changes.is_full_recompute():
+                logging.info("Tiles of the previous run can't be matched, all tiles are computed.")
+            else:
+                logging.info(f"Tiles changed since the previous run : {scene_changes.get_changed_tile_indexes()}")
 
-        tile_wrapper = TileWrapper(tile, tile_index)
+        # Units are recorded once written, so the manifest writers are inside writing threads
+        manifest_writers = [ManifestWriter(MetricsWriter(create_writer(writer_name, tiler, args.read_cache_size, output_directory, args.encoding_processes)), manifest, writer_name) for writer_name in args.writers]
+        writers = manifest_writers
 
-        Utils.log_memory_size_in_megabyte(tile_wrapper.get_triangles())
-        logging.debug(f"Successfully load {len(tile_wrapper.get_triangles())} triangles !")
+        # Encode and write results in background threads while computing the next tiles, each writer
+        # having its own threads
+        if 0 < args.writer_threads:
+            writers = [AsyncWriter(writer, args.writer_threads) for writer in writers]
 
-        # Intialize containers
-        results = SunlightToTiler.convert_to_feature_list_with_triangle_level(tile_wrapper.get_triangles())
+        # Export all results of one computation in each writer
+        writer = writers[0] if len(writers) == 1 else CompositeWriter(writers)
 
-        # Record ray hits accross the whole tile comparaison to get the closest intersection
-        ray_hits_by_index = dict()
+        # Export a 3D Tiles containing the geometry if export does not provide geometry export
+        # So we can associate a geometry with a result in vizualisation. Tiles are exported while they
+        # are computed, unchanged tiles of a previous export are skipped. The geometry is shared by
+        # all scenarios
+        if geometry_export is None and not writer.can_export_geometry():
+            geometry_export = GeometryExport(tiler, all_tiles, args.writer_threads)
 
-        # We loop on tiles to compare with triangle in order to load a tile once
-        # and not for each triangle
-        for other_tile_index, other_tile in enumerate(all_tiles):
+        # Compute and export Sunlight for each timestamp
+        for i, sun_datas in enumerate(scenario_sun_datas_list):
+            logging.info(f"Computes Sunlight {i + 1} on {len(scenario_sun_datas_list)} timestamps - {sun_datas.dateStr}.")
 
-            # Avoid to read and convert a tile already loaded with pool system, gain in performance and memory
-            if tile_index == other_tile_index:
-                other_tile_wrapper = tile_wrapper
-            else:
-                other_tile_wrapper = TileWrapper(other_tile, other_tile_index)
+            # Initialize each path
+            CURRENT_OUTPUT_DIRECTORY = Utils.get_output_directory_for_timestamp(output_directory, sun_datas.dateStr)
 
-            for triangle_index, triangle in enumerate(tile_wrapper.get_triangles()):
-                # Don't compute intersection if the triangle is already looking at the ground
-                if not pySunlight.isFacingTheSun(triangle, sun_datas.direction):
-                    # Associate shadow with the same triangle, because there's
-                    # nothing blocking it but itself
-                    temp_feature = results.get_features()[triangle_index]
-                    SunlightToTiler.record_result_in_batch_table(temp_feature, sun_datas.dateStr, False, triangle.getId())
-                    continue
+            writer.set_directory(CURRENT_OUTPUT_DIRECTORY)
 
-                ray = pySunlight.constructRay(triangle, sun_datas.direction)
-                tile_bounding_box_hit = pySunlight.checkIntersectionWith(ray, other_tile_wrapper.get_bounding_box())
+            # Tiles shadowed differently since the previous run are computed again
+            affected_tile_indexes = set()
+            if scene_changes is not None:
+                affected_tile_indexes = set(scene_changes.get_affected_tile_indexes(SunlightToTiler.convert_vec3_to_numpy(sun_datas.direction)))
 
-                # Pool the nearest hit of a previous comparaison to get only the closest
-                nearest_ray_hit = None
-                if triangle_index in ray_hits_by_index:
-                    nearest_ray_hit = ray_hits_by_index[triangle_index]
+            # Skip tiles completely exported by each writer in a previous run
+            tile_indexes = [j for j in receiver_tile_indexes if j in affected_tile_indexes or not all(manifest_writer.is_tile_complete(j) for manifest_writer in manifest_writers)]
+            if len(tile_indexes) == 0 and all(manifest_writer.is_tileset_complete() for manifest_writer in manifest_writers):
+                logging.info(f"Timestamp {sun_datas.dateStr} already computed.")
+                continue
 
-                if 0 < len(tile_bounding_box_hit) and is_closer(tile_bounding_box_hit[0], nearest_ray_hit):
-                    # Sort result by impact distance (from near to far)
-                    triangle_ray_hits = pySunlight.checkIntersectionWith(ray, other_tile_wrapper.get_triangles())
+            # Aggregates of a tile computed again are outdated
+            for tile_index in tile_indexes:
+                for writer_name in args.writers:
+                    if manifest.is_aggregate_complete(tile_index, writer_name):
+                        manifest.record_aggregate(tile_index, False, writer_name)
 
-                    if 0 < len(triangle_ray_hits) and is_closer(triangle_ray_hits[0], nearest_ray_hit):
-                        # We consider the first triangle to be blocking
-                        nearest_ray_hit = triangle_ray_hits[0]
+            writer.create_directory()
 
-                # Record the closest ray hit
-                if nearest_ray_hit is not None:
-                    ray_hits_by_index[triangle_index] = nearest_ray_hit
+            compute_3DTiles_sunlight(tileset, sun_datas, writer, args.prefetch, tile_indexes, region_of_interest, args.proxy_distance, args.conservative_proxies, extrusion_engine, tile_hierarchy, tile_pool, args.hit_buffer_directory, scene_cache, geometry_export)
 
-        logging.info("Exporting result...")
+        if args.with_aggregate:
+            dates = SunlightToTiler.get_dates_from_sun_datas_list(scenario_sun_datas_list)
+            export_aggregates(list(zip(args.writers, writers)), output_directory, dates, num_of_tiles, receiver_tile_indexes, manifest, args.aggregate_workers)
 
-        # Transform collision detection to sunlight result
-        SunlightToTiler.record_results_from_collision(results, ray_hits_by_index, sun_datas.dateStr)
-        writer.export_feature_list_by_tile(results, tile_index)
+        writer.close()
 
-        logging.info("Export finished.")
+        # Next incremental runs are compared with the tiles of this run
+        if scene_changes is not None:
+            manifest.record_scene(current_tiles)
 
-    # Export tileset.json for each timestamp
-    writer.export_tileset(tileset)
-    logging.info("End computation.\n")
+        if run_metrics is not None:
+            metrics.dump()
+            metrics.merge(run_metrics)
+            metrics.configure(args.metrics_output, args.metrics_format, args.metrics_interval)
 
+    # Export the geometry of tiles that were not computed
+    if geometry_export is not None:
+        export_with_triangle_level(tiler, tileset, tile_hierarchy, geometry_export, args.prefetch, tile_pool, scene_cache)
 
-def produce_3DTiles_sunlight(sun_datas_list: pySunlight.SunDatasList, tiler: TilesetTiler, args=None):
+    if tile_pool is not None:
+        logging.info(f"Tile pool statistics : {tile_pool.get_statistics()}")
+
+    logging.info(f"Metrics : {metrics.to_dict()}")
+    metrics.dump()
+
+
+def load_sun_datas(args, sunpath: str, start_date: int, end_date: int):
     """
-    The function `produce_3DTiles_sunlight` merges all tiles to create one TileSet, computes 3D Tiles
-    sunlight, and then computes and exports aggregates based on different date groups.
+    The function loads the sun positions of a date range from the source given in command line : the
+    SunEarthToolsParser, the sun path file read with NumPy, or positions computed for a site.
+
+    :param args: The `args` parameter is the parsed command line of pySunlight
+    :param sunpath: The `sunpath` parameter is the path of the sun path file
+    :type sunpath: str
+    :param start_date: The `start_date` parameter is the first hour since 1970-01-01 00:00
+    :type start_date: int
+    :param end_date: The `end_date` parameter is the end hour of the range
+    :type end_date: int
+    :return: a `pySunlight.SunDatasList`.
+    """
+    if args.sun_source == 'parser':
+        sunParser = pySunlight.SunEarthToolsParser()
+        sunParser.loadSunpathFile(sunpath, start_date, end_date)
 
-    :param sun_datas_list: A list of sun data objects. Each sun data object contains information about
-    the position of the sun at a specific time and location
-    :type sun_datas_list: pySunlight.SunDatasList
-    :param tiler: The `tiler` parameter is an instance of the `TilesetTiler` class. It is used to
-    perform operations related to tiling and merging tilesets
-    :type tiler: TilesetTiler
-    :param args: The 'args' parameter is an optional argument that can be passed to the function. It is
-    used to provide additional configuration or settings to the function
+        # Copy the positions, the parser is released with this function
+        return pySunlight.SunDatasList(sunParser.getSunDatas())
+
+    if args.sun_source == 'numpy':
+        return SunPosition.load_sunpath_file(sunpath, start_date, end_date)
+
+    # Positions are computed for the site of the sun path file by default
+    latitude, longitude = args.site if args.site is not None else SunPosition.read_sunpath_site(sunpath)
+    sun_position_provider = SunPosition.SunPositionProvider(latitude, longitude, args.utc_offset, args.summer_time, cache_directory=args.sun_cache)
+
+    return sun_position_provider.get_sun_datas(start_date, end_date)
+
+
+# A named sun path and date range computed on the same scene as the other scenarios of a run
+Scenario = namedtuple('Scenario', ['name', 'start_date', 'end_date', 'sunpath'])
+
+# Directories of the output directory which can't be the results of a scenario
+RESERVED_SCENARIO_NAMES = ['geometry', 'queue', 'profile']
+
+
+def parse_scenario(value: str):
+    """
+    The function parses a scenario of the command line.
+
+    :param value: The `value` parameter is the scenario, as "name:start:end" or "name:start:end:sunpath"
+    :type value: str
+    :return: a `Scenario`, without sun path when it is not given.
     """
-    # Merge all tiles to create one TileSet
-    tileset = tiler.read_and_merge_tilesets()
-    # writer = CsvWriter()
-    writer = JsonWriter()
-    # writer = TileWriter(None, tiler)
+    fields = value.split(':', 3)
+    if len(fields) < 3 or re.fullmatch(r'[\w.-]+', fields[0]) is None:
+        raise argparse.ArgumentTypeError(f"A scenario is name:start:end[:sunpath] with a name made of letters, digits, '.', '-' or '_', got {value}.")
 
-    # Export a 3D Tiles containing the geometry if export does not provide geometry export
-    # So we can associate a geometry with a result in vizualisation
-    if not writer.can_export_geometry():
-        export_with_triangle_level(tiler, tileset)
+    # The name is a directory of the output directory, compared without case for case-insensitive file systems
+    if fields[0].strip('.') == '' or fields[0].lower() in RESERVED_SCENARIO_NAMES:
+        raise argparse.ArgumentTypeError(f"A scenario name can't be only dots or one of {RESERVED_SCENARIO_NAMES}, got {fields[0]}.")
 
-    # Compute and export Sunlight for each timestamp
-    for i, sun_datas in enumerate(sun_datas_list):
-        logging.info(f"Computes Sunlight {i + 1} on {len(sun_datas_list)} timestamps - {sun_datas.dateStr}.")
+    try:
+        return Scenario(fields[0], int(fields[1]), int(fields[2]), fields[3] if len(fields) == 4 else None)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Start and end dates of a scenario are hours, got {value}.")
 
-        # Initialize each path
-        CURRENT_OUTPUT_DIRECTORY = Utils.get_output_directory_for_timestamp(tiler.get_output_dir(), sun_datas.dateStr)
 
-        writer.set_directory(CURRENT_OUTPUT_DIRECTORY)
-        writer.create_directory()
+def get_scenario_output_directory(root_directory: str, scenario_name=None):
+    """
+    The function returns the root directory of the results of a scenario.
+
+    :param root_directory: The `root_directory` parameter is the output directory of the run
+    :type root_directory: str
+    :param scenario_name: The `scenario_name` parameter is the name of the scenario, None without
+    scenarios, defaults to None
+    :return: a string that represents the root directory of the scenario.
+    """
+    return root_directory if scenario_name is None else f"{root_directory}/{scenario_name}"
+
 
-        compute_3DTiles_sunlight(tileset, sun_datas, writer)
+def get_scenario_metrics_path(metrics_output: str, scenario_name: str):
+    """
+    The function returns the file where the metrics of a scenario are dumped, next to the metrics of the
+    run.
+
+    :param metrics_output: The `metrics_output` parameter is the metrics file of the run, None when
+    metrics are not dumped
+    :type metrics_output: str
+    :param scenario_name: The `scenario_name` parameter is the name of the scenario
+    :type scenario_name: str
+    :return: a Path (ex : metrics.winter.json for metrics.json), or None.
+    """
+    if metrics_output is None:
+        return None
 
-    if args.with_aggregate:
-        aggregator = AggregatorControllerInBatchTable(tiler.get_output_dir(), writer)
+    path = Path(metrics_output)
+    return path.with_name(f"{path.stem}.{scenario_name}{path.suffix}")
 
-        # We group all dates to compute aggreate on different group (by day and by month)
-        dates = SunlightToTiler.get_dates_from_sun_datas_list(sun_datas_list)
-        dates_by_month_and_days = Utils.group_dates_by_month_and_days(dates)
-        num_of_tiles = len(tileset.get_root_tile().get_children())
-        aggregator.compute_and_export(num_of_tiles, dates_by_month_and_days)
+
+def load_scenarios(args):
+    """
+    The function loads the sun positions of each scenario of the command line.
+
+    :param args: The `args` parameter is the parsed command line of pySunlight
+    :return: a dictionary of `pySunlight.SunDatasList` by scenario name.
+    """
+    scenarios = dict()
+    for scenario in args.scenarios:
+        if scenario.name in scenarios:
+            raise ValueError(f"Scenario {scenario.name} is given twice.")
+
+        scenarios[scenario.name] = load_sun_datas(args, scenario.sunpath or args.sunpath, scenario.start_date, scenario.end_date)
+
+    return scenarios
 
 
 def parse_command_line():
@@ -195,14 +421,51 @@ def parse_command_line():
     parser = argparse.ArgumentParser(description='Light pre-calculation based on real data (urban data and sun position) with 3DTiles.')
     parser.add_argument('--paths', '--path', '--db_config_path', '--file_path', '-i', nargs='*', type=str, help='Paths to input files or directories.')
     parser.add_argument('--output_dir', '--out', '-o', nargs='?', type=str, help='Output directory of Sunlight results.')
-    parser.add_argument('--start-date', '-s', dest='start_date', type=int, help='Start date of sunlight computation. Ex : --start-date 403224', required=True)
-    parser.add_argument('--end-date', '-e', dest='end_date', type=int, help='End date of sunlight computation. Ex : --end-date 403248', required=True)  # type: ignore
+    parser.add_argument('--start-date', '-s', dest='start_date', type=int, help='Start date of sunlight computation, required without scenarios. Ex : --start-date 403224')
+    parser.add_argument('--end-date', '-e', dest='end_date', type=int, help='End date of sunlight computation, required without scenarios. Ex : --end-date 403248')  # type: ignore
+    parser.add_argument('--scenario', dest='scenarios', action='append', type=parse_scenario, help='Named sun path and date range, repeated for each scenario computed on the same scene. Results of each scenario are exported in <output_dir>/<name>, the sun path is --sunpath when it is not given. Ex : --scenario winter:403224:403248 --scenario summer:407592:407616:datas/AnnualSunPath_Lyon.csv')
+    parser.add_argument('--sunpath', dest='sunpath', default=DEFAULT_SUNPATH, help=f'SunEarthTools sun path file of the sun positions. Ex : --sunpath datas/AnnualSunPath_Paris.csv, default={DEFAULT_SUNPATH}')
+    parser.add_argument('--sun-source', dest='sun_source', default='parser', choices=['parser', 'numpy', 'solar'], help='Source of sun positions. parser reads the sun path file with Sunlight, numpy reads it at once with NumPy, solar computes positions of the site with the NOAA algorithm. Ex : --sun-source solar, default=parser')
+    parser.add_argument('--site', dest='site', nargs=2, type=float, help='Latitude and longitude in degrees of the site of computed sun positions, default=site of the sun path file. Ex : --site 48.85 2.35')
+    parser.add_argument('--utc-offset', dest='utc_offset', type=float, default=0, help='Offset from UTC in hours of the dates of computed sun positions, out of summer time. The default gives the dates of the parser. Ex : --utc-offset 1, default=0')
+    parser.add_argument('--no-summer-time', dest='summer_time', action='store_false', help='Keep the same offset from UTC during European summer time for computed sun positions. Ex : --no-summer-time')
+    parser.add_argument('--sun-cache', dest='sun_cache', type=str, help='Directory where computed sun positions are cached by site and date range. Ex : --sun-cache /tmp/sun-positions')
+    parser.add_argument('--writer', '--writers', dest='writers', nargs='+', default=['json'], choices=['json', 'csv', 'tile', 'shared-tile', 'timeseries'], help='Formats of Sunlight results, all exported from the same computation. Ex : --writer tile csv, default=json')
+    parser.add_argument('--prefetch', dest='prefetch', type=int, default=2, help='Number of tiles decoded in background during computation, 0 to disable. Ex : --prefetch 4, default=2')
+    parser.add_argument('--writer-threads', dest='writer_threads', type=int, default=1, help='Number of threads writing results during computation, 0 to write synchronously. Ex : --writer-threads 4, default=1')
+    parser.add_argument('--encoding-processes', dest='encoding_processes', type=int, default=0, help='Number of processes encoding the b3dm of the tile writer, tiles are then encoded while the next tiles are computed. 0 encodes tiles one at a time in the writing thread. Ex : --encoding-processes 4, default=0')
+    parser.add_argument('--read-cache-size', dest='read_cache_size', type=int, help='Number of tilesets / batch tables kept in memory when results are read back for aggregates, 0 to disable. Ex : --read-cache-size 8')
     parser.add_argument('--with-aggregate', dest='with_aggregate', action='store_true', help='Add aggregate to 3DTiles export.')
+    parser.add_argument('--aggregate-workers', dest='aggregate_workers', type=int, default=0, help='Number of threads aggregating tiles in parallel, 0 to aggregate tiles one after another. Ex : --aggregate-workers 8, default=0')
+    parser.add_argument('--roi', dest='roi', nargs='+', type=float, help='Region of interest in the tileset CRS, as a bounding box "xmin ymin xmax ymax" or the "x y" vertices of a polygon. Only its triangles are computed. Ex : --roi 1843000 5173000 1844000 5174000')
+    parser.add_argument('--scene-cache', dest='scene_cache', nargs='?', const='', type=str, help='Compile the triangles of the input once in a cache, memory-mapped by later runs and compiled again when the input changes. Stored next to the first input without directory. Ex : --scene-cache /tmp/city.sunlight-cache')
+    parser.add_argument('--max-memory', dest='max_memory', type=int, help='Memory budget in megabytes of decoded tiles kept between comparisons, least recently used tiles are evicted first. Ex : --max-memory 4096')
+    parser.add_argument('--hit-buffer-dir', dest='hit_buffer_directory', type=str, help='Directory where hits of each tile are memory-mapped, to compute very large tiles in bounded memory. Ex : --hit-buffer-dir /tmp/sunlight')
+    parser.add_argument('--engine', dest='engine', default='ray', choices=['ray', 'extrusion'], help='Shadow engine. extrusion computes shadows of extruded (LOD1) features in 2.5D and ray traces other features. Ex : --engine extrusion, default=ray')
+    parser.add_argument('--proxy-distance', dest='proxy_distance', type=float, help='Distance between tiles beyond which occluders are simplified to one box by feature. Ex : --proxy-distance 500')
+    parser.add_argument('--conservative-proxies', dest='conservative_proxies', action='store_true', help='Confirm hits of simplified occluders on their full geometry.')
+    parser.add_argument('--incremental', dest='incremental', action='store_true', help='Compare input tiles with the previous run in the output directory and compute again only changed tiles and the tiles they can shadow.')
+    parser.add_argument('--resume', dest='resume', action='store_true', help='Resume a previous run in the output directory, skipping units recorded as complete in its manifest.')
 
     # Set Logging level for the whole application
+    parser.add_argument('--metrics-output', dest='metrics_output', type=str, help='File where per-stage wall times and counters (rays, box tests, triangle tests, bytes written...) are dumped at the end of the run. Ex : --metrics-output metrics.json')
+    parser.add_argument('--metrics-format', dest='metrics_format', default='json', choices=['json', 'prometheus'], help='Format of the metrics dump. Ex : --metrics-format prometheus, default=json')
+    parser.add_argument('--metrics-interval', dest='metrics_interval', type=int, default=0, help='Number of computed tiles between two metrics dumps, 0 to dump only at the end of the run. Ex : --metrics-interval 10, default=0')
+    parser.add_argument('--profile', dest='profile', choices=['sampling', 'cprofile'], help='Profile the run. sampling records the stacks of all threads with a bounded overhead, cprofile also records the statistics of each function. Ex : --profile sampling')
+    parser.add_argument('--profile-output', dest='profile_output', type=str, help='Directory of the collapsed stacks and statistics of the profile, default=<output_dir>/profile. Ex : --profile-output /tmp/profile')
     parser.add_argument('--log-level', '-log', dest='log_level', default='WARNING', choices=logging._nameToLevel.keys(), help='Provide logging level. Ex : --log-level DEBUG, default=WARNING')
 
-    return parser.parse_known_args()[0]
+    args = parser.parse_known_args()[0]
+
+    # Both tile writers would write the tileset.json of each timestamp
+    if 'tile' in args.writers and 'shared-tile' in args.writers:
+        parser.error("--writer tile and shared-tile can't be exported in the same run")
+
+    # Scenarios give their own dates
+    if args.scenarios is None and (args.start_date is None or args.end_date is None):
+        parser.error("the following arguments are required without --scenario: --start-date/-s, --end-date/-e")
+
+    return args
 
 
 def main():
@@ -210,14 +473,26 @@ def main():
 
     logging.basicConfig(level=args.log_level, format='[%(asctime)s] [%(levelname)s] %(message)s')
 
-    sunParser = pySunlight.SunEarthToolsParser()
-    sunParser.loadSunpathFile("datas/AnnualSunPath_Lyon.csv", args.start_date, args.end_date)
+    if args.scenarios is not None:
+        sun_datas_list = load_scenarios(args)
+    else:
+        sun_datas_list = load_sun_datas(args, args.sunpath, args.start_date, args.end_date)
 
     # Read all tiles in a folder using command line arguments
     tiler = TilesetTiler()
     tiler.parse_command_line()
 
-    produce_3DTiles_sunlight(sunParser.getSunDatas(), tiler, args)
+    # Profile the whole run, with the stages and threads of each sample
+    profiler = None
+    if args.profile is not None:
+        profiler = Profiler(args.profile, args.profile_output or Path(tiler.get_output_dir(), "profile"))
+        profiler.start()
+
+    try:
+        produce_3DTiles_sunlight(sun_datas_list, tiler, args)
+    finally:
+        if profiler is not None:
+            profiler.stop()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,95 @@
+import threading
+import unittest
+from argparse import Namespace
+
+from py3dtilers.TilesetReader.TilesetReader import TilesetTiler
+from src.Aggregators.AggregatorController import \
+    AggregatorControllerInBatchTable
+from src.main import export_aggregates
+from src.Writers import AsyncWriter, TileWriter, Writer
+
+# Test that aggregation workers use one copy of the writer each, and that writers which can't export
+# concurrently export tiles in their order
+
+
+class RecordingWriter(Writer):
+    def __init__(self, concurrent: bool):
+        super().__init__()
+
+        self.concurrent = concurrent
+        self.copies = []
+        self.exported_tile_indexes = []
+        self.lock = threading.Lock()
+
+    def can_read_feature_list(self):
+        return True
+
+    def can_export_concurrently(self):
+        return self.concurrent
+
+    def copy(self):
+        writer_copy = super().copy()
+        self.copies.append(writer_copy)
+
+        return writer_copy
+
+    def get_feature_list_from_tile(self, tile_index: int, root_directory: str):
+        return []
+
+    def export_feature_list_by_tile(self, feature_list, tile_index: int):
+        with self.lock:
+            self.exported_tile_indexes.append(tile_index)
+
+
+class ThreadRecordingTileWriter(TileWriter):
+    def __init__(self, tiler):
+        super().__init__(None, tiler)
+
+        self.thread_names = set()
+        self.lock = threading.Lock()
+        self.other_thread_started = threading.Event()
+
+    def get_feature_list_from_tile(self, tile_index: int, root_directory: str):
+        return []
+
+    def export_feature_list_by_tile(self, feature_list, tile_index: int):
+        with self.lock:
+            self.thread_names.add(threading.current_thread().name)
+            if 1 < len(self.thread_names):
+                self.other_thread_started.set()
+
+        # Keep the first tile in progress until another worker exports a tile
+        self.other_thread_started.wait(timeout=1)
+
+
+class TestAggregatorController(unittest.TestCase):
+    def test_one_writer_copy_by_worker(self):
+        writer = RecordingWriter(concurrent=True)
+        AggregatorControllerInBatchTable('junk', writer, num_workers=2).compute_and_export(6, [[['2016-01-01:0800']]])
+
+        self.assertEqual(len(writer.copies), 2)
+        self.assertEqual(sorted(writer.exported_tile_indexes), [tile_index for tile_index in range(6) for _ in range(2)])
+
+    def test_tile_order_without_concurrent_exports(self):
+        writer = RecordingWriter(concurrent=False)
+        AggregatorControllerInBatchTable('junk', writer, num_workers=4).compute_and_export(6, [[['2016-01-01:0800']]])
+
+        self.assertEqual(len(writer.copies), 0)
+        self.assertEqual(writer.exported_tile_indexes, [tile_index for tile_index in range(6) for _ in range(2)])
+
+    def test_workers_with_the_default_async_writer(self):
+        tiler = TilesetTiler()
+        tiler.args = Namespace(crs_in='EPSG:3946', crs_out='EPSG:3946', offset=[0, 0, 0], with_texture=False, scale=1)
+
+        # Writers of a run are wrapped in an async writer, which must not serialize the aggregation
+        tile_writer = ThreadRecordingTileWriter(tiler)
+        writer = AsyncWriter(tile_writer)
+        export_aggregates([('tile', writer)], 'junk', ['2016-01-01:0800'], 4, num_workers=2)
+        writer.close()
+
+        self.assertTrue(writer.can_export_concurrently())
+        self.assertLess(1, len(tile_writer.thread_names))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import threading
+import time
+import unittest
+
+from py3dtilers.Common import FeatureList
+from src.Writers import AsyncWriter, Writer
+
+# Test that the async writer bounds the number of pending exports, and streams the chunks of a tile
+# to its writer without merging them
+
+
+class BlockingWriter(Writer):
+    def __init__(self):
+        super().__init__()
+
+        self.unblocked = threading.Event()
+        self.exported_tile_indexes = []
+        self.exported_chunks = []
+
+    def export_feature_list_by_tile(self, feature_list, tile_index: int):
+        self.unblocked.wait(timeout=5)
+        self.exported_tile_indexes.append(tile_index)
+
+    def export_feature_chunks_by_tile(self, feature_chunks, tile_index: int):
+        self.exported_chunks.append((tile_index, [feature_list for feature_list in feature_chunks]))
+
+
+class TestAsyncWriter(unittest.TestCase):
+    def test_max_pending_exports(self):
+        blocking_writer = BlockingWriter()
+        writer = AsyncWriter(blocking_writer, max_pending_exports=2)
+
+        queued_tile_indexes = []
+
+        def export():
+            for tile_index in range(5):
+                writer.export_feature_list_by_tile(FeatureList(), tile_index)
+                queued_tile_indexes.append(tile_index)
+
+        exporting_thread = threading.Thread(target=export)
+        exporting_thread.start()
+
+        # The first export is blocked in the writer, the third one waits for a pending slot
+        time.sleep(0.3)
+        self.assertEqual(queued_tile_indexes, [0, 1])
+
+        blocking_writer.unblocked.set()
+        exporting_thread.join(timeout=5)
+        writer.close()
+
+        self.assertEqual(queued_tile_indexes, list(range(5)))
+        self.assertEqual(blocking_writer.exported_tile_indexes, list(range(5)))
+
+    def test_feature_chunks(self):
+        blocking_writer = BlockingWriter()
+        writer = AsyncWriter(blocking_writer)
+
+        feature_chunks = [FeatureList(), FeatureList()]
+        writer.export_feature_chunks_by_tile(iter(feature_chunks), 0)
+
+        # Chunks are given to the writer once exported, the tile is never merged in one feature list
+        self.assertEqual(len(blocking_writer.exported_chunks), 1)
+        self.assertEqual(blocking_writer.exported_chunks[0][0], 0)
+        self.assertEqual([id(feature_list) for feature_list in blocking_writer.exported_chunks[0][1]], [id(feature_list) for feature_list in feature_chunks])
+        self.assertEqual(blocking_writer.exported_tile_indexes, [])
+
+        writer.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+import shutil
+import unittest
+from pathlib import Path
+
+from benchmarks.run_benchmarks import (compare_with_baseline, format_results,
+                                       prepare_case, run_case)
+from benchmarks.SyntheticCity import generate_city
+
+# Smoke test of the benchmark harness on a tiny synthetic city
+
+
+class TestBenchmarks(unittest.TestCase):
+    def test_harness(self):
+        JUNK_DIRECTORY = Path('datas/testing', 'junk_benchmarks')
+        shutil.rmtree(str(JUNK_DIRECTORY), ignore_errors=True)
+        tileset_dir = Path(JUNK_DIRECTORY, 'city')
+
+        city = generate_city(tileset_dir, 1, 1)
+
+        results = dict()
+        for case_name in ['compute-csv', 'aggregate']:
+            prepare_case(case_name, tileset_dir, Path(JUNK_DIRECTORY, case_name))
+            results[case_name] = run_case(case_name, tileset_dir, Path(JUNK_DIRECTORY, case_name))
+            results[case_name]['city'] = city
+
+            self.assertLess(0, results[case_name]['triangles'])
+            self.assertLess(0, results[case_name]['trianglesPerSecond'])
+            self.assertLess(0, results[case_name]['peakRssInMegabytes'])
+            self.assertIn('stages', results[case_name]['metrics'])
+
+        self.assertIn('compute-csv', format_results(results))
+
+        # A baseline twice faster is a regression, a baseline of another city is not compared
+        baseline = {case_name: dict(result, trianglesPerSecond=2 * result['trianglesPerSecond']) for case_name, result in results.items()}
+        self.assertEqual(compare_with_baseline(results, baseline, 0.1), ['compute-csv', 'aggregate'])
+        self.assertEqual(compare_with_baseline(results, results, 0.1), [])
+
+        baseline['aggregate']['city'] = dict(city, numOfTiles=2)
+        self.assertEqual(compare_with_baseline(results, baseline, 0.1), ['compute-csv'])
+
+        shutil.rmtree(str(JUNK_DIRECTORY), ignore_errors=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import csv
+import json
+import shutil
+import unittest
+from argparse import Namespace
+from filecmp import cmp
+from pathlib import Path
+
+from py3dtilers.Common import Feature, FeatureList
+from py3dtilers.TilesetReader.TilesetReader import TilesetTiler
+from src import Utils
+from src.main import export_aggregates
+from src.Writers import (CompositeWriter, CsvWriter, JsonWriter,
+                         SharedGeometryTileWriter, TileWriter)
+
+# Test the export of one computation with several writers, each writer aggregating its own results
+
+TESTING_DIRECTORY = 'datas/testing'
+DATE = "2016-10-01:0700"
+
+
+def create_tiler(output_directory):
+    tiler = TilesetTiler()
+    tiler.args = Namespace(obj=None, loa=None, lod1=False, crs_in='EPSG:3946', crs_out='EPSG:3946', offset=[0, 0, 0], with_texture=False, scale=1, output_dir=output_directory, geometric_error=[None, None, None], kd_tree_max=None, texture_lods=0)
+    return tiler
+
+
+class TestCompositeWriter(unittest.TestCase):
+    def test_json_and_tile_aggregates(self):
+        ORIGINAL_DIRECTORY = Path(TESTING_DIRECTORY, "b3dm_multiple_tileset")
+        JUNK_DIRECTORY = Path(TESTING_DIRECTORY, "junk_composite_json_tile")
+        shutil.rmtree(str(JUNK_DIRECTORY), ignore_errors=True)
+        shutil.copytree(str(Path(ORIGINAL_DIRECTORY, "precomputed_sunlight")), str(JUNK_DIRECTORY))
+
+        tiler = create_tiler(JUNK_DIRECTORY)
+        tiler.files = [ORIGINAL_DIRECTORY]
+        tileset = tiler.read_and_merge_tilesets()
+        num_of_tiles = len(tileset.get_root_tile().get_children())
+
+        # Json results of the same computation, next to the tiles
+        directory = Utils.get_output_directory_for_timestamp(str(JUNK_DIRECTORY), DATE)
+        tile_writer = TileWriter(None, tiler)
+        json_writer = JsonWriter(directory)
+        for tile_index in range(num_of_tiles):
+            json_writer.export_feature_list_by_tile(tile_writer.get_feature_list_from_tile(tile_index, directory), tile_index)
+
+        export_aggregates([('json', json_writer), ('tile', tile_writer)], str(JUNK_DIRECTORY), [DATE], num_of_tiles)
+
+        # Tiles are aggregated from their own results, with their geometry
+        for tile in tileset.get_root_tile().get_children():
+            tile_name = f"2016-10-01__0700/{tile.get_content_uri()}"
+            self.assertTrue(cmp(Path(ORIGINAL_DIRECTORY, "precomputed_aggregate", tile_name), Path(JUNK_DIRECTORY, tile_name)), f"Aggregate of tile {tile.get_content_uri()} differs from the origin")
+
+        with open(str(Path(directory, "0.json")), 'r') as file:
+            self.assertTrue(all('dailyExposurePercent' in batch_table for batch_table in json.load(file).values()))
+
+        shutil.rmtree(str(JUNK_DIRECTORY), ignore_errors=True)
+
+    def test_json_and_csv_aggregates(self):
+        JUNK_DIRECTORY = Path(TESTING_DIRECTORY, "junk_composite_json_csv")
+        shutil.rmtree(str(JUNK_DIRECTORY), ignore_errors=True)
+
+        named_writers = [('json', JsonWriter(None)), ('csv', CsvWriter(None))]
+        writer = CompositeWriter([writer for _, writer in named_writers])
+        writer.set_directory(Utils.get_output_directory_for_timestamp(str(JUNK_DIRECTORY), DATE))
+        writer.create_directory()
+
+        feature_list = FeatureList()
+        for i, state in enumerate([True, False]):
+            feature = Feature(f"Triangle-{i}")
+            feature.add_batchtable_data('date', DATE)
+            feature.add_batchtable_data('bLighted', state)
+            feature.add_batchtable_data('occultingId', "")
+            feature_list.append(feature)
+        writer.export_feature_list_by_tile(feature_list, 0)
+
+        export_aggregates(named_writers, str(JUNK_DIRECTORY), [DATE], 1)
+        writer.close()
+
+        # The csv can't be read back, its rows are not appended again with aggregates
+        with open(str(named_writers[1][1].get_path()), 'r') as file:
+            self.assertEqual(len(list(csv.reader(file))), 2)
+
+        aggregated_feature_list = named_writers[0][1].get_feature_list_from_tile(0, named_writers[0][1].directory)
+        self.assertEqual([feature.get_batchtable_data()['dailyExposurePercent'] for feature in aggregated_feature_list], [100, 0])
+
+        shutil.rmtree(str(JUNK_DIRECTORY), ignore_errors=True)
+
+    def test_tile_and_shared_tile(self):
+        # Both writers would write the tileset.json of each timestamp
+        tiler = create_tiler(Path(TESTING_DIRECTORY, "junk_composite_tiles"))
+
+        with self.assertRaises(ValueError):
+            CompositeWriter([TileWriter(None, tiler), SharedGeometryTileWriter(None, tiler, Path(TESTING_DIRECTORY, "junk_composite_tiles", "geometry"))])
@@ -0,0 +1,56 @@
+import shutil
+import unittest
+from pathlib import Path
+
+from py3dtilers.Common import FeatureList
+
+from benchmarks.SyntheticCity import (ORIGIN, create_building, create_feature,
+                                      write_tileset)
+from src.Computation import compute_3DTiles_sunlight
+from src.LazyTileset import LazyTileset
+from src.Metrics import metrics
+from src.pySunlight import SunDatas, Vec3d
+from src.TileHierarchy import TileHierarchy
+from src.TileWrapper import TileWrapper
+from src.Writers import CsvWriter
+
+# Test that the counters of the computation count each ray tested against each occluder triangle
+
+JUNK_DIRECTORY = Path('datas/testing', 'junk_computation_metrics')
+
+
+class TestComputationMetrics(unittest.TestCase):
+    def setUp(self):
+        shutil.rmtree(str(JUNK_DIRECTORY), ignore_errors=True)
+
+    def tearDown(self):
+        shutil.rmtree(str(JUNK_DIRECTORY), ignore_errors=True)
+
+    def test_triangle_tests(self):
+        feature_list = FeatureList()
+        feature_list.append(create_feature("building", create_building(ORIGIN[0], ORIGIN[1], 10, 10, 20, 1)))
+        write_tileset(str(Path(JUNK_DIRECTORY, "input")), [feature_list])
+
+        tileset = LazyTileset([Path(JUNK_DIRECTORY, "input")])
+        tile_hierarchy = TileHierarchy(tileset)
+        num_of_triangles = len(TileWrapper(tile_hierarchy.get_tiles()[0], 0).get_triangles())
+
+        writer = CsvWriter(str(JUNK_DIRECTORY), 'junk.csv')
+        writer.create_directory()
+
+        metrics.reset()
+        sun_datas = SunDatas("2016-01-01:0800", Vec3d(*ORIGIN), Vec3d(0.748839, -0.630358, 0.204667))
+        compute_3DTiles_sunlight(tileset, sun_datas, writer, tile_hierarchy=tile_hierarchy)
+        writer.close()
+
+        # The only tile is the occluder of its own triangles, its box contains each ray origin
+        num_of_rays = metrics.get_counter('rays')
+        self.assertLess(0, num_of_rays)
+        self.assertEqual(metrics.get_counter('box_tests'), num_of_rays)
+        self.assertEqual(metrics.get_counter('triangle_tests'), num_of_rays * num_of_triangles)
+
+        metrics.reset()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import csv
+import shutil
+import unittest
+from pathlib import Path
+
+import numpy as np
+from py3dtilers.Common import FeatureList
+
+from benchmarks.SyntheticCity import (ORIGIN, create_building, create_feature,
+                                      write_tileset)
+from src import Geometry
+from src.Computation import compute_3DTiles_sunlight
+from src.ExtrusionEngine import ExtrusionEngine
+from src.LazyTileset import LazyTileset
+from src.pySunlight import SunDatas, Vec3d
+from src.TileHierarchy import TileHierarchy
+from src.Writers import CsvWriter
+
+# Test the 2.5D primitives of the extrusion engine, and its shadows compared with the ray engine
+
+JUNK_DIRECTORY = Path('datas/testing', 'junk_extrusion_engine')
+
+
+def create_box(min, max):
+    corners = [[x, y, z] for z in (min[2], max[2]) for y in (min[1], max[1]) for x in (min[0], max[0])]
+    faces = [(0, 2, 1), (1, 2, 3), (4, 5, 6), (5, 7, 6), (0, 1, 4), (1, 5, 4), (2, 6, 3), (3, 6, 7), (0, 4, 2), (2, 4, 6), (1, 3, 5), (3, 7, 5)]
+
+    return np.array([[corners[i] for i in face] for face in faces], dtype=float)
+
+
+class TestExtrusionEngine(unittest.TestCase):
+    def test_extrusion_detection(self):
+        roof_triangle_indexes, min_z, max_z = Geometry.get_extrusion_roof(create_box([0, 0, 0], [10, 10, 20]))
+        self.assertEqual(list(roof_triangle_indexes), [2, 3])
+        self.assertEqual((min_z, max_z), (0, 20))
+
+        # Sloped walls are not an extrusion
+        pyramid = create_box([0, 0, 0], [10, 10, 20])
+        pyramid[pyramid[:, :, 2] == 20, :2] *= 0.5
+        self.assertIsNone(Geometry.get_extrusion_roof(pyramid))
+
+    def test_segment_clipping(self):
+        roof = create_box([0, 0, 0], [10, 10, 20])[[2, 3], :, :2]
+
+        s, triangle_index = Geometry.clip_segment_by_triangles([-10, 5], [10, 5], roof)
+        self.assertAlmostEqual(s, 0.5)
+
+        # Segment inside the roof from its start
+        s, triangle_index = Geometry.clip_segment_by_triangles([5, 5], [8, 8], roof)
+        self.assertAlmostEqual(s, 0)
+
+        self.assertIsNone(Geometry.clip_segment_by_triangles([-10, 5], [-1, 5], roof))
+        self.assertIsNone(Geometry.clip_segment_by_triangles([-10, 11], [20, 11], roof))
+
+    def compute(self, name: str, use_extrusion_engine: bool):
+        tileset = LazyTileset([Path(JUNK_DIRECTORY, "input")])
+        tile_hierarchy = TileHierarchy(tileset)
+        extrusion_engine = ExtrusionEngine(tile_hierarchy.get_tiles()) if use_extrusion_engine else None
+
+        writer = CsvWriter(str(Path(JUNK_DIRECTORY, name)), 'junk.csv')
+        writer.create_directory()
+
+        # The sun comes from the east at 45 degrees
+        sun_datas = SunDatas("2016-01-01:0800", Vec3d(*ORIGIN), Vec3d(np.sqrt(0.5), 0, np.sqrt(0.5)))
+        compute_3DTiles_sunlight(tileset, sun_datas, writer, extrusion_engine=extrusion_engine, tile_hierarchy=tile_hierarchy)
+        writer.close()
+
+        # Lighting and occulting feature by receiver triangle
+        with open(str(writer.get_path()), 'r', newline='') as file:
+            rows = [row[0].split(';') for row in csv.reader(file)]
+
+        return {id: (lighted, occulting_id.split('__')[:2]) for id, _, lighted, occulting_id, _ in rows}
+
+    def test_shadow_of_an_extrusion(self):
+        shutil.rmtree(str(JUNK_DIRECTORY), ignore_errors=True)
+
+        # A low building west of a tower, whose shadow covers it
+        feature_list = FeatureList()
+        feature_list.append(create_feature("low_building", create_building(ORIGIN[0], ORIGIN[1], 10, 10, 10, 1)))
+        feature_list.append(create_feature("tower", create_building(ORIGIN[0] + 30, ORIGIN[1], 10, 10, 40, 1)))
+        write_tileset(str(Path(JUNK_DIRECTORY, "input")), [feature_list])
+
+        ray_results = self.compute("ray", False)
+        extrusion_results = self.compute("extrusion", True)
+
+        self.assertEqual(extrusion_results, ray_results)
+
+        # The roof and the eastern wall of the low building are in the shadow of the tower
+        shadowed_results = [(id, lighted) for id, (lighted, occulting_id) in extrusion_results.items() if 'low_building' in id and 1 < len(occulting_id) and 'tower' in occulting_id[1]]
+        self.assertEqual([lighted for _, lighted in shadowed_results], ['False'] * 4)
+
+        shutil.rmtree(str(JUNK_DIRECTORY), ignore_errors=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
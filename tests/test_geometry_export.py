@@ -0,0 +1,101 @@
+import shutil
+import unittest
+from argparse import Namespace
+from pathlib import Path, PurePosixPath
+
+import numpy as np
+from py3dtilers.TilesetReader.TilesetReader import TilesetReader, TilesetTiler
+from py3dtilers.TilesetReader.tile_to_feature import TileToFeatureList
+from src.Computation import export_with_triangle_level
+from src.Converters import SunlightToTiler
+from src.GeometryExport import GEOMETRY_ARGUMENTS, GeometryExport
+from src.LazyTileset import LazyTileset
+from src.TileHierarchy import TileHierarchy
+from src.TileWrapper import TileWrapper
+
+# Test that the geometry export writes the triangles decoded for the computation, and that it is only
+# written again when the input tiles or the arguments changing the geometry change
+
+TESTING_DIRECTORY = 'datas/testing'
+JUNK_DIRECTORY = Path(TESTING_DIRECTORY, 'junk_geometry_export')
+
+# Another value of each argument changing the geometry
+CHANGED_ARGUMENTS = {
+    'crs_in': 'EPSG:4326',
+    'crs_out': 'EPSG:4978',
+    'offset': [1, 0, 0],
+    'scale': 2,
+    'with_texture': True,
+    'lod1': True,
+    'loa': 'junk_loa'
+}
+
+
+def create_tiler(**arguments):
+    tiler = TilesetTiler()
+    tiler.args = Namespace(obj=None, loa=None, lod1=False, crs_in='EPSG:3946', crs_out='EPSG:3946', offset=[0, 0, 0], with_texture=False, scale=1, output_dir=JUNK_DIRECTORY, geometric_error=[None, None, None], kd_tree_max=None, texture_lods=0)
+    vars(tiler.args).update(arguments)
+
+    return tiler
+
+
+class TestGeometryExport(unittest.TestCase):
+    def setUp(self):
+        shutil.rmtree(str(JUNK_DIRECTORY), ignore_errors=True)
+
+        self.tileset = LazyTileset([Path(TESTING_DIRECTORY, 'b3dm_tileset')])
+        self.all_tiles = TileHierarchy(self.tileset).get_tiles()
+
+    def tearDown(self):
+        shutil.rmtree(str(JUNK_DIRECTORY), ignore_errors=True)
+
+    def export(self, tiler):
+        geometry_export = GeometryExport(tiler, self.all_tiles, num_threads=0)
+        pending_tile_indexes = [tile_index for tile_index in range(len(self.all_tiles)) if geometry_export.is_pending(tile_index)]
+        export_with_triangle_level(tiler, self.tileset, geometry_export=geometry_export)
+
+        return pending_tile_indexes
+
+    def test_reuse_of_unchanged_tiles(self):
+        tiler = create_tiler()
+        self.assertEqual(self.export(tiler), list(range(len(self.all_tiles))))
+
+        output_paths = [path for tile_index in range(len(self.all_tiles)) for path in GeometryExport(tiler, self.all_tiles, 0).tile_writer.get_output_paths(tile_index)]
+        modification_times = [path.stat().st_mtime_ns for path in output_paths]
+
+        # The same geometry is not written again
+        self.assertEqual(self.export(tiler), [])
+        self.assertEqual([path.stat().st_mtime_ns for path in output_paths], modification_times)
+
+        # Arguments which don't change the geometry keep the previous export
+        self.assertEqual(self.export(create_tiler(kd_tree_max=10)), [])
+
+    def test_invalidation_by_geometry_arguments(self):
+        self.export(create_tiler())
+
+        self.assertEqual(sorted(CHANGED_ARGUMENTS), sorted(GEOMETRY_ARGUMENTS))
+        for name, value in CHANGED_ARGUMENTS.items():
+            geometry_export = GeometryExport(create_tiler(**{name: value}), self.all_tiles, num_threads=0)
+            self.assertTrue(all(geometry_export.is_pending(tile_index) for tile_index in range(len(self.all_tiles))), f"Changing {name} must export the geometry again")
+
+    def test_geometry_of_the_computation(self):
+        tiler = create_tiler()
+        self.export(tiler)
+
+        exported_tileset = TilesetReader().read_tileset(Path(JUNK_DIRECTORY, "geometry"))
+        exported_tiles = {PurePosixPath(tile.get_content_uri()): tile for tile in TileHierarchy(exported_tileset).get_tiles()}
+
+        for tile_index, tile in enumerate(self.all_tiles):
+            triangles = TileWrapper(tile, tile_index).get_triangles()
+            exported_tile = exported_tiles[PurePosixPath(f"tiles/{tile_index}.b3dm")]
+
+            # One feature by triangle, identified by the triangle decoded for the computation
+            self.assertEqual([feature.get_id() for feature in TileToFeatureList(exported_tile)], [triangle.getId() for triangle in triangles])
+
+            vertices = [SunlightToTiler.convert_to_tiler_triangle(triangle) for triangle in triangles]
+            exported_vertices = [SunlightToTiler.convert_to_tiler_triangle(triangle) for triangle in TileWrapper(exported_tile, tile_index).get_triangles()]
+            np.testing.assert_allclose(np.array(exported_vertices), np.array(vertices), atol=1e-2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import shutil
+import unittest
+from pathlib import Path
+
+from src.HitBuffer import NO_HIT, NOT_FACING, HitBuffer
+from src.pySunlight import Triangle, TriangleSoup, Vec3d
+
+# Test that only the nearest hit of each triangle is kept, in memory or memory-mapped
+
+
+class Hit():
+    def __init__(self, distance: float, occluder_id: str):
+        self.distance = distance
+        self.triangle = Triangle(Vec3d(0, 0, 0), Vec3d(1, 0, 0), Vec3d(0, 1, 0), occluder_id, "tile")
+
+
+class TestHitBuffer(unittest.TestCase):
+    def check_nearest_hits(self, hit_buffer: HitBuffer):
+        hit_buffer.record_hit(0, Hit(10, "far"))
+        hit_buffer.record_hit(0, Hit(5, "near"))
+        hit_buffer.record_hit(0, Hit(5, "same distance"))
+        hit_buffer.record_hit(1, Hit(10, "far"))
+        hit_buffer.record_not_facing(2)
+
+        self.assertEqual(hit_buffer.get_nearest_distance(0), 5)
+        self.assertEqual(hit_buffer.occluder_ids[hit_buffer.occluder_codes[0]], "near")
+        self.assertEqual(hit_buffer.occluder_ids[hit_buffer.occluder_codes[1]], "far")
+        self.assertEqual(hit_buffer.occluder_codes[2], NOT_FACING)
+        self.assertEqual(hit_buffer.occluder_codes[3], NO_HIT)
+        self.assertEqual(len(hit_buffer.occluder_ids), 2)
+
+    def test_in_memory(self):
+        self.check_nearest_hits(HitBuffer(4))
+
+    def test_memory_mapped(self):
+        JUNK_DIRECTORY = Path('datas/testing', 'junk_hit_buffer')
+        shutil.rmtree(str(JUNK_DIRECTORY), ignore_errors=True)
+
+        hit_buffer = HitBuffer(4, JUNK_DIRECTORY)
+        self.check_nearest_hits(hit_buffer)
+
+        hit_buffer.close()
+        self.assertEqual(list(JUNK_DIRECTORY.iterdir()), [])
+
+    def test_feature_chunks(self):
+        JUNK_DIRECTORY = Path('datas/testing', 'junk_hit_buffer_chunks')
+        shutil.rmtree(str(JUNK_DIRECTORY), ignore_errors=True)
+
+        triangle_soup = TriangleSoup()
+        for i in range(5):
+            triangle_soup.push_back(Triangle(Vec3d(i, 0, 0), Vec3d(i + 1, 0, 0), Vec3d(i, 1, 0), f"receiver_{i}", "tile"))
+
+        with HitBuffer(len(triangle_soup), JUNK_DIRECTORY) as hit_buffer:
+            hit_buffer.record_hit(1, Hit(10, "far"))
+            hit_buffer.record_not_facing(3)
+
+            feature_chunks = hit_buffer.get_feature_chunks(triangle_soup, "2016-01-01__0800", chunk_size=2)
+            self.assertEqual([len(feature_list) for feature_list in feature_chunks], [2, 2, 1])
+
+            # Chunks can be iterated again by another writer
+            results = [feature.get_batchtable_data() for feature_list in feature_chunks for feature in feature_list]
+            self.assertEqual([result['bLighted'] for result in results], [True, False, True, False, True])
+            self.assertEqual(results[1]['occultingId'], "far")
+            self.assertEqual(results[3]['occultingId'], "receiver_3")
+
+        # Memory-mapped arrays are removed when the buffer is left
+        self.assertEqual(list(JUNK_DIRECTORY.iterdir()), [])
@@ -5,9 +5,13 @@ from pathlib import Path
 
 from py3dtilers.TilesetReader.TilesetReader import TilesetTiler
 from py3dtiles import TilesetReader
-from src.main import compute_3DTiles_sunlight
+from src.LazyTileset import LazyTileset
+from src.Computation import compute_3DTiles_sunlight
+from src.SceneCache import SceneCache
+from src.SunlightEngine import SunlightEngine
+from src.TileHierarchy import TileHierarchy
 from src.pySunlight import SunDatas, Vec3d
-from src.Writers import CsvWriter, TileWriter
+from src.Writers import AsyncWriter, CsvWriter, TileWriter
 from src.Aggregators.AggregatorController import AggregatorControllerInBatchTable
 import shutil
 
@@ -33,10 +37,66 @@ class TestIdenticalResult(unittest.TestCase):
 
         self.assertTrue(cmp(original_file_path, computed_file_path), 'Computation differs from the origin')
 
+    def test_identical_result_with_scene_cache(self):
+        TESTING_DIRECTORY = 'datas/testing'
+        INPUT_DIRECTORY = Path(TESTING_DIRECTORY, 'b3dm_tileset')
+        JUNK_DIRECTORY = Path(TESTING_DIRECTORY, 'junk_scene_cache')
+
+        tileset = TilesetReader().read_tileset(f'{INPUT_DIRECTORY}/')
+        sun_datas = SunDatas("2016-01-01:0800", Vec3d(1888857.649890, 5136065.174273, 12280.013599), Vec3d(0.748839, -0.630358, 0.204667))
+        writer = CsvWriter(str(JUNK_DIRECTORY), 'junk.csv')
+        writer.create_directory()
+
+        # Compile the cache, then compute from the memory-mapped cache
+        SceneCache(Path(JUNK_DIRECTORY, 'cache')).open(TileHierarchy(tileset).get_tiles(), [INPUT_DIRECTORY])
+
+        lazy_tileset = LazyTileset([INPUT_DIRECTORY])
+        tile_hierarchy = TileHierarchy(lazy_tileset)
+        scene_cache = SceneCache(Path(JUNK_DIRECTORY, 'cache'))
+        scene_cache.open(tile_hierarchy.get_tiles(), [INPUT_DIRECTORY])
+
+        compute_3DTiles_sunlight(lazy_tileset, sun_datas, writer, tile_hierarchy=tile_hierarchy, scene_cache=scene_cache)
+
+        original_file_path = str(Path(TESTING_DIRECTORY, 'original.csv'))
+        self.assertTrue(cmp(original_file_path, str(writer.get_path())), 'Computation from the scene cache differs from the origin')
+
+        # No b3dm is decoded when the cache is valid
+        self.assertTrue(all(tile.content_reference is None for tile in tile_hierarchy.get_tiles()))
+
+        shutil.rmtree(str(JUNK_DIRECTORY), ignore_errors=True)
+
+    def test_identical_result_with_engine(self):
+        TESTING_DIRECTORY = 'datas/testing'
+        JUNK_DIRECTORY = Path(TESTING_DIRECTORY, 'junk_engine')
+
+        tileset = TilesetReader().read_tileset(f'{TESTING_DIRECTORY}/b3dm_tileset/')
+        sun_datas = SunDatas("2016-01-01:0800", Vec3d(1888857.649890, 5136065.174273, 12280.013599), Vec3d(0.748839, -0.630358, 0.204667))
+
+        # The prepared scene is reused by each computation
+        engine = SunlightEngine(tileset)
+        engine.prepare()
+
+        for i in range(2):
+            writer = CsvWriter(str(Path(JUNK_DIRECTORY, str(i))), 'junk.csv')
+            writer.create_directory()
+            engine.compute([sun_datas], writer)
+
+            original_file_path = str(Path(TESTING_DIRECTORY, 'original.csv'))
+            self.assertTrue(cmp(original_file_path, str(writer.get_path())), f'Computation {i} of the engine differs from the origin')
+
+        shutil.rmtree(str(JUNK_DIRECTORY), ignore_errors=True)
+
     def test_identical_result_in_tiles(self):
+        self.check_identical_tiles('junk_computation')
+
+    def test_identical_result_with_encoding_processes(self):
+        # Tiles exported by several threads are encoded at the same time in a process pool
+        self.check_identical_tiles('junk_encoding_processes', encoding_processes=2)
+
+    def check_identical_tiles(self, junk_directory_name, encoding_processes=0):
         TESTING_DIRECTORY = 'datas/testing'
         ORIGINAL_DIRECTORY = Path(TESTING_DIRECTORY, "b3dm_multiple_tileset")
-        JUNK_DIRECTORY = Path(TESTING_DIRECTORY, 'junk_computation')
+        JUNK_DIRECTORY = Path(TESTING_DIRECTORY, junk_directory_name)
 
         # Define basic input
         sun_datas = SunDatas("2016-10-01:0700", Vec3d(1901882.337616, 5166061.119860, 13415.421495), Vec3d(0.965917, -0.130426, 0.223590))
@@ -46,11 +106,14 @@ class TestIdenticalResult(unittest.TestCase):
         tiler.args = Namespace(obj=None, loa=None, lod1=False, crs_in='EPSG:3946', crs_out='EPSG:3946', offset=[0, 0, 0], with_texture=False, scale=1, output_dir=JUNK_DIRECTORY, geometric_error=[None, None, None], kd_tree_max=None, texture_lods=0)
         tileset = TilesetReader().read_tileset(f'{ORIGINAL_DIRECTORY}/original/')
 
-        writer = TileWriter(JUNK_DIRECTORY, tiler)
+        writer = TileWriter(JUNK_DIRECTORY, tiler, encoding_processes=encoding_processes)
+        if 0 < encoding_processes:
+            writer = AsyncWriter(writer, encoding_processes)
         writer.create_directory()
 
         # Compute result
         compute_3DTiles_sunlight(tileset, sun_datas, writer)
+        writer.close()
 
         # Compare result
         for tile in tileset.get_root_tile().get_children():
@@ -62,11 +125,17 @@ class TestIdenticalResult(unittest.TestCase):
 
     def test_identical_result_with_aggregate(self):
         # Trigger bug describe here : https://github.com/VCityTeam/pySunlight/issues/7
+        self.check_identical_aggregate("junk_aggregate_result")
+
+    def test_identical_result_with_parallel_aggregate(self):
+        # Tiles aggregated in parallel export the same results in each timestamp directory
+        self.check_identical_aggregate("junk_parallel_aggregate_result", num_workers=2)
 
+    def check_identical_aggregate(self, junk_directory_name, num_workers=0):
         # Path of exported result
         TESTING_DIRECTORY = 'datas/testing'
         ORIGINAL_DIRECTORY = Path(TESTING_DIRECTORY, "b3dm_multiple_tileset")
-        JUNK_DIRECTORY = Path(TESTING_DIRECTORY, "junk_aggregate_result")
+        JUNK_DIRECTORY = Path(TESTING_DIRECTORY, junk_directory_name)
 
         # Copy precomputed tileset to recompute and export aggregate on it
         shutil.copytree(str(Path(ORIGINAL_DIRECTORY, "precomputed_sunlight")), str(JUNK_DIRECTORY), dirs_exist_ok=True)
@@ -81,7 +150,7 @@ class TestIdenticalResult(unittest.TestCase):
 
         # Compute and export aggregate
         num_of_tiles = len(tileset.get_root_tile().get_children())
-        aggregator = AggregatorControllerInBatchTable(tiler.get_output_dir(), tile_writer)
+        aggregator = AggregatorControllerInBatchTable(tiler.get_output_dir(), tile_writer, num_workers=num_workers)
         aggregator.compute_and_export(num_of_tiles, dates_by_month_and_days=[[['2016-10-01:0700']]])
 
         # Compare result
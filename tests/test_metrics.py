@@ -0,0 +1,64 @@
+import json
+import shutil
+import unittest
+from pathlib import Path
+
+from src.Metrics import Metrics
+
+# Test that stage times and counters are recorded and dumped in JSON and Prometheus text
+
+
+class TestMetrics(unittest.TestCase):
+    def test_stages_and_counters(self):
+        metrics = Metrics()
+
+        with metrics.time('intersect'):
+            pass
+        metrics.add_time('intersect', 2.0)
+        metrics.increment('rays', 10)
+        metrics.increment('rays', 5)
+
+        content = metrics.to_dict()
+        self.assertEqual(content['stages']['intersect']['count'], 2)
+        self.assertGreaterEqual(content['stages']['intersect']['seconds'], 2.0)
+        self.assertEqual(content['counters'], {'rays': 15})
+
+        prometheus = metrics.to_prometheus()
+        self.assertIn('sunlight_stage_calls_total{stage="intersect"} 2', prometheus)
+        self.assertIn('sunlight_rays_total 15', prometheus)
+
+    def test_reset_and_merge(self):
+        metrics = Metrics()
+        metrics.add_time('load', 1.0)
+        metrics.increment('rays', 10)
+
+        # Metrics of a scenario are counted from zero, then added to the totals
+        run_metrics = metrics.reset()
+        self.assertEqual(metrics.to_dict(), {'stages': {}, 'counters': {}})
+
+        metrics.add_time('load', 2.0)
+        metrics.increment('rays', 5)
+        metrics.increment('tiles')
+        self.assertEqual(metrics.get_counter('rays'), 5)
+
+        metrics.merge(run_metrics)
+        content = metrics.to_dict()
+        self.assertEqual(content['stages']['load'], {'count': 2, 'seconds': 3.0})
+        self.assertEqual(content['counters'], {'rays': 15, 'tiles': 1})
+
+    def test_dump_every_n_tiles(self):
+        JUNK_DIRECTORY = Path('datas/testing', 'junk_metrics')
+        shutil.rmtree(str(JUNK_DIRECTORY), ignore_errors=True)
+        output_path = Path(JUNK_DIRECTORY, 'metrics.json')
+
+        metrics = Metrics()
+        metrics.configure(output_path, 'json', 2)
+
+        metrics.record_computed_tile()
+        self.assertFalse(output_path.exists())
+
+        metrics.record_computed_tile()
+        with open(str(output_path), 'r') as file:
+            self.assertEqual(json.load(file)['counters']['tiles'], 2)
+
+        shutil.rmtree(str(JUNK_DIRECTORY), ignore_errors=True)
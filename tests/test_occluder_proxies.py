@@ -0,0 +1,138 @@
+import shutil
+import unittest
+from pathlib import Path
+
+import numpy as np
+from py3dtilers.Common import FeatureList
+
+from benchmarks.SyntheticCity import (ORIGIN, create_building, create_feature,
+                                      write_tileset)
+from src.Converters import SunlightToTiler
+from src.LazyTileset import LazyTileset
+from src.OccluderProxies import OccluderProxies
+from src.pySunlight import (Triangle, Vec3d, checkIntersectionWith,
+                            constructRay)
+from src.TileHierarchy import TileHierarchy
+from src.TilePool import TilePool
+from src.TileWrapper import TileWrapper
+
+# Test the boxes replacing distant occluders, and the confirmation of their hits on the triangles of
+# their feature in conservative mode
+
+JUNK_DIRECTORY = Path('datas/testing', 'junk_occluder_proxies')
+
+
+def create_ray(point, direction):
+    # Small horizontal receiver triangle around the origin of the ray
+    point = ORIGIN + np.array(point, dtype=float)
+    triangle = Triangle(Vec3d(*point), Vec3d(point[0] + 0.01, point[1], point[2]), Vec3d(point[0], point[1] + 0.01, point[2]))
+
+    return constructRay(triangle, Vec3d(*direction))
+
+
+def get_box_hits_by_brute_force(proxies: OccluderProxies, ray):
+    origin = SunlightToTiler.convert_vec3_to_numpy(ray.origin)
+    direction = SunlightToTiler.convert_vec3_to_numpy(ray.direction)
+
+    # Intersection of the ray with the box of each feature, one box at a time
+    hits = []
+    for box_index, (min, max) in enumerate(zip(proxies.mins, proxies.maxs)):
+        t_near, t_far = -np.inf, np.inf
+        for axis in range(3):
+            if direction[axis] == 0:
+                if not (min[axis] <= origin[axis] <= max[axis]):
+                    t_near, t_far = np.inf, -np.inf
+                continue
+
+            t1 = (min[axis] - origin[axis]) / direction[axis]
+            t2 = (max[axis] - origin[axis]) / direction[axis]
+            t_near, t_far = np.maximum(t_near, np.minimum(t1, t2)), np.minimum(t_far, np.maximum(t1, t2))
+
+        if t_near <= t_far and 0 < t_far:
+            hits.append((np.maximum(t_near, 0), box_index))
+
+    return [box_index for _, box_index in sorted(hits)], [distance for distance, _ in sorted(hits)]
+
+
+class TestOccluderProxies(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        shutil.rmtree(str(JUNK_DIRECTORY), ignore_errors=True)
+
+        # A box building, and a feature made of two boxes with an empty street between them
+        feature_list = FeatureList()
+        feature_list.append(create_feature("building", create_building(ORIGIN[0], ORIGIN[1], 10, 10, 20, 1)))
+        feature_list.append(create_feature("two_buildings", create_building(ORIGIN[0] + 30, ORIGIN[1], 5, 10, 20, 1) + create_building(ORIGIN[0] + 45, ORIGIN[1], 5, 10, 20, 1)))
+        write_tileset(str(JUNK_DIRECTORY), [feature_list])
+
+        cls.tileset = LazyTileset([JUNK_DIRECTORY])
+        cls.tile = TileHierarchy(cls.tileset).get_tiles()[0]
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(str(JUNK_DIRECTORY), ignore_errors=True)
+
+    def test_box_hits(self):
+        proxies = OccluderProxies(self.tile, 0)
+        self.assertEqual(len(proxies.mins), 2)
+
+        rays = [
+            # Crossing both features from the west, in a plane parallel to the slabs along y
+            create_ray([-20, 5, 10], [1, 0, 0]),
+            # Crossing both features with a slope
+            create_ray([-20, 2, 1], [0.9, 0.1, 0.3]),
+            # Going away from the features
+            create_ray([-20, 5, 10], [-1, 0, 0.2]),
+            # Above the features
+            create_ray([-20, 5, 30], [1, 0, 0]),
+            # Starting inside the box of the second feature
+            create_ray([40, 5, 10], [0, 0, 1])
+        ]
+
+        for ray in rays:
+            hit_indexes, distances = proxies.get_box_hits(ray)
+            expected_hit_indexes, expected_distances = get_box_hits_by_brute_force(proxies, ray)
+
+            self.assertEqual(list(hit_indexes), expected_hit_indexes)
+            np.testing.assert_allclose(distances, expected_distances)
+
+        self.assertEqual(list(proxies.get_box_hits(rays[0])[0]), [0, 1])
+        self.assertEqual(list(proxies.get_box_hits(rays[2])[0]), [])
+        self.assertEqual(list(proxies.get_box_hits(rays[4])[0]), [1])
+
+        # Excluded features have no box
+        self.assertEqual(len(OccluderProxies(self.tile, 0, excluded_feature_ids={"building"}).mins), 1)
+
+    def test_conservative_hits(self):
+        proxies = OccluderProxies(self.tile, 0)
+        conservative_proxies = OccluderProxies(self.tile, 0, conservative=True)
+        triangles = TileWrapper(self.tile, 0).get_triangles()
+
+        # The ray crosses the box of the two buildings in the street between them
+        ray = create_ray([40, -20, 10], [0, 1, 0.1])
+        self.assertEqual(len(proxies.check_intersection_with(ray)), 1)
+        self.assertEqual(len(conservative_proxies.check_intersection_with(ray)), 0)
+        self.assertEqual(len(checkIntersectionWith(ray, triangles)), 0)
+
+        # The ray crosses the building, the hit is the first triangle hit on the full geometry
+        ray = create_ray([5, -20, 10], [0, 1, 0.1])
+        conservative_hits = conservative_proxies.check_intersection_with(ray)
+        triangle_hits = checkIntersectionWith(ray, triangles)
+
+        self.assertEqual(len(conservative_hits), 1)
+        self.assertAlmostEqual(conservative_hits[0].distance, triangle_hits[0].distance, places=5)
+        self.assertEqual(conservative_hits[0].triangle.getId(), triangle_hits[0].triangle.getId())
+
+    def test_pooled_proxies(self):
+        tile_pool = TilePool([self.tile], 1024 * 1024)
+
+        # Proxies are built once and kept apart from the tile wrapper
+        proxies = tile_pool.load_occluder_proxies(0)
+        self.assertIs(tile_pool.load_occluder_proxies(0), proxies)
+        self.assertIsNot(tile_pool.load_occluder_proxies(0, conservative=True), proxies)
+        self.assertLess(0, proxies.get_memory_size())
+        self.assertEqual(tile_pool.get_statistics()['hits'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
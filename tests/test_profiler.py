@@ -0,0 +1,48 @@
+import json
+import shutil
+import time
+import unittest
+from pathlib import Path
+
+from src.Metrics import metrics
+from src.Profiler import Profiler
+
+# Test that samples are tagged with their thread and stage, and written as collapsed stacks
+
+
+def busy_wait(seconds: float):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+class TestProfiler(unittest.TestCase):
+    def check_profile(self, mode: str):
+        JUNK_DIRECTORY = Path('datas/testing', f'junk_profile_{mode}')
+        shutil.rmtree(str(JUNK_DIRECTORY), ignore_errors=True)
+
+        profiler = Profiler(mode, JUNK_DIRECTORY, 0.001)
+        profiler.start()
+        with metrics.time('intersect'):
+            busy_wait(0.2)
+        profiler.stop()
+
+        with open(str(Path(JUNK_DIRECTORY, "profile.json")), 'r') as file:
+            summary = json.load(file)
+        self.assertLess(0, summary['samplesByStage']['intersect'])
+        self.assertLess(0, summary['samplesByThread']['MainThread'])
+
+        with open(str(Path(JUNK_DIRECTORY, "profile.collapsed")), 'r') as file:
+            lines = file.read().splitlines()
+        self.assertTrue(any(line.startswith('MainThread;intersect;') and 'busy_wait' in line for line in lines))
+
+        # Deterministic statistics of all threads are merged
+        self.assertEqual(mode == 'cprofile', Path(JUNK_DIRECTORY, "profile.pstats").exists())
+
+        shutil.rmtree(str(JUNK_DIRECTORY), ignore_errors=True)
+
+    def test_sampling(self):
+        self.check_profile('sampling')
+
+    def test_cprofile(self):
+        self.check_profile('cprofile')
@@ -0,0 +1,53 @@
+import threading
+import unittest
+
+from src.QueryBatcher import LatencyRecorder, QueryBatcher
+
+# Test that concurrent queries are answered together by sun direction, and latency percentiles
+
+
+class TestQueryBatcher(unittest.TestCase):
+    def test_group_by_direction(self):
+        batcher = QueryBatcher(batch_window=0.2)
+        answered_directions = []
+        lock = threading.Lock()
+
+        def answer(direction_key, value):
+            with lock:
+                answered_directions.append(direction_key)
+            return value * 2
+
+        # Directions alternate in arrival order, and are answered one after the other
+        futures = [batcher.submit(direction_key, answer, direction_key, i) for i, direction_key in enumerate(['a', 'b', 'a', 'b', 'a'])]
+        batcher.start()
+
+        self.assertEqual([future.result() for future in futures], [0, 2, 4, 6, 8])
+        self.assertEqual(answered_directions, ['a', 'a', 'a', 'b', 'b'])
+        self.assertEqual(batcher.get_statistics(), {'batches': 1, 'directionGroups': 2})
+
+        batcher.stop()
+
+    def test_failed_query(self):
+        batcher = QueryBatcher()
+        batcher.start()
+
+        future = batcher.submit('a', int, 'not a number')
+        with self.assertRaises(ValueError):
+            future.result()
+        self.assertEqual(batcher.submit('a', int, '3').result(), 3)
+
+        batcher.stop()
+
+    def test_latency_percentiles(self):
+        recorder = LatencyRecorder(max_samples=100)
+        self.assertEqual(recorder.get_statistics(), {'queries': 0})
+
+        for i in range(1, 201):
+            recorder.record(i / 1000)
+
+        statistics = recorder.get_statistics()
+        self.assertEqual(statistics['queries'], 200)
+
+        # Only the most recent latencies are kept, from 101 to 200 milliseconds
+        self.assertAlmostEqual(statistics['p50Ms'], 150.5)
+        self.assertAlmostEqual(statistics['maxMs'], 200)
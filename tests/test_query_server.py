@@ -0,0 +1,61 @@
+import json
+import threading
+import time
+import unittest
+from http.client import HTTPConnection
+
+from py3dtiles import TilesetReader
+
+from src.Converters import TilerToSunlight
+from src.QueryServer import QueryServer
+from src.SunlightEngine import SunlightEngine
+from src.pySunlight import SunDatas, Vec3d
+
+# Test the answers of the query server to feature queries, including unknown tiles
+
+
+class TestQueryServer(unittest.TestCase):
+    def test_feature_id(self):
+        triangle_id = TilerToSunlight.generate_triangle_id("tiles/0.b3dm", "feature__12", 3)
+        self.assertEqual(TilerToSunlight.get_feature_id_from_triangle_id(triangle_id, "tiles/0.b3dm"), "feature__12")
+
+    def test_feature_queries(self):
+        tileset = TilesetReader().read_tileset('datas/testing/b3dm_tileset/')
+        sun_datas = SunDatas("2016-01-01:0800", Vec3d(1888857.649890, 5136065.174273, 12280.013599), Vec3d(0.748839, -0.630358, 0.204667))
+
+        engine = SunlightEngine(tileset)
+        server = QueryServer(engine, [sun_datas])
+        thread = threading.Thread(target=server.serve, args=('127.0.0.1', 0))
+        thread.start()
+        while server.http_server is None:
+            time.sleep(0.01)
+
+        # Triangles of the first feature of the first tile
+        tile_wrapper = engine.tile_pool.load(0)
+        feature_id = TilerToSunlight.get_feature_id_from_triangle_id(tile_wrapper.get_triangles()[0].getId(), tile_wrapper.tile_name)
+        num_of_triangles = sum(1 for triangle in tile_wrapper.get_triangles() if TilerToSunlight.get_feature_id_from_triangle_id(triangle.getId(), tile_wrapper.tile_name) == feature_id)
+
+        def post(request):
+            connection = HTTPConnection('127.0.0.1', server.http_server.server_address[1])
+            connection.request('POST', '/query', json.dumps(request))
+            response = connection.getresponse()
+            content = json.loads(response.read())
+            connection.close()
+            return response.status, content
+
+        status, content = post({'date': "2016-01-01:0800", 'features': [{'tile': 0, 'id': feature_id}]})
+        self.assertEqual(status, 200)
+        self.assertEqual(content['features'][0]['triangles'], num_of_triangles)
+
+        # Unknown tiles are not found, instead of reading another tile
+        for tile_index in [engine.get_num_of_tiles(), -1]:
+            status, content = post({'date': "2016-01-01:0800", 'features': [{'tile': tile_index, 'id': feature_id}]})
+            self.assertEqual(status, 404)
+            self.assertIn('error', content)
+
+        server.shutdown()
+        thread.join()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+import shutil
+import unittest
+from pathlib import Path
+
+from src.Writers.ReadCache import ReadCache
+
+# Test that read back results are reused only while their file is unchanged
+
+
+class TestReadCache(unittest.TestCase):
+    def test_reuse_and_invalidation(self):
+        JUNK_DIRECTORY = Path('datas/testing', 'junk_read_cache')
+        shutil.rmtree(str(JUNK_DIRECTORY), ignore_errors=True)
+        JUNK_DIRECTORY.mkdir(parents=True)
+
+        paths = [Path(JUNK_DIRECTORY, f"{i}.json") for i in range(3)]
+        for path in paths:
+            path.write_text(path.stem)
+
+        cache = ReadCache(max_entries=2)
+
+        def load(path):
+            return Path(path).read_text()
+
+        self.assertEqual(cache.get(paths[0], load), "0")
+        self.assertEqual(cache.get(paths[0], load), "0")
+
+        # A writer changing the file invalidates its entry
+        paths[0].write_text("changed")
+        cache.invalidate(paths[0])
+        self.assertEqual(cache.get(paths[0], load), "changed")
+
+        # The least recently used entry is evicted
+        cache.get(paths[1], load)
+        cache.get(paths[2], load)
+
+        statistics = cache.get_statistics()
+        self.assertEqual(statistics['hits'], 1)
+        self.assertEqual(statistics['misses'], 4)
+        self.assertEqual(statistics['invalidations'], 1)
+        self.assertEqual(statistics['evictions'], 1)
+        self.assertEqual(statistics['entries'], 2)
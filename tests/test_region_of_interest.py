@@ -0,0 +1,86 @@
+import json
+import shutil
+import unittest
+from argparse import Namespace
+from pathlib import Path
+
+import numpy as np
+from py3dtilers.TilesetReader.TilesetReader import TilesetTiler
+
+from src import Utils
+from src.RegionOfInterest import RegionOfInterest
+from src.TileHierarchy import TileHierarchy
+from src.TilePool import TilePool
+from src.Writers import TileWriter
+
+# Test the selection of receivers in a region of interest
+
+
+class TestRegionOfInterest(unittest.TestCase):
+    def test_polygon(self):
+        # L shaped polygon
+        region_of_interest = RegionOfInterest.from_coordinates([0, 0, 10, 0, 10, 5, 5, 5, 5, 10, 0, 10])
+
+        self.assertTrue(region_of_interest.contains_point(2, 8))
+        self.assertTrue(region_of_interest.contains_point(8, 2))
+        self.assertFalse(region_of_interest.contains_point(8, 8))
+        self.assertFalse(region_of_interest.contains_point(-1, 2))
+
+        self.assertTrue(region_of_interest.intersects_bounds((np.array([9, 9, 0]), np.array([20, 20, 10]))))
+        self.assertFalse(region_of_interest.intersects_bounds((np.array([11, 0, 0]), np.array([20, 20, 10]))))
+
+    def test_bounding_box(self):
+        region_of_interest = RegionOfInterest.from_coordinates([0, 0, 10, 10])
+
+        self.assertTrue(region_of_interest.contains_point(5, 5))
+        self.assertFalse(region_of_interest.contains_point(11, 5))
+
+        with self.assertRaises(ValueError):
+            RegionOfInterest.from_coordinates([0, 0, 10])
+
+    def test_tileset_of_receivers(self):
+        ORIGINAL_DIRECTORY = Path('datas/testing', "b3dm_multiple_tileset")
+        JUNK_DIRECTORY = Path('datas/testing', "junk_region_of_interest")
+        shutil.rmtree(str(JUNK_DIRECTORY), ignore_errors=True)
+
+        tiler = TilesetTiler()
+        tiler.args = Namespace(obj=None, loa=None, lod1=False, crs_in='EPSG:3946', crs_out='EPSG:3946', offset=[0, 0, 0], with_texture=False, scale=1, output_dir=JUNK_DIRECTORY, geometric_error=[None, None, None], kd_tree_max=None, texture_lods=0)
+        tiler.files = [ORIGINAL_DIRECTORY]
+        tileset = tiler.read_and_merge_tilesets()
+
+        # Tiles are selected once for the same tile hierarchy
+        tile_hierarchy = TileHierarchy(tileset)
+        region_of_interest = RegionOfInterest.from_coordinates([1843000, 5173000, 1844000, 5174000])
+        receiver_tile_indexes = region_of_interest.select_tiles(tile_hierarchy)
+        self.assertIs(region_of_interest.select_tiles(tile_hierarchy), receiver_tile_indexes)
+        self.assertIsNot(region_of_interest.select_tiles(TileHierarchy(tileset)), receiver_tile_indexes)
+
+        # Tiles overlapping the region are loaded through the pool
+        tile_pool = TilePool(tile_hierarchy.get_tiles(), 1024 * 1024 * 1024)
+        self.assertEqual(RegionOfInterest.from_coordinates([1843000, 5173000, 1844000, 5174000]).select_tiles(tile_hierarchy, tile_pool), receiver_tile_indexes)
+        self.assertLess(0, tile_pool.get_statistics()['misses'])
+
+        # Only the first tile is a receiver of the region
+        precomputed_directory = Utils.get_output_directory_for_timestamp(str(Path(ORIGINAL_DIRECTORY, "precomputed_sunlight")), "2016-10-01:0700")
+        writer = TileWriter(Utils.get_output_directory_for_timestamp(str(JUNK_DIRECTORY), "2016-10-01:0700"), tiler)
+        writer.create_directory()
+        writer.export_feature_list_by_tile(writer.get_feature_list_from_tile(0, precomputed_directory), 0)
+        writer.export_tileset(tileset)
+
+        # Each content of the written tileset exists
+        with open(str(Path(writer.directory, "tileset.json")), 'r') as file:
+            tiles = [json.load(file)['root']]
+
+        uris = []
+        while 0 < len(tiles):
+            tile = tiles.pop()
+            tiles.extend(tile.get('children', []))
+            if 'content' in tile:
+                uris.append(tile['content']['uri'])
+
+        self.assertEqual(uris, ["tiles/0.b3dm"])
+        self.assertTrue(all(Path(writer.directory, uri).exists() for uri in uris))
+        self.assertEqual(len(writer.get_feature_list_from_tile(0, writer.directory)), len(writer.get_feature_list_from_tile(0, precomputed_directory)))
+
+        writer.close()
+        shutil.rmtree(str(JUNK_DIRECTORY), ignore_errors=True)
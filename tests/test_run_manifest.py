@@ -0,0 +1,63 @@
+import os
+import shutil
+import unittest
+from pathlib import Path
+
+from src.RunManifest import RunManifest, hash_run
+
+# Test that a resumed run skips only the units completely written by the previous run
+
+
+class TestRunManifest(unittest.TestCase):
+    def test_resume(self):
+        JUNK_DIRECTORY = Path('datas/testing', 'junk_run_manifest')
+        shutil.rmtree(str(JUNK_DIRECTORY), ignore_errors=True)
+        TIMESTAMP_DIRECTORY = Path(JUNK_DIRECTORY, '2016-01-01__0800')
+        TIMESTAMP_DIRECTORY.mkdir(parents=True)
+
+        output_path = Path(TIMESTAMP_DIRECTORY, '0.json')
+        output_path.write_text('{}')
+
+        manifest = RunManifest(str(JUNK_DIRECTORY), 'hash')
+        self.assertFalse(manifest.open(resume=True))
+        manifest.record_tile('json', str(TIMESTAMP_DIRECTORY), 0, [output_path])
+        manifest.record_tileset('json', str(TIMESTAMP_DIRECTORY))
+        manifest.record_aggregate(0)
+
+        # A partially written record is ignored
+        with open(str(manifest.path), 'a') as file:
+            file.write('{"unit": "tile", "wri')
+
+        resumed_manifest = RunManifest(str(JUNK_DIRECTORY), 'hash')
+        self.assertTrue(resumed_manifest.open(resume=True))
+        self.assertTrue(resumed_manifest.is_tile_complete('json', str(TIMESTAMP_DIRECTORY), 0, [output_path]))
+        self.assertFalse(resumed_manifest.is_tile_complete('json', str(TIMESTAMP_DIRECTORY), 1, [output_path]))
+        self.assertTrue(resumed_manifest.is_tileset_complete('json', str(TIMESTAMP_DIRECTORY)))
+        self.assertTrue(resumed_manifest.is_aggregate_complete(0))
+
+        # A modified output is exported again
+        output_path.write_text('{"changed": true}')
+        self.assertFalse(resumed_manifest.is_tile_complete('json', str(TIMESTAMP_DIRECTORY), 0, [output_path]))
+
+        # Another run starts over
+        other_manifest = RunManifest(str(JUNK_DIRECTORY), 'other hash')
+        self.assertFalse(other_manifest.open(resume=True))
+        self.assertFalse(other_manifest.is_aggregate_complete(0))
+
+    def test_hash_run_without_reading_contents(self):
+        JUNK_DIRECTORY = Path('datas/testing', 'junk_run_manifest')
+        shutil.rmtree(str(JUNK_DIRECTORY), ignore_errors=True)
+        INPUT_DIRECTORY = Path(JUNK_DIRECTORY, 'input')
+        INPUT_DIRECTORY.mkdir(parents=True)
+
+        input_path = Path(INPUT_DIRECTORY, 'tile.b3dm')
+        input_path.write_text('content')
+        run_hash = hash_run([INPUT_DIRECTORY], {'parameter': 1}, read_contents=False)
+        self.assertEqual(run_hash, hash_run([INPUT_DIRECTORY], {'parameter': 1}, read_contents=False))
+        self.assertNotEqual(run_hash, hash_run([INPUT_DIRECTORY], {'parameter': 2}, read_contents=False))
+
+        # A modified input changes the hash through its size and modification time
+        stat = input_path.stat()
+        input_path.write_text('modified content')
+        os.utime(str(input_path), ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+        self.assertNotEqual(run_hash, hash_run([INPUT_DIRECTORY], {'parameter': 1}, read_contents=False))
@@ -0,0 +1,34 @@
+import argparse
+import unittest
+from argparse import Namespace
+
+from src.main import DEFAULT_SUNPATH, load_scenarios, parse_scenario
+
+# Test that scenarios of the command line are parsed and loaded with their own dates
+
+
+class TestScenarios(unittest.TestCase):
+    def test_parse_scenario(self):
+        scenario = parse_scenario("winter:403224:403248")
+        self.assertEqual((scenario.name, scenario.start_date, scenario.end_date, scenario.sunpath), ("winter", 403224, 403248, None))
+
+        # Sun paths can contain ':' on Windows
+        self.assertEqual(parse_scenario("summer:407592:407616:C:/datas/sunpath.csv").sunpath, "C:/datas/sunpath.csv")
+
+        # Names are directories of the output directory, next to the geometry, queue and profile
+        self.assertEqual(parse_scenario("winter.2016:403224:403248").name, "winter.2016")
+        for value in ["winter:403224", "../winter:403224:403248", "winter/..:403224:403248", "winter:start::", ":403224:403248", ".:403224:403248", "..:403224:403248", "...:403224:403248", "geometry:403224:403248", "Queue:403224:403248", "profile:403224:403248", "winter:start:end"]:
+            with self.assertRaises(argparse.ArgumentTypeError):
+                parse_scenario(value)
+
+    def test_load_scenarios(self):
+        args = Namespace(sun_source='numpy', sunpath=DEFAULT_SUNPATH, scenarios=[parse_scenario("winter:403224:403248"), parse_scenario("summer:407592:407604")])
+
+        scenarios = load_scenarios(args)
+        self.assertEqual(list(scenarios), ["winter", "summer"])
+        self.assertEqual(len(scenarios["summer"]), 12)
+        self.assertEqual(scenarios["summer"][0].dateStr, "2016-07-01:0000")
+
+        args.scenarios.append(parse_scenario("winter:403248:403272"))
+        with self.assertRaises(ValueError):
+            load_scenarios(args)
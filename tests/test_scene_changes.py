@@ -0,0 +1,44 @@
+import unittest
+
+import numpy as np
+
+from src import Geometry
+from src.SceneChanges import SceneChanges
+
+# Test that only tiles which can be shadowed by a changed tile are computed again
+
+
+def describe(hash: str, min: list, max: list):
+    return {'hash': hash, 'min': min, 'max': max}
+
+
+class TestSceneChanges(unittest.TestCase):
+    def test_shadow_corridor(self):
+        receiver = (np.array([0, 0, 0]), np.array([10, 10, 1]))
+        occluder = (np.array([20, 0, 0]), np.array([30, 10, 20]))
+
+        # Sun in the east and low on horizon, the occluder is in the way
+        self.assertTrue(Geometry.is_in_shadow_corridor(receiver, occluder, [0.8, 0, 0.6]))
+
+        # Sun in the west, the occluder is behind the receiver
+        self.assertFalse(Geometry.is_in_shadow_corridor(receiver, occluder, [-0.8, 0, 0.6]))
+
+        # Sun too high, the ray passes above the occluder
+        self.assertFalse(Geometry.is_in_shadow_corridor(receiver, occluder, [0.1, 0, 0.99]))
+
+    def test_affected_tiles(self):
+        previous_tiles = [
+            describe('a', [0, 0, 0], [10, 10, 1]),
+            describe('b', [20, 0, 0], [30, 10, 20]),
+            describe('c', [-30, 0, 0], [-20, 10, 1])
+        ]
+        current_tiles = [previous_tiles[0], describe('new b', [20, 0, 0], [30, 10, 40]), previous_tiles[2]]
+
+        scene_changes = SceneChanges(previous_tiles, current_tiles)
+        self.assertEqual(scene_changes.get_changed_tile_indexes(), [1])
+        self.assertEqual(scene_changes.get_affected_tile_indexes([0.8, 0, 0.6]), [0, 1, 2])
+        self.assertEqual(scene_changes.get_affected_tile_indexes([-0.8, 0, 0.6]), [1])
+
+        # Tile indexes can't be matched when tiles are added
+        scene_changes = SceneChanges(previous_tiles[:2], current_tiles)
+        self.assertTrue(scene_changes.is_full_recompute())
@@ -0,0 +1,106 @@
+import json
+import shutil
+import unittest
+from pathlib import Path
+
+from py3dtilers.Common import FeatureList
+from py3dtilers.TilesetReader.TilesetReader import TilesetTiler
+
+from benchmarks.SyntheticCity import (ORIGIN, create_building, create_feature,
+                                      get_tiler_args, write_tileset)
+from src.LazyTileset import LazyTileset
+from src.Writers import SharedGeometryTileWriter, TileWriter
+
+# Test that the shared geometry writer stores one batch table by tile, referenced by a tileset using
+# the shared geometry, and reads back the same results as the tile writer
+
+JUNK_DIRECTORY = Path('datas/testing', 'junk_shared_geometry')
+RESULT_KEYS = ['date', 'bLighted', 'occultingId']
+
+
+def create_result_feature_list():
+    feature_list = FeatureList()
+
+    for i in range(3):
+        feature = create_feature(f"tiles/0.b3dm__building_{i}__0", create_building(ORIGIN[0] + 20 * i, ORIGIN[1], 10, 10, 20, 1))
+
+        # Results are recorded in another order than the batch table order
+        feature.add_batchtable_data('occultingId', "" if i == 1 else "tiles/0.b3dm__building_1__0")
+        feature.add_batchtable_data('bLighted', i == 1)
+        feature.add_batchtable_data('date', "2016-01-01__0800")
+        feature_list.append(feature)
+
+    return feature_list
+
+
+class TestSharedGeometryTileWriter(unittest.TestCase):
+    def setUp(self):
+        shutil.rmtree(str(JUNK_DIRECTORY), ignore_errors=True)
+
+        write_tileset(str(Path(JUNK_DIRECTORY, "input")), [create_result_feature_list()])
+        self.tileset = LazyTileset([Path(JUNK_DIRECTORY, "input")])
+
+        self.tiler = TilesetTiler()
+        self.tiler.args = get_tiler_args(str(JUNK_DIRECTORY))
+
+    def tearDown(self):
+        shutil.rmtree(str(JUNK_DIRECTORY), ignore_errors=True)
+
+    def test_batch_table_and_tileset(self):
+        directory = Path(JUNK_DIRECTORY, "shared", "2016-01-01__0800")
+        writer = SharedGeometryTileWriter(str(directory), self.tiler, Path(JUNK_DIRECTORY, "shared", "geometry"))
+        writer.create_directory()
+
+        writer.export_feature_list_by_tile(create_result_feature_list(), 0)
+        writer.export_tileset(self.tileset)
+        writer.close()
+
+        # One array by property, in the order of the batch table of a b3dm
+        with open(str(Path(directory, "tiles", "0.json")), 'r') as file:
+            batch_table = json.load(file)
+
+        self.assertEqual(list(batch_table), ['id'] + RESULT_KEYS)
+        self.assertEqual(batch_table['id'], [f"tiles/0.b3dm__building_{i}__0" for i in range(3)])
+        self.assertEqual(batch_table['bLighted'], [False, True, False])
+        self.assertEqual(batch_table['occultingId'], ["tiles/0.b3dm__building_1__0", "", "tiles/0.b3dm__building_1__0"])
+
+        # The content references the shared geometry, and the batch table is in the extras
+        with open(str(Path(directory, "tileset.json")), 'r') as file:
+            tileset_json = json.load(file)
+
+        contents = []
+        tiles = [tileset_json['root']]
+        while 0 < len(tiles):
+            tile = tiles.pop()
+            tiles.extend(tile.get('children', []))
+            if 'content' in tile:
+                contents.append((tile['content']['uri'], tile['extras']['batchTable']))
+
+        self.assertEqual(contents, [("../geometry/tiles/0.b3dm", "tiles/0.json")])
+
+    def test_read_back_like_the_tile_writer(self):
+        feature_lists = []
+        for writer_class, name in [(TileWriter, "tile"), (SharedGeometryTileWriter, "shared")]:
+            directory = Path(JUNK_DIRECTORY, name, "2016-01-01__0800")
+            if writer_class is TileWriter:
+                writer = TileWriter(str(directory), self.tiler)
+            else:
+                writer = SharedGeometryTileWriter(str(directory), self.tiler, Path(JUNK_DIRECTORY, name, "geometry"))
+            writer.create_directory()
+
+            writer.export_feature_list_by_tile(create_result_feature_list(), 0)
+            writer.export_tileset(self.tileset)
+            feature_lists.append(writer.get_feature_list_from_tile(0, str(directory)))
+            writer.close()
+
+        tile_feature_list, shared_feature_list = feature_lists
+        self.assertEqual(len(shared_feature_list), len(tile_feature_list))
+        for tile_feature, shared_feature in zip(tile_feature_list, shared_feature_list):
+            self.assertEqual(shared_feature.get_id(), tile_feature.get_id())
+
+            for key in RESULT_KEYS:
+                self.assertEqual(shared_feature.get_batchtable_data()[key], tile_feature.get_batchtable_data()[key])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import shutil
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+from src import SunPosition
+from src.SunPosition import SunPositionProvider
+
+# Test that sun positions loaded with NumPy and computed by the NOAA algorithm agree with the Lyon sun
+# path file
+
+SUNPATH = "datas/AnnualSunPath_Lyon.csv"
+
+
+class TestSunPosition(unittest.TestCase):
+    def test_load_sunpath_file(self):
+        # 2016-01-01 from 00:00 to 23:00, the first position of the parser is at 08:00
+        sun_datas_list = SunPosition.load_sunpath_file(SUNPATH, 403224, 403248)
+        self.assertEqual(len(sun_datas_list), 24)
+        self.assertEqual(sun_datas_list[8].dateStr, "2016-01-01:0800")
+
+        # Same directions as the parser, in and out of summer time
+        direction = sun_datas_list[8].direction
+        np.testing.assert_allclose([direction.x, direction.y, direction.z], [0.748839, -0.630358, 0.204667], atol=1e-6)
+
+        direction = SunPosition.load_sunpath_file(SUNPATH, 409800, 409824)[7].direction
+        np.testing.assert_allclose([direction.x, direction.y, direction.z], [0.965917, -0.130426, 0.223590], atol=1e-6)
+
+        # Nothing is lighted at night, nor when only the elevation of the next hour is known
+        for night_index in [0, 7]:
+            direction = sun_datas_list[night_index].direction
+            self.assertEqual([direction.x, direction.y, direction.z], [0, 0, 0])
+
+    def test_summer_time(self):
+        dates = np.array(['2016-03-26T12', '2016-03-27T12', '2016-10-29T12', '2016-10-30T12'], dtype='datetime64[h]')
+        self.assertEqual(SunPosition.is_summer_time(dates).tolist(), [False, True, True, False])
+
+    def test_solar_angles_of_the_sunpath_file(self):
+        (latitude, longitude), days, elevations, azimuths = SunPosition.read_sunpath_file(SUNPATH)
+
+        dates = (days.astype('datetime64[h]')[:, np.newaxis] + np.arange(24).astype('timedelta64[h]')).ravel()
+        elevation, azimuth = SunPosition.compute_solar_angles(latitude, longitude, dates, utc_offset=1)
+
+        # Angles of the file are rounded to 0.01 degree
+        day = ~np.isnan(elevations.ravel())
+        self.assertLess(np.amax(np.abs(elevation[day] - elevations.ravel()[day])), 0.03)
+        self.assertLess(np.amax(np.abs(azimuth[day] - azimuths.ravel()[day])), 0.03)
+
+    def test_provider_cache(self):
+        JUNK_DIRECTORY = Path('datas/testing', 'junk_sun_positions')
+        shutil.rmtree(str(JUNK_DIRECTORY), ignore_errors=True)
+
+        provider = SunPositionProvider(45.75, 4.85, summer_time=True, cache_directory=JUNK_DIRECTORY)
+        sun_datas_list = provider.get_sun_datas(403224, 403248)
+        self.assertEqual(len(list(JUNK_DIRECTORY.glob('*.npz'))), 1)
+
+        cached_sun_datas_list = provider.get_sun_datas(403224, 403248)
+        self.assertEqual([sun_datas.direction.z for sun_datas in cached_sun_datas_list], [sun_datas.direction.z for sun_datas in sun_datas_list])
+
+        # Computed azimuths are the ones of the parser, in and out of summer time
+        for sun_datas, azimuth in [(sun_datas_list[8], 130.09), (provider.get_sun_datas(409800, 409824)[7], 97.69)]:
+            self.assertAlmostEqual(np.degrees(np.arctan2(sun_datas.direction.x, sun_datas.direction.y)), azimuth, delta=0.03)
+
+        shutil.rmtree(str(JUNK_DIRECTORY), ignore_errors=True)
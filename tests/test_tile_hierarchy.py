@@ -0,0 +1,102 @@
+import unittest
+
+import numpy as np
+
+from src.TileHierarchy import TileHierarchy, prune_tileset_json
+
+# Test the pre-order indexing and the culling of a tile tree
+
+
+class BoundingVolume():
+    def __init__(self, min, max):
+        self.corners = np.array([min, max])
+
+    def get_corners(self):
+        return self.corners
+
+
+class Tile():
+    def __init__(self, min, max, has_content=True, children=None, refine=None):
+        self.bounding_volume = BoundingVolume(min, max)
+        self.content_uri = "tiles/0.b3dm" if has_content else None
+        self.children = [] if children is None else children
+        self.refine = refine
+
+    def get_bounding_volume(self):
+        return self.bounding_volume
+
+    def get_content_uri(self):
+        return self.content_uri
+
+    def get_children(self):
+        return self.children
+
+
+class TileSet():
+    def __init__(self, children, refine='ADD'):
+        self.root = Tile([0, 0, 0], [0, 0, 0], False, children, refine)
+
+    def get_root_tile(self):
+        return self.root
+
+
+class TestTileHierarchy(unittest.TestCase):
+    def test_hierarchy(self):
+        receiver = Tile([0, 0, 0], [10, 10, 10])
+        east = Tile([20, 0, 0], [30, 10, 20])
+        far_east = Tile([40, 0, 0], [50, 10, 40])
+        west_group = Tile([-50, 0, 0], [-20, 10, 40], False, [Tile([-50, 0, 0], [-40, 10, 40]), Tile([-30, 0, 0], [-20, 10, 20])])
+
+        tile_hierarchy = TileHierarchy(TileSet([receiver, Tile([20, 0, 0], [50, 10, 40], False, [east, far_east]), west_group]))
+
+        # Tiles with a content are indexed in pre-order
+        self.assertEqual(tile_hierarchy.get_num_of_tiles(), 5)
+        self.assertIs(tile_hierarchy.get_tiles()[0], receiver)
+        self.assertIs(tile_hierarchy.get_tiles()[2], far_east)
+
+        # Sun in the east, the west group is skipped at once
+        receiver_bounds = tile_hierarchy.get_tile_bounds(0)
+        self.assertEqual(tile_hierarchy.get_occluder_tile_indexes(receiver_bounds, [0.8, 0, 0.6]), [0, 1, 2])
+        self.assertEqual(tile_hierarchy.get_occluder_tile_indexes(receiver_bounds, [-0.8, 0, 0.6]), [0, 3, 4])
+
+    def test_replace_refinement(self):
+        # Two levels of details of the same buildings, the coarse level is replaced by the detailed one
+        detailed_tiles = [Tile([0, 0, 0], [10, 10, 10]), Tile([10, 0, 0], [20, 10, 20])]
+        coarse_tile = Tile([0, 0, 0], [20, 10, 20], True, detailed_tiles, 'REPLACE')
+        added_tile = Tile([40, 0, 0], [50, 10, 20], True, [Tile([40, 0, 0], [45, 10, 10])], 'ADD')
+
+        tile_hierarchy = TileHierarchy(TileSet([coarse_tile, added_tile], 'REPLACE'))
+
+        # Only the detailed level receives and casts shadows, contents added to a tile are kept
+        self.assertEqual(tile_hierarchy.get_num_of_tiles(), 4)
+        self.assertEqual(tile_hierarchy.get_tiles(), detailed_tiles + [added_tile, added_tile.get_children()[0]])
+
+        # The coarse content is never an occluder of its own children
+        receiver_bounds = tile_hierarchy.get_tile_bounds(0)
+        self.assertEqual(tile_hierarchy.get_occluder_tile_indexes(receiver_bounds, [0.8, 0, 0.6]), [0, 1])
+
+        # The written tileset drops the coarse content, with the same tile indexes
+        tileset_json = {'root': {'refine': 'REPLACE', 'children': [
+            {'content': {'uri': 'coarse.b3dm'}, 'children': [{'content': {'uri': 'a.b3dm'}}, {'content': {'uri': 'b.b3dm'}}]},
+            {'refine': 'ADD', 'content': {'uri': 'c.b3dm'}, 'children': [{'content': {'uri': 'd.b3dm'}}]}
+        ]}}
+        prune_tileset_json(tileset_json, lambda tile_index: f"tiles/{tile_index}.b3dm")
+        self.assertEqual(tileset_json, {'root': {'refine': 'REPLACE', 'children': [
+            {'children': [{'content': {'uri': 'tiles/0.b3dm'}}, {'content': {'uri': 'tiles/1.b3dm'}}]},
+            {'refine': 'ADD', 'content': {'uri': 'tiles/2.b3dm'}, 'children': [{'content': {'uri': 'tiles/3.b3dm'}}]}
+        ]}})
+
+    def test_prune_tileset_json(self):
+        tileset_json = {'root': {'children': [
+            {'content': {'uri': 'a.b3dm'}},
+            {'children': [{'content': {'uri': 'b/c.b3dm'}}, {'content': {'uri': 'b/d.b3dm'}}]},
+            {'content': {'uri': 'e.b3dm'}, 'children': [{'content': {'uri': 'e/f.b3dm'}}]}
+        ]}}
+
+        # Contents reference the tiles by index, subtrees without kept content are removed and parents
+        # of kept tiles lose their content
+        prune_tileset_json(tileset_json, lambda tile_index: f"tiles/{tile_index}.b3dm" if tile_index in [2, 4] else None)
+        self.assertEqual(tileset_json, {'root': {'children': [
+            {'children': [{'content': {'uri': 'tiles/2.b3dm'}}]},
+            {'children': [{'content': {'uri': 'tiles/4.b3dm'}}]}
+        ]}})
@@ -0,0 +1,50 @@
+import unittest
+
+from src.TilePool import TilePool
+from src.TileWrapper import get_string_memory_size
+
+# Test that the tiles kept by the tile pool stay under its memory budget
+
+
+class TileWrapper():
+    def __init__(self, tile_index, memory_size):
+        self.index = tile_index
+        self.memory_size = memory_size
+
+    def get_memory_size(self):
+        return self.memory_size
+
+
+class TestTilePool(unittest.TestCase):
+    def test_memory_budget(self):
+        sizes = [300, 200, 500, 100, 400, 250, 350, 150]
+        tile_pool = TilePool([None] * len(sizes), 800)
+
+        def tile_loader(tile_index):
+            return TileWrapper(tile_index, sizes[tile_index])
+
+        for tile_index in list(range(len(sizes))) * 2 + [3, 3, 7]:
+            tile_wrapper = tile_pool.load(tile_index, tile_loader)
+            self.assertEqual(tile_wrapper.index, tile_index)
+
+            self.assertLessEqual(tile_pool.memory_in_bytes, 800)
+            self.assertEqual(tile_pool.memory_in_bytes, sum(size for _, size in tile_pool.tile_wrappers.values()))
+
+        statistics = tile_pool.get_statistics()
+        self.assertLessEqual(statistics['tiles'], 4)
+        self.assertEqual(statistics['hits'], 2)
+        self.assertEqual(statistics['misses'], 17)
+
+        # A tile larger than the budget is kept alone
+        tile_pool = TilePool([None], 100)
+        tile_pool.load(0, tile_loader)
+        self.assertEqual(tile_pool.get_statistics()['tiles'], 1)
+
+    def test_string_memory_size(self):
+        # Short strings are stored in the std::string itself
+        self.assertEqual(get_string_memory_size("tiles/0.b3dm"), 0)
+        self.assertEqual(get_string_memory_size("tiles/0.b3dm__feature_12__3"), 27 + 1 + 16)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import threading
+import time
+import unittest
+
+from src.TilePrefetcher import TilePrefetcher
+
+# Test that the prefetcher returns the tiles loaded in a background thread in order, passes loading
+# errors to the consumer and loads a bounded number of tiles in advance
+
+
+class TestTilePrefetcher(unittest.TestCase):
+    def test_prefetched_order(self):
+        tile_indexes = [3, 0, 2, 1]
+        prefetcher = TilePrefetcher([None] * 4, prefetch_size=2, tile_indexes=tile_indexes, tile_loader=lambda tile_index: f"tile_{tile_index}")
+
+        self.assertEqual(list(prefetcher), [(tile_index, f"tile_{tile_index}") for tile_index in tile_indexes])
+
+    def test_loader_exception(self):
+        def load(tile_index):
+            if tile_index == 2:
+                raise ValueError("Invalid tile")
+            return tile_index
+
+        loaded_tile_indexes = []
+        with self.assertRaises(ValueError):
+            for tile_index, _ in TilePrefetcher([None] * 4, prefetch_size=2, tile_loader=load):
+                loaded_tile_indexes.append(tile_index)
+
+        # Tiles loaded before the error are still returned
+        self.assertEqual(loaded_tile_indexes, [0, 1])
+
+    def test_backpressure(self):
+        lock = threading.Lock()
+        loaded_tile_indexes = []
+
+        def load(tile_index):
+            with lock:
+                loaded_tile_indexes.append(tile_index)
+            return tile_index
+
+        prefetch_size = 2
+        iterator = iter(TilePrefetcher([None] * 10, prefetch_size=prefetch_size, tile_loader=load))
+        self.assertEqual(next(iterator), (0, 0))
+
+        # The consumer is slow, the producer waits once the queue is full, with one tile waiting to be put
+        time.sleep(0.3)
+        with lock:
+            self.assertEqual(len(loaded_tile_indexes), 1 + prefetch_size + 1)
+
+        self.assertEqual([tile_index for tile_index, _ in iterator], list(range(1, 10)))
+        self.assertEqual(loaded_tile_indexes, list(range(10)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import shutil
+import unittest
+from argparse import Namespace
+from filecmp import cmp
+from pathlib import Path
+
+import numpy as np
+from py3dtilers.Common import FeatureList
+from py3dtilers.Common.feature import Feature
+from src.Writers.TileWriter import (create_feature_list, encode_tile,
+                                    encode_tile_arrays, get_tile_arrays)
+
+# Test that a tile sent to the encoding processes as arrays is encoded like its feature list
+
+
+def create_test_feature_list(with_uvs=False):
+    feature_list = FeatureList()
+
+    for i in range(3):
+        feature = Feature(f"feature_{i}")
+        feature.geom.triangles.append([[np.array([i, 0., 0.]), np.array([i + 1, 0., 0.]), np.array([i, 1., float(i)])]])
+        if with_uvs:
+            feature.geom.triangles.append([[np.array([0., 0.]), np.array([1., 0.]), np.array([0., 1.])]])
+
+        feature.add_batchtable_data('date', "2016-01-01__0800")
+        feature.add_batchtable_data('bLighted', i % 2 == 0)
+        feature.add_batchtable_data('occultingId', "" if i % 2 == 0 else "tiles/0.b3dm__feature_0__0")
+        feature_list.append(feature)
+
+    return feature_list
+
+
+class TestTileWriter(unittest.TestCase):
+    def test_tile_arrays_encoding(self):
+        JUNK_DIRECTORY = Path('datas/testing', 'junk_tile_writer')
+        shutil.rmtree(str(JUNK_DIRECTORY), ignore_errors=True)
+
+        args = Namespace(crs_in='EPSG:3946', crs_out='EPSG:3946', offset=[0, 0, 0], with_texture=False, scale=1)
+
+        encode_tile(create_test_feature_list(), args, 0, str(Path(JUNK_DIRECTORY, "features")))
+        encode_tile_arrays(get_tile_arrays(create_test_feature_list()), args, 0, str(Path(JUNK_DIRECTORY, "arrays")))
+
+        self.assertTrue(cmp(Path(JUNK_DIRECTORY, "features", "tiles", "0.b3dm"), Path(JUNK_DIRECTORY, "arrays", "tiles", "0.b3dm"), shallow=False))
+
+        shutil.rmtree(str(JUNK_DIRECTORY), ignore_errors=True)
+
+    def test_tile_arrays_with_texture_coordinates(self):
+        feature_list = create_test_feature_list(with_uvs=True)
+        copied_feature_list = create_feature_list(get_tile_arrays(feature_list))
+
+        self.assertEqual(len(copied_feature_list), len(feature_list))
+        for feature, copied_feature in zip(feature_list, copied_feature_list):
+            self.assertEqual(copied_feature.get_id(), feature.get_id())
+            self.assertEqual(copied_feature.get_batchtable_data(), feature.get_batchtable_data())
+            self.assertEqual(copied_feature.material_index, feature.material_index)
+
+            self.assertEqual(len(copied_feature.geom.triangles), 2)
+            np.testing.assert_array_equal(np.asarray(copied_feature.geom.triangles[0]), np.asarray(feature.geom.triangles[0]))
+            np.testing.assert_array_equal(np.asarray(copied_feature.geom.triangles[1]), np.asarray(feature.geom.triangles[1]))
+
+        self.assertEqual(copied_feature_list.materials, feature_list.materials)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import shutil
+import unittest
+from pathlib import Path
+
+from py3dtilers.Common import Feature, FeatureList
+from src.TimeSeriesQuery import TimeSeriesQuery
+from src.Writers import TimeSeriesWriter
+from src.Writers.TimeSeriesWriter import replace_state_in_runs
+
+# Test the run-length encoded time series export and its range queries
+
+
+class TestTimeSeries(unittest.TestCase):
+    def export_states(self, writer: TimeSeriesWriter, date: str, states: list):
+        feature_list = FeatureList()
+        for i, state in enumerate(states):
+            feature = Feature(f"Triangle-{i}")
+            feature.add_batchtable_data('date', date)
+            feature.add_batchtable_data('bLighted', state)
+            feature.add_batchtable_data('occultingId', "")
+            feature_list.append(feature)
+
+        writer.export_feature_list_by_tile(feature_list, 0)
+
+    def test_range_queries(self):
+        JUNK_DIRECTORY = Path('datas/testing', 'junk_time_series')
+        shutil.rmtree(str(JUNK_DIRECTORY), ignore_errors=True)
+
+        writer = TimeSeriesWriter(JUNK_DIRECTORY)
+        writer.create_directory()
+
+        self.export_states(writer, "2016-01-01:0800", [True, False])
+        self.export_states(writer, "2016-01-01:0900", [True, True])
+        self.export_states(writer, "2016-01-01:1000", [False, True])
+
+        # Exporting a timestamp again replaces its states
+        self.export_states(writer, "2016-01-01:0900", [False, True])
+
+        # Series are written once, when the writer is closed
+        self.assertFalse(writer.get_path(0).exists())
+        writer.close()
+
+        query = TimeSeriesQuery(JUNK_DIRECTORY)
+        self.assertEqual(query.get_time_series(0)['dates'], ["2016-01-01:0800", "2016-01-01:0900", "2016-01-01:1000"])
+        self.assertEqual(query.get_time_series(0)['triangles']['Triangle-0'], [[True, 1], [False, 2]])
+        self.assertEqual(query.get_lighted_hours(0, 'Triangle-0'), 1)
+        self.assertEqual(query.get_lighted_hours(0, 'Triangle-1', "2016-01-01:0900", "2016-01-01:0930"), 1)
+        self.assertEqual(query.get_lighted_hours_by_triangle(0, "2016-01-01:0900"), {'Triangle-0': 0, 'Triangle-1': 2})
+        self.assertFalse(query.is_lighted_at(0, 'Triangle-0', "2016-01-01:1000"))
+        self.assertIsNone(query.is_lighted_at(0, 'Triangle-0', "2016-01-01:1100"))
+
+    def test_replace_state_in_runs(self):
+        runs = [[True, 3], [False, 2]]
+
+        # Splitting a run
+        self.assertTrue(replace_state_in_runs(runs, 1, False))
+        self.assertEqual(runs, [[True, 1], [False, 1], [True, 1], [False, 2]])
+
+        # Merging with the previous and next runs
+        self.assertTrue(replace_state_in_runs(runs, 2, False))
+        self.assertEqual(runs, [[True, 1], [False, 4]])
+        self.assertTrue(replace_state_in_runs(runs, 0, False))
+        self.assertEqual(runs, [[False, 5]])
+
+        # An unchanged state keeps the runs
+        self.assertFalse(replace_state_in_runs(runs, 4, False))
+        self.assertEqual(runs, [[False, 5]])
+
+        self.assertTrue(replace_state_in_runs(runs, 4, None))
+        self.assertEqual(runs, [[False, 4], [None, 1]])
+        with self.assertRaises(IndexError):
+            replace_state_in_runs(runs, 5, True)
@@ -0,0 +1,137 @@
+import multiprocessing
+import os
+import shutil
+import time
+import unittest
+from pathlib import Path
+
+from src.WorkQueue import LeaseLostError, WorkQueue, split_into_shards
+
+# Test that shards cover the run once, and are claimed once by workers of several processes
+
+JUNK_DIRECTORY = Path('datas/testing', 'junk_work_queue')
+
+
+def claim_all_shards(directory, worker_id):
+    queue = WorkQueue(directory)
+    queue.load(timeout=10)
+
+    while not queue.is_complete():
+        shard = queue.claim(worker_id)
+        if shard is None:
+            time.sleep(0.01)
+            continue
+
+        with queue.hold(shard['id'], worker_id):
+            with open(str(Path(directory, f"claims-{worker_id}.txt")), 'a') as file:
+                file.write(f"{shard['id']}\n")
+
+        queue.complete(shard['id'], worker_id)
+
+
+class TestWorkQueue(unittest.TestCase):
+    def setUp(self):
+        shutil.rmtree(str(JUNK_DIRECTORY), ignore_errors=True)
+
+    def tearDown(self):
+        shutil.rmtree(str(JUNK_DIRECTORY), ignore_errors=True)
+
+    def test_split_into_shards(self):
+        shards = split_into_shards({'winter': 5, 'summer': 2}, [0, 2, 3], shard_tiles=2, shard_timestamps=2)
+
+        pairs = [(shard['scenario'], i, tile_index) for shard in shards for i in range(shard['start'], shard['end']) for tile_index in shard['tiles']]
+        self.assertEqual(len(pairs), len(set(pairs)))
+        self.assertEqual(len(pairs), (5 + 2) * 3)
+        self.assertEqual([shard['id'] for shard in shards], sorted(shard['id'] for shard in shards))
+
+        # Without limits, a shard contains the whole scenario
+        self.assertEqual(split_into_shards({None: 24}, range(4)), [{'id': '000000', 'scenario': None, 'start': 0, 'end': 24, 'tiles': [0, 1, 2, 3]}])
+
+    def test_claim_and_expire(self):
+        queue = WorkQueue(JUNK_DIRECTORY, lease_seconds=60)
+        queue.publish({'runHash': 'a'}, split_into_shards({None: 2}, range(2), shard_tiles=1))
+
+        self.assertEqual(queue.claim('worker-1')['id'], '000000')
+        self.assertEqual(queue.claim('worker-2')['id'], '000001')
+        self.assertIsNone(queue.claim('worker-3'))
+
+        queue.complete('000000', 'worker-1')
+        self.assertEqual(queue.get_completed_shard_ids(), {'000000'})
+        self.assertFalse(queue.is_complete())
+
+        # The lease of a stopped worker expires
+        lease_path = queue.get_lease_path('000001')
+        os.utime(str(lease_path), (time.time() - 120, time.time() - 120))
+        self.assertEqual(queue.claim('worker-3')['id'], '000001')
+        self.assertEqual(lease_path.read_text(), 'worker-3')
+
+        queue.complete('000001', 'worker-3')
+        self.assertTrue(queue.is_complete())
+
+        # Completed shards are kept by the same job, and reset by another one
+        queue.publish({'runHash': 'a'}, split_into_shards({None: 2}, range(2), shard_tiles=1))
+        self.assertTrue(queue.is_complete())
+        queue.publish({'runHash': 'b'}, split_into_shards({None: 2}, range(2), shard_tiles=1))
+        self.assertEqual(queue.get_completed_shard_ids(), set())
+
+    def test_expired_and_reclaimed(self):
+        queue = WorkQueue(JUNK_DIRECTORY, lease_seconds=60)
+        queue.publish({'runHash': 'a'}, split_into_shards({None: 1}, range(1)))
+        output_directory = Path(JUNK_DIRECTORY, 'output')
+
+        # Both workers stage the same output of the shard
+        self.assertEqual(queue.claim('worker-1')['id'], '000000')
+        staging_directories = dict()
+        for worker_id in ['worker-1', 'worker-2']:
+            staging_directories[worker_id] = queue.get_staging_directory(output_directory, '000000', worker_id)
+            Path(staging_directories[worker_id], '2016-01-01__0800').mkdir(parents=True)
+            Path(staging_directories[worker_id], '2016-01-01__0800', '0.json').write_text(worker_id)
+
+        # The lease of worker-1 expires and is claimed again by worker-2
+        lease_path = queue.get_lease_path('000000')
+        os.utime(str(lease_path), (time.time() - 120, time.time() - 120))
+        self.assertEqual(queue.claim('worker-2')['id'], '000000')
+
+        # worker-1 can't renew nor complete the shard anymore, and its outputs are not moved
+        with self.assertRaises(LeaseLostError):
+            queue.renew('000000', 'worker-1')
+        with self.assertRaises(LeaseLostError):
+            queue.complete('000000', 'worker-1', staged_directories=[(staging_directories['worker-1'], output_directory)])
+        self.assertFalse(queue.is_complete())
+        self.assertFalse(Path(output_directory, '2016-01-01__0800', '0.json').exists())
+
+        queue.renew('000000', 'worker-2')
+        queue.complete('000000', 'worker-2', staged_directories=[(staging_directories['worker-2'], output_directory)])
+        self.assertTrue(queue.is_complete())
+        self.assertEqual(Path(output_directory, '2016-01-01__0800', '0.json').read_text(), 'worker-2')
+        self.assertFalse(staging_directories['worker-2'].exists())
+
+    def test_hold_detects_lost_lease(self):
+        queue = WorkQueue(JUNK_DIRECTORY, lease_seconds=0.3)
+        queue.publish({'runHash': 'a'}, split_into_shards({None: 1}, range(1)))
+        self.assertEqual(queue.claim('worker-1')['id'], '000000')
+
+        with queue.hold('000000', 'worker-1') as lease_lost:
+            self.assertFalse(lease_lost.is_set())
+
+            # Another worker owns the lease once it expired
+            queue.get_lease_path('000000').write_text('worker-2')
+            self.assertTrue(lease_lost.wait(2))
+
+    def test_workers_claim_each_shard_once(self):
+        queue = WorkQueue(JUNK_DIRECTORY)
+        shards = split_into_shards({None: 20}, range(10), shard_tiles=1, shard_timestamps=1)
+
+        processes = [multiprocessing.Process(target=claim_all_shards, args=(str(JUNK_DIRECTORY), f"worker-{i}")) for i in range(4)]
+        for process in processes:
+            process.start()
+
+        queue.publish({'runHash': 'a'}, shards)
+
+        for process in processes:
+            process.join()
+            self.assertEqual(process.exitcode, 0)
+
+        claimed_shard_ids = [line for path in JUNK_DIRECTORY.glob("claims-*.txt") for line in path.read_text().split()]
+        self.assertEqual(sorted(claimed_shard_ids), [shard['id'] for shard in shards])
+        self.assertTrue(queue.is_complete())